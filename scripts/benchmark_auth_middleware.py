@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmark requests/sec of a trivial authenticated endpoint through the API middleware stack.
+
+Features:
+1) Builds a minimal FastAPI app with the same middleware order as server/main.py
+   (CORS, access log, login rate limit) and one endpoint depending on get_required_user;
+   the legacy setup also has the former pass-through auth middleware
+2) Compares three setups in-process (httpx ASGITransport, no network):
+   - legacy:     BaseHTTPMiddleware-based middlewares + a users query on every request
+   - asgi:       pure ASGI middlewares + a users query on every request
+   - asgi+cache: pure ASGI middlewares + cached token -> user principal
+3) Runs against POSTGRES_URL in a scratch schema (dropped afterwards unless --keep);
+   falls back to a temporary SQLite file when no DSN is available
+4) Prints requests/sec and latency (p50 / p95) per setup; optional JSON output
+
+Usage:
+    python scripts/benchmark_auth_middleware.py --requests 5000 --concurrency 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("YUXI_SKIP_APP_INIT", "1")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from server.utils.access_log_middleware import AccessLogMiddleware, access_logger  # noqa: E402
+from server.utils.auth_cache import auth_principal_cache  # noqa: E402
+from server.utils.auth_middleware import get_required_user, is_public_path  # noqa: E402
+from server.utils.auth_utils import AuthUtils  # noqa: E402
+from server.utils.login_rate_limit_middleware import RATE_LIMIT_ENDPOINTS, LoginRateLimitMiddleware  # noqa: E402
+from src.storage.postgres.manager import pg_manager  # noqa: E402
+from src.storage.postgres.models_business import Department, User  # noqa: E402
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * (p / 100)
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+# =============================================================================
+# Legacy middlewares (BaseHTTPMiddleware), as previously defined in server/main.py
+# =============================================================================
+
+
+class LegacyAccessLogMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.perf_counter()
+        response = await call_next(request)
+        process_time_ms = int((time.perf_counter() - start_time) * 1000)
+        access_logger.info(f'"{request.method} {request.url.path}" {response.status_code} - {process_time_ms}ms')
+        return response
+
+
+class LegacyLoginRateLimitMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        normalized_path = request.url.path.rstrip("/") or "/"
+        if (normalized_path, request.method.upper()) in RATE_LIMIT_ENDPOINTS:
+            raise RuntimeError("The benchmark does not call the login endpoint")
+        return await call_next(request)
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if is_public_path(path) or not path.startswith("/api"):
+            return await call_next(request)
+        return await call_next(request)
+
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/bench/me")
+    async def me(current_user: User = Depends(get_required_user)) -> dict[str, Any]:
+        return {"id": current_user.id, "role": current_user.role}
+
+    app.add_middleware(
+        CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
+    )
+    if legacy:
+        app.add_middleware(LegacyAccessLogMiddleware)
+        app.add_middleware(LegacyLoginRateLimitMiddleware)
+        app.add_middleware(LegacyAuthMiddleware)
+    else:
+        app.add_middleware(AccessLogMiddleware)
+        app.add_middleware(LoginRateLimitMiddleware)
+    return app
+
+
+# =============================================================================
+# Database setup
+# =============================================================================
+
+
+async def setup_database(args: argparse.Namespace) -> tuple[Any, str]:
+    if args.dsn:
+        engine = create_async_engine(
+            args.dsn,
+            pool_size=args.concurrency,
+            max_overflow=0,
+            connect_args={"server_settings": {"search_path": args.schema}},
+        )
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+            await conn.execute(text(f'CREATE SCHEMA "{args.schema}"'))
+        backend = "postgresql"
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="auth-bench-"), "bench.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        backend = "sqlite (no POSTGRES_URL)"
+
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync_conn: User.metadata.create_all(sync_conn, tables=[Department.__table__, User.__table__])
+        )
+        await conn.execute(
+            insert(User),
+            [
+                {"id": 1, "username": "bench", "user_id": "bench", "password_hash": "-", "role": "user"},
+            ],
+        )
+
+    # 让 get_db / get_current_user 使用基准测试的数据库
+    pg_manager.async_engine = engine
+    pg_manager.AsyncSession = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    pg_manager._initialized = True
+    return engine, backend
+
+
+async def teardown_database(engine, args: argparse.Namespace) -> None:
+    if args.dsn and not args.keep:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+    await engine.dispose()
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+
+async def run_scenario(app: FastAPI, token: str, args: argparse.Namespace) -> dict[str, Any]:
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies: list[float] = []
+    failures = 0
+    remaining = args.requests
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(args.warmup):
+            await client.get("/api/bench/me", headers=headers)
+
+        async def worker() -> None:
+            nonlocal remaining, failures
+            while remaining > 0:
+                remaining -= 1
+                t0 = time.perf_counter()
+                response = await client.get("/api/bench/me", headers=headers)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    engine, backend = await setup_database(args)
+    token = AuthUtils.create_access_token({"sub": "1"})
+    configured_ttl = auth_principal_cache.ttl_seconds
+    scenarios = [("legacy", True, 0), ("asgi", False, 0), ("asgi+cache", False, configured_ttl or 30)]
+
+    results = {}
+    try:
+        for name, legacy, ttl in scenarios:
+            auth_principal_cache.clear()
+            auth_principal_cache.ttl_seconds = ttl
+            results[name] = await run_scenario(build_app(legacy), token, args)
+            print(f"{name}: {results[name]['rps']:.0f} req/s")
+    finally:
+        auth_principal_cache.ttl_seconds = configured_ttl
+        await teardown_database(engine, args)
+    return {"backend": backend, "scenarios": results}
+
+
+def format_table(report: dict[str, Any]) -> str:
+    baseline = report["scenarios"]["legacy"]["rps"]
+    header = f"{'setup':<12} {'req/s':>9} {'p50':>9} {'p95':>9} {'failures':>9} {'vs legacy':>10}"
+    lines = [f"database: {report['backend']}", header, "-" * len(header)]
+    for name, row in report["scenarios"].items():
+        lines.append(
+            f"{name:<12} {row['rps']:>9.0f} {row['p50_ms']:>7.2f}ms {row['p95_ms']:>7.2f}ms "
+            f"{row['failures']:>9} {row['rps'] / baseline:>9.2f}x"
+        )
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the API middleware stack and auth principal cache")
+    parser.add_argument(
+        "--dsn", default=os.getenv("POSTGRES_URL"), help="SQLAlchemy asyncpg URL (default: POSTGRES_URL)"
+    )
+    parser.add_argument("--schema", default="bench_auth", help="Scratch schema, dropped and recreated")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per setup")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--warmup", type=int, default=50, help="Warm-up requests per setup")
+    parser.add_argument("--access-log", action="store_true", help="Keep access log output (disabled by default)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema after the run")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.access_log:
+        # 日志输出在各方案中开销相同，默认关闭以免干扰对比
+        access_logger.setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    print()
+    print(format_table(report))
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({"args": vars(args), **report}, ensure_ascii=False, indent=2))
+        print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark server CPU spent on serializing streamed chat chunks.
+
+Features:
+1) Generates a synthetic reply of N AIMessageChunks (content, optional reasoning, LangGraph-style metadata)
+2) Compares two encoders of the same chunk sequence:
+   - legacy:    one NDJSON line per chunk with a full model_dump() + reasoning normalization
+   - coalesced: ChatStreamCoalescer (first chunk full, then slim deltas flushed by window / size)
+3) Token arrival is simulated with a fake clock at --rate tokens/s, so the coalescing window behaves
+   as it would against a model producing that many tokens per second, without sleeping
+4) Prints CPU tokens/sec, CPU ms per 1k tokens, frames and bytes written per setup; optional JSON output
+
+Usage:
+    python scripts/benchmark_chat_stream.py --tokens 20000 --rate 300 --flush-ms 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from langchain.messages import AIMessageChunk  # noqa: E402
+
+from src.services.chat_stream_service import ChatStreamCoalescer, _normalize_reasoning_fields  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_chunks(tokens: int, reasoning_ratio: float) -> list[tuple[AIMessageChunk, dict]]:
+    metadata = {
+        "thread_id": "benchmark-thread",
+        "user_id": "1",
+        "langgraph_step": 1,
+        "langgraph_node": "model",
+        "langgraph_triggers": ["branch:to:model"],
+        "langgraph_path": ["__pregel_pull", "model"],
+        "langgraph_checkpoint_ns": "model:6f1c0b7e-5a52-4c1e-9d4c-0f8f1f7f3a11",
+        "checkpoint_ns": "model:6f1c0b7e-5a52-4c1e-9d4c-0f8f1f7f3a11",
+        "ls_provider": "openai",
+        "ls_model_name": "Qwen3-32B",
+        "ls_model_type": "chat",
+        "ls_temperature": 0.7,
+    }
+    reasoning_tokens = int(tokens * reasoning_ratio)
+    chunks = []
+    for i in range(tokens):
+        if i < reasoning_tokens:
+            msg = AIMessageChunk(
+                content="", id="run--benchmark", additional_kwargs={"reasoning_content": f"思考{i % 10}"}
+            )
+        else:
+            msg = AIMessageChunk(content=f"内容{i % 10}", id="run--benchmark")
+        msg.response_metadata = {"model_provider": "openai"}
+        chunks.append((msg, metadata))
+    return chunks
+
+
+def encode(request_id: str, content, msg_dict: dict, metadata: dict) -> bytes:
+    payload = {
+        "request_id": request_id,
+        "response": content,
+        "msg": msg_dict,
+        "metadata": metadata,
+        "status": "loading",
+    }
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def run_legacy(chunks: list[tuple[AIMessageChunk, dict]]) -> dict:
+    frames = 0
+    written = 0
+    start = time.process_time()
+    for msg, metadata in chunks:
+        msg_dict = _normalize_reasoning_fields(msg.model_dump())
+        msg_dict["id"] = "run--benchmark"
+        written += len(encode("benchmark", msg.content, msg_dict, metadata))
+        frames += 1
+    return {"cpu_seconds": time.process_time() - start, "frames": frames, "bytes": written}
+
+
+def run_coalesced(chunks: list[tuple[AIMessageChunk, dict]], rate: float, flush_ms: int, max_chars: int) -> dict:
+    clock = FakeClock()
+    coalescer = ChatStreamCoalescer(flush_interval=flush_ms / 1000, max_chars=max_chars, clock=clock)
+    written = 0
+    start = time.process_time()
+    for msg, metadata in chunks:
+        clock.now += 1 / rate
+        for msg_dict, frame_metadata in coalescer.add(msg, metadata):
+            written += len(encode("benchmark", msg_dict["content"], msg_dict, frame_metadata))
+    for msg_dict, frame_metadata in coalescer.flush():
+        written += len(encode("benchmark", msg_dict["content"], msg_dict, frame_metadata))
+    return {"cpu_seconds": time.process_time() - start, "frames": coalescer.frames, "bytes": written}
+
+
+def summarize(name: str, result: dict, tokens: int) -> dict:
+    cpu = max(result["cpu_seconds"], 1e-9)
+    return {
+        "setup": name,
+        "tokens": tokens,
+        "cpu_seconds": round(cpu, 4),
+        "cpu_tokens_per_second": round(tokens / cpu),
+        "cpu_ms_per_1k_tokens": round(cpu * 1000 / tokens * 1000, 2),
+        "frames": result["frames"],
+        "bytes": result["bytes"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20000, help="chunks in the synthetic reply")
+    parser.add_argument("--rate", type=float, default=300, help="simulated model output, tokens/s")
+    parser.add_argument("--flush-ms", type=int, default=40, help="coalescing window in milliseconds")
+    parser.add_argument("--max-chars", type=int, default=1024, help="flush when pending delta reaches this size")
+    parser.add_argument("--reasoning-ratio", type=float, default=0.3, help="share of chunks carrying reasoning")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per setup, the fastest is reported")
+    parser.add_argument("--json", type=Path, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.tokens, args.reasoning_ratio)
+    setups = {
+        "legacy": lambda: run_legacy(chunks),
+        "coalesced": lambda: run_coalesced(chunks, args.rate, args.flush_ms, args.max_chars),
+    }
+    results = []
+    for name, run in setups.items():
+        best = min((run() for _ in range(args.repeat)), key=lambda r: r["cpu_seconds"])
+        results.append(summarize(name, best, args.tokens))
+
+    print(f"{args.tokens} tokens at a simulated {args.rate:g} tokens/s, flush window {args.flush_ms} ms")
+    print(f"{'setup':<10} {'cpu tok/s':>12} {'cpu ms/1k':>10} {'frames':>8} {'bytes':>12}")
+    for r in results:
+        print(
+            f"{r['setup']:<10} {r['cpu_tokens_per_second']:>12} {r['cpu_ms_per_1k_tokens']:>10}"
+            f" {r['frames']:>8} {r['bytes']:>12}"
+        )
+    speedup = results[0]["cpu_seconds"] / max(results[1]["cpu_seconds"], 1e-9)
+    print(f"coalesced uses {speedup:.1f}x less CPU per token")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
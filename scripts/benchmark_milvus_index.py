@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark Milvus vector index profiles (FLAT / HNSW / IVF_SQ8 / IVF_PQ / DISKANN).
+
+Features:
+1) Random normalized vectors, or vectors sampled from an existing knowledge base collection
+2) Builds each index with the same parameters the knowledge base uses (src/knowledge/utils/milvus_index.py)
+3) Reports recall@k against exact (brute-force) ground truth, QPS and latency percentiles
+   for several ef / nprobe / search_list values, then drops the temporary collections
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections, utility
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CONNECTION_ALIAS = "benchmark_milvus_index"
+COLLECTION_PREFIX = "bench_index_"
+
+
+def load_index_module():
+    # 直接按文件加载，避免导入 src 包时初始化整个应用
+    path = ROOT_DIR / "src" / "knowledge" / "utils" / "milvus_index.py"
+    spec = importlib.util.spec_from_file_location("milvus_index", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * (p / 100)
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def sample_vectors(collection_name: str, limit: int) -> np.ndarray:
+    collection = Collection(collection_name, using=CONNECTION_ALIAS)
+    collection.load()
+    iterator = collection.query_iterator(batch_size=1000, expr="", output_fields=["embedding"])
+    vectors: list[list[float]] = []
+    try:
+        while len(vectors) < limit:
+            batch = iterator.next()
+            if not batch:
+                break
+            vectors.extend(row["embedding"] for row in batch)
+    finally:
+        iterator.close()
+    if not vectors:
+        raise SystemExit(f"Collection {collection_name} has no vectors")
+    return normalize(np.asarray(vectors[:limit], dtype=np.float32))
+
+
+def build_dataset(args: argparse.Namespace) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(args.seed)
+    if args.source_collection:
+        data = sample_vectors(args.source_collection, args.rows)
+    else:
+        data = normalize(rng.standard_normal((args.rows, args.dim), dtype=np.float32))
+
+    # 查询向量取自数据集并加入扰动，模拟相近但不完全相同的查询
+    picked = data[rng.choice(len(data), size=min(args.queries, len(data)), replace=False)]
+    queries = normalize(picked + rng.standard_normal(picked.shape, dtype=np.float32) * args.query_noise)
+    return data, queries
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, top_k: int) -> list[set[int]]:
+    truth: list[set[int]] = []
+    for start in range(0, len(queries), 256):
+        scores = queries[start : start + 256] @ data.T
+        top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        truth.extend(set(row.tolist()) for row in top)
+    return truth
+
+
+def create_collection(name: str, data: np.ndarray, batch_size: int) -> Collection:
+    if utility.has_collection(name, using=CONNECTION_ALIAS):
+        utility.drop_collection(name, using=CONNECTION_ALIAS)
+
+    schema = CollectionSchema(
+        fields=[
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=data.shape[1]),
+        ],
+        description="temporary collection for index benchmark",
+    )
+    collection = Collection(name=name, schema=schema, using=CONNECTION_ALIAS)
+    for start in range(0, len(data), batch_size):
+        end = min(start + batch_size, len(data))
+        collection.insert([list(range(start, end)), data[start:end].tolist()])
+    collection.flush()
+    return collection
+
+
+def search_settings(index_type: str, args: argparse.Namespace) -> list[dict[str, int]]:
+    if index_type == "HNSW":
+        return [{"hnsw_ef": value} for value in args.ef]
+    if index_type == "DISKANN":
+        return [{"diskann_search_list": value} for value in args.search_list]
+    if index_type.startswith("IVF"):
+        return [{"ivf_nprobe": value} for value in args.nprobe]
+    return [{}]
+
+
+def run_searches(
+    collection: Collection,
+    queries: np.ndarray,
+    truth: list[set[int]],
+    search_params: dict[str, Any],
+    top_k: int,
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    hits = 0
+    started = time.perf_counter()
+    for query, expected in zip(queries, truth, strict=True):
+        t0 = time.perf_counter()
+        results = collection.search(data=[query.tolist()], anns_field="embedding", param=search_params, limit=top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += len(expected & {hit.id for hit in results[0]})
+    elapsed = time.perf_counter() - started
+
+    return {
+        "recall": hits / (len(truth) * top_k),
+        "qps": len(queries) / elapsed if elapsed > 0 else None,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def benchmark_profile(
+    index_module,
+    index_type: str,
+    data: np.ndarray,
+    queries: np.ndarray,
+    truth: list[set[int]],
+    args: argparse.Namespace,
+) -> list[dict[str, Any]]:
+    name = f"{COLLECTION_PREFIX}{index_type.lower()}"
+    collection = create_collection(name, data, args.insert_batch_size)
+    rows: list[dict[str, Any]] = []
+    try:
+        index_params = index_module.build_index_params(index_type, len(data), data.shape[1], args.metric)
+        t0 = time.perf_counter()
+        collection.create_index(field_name="embedding", index_params=index_params)
+        utility.wait_for_index_building_complete(name, using=CONNECTION_ALIAS)
+        collection.load()
+        build_sec = time.perf_counter() - t0
+
+        for options in search_settings(index_type, args):
+            search_params = index_module.build_search_params(index_type, args.metric, args.top_k, options)
+            # 预热，避免首个查询计入冷启动开销
+            collection.search(data=[queries[0].tolist()], anns_field="embedding", param=search_params, limit=args.top_k)
+            stats = run_searches(collection, queries, truth, search_params, args.top_k)
+            rows.append(
+                {
+                    "index_type": index_type,
+                    "index_params": index_params["params"],
+                    "search_params": search_params["params"],
+                    "build_sec": build_sec,
+                    **stats,
+                }
+            )
+    finally:
+        if not args.keep:
+            collection.release()
+            utility.drop_collection(name, using=CONNECTION_ALIAS)
+    return rows
+
+
+def format_table(rows: list[dict[str, Any]]) -> str:
+    header = (
+        f"{'index':<9} {'search params':<24} {'build(s)':>8} {'recall':>7} {'qps':>9} "
+        f"{'p50(ms)':>8} {'p95(ms)':>8} {'p99(ms)':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        params = json.dumps(row["search_params"], ensure_ascii=False) if row["search_params"] else "-"
+        lines.append(
+            f"{row['index_type']:<9} {params:<24} {row['build_sec']:>8.2f} {row['recall']:>7.4f} "
+            f"{row['qps'] or 0:>9.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark Milvus index profiles: recall@k, QPS and latency")
+    parser.add_argument("--uri", default=os.getenv("MILVUS_URI") or "http://localhost:19530", help="Milvus URI")
+    parser.add_argument("--token", default=os.getenv("MILVUS_TOKEN") or "", help="Milvus token")
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=["FLAT", "HNSW", "IVF_SQ8", "IVF_PQ"],
+        help="Index types to benchmark (FLAT HNSW IVF_SQ8 IVF_PQ DISKANN)",
+    )
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of vectors to insert")
+    parser.add_argument("--dim", type=int, default=1024, help="Vector dimension (random data only)")
+    parser.add_argument(
+        "--source-collection",
+        default=None,
+        help="Sample vectors from an existing knowledge base collection instead of random data",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--query-noise", type=float, default=0.05, help="Gaussian noise added to sampled queries")
+    parser.add_argument("--top-k", type=int, default=10, help="k for recall@k")
+    parser.add_argument("--metric", default="COSINE", help="Metric type")
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256], help="HNSW ef values")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64, 128], help="IVF nprobe values")
+    parser.add_argument("--search-list", type=int, nargs="+", default=[50, 100, 200], help="DISKANN search_list values")
+    parser.add_argument("--insert-batch-size", type=int, default=5000, help="Rows per insert call")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", default=None, help="Write full results as JSON to this path")
+    parser.add_argument("--keep", action="store_true", help="Keep temporary collections after the run")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    index_module = load_index_module()
+    connections.connect(alias=CONNECTION_ALIAS, uri=args.uri, token=args.token)
+
+    data, queries = build_dataset(args)
+    print(f"Dataset: {len(data)} vectors x {data.shape[1]} dim, {len(queries)} queries, top_k={args.top_k}")
+    truth = exact_top_k(data, queries, args.top_k)
+
+    rows: list[dict[str, Any]] = []
+    for profile in args.profiles:
+        index_type = profile.strip().upper()
+        if index_type not in index_module.INDEX_PROFILES:
+            print(f"Skip unknown profile: {profile}")
+            continue
+        print(f"Benchmarking {index_type} ...")
+        rows.extend(benchmark_profile(index_module, index_type, data, queries, truth, args))
+
+    print()
+    print(format_table(rows))
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({"args": vars(args), "results": rows}, ensure_ascii=False, indent=2))
+        print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
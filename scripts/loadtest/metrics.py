@@ -0,0 +1,175 @@
+"""
+Latency / throughput / event-loop lag measurement and JSON baselines for the load test harness.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+# 与基线对比的指标，以及数值变大（higher）还是变小（lower）算变差
+COMPARED_METRICS = {
+    "p50_ms": "higher",
+    "p95_ms": "higher",
+    "p99_ms": "higher",
+    "throughput_rps": "lower",
+    "loop_lag_p99_ms": "higher",
+    "ttft_p95_ms": "higher",
+}
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * (p / 100)
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize_latencies(prefix: str, values_ms: list[float]) -> dict[str, float | None]:
+    return {
+        f"{prefix}p50_ms": percentile(values_ms, 50),
+        f"{prefix}p95_ms": percentile(values_ms, 95),
+        f"{prefix}p99_ms": percentile(values_ms, 99),
+        f"{prefix}max_ms": max(values_ms) if values_ms else None,
+    }
+
+
+class EventLoopLagMonitor:
+    """定时 sleep 并记录实际唤醒比预期晚了多少，反映事件循环被同步代码阻塞的程度"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags_ms: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags_ms.append(max(0.0, (loop.time() - expected) * 1000))
+
+    def start(self) -> None:
+        self.lags_ms = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict[str, float | None]:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        return summarize_latencies("loop_lag_", self.lags_ms)
+
+
+class ScenarioRecorder:
+    """收集一个场景内每个请求的耗时、失败与场景自定义的附加指标"""
+
+    def __init__(self):
+        self.latencies_ms: list[float] = []
+        self.samples: dict[str, list[float]] = {}
+        self.failures = 0
+        self.errors: list[str] = []
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+
+    def finish(self) -> None:
+        self._elapsed = time.perf_counter() - self._started
+
+    def record(self, latency_ms: float, ok: bool, error: str | None = None, **samples: float | None) -> None:
+        self.latencies_ms.append(latency_ms)
+        if not ok:
+            self.failures += 1
+            if error and len(self.errors) < 5:
+                self.errors.append(error)
+        for name, value in samples.items():
+            if value is not None:
+                self.samples.setdefault(name, []).append(value)
+
+    def summary(self) -> dict[str, Any]:
+        result: dict[str, Any] = {
+            "requests": len(self.latencies_ms),
+            "failures": self.failures,
+            "elapsed_s": self._elapsed,
+            "throughput_rps": len(self.latencies_ms) / self._elapsed if self._elapsed else None,
+            **summarize_latencies("", self.latencies_ms),
+        }
+        for name, values in self.samples.items():
+            if name.endswith("_ms"):
+                result.update(summarize_latencies(f"{name[:-3]}_", values))
+            else:
+                result[f"{name}_avg"] = sum(values) / len(values)
+        if self.errors:
+            result["errors"] = self.errors
+        return result
+
+
+def git_revision() -> dict[str, Any]:
+    def git(*args: str) -> str:
+        proc = subprocess.run(["git", *args], capture_output=True, text=True, check=False)
+        return proc.stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain"))}
+
+
+def build_report(args: dict[str, Any], environment: dict[str, Any], scenarios: dict[str, dict]) -> dict[str, Any]:
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "args": args,
+        "environment": environment,
+        "scenarios": scenarios,
+    }
+
+
+def save_report(report: dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+
+
+def load_report(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare_reports(
+    current: dict[str, Any], baseline: dict[str, Any], tolerance: float, min_delta_ms: float
+) -> list[dict[str, Any]]:
+    """
+    逐场景对比指标，返回对比行
+
+    变差超过 tolerance（相对值）且超过 min_delta_ms（毫秒类指标的绝对值）时标记为回归，
+    避免个位数毫秒的抖动被判为回归。
+    """
+    rows = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric, worse in COMPARED_METRICS.items():
+            new_value, old_value = result.get(metric), base.get(metric)
+            if new_value is None or old_value is None or old_value == 0:
+                continue
+            change = (new_value - old_value) / old_value
+            regression = change > tolerance if worse == "higher" else change < -tolerance
+            if regression and metric.endswith("_ms") and abs(new_value - old_value) < min_delta_ms:
+                regression = False
+            rows.append(
+                {
+                    "scenario": name,
+                    "metric": metric,
+                    "baseline": old_value,
+                    "current": new_value,
+                    "change": change,
+                    "regression": regression,
+                }
+            )
+    return rows
@@ -0,0 +1,331 @@
+"""
+In-memory stand-in for a Milvus collection, and a MilvusKB subclass that uses it.
+
+Only the pymilvus boundary is replaced: OfflineMilvusKB keeps MilvusKB's own chunking, embedding,
+search parameter, hybrid / BM25 / rerank and metadata code paths, so load tests exercise the same
+Python code as production. FakeCollection implements the subset of pymilvus.Collection used by
+MilvusKB (insert / delete / query / search / hybrid_search / index and load management) with
+exact search in numpy and a character-bigram BM25, and sleeps --milvus-latency-ms per call to
+stand in for the server round trip (blocking, like the pymilvus gRPC client).
+
+Parsed markdown, normally stored in MinIO, is kept in a dict.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from src.knowledge.implementations.milvus import SPARSE_FIELD, MilvusKB
+from src.knowledge.utils.milvus_index import build_index_params, resolve_index_type
+from src.utils import logger
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+@dataclass
+class FakeField:
+    name: str
+    params: dict = field(default_factory=dict)
+
+
+@dataclass
+class FakeSchema:
+    fields: list[FakeField]
+
+
+@dataclass
+class FakeIndex:
+    field_name: str
+    index_name: str
+    params: dict
+
+
+class FakeEntity:
+    def __init__(self, row: dict, output_fields: list[str] | None):
+        self._row = row if output_fields is None else {k: row.get(k) for k in output_fields}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._row.get(key, default)
+
+
+class FakeHit:
+    def __init__(self, row: dict, distance: float, output_fields: list[str] | None):
+        self.id = row["id"]
+        self.distance = float(distance)
+        self.entity = FakeEntity(row, output_fields)
+
+
+def _bigrams(text: str) -> list[str]:
+    text = re.sub(r"\s+", "", text.lower())
+    if len(text) < 2:
+        return [text] if text else []
+    return [text[i : i + 2] for i in range(len(text) - 1)]
+
+
+def compile_expr(expr: str | None):
+    """把 MilvusKB 生成的过滤表达式转换为行过滤函数，不支持的表达式直接报错"""
+    if not expr:
+        return None
+    expr = expr.strip()
+    if m := re.fullmatch(r"file_id in (\[.*\])", expr):
+        file_ids = set(json.loads(m.group(1)))
+        return lambda row: row["file_id"] in file_ids
+    if m := re.fullmatch(r'file_id == "(.*)"', expr):
+        file_id = m.group(1)
+        return lambda row: row["file_id"] == file_id
+    if m := re.fullmatch(r'source like "(.*)"', expr):
+        pattern = re.compile(".*".join(re.escape(part) for part in m.group(1).replace('\\"', '"').split("%")))
+        return lambda row: pattern.fullmatch(row["source"]) is not None
+    raise ValueError(f"Unsupported filter expression for the offline collection: {expr}")
+
+
+class FakeCollection:
+    """pymilvus.Collection 的内存实现（仅覆盖 MilvusKB 用到的接口）"""
+
+    def __init__(self, name: str, dim: int, description: str, latency: float = 0.0):
+        self.name = name
+        self.description = description
+        self.schema = FakeSchema(
+            [
+                FakeField("id"),
+                FakeField("content"),
+                FakeField("source"),
+                FakeField("chunk_id"),
+                FakeField("file_id"),
+                FakeField("chunk_index"),
+                FakeField("embedding", {"dim": dim}),
+                FakeField(SPARSE_FIELD),
+            ]
+        )
+        self.indexes: list[FakeIndex] = []
+        self.loaded = False
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._dim = dim
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        # 检索用的派生数据，写入后失效、下次检索时重建
+        self._matrix: np.ndarray | None = None
+        self._postings: dict[str, list[tuple[int, int]]] | None = None
+        self._doc_lengths: np.ndarray | None = None
+
+    # ------------------------------------------------------------ management
+
+    @property
+    def num_entities(self) -> int:
+        return len(self._rows)
+
+    def _round_trip(self, name: str) -> None:
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_index(self, field_name: str, index_params: dict, index_name: str | None = None, **kwargs) -> None:
+        self._round_trip("create_index")
+        self.indexes = [index for index in self.indexes if index.field_name != field_name]
+        self.indexes.append(FakeIndex(field_name, index_name or f"{field_name}_idx", dict(index_params)))
+
+    def drop_index(self, index_name: str | None = None, **kwargs) -> None:
+        self._round_trip("drop_index")
+        self.indexes = [index for index in self.indexes if index.index_name != index_name]
+
+    def load(self, **kwargs) -> None:
+        self._round_trip("load")
+        self.loaded = True
+
+    def release(self, **kwargs) -> None:
+        self._round_trip("release")
+        self.loaded = False
+
+    def flush(self, **kwargs) -> None:
+        self._round_trip("flush")
+
+    # ---------------------------------------------------------------- writes
+
+    def insert(self, rows: list[dict], **kwargs) -> None:
+        self._round_trip("insert")
+        with self._lock:
+            self._rows.extend(dict(row) for row in rows)
+            self._invalidate()
+
+    def delete(self, expr: str, **kwargs) -> None:
+        self._round_trip("delete")
+        predicate = compile_expr(expr)
+        with self._lock:
+            self._rows = [row for row in self._rows if not predicate(row)]
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._matrix = None
+        self._postings = None
+        self._doc_lengths = None
+
+    # ----------------------------------------------------------------- reads
+
+    def _snapshot(self) -> tuple[list[dict], np.ndarray, dict, np.ndarray]:
+        with self._lock:
+            if self._matrix is None:
+                matrix = np.asarray([row["embedding"] for row in self._rows], dtype=np.float32).reshape(-1, self._dim)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                self._matrix = matrix / np.where(norms == 0, 1, norms)
+
+                postings: dict[str, list[tuple[int, int]]] = {}
+                lengths = []
+                for i, row in enumerate(self._rows):
+                    grams = Counter(_bigrams(row["content"]))
+                    lengths.append(sum(grams.values()))
+                    for gram, tf in grams.items():
+                        postings.setdefault(gram, []).append((i, tf))
+                self._postings = postings
+                self._doc_lengths = np.asarray(lengths, dtype=np.float32)
+            return self._rows, self._matrix, self._postings, self._doc_lengths
+
+    def _check_loaded(self) -> None:
+        if not self.loaded:
+            raise RuntimeError(f"collection {self.name} not loaded")
+
+    def _mask(self, rows: list[dict], expr: str | None) -> np.ndarray | None:
+        predicate = compile_expr(expr)
+        if predicate is None:
+            return None
+        return np.fromiter((predicate(row) for row in rows), dtype=bool, count=len(rows))
+
+    def _vector_scores(self, matrix: np.ndarray, vector: list[float]) -> np.ndarray:
+        query = np.asarray(vector, dtype=np.float32)
+        return matrix @ (query / (np.linalg.norm(query) or 1))
+
+    def _bm25_scores(self, postings: dict, lengths: np.ndarray, text: str) -> np.ndarray:
+        scores = np.zeros(len(lengths), dtype=np.float32)
+        if not len(lengths):
+            return scores
+        avg_length = float(lengths.mean()) or 1.0
+        for gram in set(_bigrams(text)):
+            entries = postings.get(gram)
+            if not entries:
+                continue
+            idf = math.log(1 + (len(lengths) - len(entries) + 0.5) / (len(entries) + 0.5))
+            for i, tf in entries:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[i] / avg_length)
+                scores[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def _top_hits(
+        self, rows: list[dict], scores: np.ndarray, mask: np.ndarray | None, limit: int, output_fields, positive: bool
+    ) -> list[FakeHit]:
+        candidates = np.arange(len(rows))
+        if mask is not None:
+            candidates = candidates[mask]
+        if positive:
+            candidates = candidates[scores[candidates] > 0]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")][:limit]
+        return [FakeHit(rows[i], scores[i], output_fields) for i in order]
+
+    def _search_one(self, data, anns_field: str, limit: int, expr: str | None, output_fields) -> list[FakeHit]:
+        rows, matrix, postings, lengths = self._snapshot()
+        mask = self._mask(rows, expr)
+        if anns_field == SPARSE_FIELD:
+            return self._top_hits(rows, self._bm25_scores(postings, lengths, data), mask, limit, output_fields, True)
+        return self._top_hits(rows, self._vector_scores(matrix, data), mask, limit, output_fields, False)
+
+    def search(
+        self,
+        data: list,
+        anns_field: str,
+        param: dict | None = None,
+        limit: int = 10,
+        expr: str | None = None,
+        output_fields: list[str] | None = None,
+        **kwargs,
+    ) -> list[list[FakeHit]]:
+        self._round_trip("search")
+        self._check_loaded()
+        return [self._search_one(item, anns_field, limit, expr, output_fields) for item in data]
+
+    def hybrid_search(self, reqs: list, rerank: Any, limit: int, output_fields: list[str] | None = None, **kwargs):
+        """各路检索结果按 RRF 融合：score = Σ 1 / (k + rank)"""
+        self._round_trip("hybrid_search")
+        self._check_loaded()
+        k = getattr(rerank, "_k", 60)
+        fused: dict[str, float] = {}
+        hits_by_id: dict[str, FakeHit] = {}
+        for req in reqs:
+            hits = self._search_one(req.data[0], req.anns_field, req.limit, req.expr, output_fields)
+            for rank, hit in enumerate(hits, start=1):
+                fused[hit.id] = fused.get(hit.id, 0.0) + 1 / (k + rank)
+                hits_by_id.setdefault(hit.id, hit)
+
+        results = []
+        for hit_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            hit = hits_by_id[hit_id]
+            hit.distance = score
+            results.append(hit)
+        return [results]
+
+    def query(self, expr: str, output_fields: list[str] | None = None, limit: int | None = None, **kwargs):
+        self._round_trip("query")
+        self._check_loaded()
+        predicate = compile_expr(expr)
+        with self._lock:
+            rows = [row for row in self._rows if predicate is None or predicate(row)]
+        rows = rows[:limit] if limit else rows
+        if output_fields is None:
+            return [dict(row) for row in rows]
+        return [{key: row.get(key) for key in output_fields} for row in rows]
+
+
+class OfflineMilvusKB(MilvusKB):
+    """集合存放在内存中的 MilvusKB，除 pymilvus / MinIO 访问外沿用 MilvusKB 的全部逻辑"""
+
+    def __init__(self, work_dir: str, latency: float = 0.0, **kwargs):
+        self.latency = latency
+        # 解析后的 Markdown {markdown_file: content}，替代 MinIO
+        self.markdown_store: dict[str, str] = {}
+        super().__init__(work_dir, **kwargs)
+
+    def _init_connection(self):
+        logger.info("OfflineMilvusKB uses in-memory collections, skipping Milvus connection")
+
+    async def _create_kb_instance(self, db_id: str, kb_config: dict) -> Any:
+        if not (metadata := self.databases_meta.get(db_id)):
+            raise ValueError(f"Database {db_id} not found")
+
+        embed_info = metadata.get("embed_info") or {}
+        dim = int(embed_info.get("dimension") or 1024)
+        model_name = embed_info.get("name", "default")
+        description = f"Knowledge base collection for {db_id} using {model_name}"
+        collection = FakeCollection(db_id, dim, description, self.latency)
+
+        # 与 _create_new_collection 相同的索引
+        index_type = resolve_index_type(self._get_index_profile(db_id), 0)
+        collection.create_index("embedding", build_index_params(index_type, 0, dim))
+        collection.create_index(SPARSE_FIELD, {"metric_type": "BM25", "index_type": "SPARSE_INVERTED_INDEX"})
+        self._ensure_scalar_indexes(collection)
+        return collection
+
+    async def _adopt_loaded_collections(self) -> None:
+        """内存集合没有服务启动前已加载的集合"""
+
+    async def _save_markdown_to_minio(self, db_id: str, file_id: str, content: str) -> str:
+        url = f"http://offline-minio/kb-parsed/{db_id}/{file_id}/parsed.md"
+        self.markdown_store[url] = content
+        return url
+
+    async def _read_markdown_from_minio(self, file_path: str) -> str:
+        return self.markdown_store[file_path]
+
+    def get_collection_calls(self) -> dict[str, int]:
+        """各集合接口的调用次数合计"""
+        total: Counter[str] = Counter()
+        for collection in self.collections.values():
+            total.update(collection.calls)
+        return dict(total)
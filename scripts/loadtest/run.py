@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Offline load test for chat streaming, retrieval, knowledge base listing and indexing.
+
+Features:
+1) Starts the OpenAI-compatible stub model server (scripts/loadtest/stub_models.py) in a subprocess
+   with configurable time to first token, token rate, embedding and rerank latency, and registers
+   it as the `loadtest` chat provider, embedding model and reranker
+2) Runs the real service code in-process: ChatbotAgent through stream_agent_chat, MilvusKB through
+   knowledge_base, with Milvus / MinIO replaced by an in-memory stand-in
+   (scripts/loadtest/offline_milvus.py) and Neo4j pointed at a closed port
+3) Uses a temporary SQLite database by default; --dsn runs against PostgreSQL in a scratch schema
+4) Scenarios: chat_stream, chat_rag, retrieval, kb_list, indexing (see scenarios.py)
+5) Reports p50 / p95 / p99 latency, throughput and event-loop lag per scenario (plus TTFT for chat)
+6) Saves JSON baselines (default reports/loadtest/<commit>.json) and compares a run against one,
+   exiting with status 1 when a metric regresses beyond --tolerance
+
+Usage:
+    python scripts/loadtest/run.py --save-baseline
+    python scripts/loadtest/run.py --compare reports/loadtest/98662ed.json
+    python scripts/loadtest/run.py --scenarios chat_stream --requests 500 --concurrency 100 --tokens-per-s 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.request
+from pathlib import Path
+from typing import Any
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+# src 以相对路径读取 .env 和静态文件；数据写入临时目录，不连接图数据库
+os.chdir(ROOT_DIR)
+WORK_DIR = tempfile.mkdtemp(prefix="yuxi-loadtest-")
+HARNESS_ENV = {
+    "SAVE_DIR": WORK_DIR,
+    "NEO4J_URI": "bolt://127.0.0.1:1",
+    "YUXI_AGENT_CHECKPOINTER": "sqlite",
+    "YUXI_MILVUS_MEMORY_BUDGET_MB": "0",
+}
+os.environ.update(HARNESS_ENV)
+os.environ.pop("YUXI_SKIP_APP_INIT", None)
+
+import src  # noqa: E402, F401
+
+# src 加载 .env 时会覆盖同名环境变量，这里恢复压测使用的配置
+os.environ.update(HARNESS_ENV)
+
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from src import config, knowledge_base  # noqa: E402
+from src.agents import agent_manager  # noqa: E402
+from src.config.static.models import ChatModelProvider, EmbedModelInfo, RerankerInfo  # noqa: E402
+from src.storage.postgres.manager import pg_manager  # noqa: E402
+from src.utils.logging_config import setup_logger  # noqa: E402
+
+from scripts.loadtest.metrics import build_report, compare_reports, load_report, save_report  # noqa: E402
+from scripts.loadtest.offline_milvus import OfflineMilvusKB  # noqa: E402
+from scripts.loadtest.scenarios import SCENARIOS, LoadTestContext, run_scenario, seed  # noqa: E402
+
+STUB_PROVIDER = "loadtest"
+DEFAULT_BASELINE_DIR = ROOT_DIR / "reports" / "loadtest"
+
+
+# =============================================================================
+# Environment
+# =============================================================================
+
+
+def start_stub_models(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    cmd = [
+        sys.executable,
+        str(Path(__file__).with_name("stub_models.py")),
+        f"--ttft-ms={args.ttft_ms}",
+        f"--tokens-per-s={args.tokens_per_s}",
+        f"--output-tokens={args.output_tokens}",
+        f"--embed-dim={args.embed_dim}",
+        f"--embed-latency-ms={args.embed_latency_ms}",
+        f"--rerank-latency-ms={args.rerank_latency_ms}",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("STUB_MODELS_READY "):
+        proc.kill()
+        raise RuntimeError(f"Stub model server failed to start: {line!r}")
+    return proc, line.split(" ", 1)[1]
+
+
+def register_stub_models(base_url: str, args: argparse.Namespace) -> dict:
+    """把桩模型注册为聊天供应商、embedding 与 reranker，返回知识库使用的 embed_info"""
+    config.model_names[STUB_PROVIDER] = ChatModelProvider(
+        name="Load test stub",
+        url=base_url,
+        base_url=f"{base_url}/v1",
+        default="stub-chat",
+        env="LOADTEST_STUB_API_KEY",
+        models=["stub-chat"],
+    )
+    embed_id = f"{STUB_PROVIDER}/stub-embedding"
+    config.embed_model_names[embed_id] = EmbedModelInfo(
+        name="stub-embedding",
+        dimension=args.embed_dim,
+        base_url=f"{base_url}/v1/embeddings",
+        api_key="loadtest",
+        model_id=embed_id,
+    )
+    config.reranker_names[args.reranker_model] = RerankerInfo(
+        name="stub-reranker", base_url=f"{base_url}/v1/rerank", api_key="loadtest"
+    )
+    config.save_dir = WORK_DIR
+    return config.embed_model_names[embed_id].model_dump()
+
+
+def fetch_stub_stats(base_url: str) -> dict[str, Any]:
+    try:
+        with urllib.request.urlopen(f"{base_url}/stats", timeout=5) as response:
+            return json.loads(response.read())
+    except OSError as e:
+        return {"error": str(e)}
+
+
+async def setup_database(args: argparse.Namespace) -> tuple[Any, str]:
+    if args.dsn:
+        engine = create_async_engine(
+            args.dsn,
+            pool_size=args.concurrency + 10,
+            max_overflow=0,
+            connect_args={"server_settings": {"search_path": args.schema}},
+        )
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+            await conn.execute(text(f'CREATE SCHEMA "{args.schema}"'))
+        backend = "postgresql"
+    else:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(WORK_DIR, 'loadtest.db')}")
+        backend = "sqlite"
+
+    # 服务代码统一通过 pg_manager 获取会话
+    pg_manager.async_engine = engine
+    pg_manager.AsyncSession = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    pg_manager._initialized = True
+    await pg_manager.create_tables()
+    return engine, backend
+
+
+async def teardown_database(engine, args: argparse.Namespace) -> None:
+    # 智能体的 SQLite checkpointer 连接运行在非守护线程中，不关闭会阻塞进程退出
+    for agent in agent_manager.get_agents():
+        if isinstance(agent.checkpointer, AsyncSqliteSaver):
+            await agent.checkpointer.conn.close()
+    if args.dsn and not args.keep:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+    await engine.dispose()
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+
+async def run(args: argparse.Namespace, base_url: str) -> dict[str, Any]:
+    engine, backend = await setup_database(args)
+    embed_info = register_stub_models(base_url, args)
+    milvus_kb = OfflineMilvusKB(os.path.join(WORK_DIR, "milvus_data"), latency=args.milvus_latency_ms / 1000)
+    knowledge_base.kb_instances["milvus"] = milvus_kb
+
+    results = {}
+    try:
+        ctx = LoadTestContext(args=args)
+        print(f"Seeding {args.kb_count} knowledge bases, {args.kb_docs} documents ({backend})...")
+        await seed(ctx, embed_info)
+
+        for name in args.scenarios:
+            print(f"Running {name}: {args.requests} requests, concurrency {args.concurrency}...")
+            results[name] = await run_scenario(SCENARIOS[name], ctx, args.requests, args.concurrency, args.warmup)
+    finally:
+        await teardown_database(engine, args)
+
+    environment = {
+        "database": backend,
+        "python": sys.version.split()[0],
+        "milvus_calls": milvus_kb.get_collection_calls(),
+        "stub_models": fetch_stub_stats(base_url),
+    }
+    return build_report({k: v for k, v in vars(args).items() if k != "dsn"}, environment, results)
+
+
+def format_table(report: dict[str, Any]) -> str:
+    def ms(value: float | None) -> str:
+        return f"{value:.1f}" if value is not None else "-"
+
+    header = (
+        f"{'scenario':<12} {'req':>6} {'fail':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        f" {'ttft p95':>9} {'lag p99':>8} {'lag max':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for name, row in report["scenarios"].items():
+        lines.append(
+            f"{name:<12} {row['requests']:>6} {row['failures']:>5} {row['throughput_rps'] or 0:>8.1f}"
+            f" {ms(row['p50_ms']):>9} {ms(row['p95_ms']):>9} {ms(row['p99_ms']):>9}"
+            f" {ms(row.get('ttft_p95_ms')):>9} {ms(row['loop_lag_p99_ms']):>8} {ms(row['loop_lag_max_ms']):>8}"
+        )
+        for error in row.get("errors", []):
+            lines.append(f"  ! {error[:160]}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list[dict[str, Any]], baseline: dict[str, Any]) -> str:
+    commit = (baseline.get("git") or {}).get("commit")
+    lines = [f"Compared with baseline {commit} ({baseline.get('created_at')}):"]
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"  {row['scenario']:<12} {row['metric']:<16} {row['baseline']:>10.2f} -> {row['current']:>10.2f}"
+            f" ({row['change']:+.0%}) {flag}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--scenarios",
+        default="kb_list,retrieval,indexing,chat_stream,chat_rag",
+        help=f"Comma separated, from: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent requests")
+    parser.add_argument("--warmup", type=int, default=2, help="Sequential warm-up requests per scenario")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for documents and queries")
+
+    stub = parser.add_argument_group("stub models")
+    stub.add_argument("--ttft-ms", type=float, default=300, help="Chat time to first token")
+    stub.add_argument("--tokens-per-s", type=float, default=100, help="Chat output rate")
+    stub.add_argument("--output-tokens", type=int, default=200, help="Tokens per chat reply")
+    stub.add_argument("--embed-dim", type=int, default=256, help="Embedding dimension")
+    stub.add_argument("--embed-latency-ms", type=float, default=20, help="Latency per embedding request")
+    stub.add_argument("--rerank-latency-ms", type=float, default=30, help="Latency per rerank request")
+    stub.add_argument("--milvus-latency-ms", type=float, default=2, help="Simulated Milvus round trip per call")
+
+    kb = parser.add_argument_group("knowledge base")
+    kb.add_argument("--kb-count", type=int, default=30, help="Knowledge bases visible to kb_list")
+    kb.add_argument("--kb-docs", type=int, default=50, help="Documents in the retrieval knowledge base")
+    kb.add_argument("--doc-chars", type=int, default=4000, help="Characters per document")
+    kb.add_argument("--chunk-size", type=int, default=500, help="Chunk size used when indexing")
+    kb.add_argument("--search-mode", default="hybrid", choices=["vector", "keyword", "hybrid"])
+    kb.add_argument("--no-rerank", action="store_true", help="Retrieve without the reranker")
+
+    db = parser.add_argument_group("database")
+    db.add_argument("--dsn", default=None, help="SQLAlchemy asyncpg URL; a temporary SQLite file is used if omitted")
+    db.add_argument("--schema", default="loadtest", help="Scratch schema with --dsn, dropped and recreated")
+    db.add_argument(
+        "--keep", action="store_true", help=f"Keep the scratch schema and the working directory ({WORK_DIR})"
+    )
+
+    out = parser.add_argument_group("output")
+    out.add_argument("--output", type=Path, help="Write the report as JSON to this path")
+    out.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help="Save the report as a baseline (default: reports/loadtest/<commit>.json)",
+    )
+    out.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    out.add_argument("--tolerance", type=float, default=0.2, help="Relative change counted as a regression")
+    out.add_argument("--min-delta-ms", type=float, default=5, help="Ignore latency changes smaller than this")
+    out.add_argument("--verbose", action="store_true", help="Keep application INFO logs")
+
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    args.chat_model = f"{STUB_PROVIDER}/stub-chat"
+    args.reranker_model = f"{STUB_PROVIDER}/stub-reranker"
+    return args
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.verbose:
+        # 应用日志在各次运行中开销相同，默认只保留警告以免刷屏
+        setup_logger("Yuxi", level="WARNING")
+
+    stub_proc, base_url = start_stub_models(args)
+    try:
+        report = asyncio.run(run(args, base_url))
+    finally:
+        stub_proc.terminate()
+        stub_proc.wait(timeout=10)
+        if not args.keep:
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    print()
+    print(format_table(report))
+
+    if args.output:
+        save_report(report, args.output)
+        print(f"\nReport written to {args.output}")
+    if args.save_baseline is not None:
+        commit = report["git"]["commit"] or "unknown"
+        path = Path(args.save_baseline) if args.save_baseline else DEFAULT_BASELINE_DIR / f"{commit}.json"
+        save_report(report, path)
+        print(f"Baseline written to {path}")
+
+    if args.compare:
+        baseline = load_report(args.compare)
+        rows = compare_reports(report, baseline, args.tolerance, args.min_delta_ms)
+        print()
+        print(format_comparison(rows, baseline))
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,346 @@
+"""
+Load test scenarios: seed data, per-request coroutines and the concurrent driver.
+
+Every scenario calls the production code directly (no HTTP layer):
+- chat_stream: stream_agent_chat_in_session with ChatbotAgent, plain answer
+- chat_rag:    same, with a knowledge base attached; the stub model calls the retriever tool first
+- retrieval:   knowledge_base.aquery -> MilvusKB.aquery (hybrid search + rerank by default)
+- kb_list:     knowledge_base.get_databases_by_user for a non-admin user
+- indexing:    knowledge_base.index_file (chunking, embedding, insert, metadata save)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from src import knowledge_base
+from src.knowledge.base import FileStatus
+from src.repositories.conversation_repository import ConversationRepository
+from src.repositories.knowledge_base_repository import KnowledgeBaseRepository
+from src.services.chat_stream_service import stream_agent_chat_in_session
+from src.storage.postgres.manager import pg_manager
+from src.storage.postgres.models_business import AgentConfig, Department, User
+from src.utils import hashstr
+from src.utils.datetime_utils import utc_isoformat
+
+from scripts.loadtest.metrics import EventLoopLagMonitor, ScenarioRecorder
+
+AGENT_ID = "ChatbotAgent"
+
+TOPICS = [
+    "变压器",
+    "断路器",
+    "继电保护",
+    "配电线路",
+    "电力电缆",
+    "避雷器",
+    "接地网",
+    "开关柜",
+    "电流互感器",
+    "蓄电池组",
+]
+ACTIONS = ["巡视检查", "预防性试验", "故障处理", "运行维护", "缺陷管理", "验收标准", "安全措施", "检修周期"]
+DETAILS = [
+    "应记录油温、负荷及环境温度的变化趋势",
+    "发现异常声响或放电痕迹时应立即上报值班负责人",
+    "试验数据应与出厂值和历史数据进行纵向比较",
+    "作业前必须办理工作票并落实停电、验电、接地措施",
+    "紧固件松动、锈蚀等一般缺陷应在一个检修周期内消除",
+    "绝缘电阻测量应使用合适电压等级的兆欧表",
+    "红外测温发现温差超过规定值时应缩短巡视周期",
+    "设备投运前应核对铭牌参数与设计图纸一致",
+]
+
+
+def make_document(rng: random.Random, chars: int) -> str:
+    """生成指定长度的 Markdown 规程文档"""
+    parts = []
+    while sum(len(p) for p in parts) < chars:
+        topic, action = rng.choice(TOPICS), rng.choice(ACTIONS)
+        sentences = "；".join(rng.sample(DETAILS, 3))
+        parts.append(f"## {topic}{action}\n\n{topic}{action}时，{sentences}。\n")
+    return "\n".join(parts)[:chars]
+
+
+def kb_name(index: int) -> str:
+    return f"压测知识库{index:03d}"
+
+
+def make_queries(rng: random.Random, count: int) -> list[str]:
+    return [f"{rng.choice(TOPICS)}{rng.choice(ACTIONS)}有哪些要求？" for _ in range(count)]
+
+
+@dataclass
+class LoadTestContext:
+    args: Any
+    queries: list[str] = field(default_factory=list)
+    user: User | None = None
+    user_info: dict = field(default_factory=dict)
+    agent_config_id: int | None = None
+    retrieval_db_id: str | None = None
+    retrieval_options: dict = field(default_factory=dict)
+    indexing_db_id: str | None = None
+    threads: list[str] = field(default_factory=list)
+    pending_files: list[str] = field(default_factory=list)
+
+
+# =============================================================================
+# Seed data
+# =============================================================================
+
+
+async def add_parsed_file(db_id: str, filename: str, content: str, params: dict) -> str:
+    """直接写入"已解析"状态的文件记录（Markdown 存入离线存储），跳过上传与文档解析"""
+    kb = await knowledge_base.aget_kb(db_id)
+    file_id = f"file_{hashstr(f'{db_id}/{filename}', 16)}"
+    markdown_file = await kb._save_markdown_to_minio(db_id, file_id, content)
+    kb.files_meta[file_id] = {
+        "file_id": file_id,
+        "database_id": db_id,
+        "filename": filename,
+        "file_type": "md",
+        "path": markdown_file,
+        "markdown_file": markdown_file,
+        "status": FileStatus.PARSED,
+        "content_hash": hashstr(content),
+        "size": len(content.encode("utf-8")),
+        "content_type": "file",
+        "processing_params": params,
+        "created_at": utc_isoformat(),
+    }
+    return file_id
+
+
+async def seed(ctx: LoadTestContext, embed_info: dict) -> None:
+    args = ctx.args
+    rng = random.Random(args.seed)
+    ctx.queries = make_queries(rng, 200)
+
+    async with pg_manager.get_async_session_context() as db:
+        department = Department(name="压测部门")
+        other_department = Department(name="压测其他部门")
+        db.add_all([department, other_department])
+        await db.flush()
+        user = User(
+            username="loadtest", user_id="loadtest", password_hash="-", role="user", department_id=department.id
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+    ctx.user = user
+    ctx.user_info = {"role": user.role, "user_id": user.id, "department_id": user.department_id}
+
+    # 知识库：第一个写入检索语料，其余为空库；每三个中有一个仅对其他部门可见，用于列表的权限过滤
+    kb_repo = KnowledgeBaseRepository()
+    db_ids = []
+    for i in range(args.kb_count):
+        info = await knowledge_base.create_database(
+            kb_name(i), f"压测用知识库 {i}，包含设备运维规程。", kb_type="milvus", embed_info=embed_info
+        )
+        db_ids.append(info["db_id"])
+        if i % 3 == 2:
+            await kb_repo.update(
+                info["db_id"], {"share_config": {"is_shared": False, "accessible_departments": [other_department.id]}}
+            )
+    indexing = await knowledge_base.create_database(
+        "压测索引知识库", "indexing 场景写入的知识库", kb_type="milvus", embed_info=embed_info
+    )
+    ctx.retrieval_db_id, ctx.indexing_db_id = db_ids[0], indexing["db_id"]
+
+    # 检索语料，查询参数同时持久化，使 chat_rag 的检索工具使用相同配置
+    kb = await knowledge_base.aget_kb(ctx.retrieval_db_id)
+    ctx.retrieval_options = {
+        "search_mode": args.search_mode,
+        "final_top_k": 10,
+        "recall_top_k": 50,
+        "use_reranker": not args.no_rerank,
+        "reranker_model": args.reranker_model,
+    }
+    kb.databases_meta[ctx.retrieval_db_id]["query_params"] = {"options": ctx.retrieval_options}
+    params = {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_size // 10}
+    file_ids = [
+        await add_parsed_file(ctx.retrieval_db_id, f"规程{i:04d}.md", make_document(rng, args.doc_chars), params)
+        for i in range(args.kb_docs)
+    ]
+    await kb._save_metadata()
+    for file_id in file_ids:
+        await knowledge_base.index_file(ctx.retrieval_db_id, file_id)
+
+    # 部门 + 智能体只有一份默认配置（SQLite 下部分唯一索引退化为普通唯一索引），由对话场景在准备阶段切换知识库
+    async with pg_manager.get_async_session_context() as db:
+        agent_config = AgentConfig(
+            department_id=user.department_id,
+            agent_id=AGENT_ID,
+            name="压测配置",
+            config_json={"context": {"model": args.chat_model, "knowledges": [], "tools": [], "mcps": []}},
+            is_default=True,
+        )
+        db.add(agent_config)
+        await db.commit()
+        ctx.agent_config_id = agent_config.id
+
+
+# =============================================================================
+# Scenarios
+# =============================================================================
+
+
+async def prepare_threads(ctx: LoadTestContext, count: int) -> None:
+    async with pg_manager.get_async_session_context() as db:
+        conv_repo = ConversationRepository(db)
+        for _ in range(count):
+            conversation = await conv_repo.create_conversation(user_id=str(ctx.user.id), agent_id=AGENT_ID)
+            ctx.threads.append(conversation.thread_id)
+
+
+async def use_knowledges(ctx: LoadTestContext, knowledges: list[str]) -> None:
+    async with pg_manager.get_async_session_context() as db:
+        agent_config = await db.get(AgentConfig, ctx.agent_config_id)
+        context = agent_config.config_json["context"]
+        agent_config.config_json = {"context": context | {"knowledges": knowledges}}
+        await db.commit()
+
+
+async def prepare_chat(ctx: LoadTestContext, count: int) -> None:
+    await use_knowledges(ctx, [])
+    await prepare_threads(ctx, count)
+
+
+async def prepare_rag_chat(ctx: LoadTestContext, count: int) -> None:
+    await use_knowledges(ctx, [kb_name(0)])
+    await prepare_threads(ctx, count)
+
+
+async def chat(ctx: LoadTestContext, index: int, expect_tool: bool) -> dict:
+    query = ctx.queries[index % len(ctx.queries)]
+    thread_id = ctx.threads.pop()
+    meta = {"request_id": str(uuid.uuid4()), "query": query, "agent_id": AGENT_ID, "thread_id": thread_id}
+    started = time.perf_counter()
+    ttft_ms = None
+    frames = written = tool_messages = 0
+    status = error = None
+
+    async for line in stream_agent_chat_in_session(
+        agent_id=AGENT_ID,
+        query=query,
+        config={"thread_id": thread_id, "agent_config_id": ctx.agent_config_id},
+        meta=meta,
+        image_content=None,
+        current_user=ctx.user,
+    ):
+        written += len(line)
+        event = json.loads(line)
+        status = event.get("status")
+        msg = event.get("msg") or {}
+        if status == "loading":
+            frames += 1
+            if msg.get("type") == "tool":
+                tool_messages += 1
+            elif ttft_ms is None and msg.get("content"):
+                ttft_ms = (time.perf_counter() - started) * 1000
+        elif status == "error":
+            error = event.get("error_message")
+
+    if status != "finished":
+        raise RuntimeError(error or f"stream ended with status {status}")
+    if expect_tool and not tool_messages:
+        raise RuntimeError("the answer did not call the retriever tool")
+    return {"ttft_ms": ttft_ms, "frames": frames, "bytes": written}
+
+
+async def retrieval(ctx: LoadTestContext, index: int) -> dict:
+    query = ctx.queries[index % len(ctx.queries)]
+    results = await knowledge_base.aquery(query, ctx.retrieval_db_id, **ctx.retrieval_options)
+    if not results:
+        raise RuntimeError("no chunks retrieved")
+    return {"results": len(results)}
+
+
+async def kb_list(ctx: LoadTestContext, index: int) -> dict:
+    databases = (await knowledge_base.get_databases_by_user(ctx.user_info)).get("databases", [])
+    if not databases:
+        raise RuntimeError("no databases listed")
+    return {"databases": len(databases)}
+
+
+async def prepare_files(ctx: LoadTestContext, count: int) -> None:
+    args = ctx.args
+    rng = random.Random(args.seed + 1)
+    params = {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_size // 10}
+    offset = len(ctx.pending_files)
+    for i in range(count):
+        content = make_document(rng, args.doc_chars)
+        ctx.pending_files.append(await add_parsed_file(ctx.indexing_db_id, f"导入{offset + i:05d}.md", content, params))
+    kb = await knowledge_base.aget_kb(ctx.indexing_db_id)
+    await kb._save_metadata()
+    ctx.pending_files.reverse()
+
+
+async def indexing(ctx: LoadTestContext, index: int) -> dict:
+    file_id = ctx.pending_files.pop()
+    meta = await knowledge_base.index_file(ctx.indexing_db_id, file_id)
+    if meta.get("status") != FileStatus.INDEXED:
+        raise RuntimeError(f"file status {meta.get('status')}: {meta.get('error')}")
+    return {}
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[LoadTestContext, int], Awaitable[dict]]
+    prepare: Callable[[LoadTestContext, int], Awaitable[None]] | None = None
+
+
+SCENARIOS = {
+    "chat_stream": Scenario(
+        "chat_stream",
+        lambda ctx, i: chat(ctx, i, expect_tool=False),
+        prepare_chat,
+    ),
+    "chat_rag": Scenario(
+        "chat_rag",
+        lambda ctx, i: chat(ctx, i, expect_tool=True),
+        prepare_rag_chat,
+    ),
+    "retrieval": Scenario("retrieval", retrieval),
+    "kb_list": Scenario("kb_list", kb_list),
+    "indexing": Scenario("indexing", indexing, prepare_files),
+}
+
+
+async def run_scenario(
+    scenario: Scenario, ctx: LoadTestContext, requests: int, concurrency: int, warmup: int
+) -> dict[str, Any]:
+    """先串行预热 warmup 次（不计入结果），再以 concurrency 个并发执行 requests 次"""
+    if scenario.prepare is not None:
+        await scenario.prepare(ctx, requests + warmup)
+    for i in range(warmup):
+        await scenario.request(ctx, i)
+
+    recorder = ScenarioRecorder()
+    monitor = EventLoopLagMonitor()
+    indexes = iter(range(warmup, warmup + requests))
+
+    async def worker() -> None:
+        for i in indexes:
+            started = time.perf_counter()
+            try:
+                samples = await scenario.request(ctx, i)
+            except Exception as e:
+                recorder.record((time.perf_counter() - started) * 1000, False, f"{type(e).__name__}: {e}")
+            else:
+                recorder.record((time.perf_counter() - started) * 1000, True, **samples)
+
+    monitor.start()
+    recorder.start()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    recorder.finish()
+    loop_lag = await monitor.stop()
+    return {"concurrency": concurrency, **recorder.summary(), **loop_lag}
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+OpenAI-compatible stub model server for offline load tests.
+
+Features:
+1) /v1/chat/completions (streaming SSE and non-streaming) with configurable time to first token,
+   output tokens/sec and reply length. When the request offers tools and the last message is the
+   user's, the stub calls the first tool taking a `query_text` argument (e.g. a knowledge base
+   retriever) with the user's text, then answers after the tool result comes back
+2) /v1/embeddings returns deterministic character n-gram hash vectors (similar texts get similar
+   vectors, so vector search results are meaningful) after a configurable latency
+3) /v1/rerank returns character overlap scores in the OpenAI/LiteLLM rerank format
+4) /stats returns request counts per endpoint
+
+The load test harness (scripts/loadtest/run.py) starts this server in a subprocess, so the stub's
+own CPU time does not show up in the event-loop lag measured for the code under test. It can also
+be started by hand to point a real deployment at it.
+
+Usage:
+    python scripts/loadtest/stub_models.py --port 8911 --ttft-ms 300 --tokens-per-s 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+
+from aiohttp import web
+
+ANSWER_TEXT = "根据知识库中的资料，该问题的处理要点如下：先核对设备运行状态，再按规程逐项检查并记录结果。"
+
+
+@dataclass
+class StubModelConfig:
+    ttft_ms: float = 300
+    tokens_per_s: float = 50
+    output_tokens: int = 200
+    embed_dim: int = 256
+    embed_latency_ms: float = 20
+    rerank_latency_ms: float = 30
+
+
+def embed_text(text: str, dim: int) -> list[float]:
+    """字符 1-2 gram 哈希到 dim 维并归一化，相同词语较多的文本向量更接近"""
+    vector = [0.0] * dim
+    grams = list(text) + [text[i : i + 2] for i in range(len(text) - 1)]
+    for gram in grams:
+        digest = hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def overlap_score(query: str, document: str) -> float:
+    """查询字符在文档中出现的比例，映射到 [-4, 4] 作为 logit（调用方会做 sigmoid）"""
+    chars = set(query)
+    if not chars:
+        return -4.0
+    ratio = len(chars & set(document)) / len(chars)
+    return ratio * 8 - 4
+
+
+def _find_retriever_tool(tools: list[dict]) -> dict | None:
+    for tool in tools or []:
+        function = tool.get("function") or {}
+        if "query_text" in ((function.get("parameters") or {}).get("properties") or {}):
+            return function
+    return None
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+class StubModelServer:
+    def __init__(self, config: StubModelConfig):
+        self.config = config
+        self.requests: Counter[str] = Counter()
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024**2)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_post("/v1/rerank", self.rerank)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+    # ------------------------------------------------------------------ chat
+
+    def _plan_reply(self, body: dict) -> tuple[dict | None, list[str]]:
+        """返回 (要调用的工具, 回答 token 列表)"""
+        messages = body.get("messages") or []
+        last = messages[-1] if messages else {}
+        tool = _find_retriever_tool(body.get("tools") or [])
+        if tool is not None and last.get("role") == "user":
+            return {"name": tool["name"], "arguments": json.dumps({"query_text": _message_text(last)})}, []
+
+        tokens = [ANSWER_TEXT[i % len(ANSWER_TEXT)] for i in range(self.config.output_tokens)]
+        return None, tokens
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests["chat"] += 1
+        body = await request.json()
+        tool_call, tokens = self._plan_reply(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub-chat")
+        prompt_tokens = sum(len(_message_text(m)) for m in body.get("messages") or [])
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens) or 1,
+            "total_tokens": prompt_tokens + (len(tokens) or 1),
+        }
+
+        await asyncio.sleep(self.config.ttft_ms / 1000)
+
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": "".join(tokens)}
+            if tool_call:
+                message["tool_calls"] = [
+                    {"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function", "function": tool_call}
+                ]
+            await asyncio.sleep(len(tokens) / self.config.tokens_per_s)
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(delta: dict, finish_reason: str | None = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+
+        if tool_call:
+            call = {"index": 0, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function"}
+            await send(
+                {"role": "assistant", "tool_calls": [call | {"function": {"name": tool_call["name"], "arguments": ""}}]}
+            )
+            await send({"tool_calls": [{"index": 0, "function": {"arguments": tool_call["arguments"]}}]})
+            await send({}, "tool_calls")
+        else:
+            await send({"role": "assistant", "content": ""})
+            # 按目标速率输出，落后时一次补发多个 token，不累积 sleep 误差
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for i, token in enumerate(tokens):
+                delay = started + i / self.config.tokens_per_s - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await send({"content": token})
+            await send({}, "stop")
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    # ------------------------------------------------------------- embedding
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        self.requests["embeddings"] += 1
+        body = await request.json()
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.requests["embedded_texts"] += len(inputs)
+        await asyncio.sleep(self.config.embed_latency_ms / 1000)
+        data = [
+            {"object": "embedding", "index": i, "embedding": embed_text(text, self.config.embed_dim)}
+            for i, text in enumerate(inputs)
+        ]
+        return web.json_response({"object": "list", "data": data, "model": body.get("model")})
+
+    async def rerank(self, request: web.Request) -> web.Response:
+        self.requests["rerank"] += 1
+        body = await request.json()
+        query = body.get("query") or ""
+        documents = body.get("documents") or []
+        await asyncio.sleep(self.config.rerank_latency_ms / 1000)
+        results = [{"index": i, "relevance_score": overlap_score(query, str(doc))} for i, doc in enumerate(documents)]
+        results.sort(key=lambda item: item["relevance_score"], reverse=True)
+        return web.json_response({"results": results[: body.get("top_n") or len(results)]})
+
+    # ----------------------------------------------------------------- misc
+
+    async def models(self, request: web.Request) -> web.Response:
+        names = ["stub-chat", "stub-embedding", "stub-reranker"]
+        return web.json_response({"object": "list", "data": [{"id": name, "object": "model"} for name in names]})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"config": asdict(self.config), "requests": dict(self.requests)})
+
+
+async def serve(config: StubModelConfig, host: str, port: int) -> None:
+    runner = web.AppRunner(StubModelServer(config).build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    # 第一行输出实际端口，供启动方读取（--port 0 时由系统分配）
+    print(f"STUB_MODELS_READY http://{host}:{bound_port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = StubModelConfig()
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub chat / embedding / rerank server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--ttft-ms", type=float, default=defaults.ttft_ms, help="Delay before the first chat token")
+    parser.add_argument("--tokens-per-s", type=float, default=defaults.tokens_per_s, help="Chat output rate")
+    parser.add_argument("--output-tokens", type=int, default=defaults.output_tokens, help="Tokens per chat reply")
+    parser.add_argument("--embed-dim", type=int, default=defaults.embed_dim, help="Embedding dimension")
+    parser.add_argument("--embed-latency-ms", type=float, default=defaults.embed_latency_ms)
+    parser.add_argument("--rerank-latency-ms", type=float, default=defaults.rerank_latency_ms)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = StubModelConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_s=args.tokens_per_s,
+        output_tokens=args.output_tokens,
+        embed_dim=args.embed_dim,
+        embed_latency_ms=args.embed_latency_ms,
+        rerank_latency_ms=args.rerank_latency_ms,
+    )
+    try:
+        asyncio.run(serve(config, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
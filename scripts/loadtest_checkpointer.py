@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Multi-process load test for the agent checkpointer (PostgreSQL vs. shared SQLite file).
+
+Features:
+1) Simulates uvicorn workers with separate processes; every turn of a conversation thread is
+   served by a different worker than the previous turn, so each turn resumes state written elsewhere
+2) Runs many threads concurrently inside each worker against a small LLM-free LangGraph graph
+   (several checkpoints and pending writes per turn)
+3) Verifies that every thread ends with the full message history, and that retention keeps at most
+   --keep-last checkpoints per thread and no pending writes older than the latest parent checkpoint
+4) Reports per-turn latency (p50 / p95), throughput and errors; --backend sqlite runs the same load
+   against one shared aio_history.db for comparison
+
+Usage:
+    python scripts/loadtest_checkpointer.py --workers 4 --threads 200 --turns 5
+    python scripts/loadtest_checkpointer.py --backend sqlite --workers 4 --threads 200 --turns 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Annotated, Any, TypedDict
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("YUXI_SKIP_APP_INIT", "1")
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.graph import END, START, StateGraph  # noqa: E402
+from langgraph.graph.message import add_messages  # noqa: E402
+from sqlalchemy import delete, func, select  # noqa: E402
+
+
+class LoadState(TypedDict):
+    messages: Annotated[list, add_messages]
+    notes: list[str]
+
+
+def build_graph(checkpointer):
+    # 每轮三个节点：产生多个检查点和中间写入，但不调用模型
+    async def plan(state: LoadState) -> dict:
+        return {"notes": [f"plan-{len(state['messages'])}"]}
+
+    async def tool(state: LoadState) -> dict:
+        await asyncio.sleep(0.001)
+        return {"notes": state["notes"] + ["tool"]}
+
+    async def respond(state: LoadState) -> dict:
+        return {"messages": [AIMessage(content=f"answer #{len(state['messages']) // 2 + 1}")]}
+
+    workflow = StateGraph(LoadState)
+    workflow.add_node("plan", plan)
+    workflow.add_node("tool", tool)
+    workflow.add_node("respond", respond)
+    workflow.add_edge(START, "plan")
+    workflow.add_edge("plan", "tool")
+    workflow.add_edge("tool", "respond")
+    workflow.add_edge("respond", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * (p / 100)
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+# =============================================================================
+# Worker process
+# =============================================================================
+
+
+async def run_worker_turn(args: dict[str, Any], worker_id: int, turn: int) -> dict[str, Any]:
+    thread_ids = [f"{args['prefix']}-{i}" for i in range(args["threads"]) if (i + turn) % args["workers"] == worker_id]
+    latencies: list[float] = []
+    errors: list[str] = []
+    semaphore = asyncio.Semaphore(args["concurrency"])
+
+    async def run_thread(graph, thread_id: str) -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                await graph.ainvoke(
+                    {"messages": [HumanMessage(content=f"question #{turn + 1}")], "notes": []},
+                    config={"configurable": {"thread_id": thread_id}},
+                )
+                latencies.append((time.perf_counter() - t0) * 1000)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    started = time.perf_counter()
+    if args["backend"] == "postgres":
+        from src.agents.common.checkpointer import PostgresCheckpointSaver
+        from src.storage.postgres.manager import pg_manager
+
+        pg_manager.initialize()
+        graph = build_graph(PostgresCheckpointSaver(keep_last=args["keep_last"]))
+        await asyncio.gather(*(run_thread(graph, thread_id) for thread_id in thread_ids))
+        await pg_manager.close()
+    else:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        async with AsyncSqliteSaver.from_conn_string(args["sqlite_path"]) as saver:
+            graph = build_graph(saver)
+            await asyncio.gather(*(run_thread(graph, thread_id) for thread_id in thread_ids))
+    return {
+        "worker": worker_id,
+        "turn": turn,
+        "threads": len(thread_ids),
+        "elapsed_s": time.perf_counter() - started,
+        "latencies": latencies,
+        "errors": errors,
+    }
+
+
+def worker_entry(payload: tuple[dict[str, Any], int, int]) -> dict[str, Any]:
+    args, worker_id, turn = payload
+    return asyncio.run(run_worker_turn(args, worker_id, turn))
+
+
+# =============================================================================
+# Verification
+# =============================================================================
+
+
+async def verify(args: dict[str, Any]) -> dict[str, Any]:
+    expected = args["turns"] * 2
+    thread_ids = [f"{args['prefix']}-{i}" for i in range(args["threads"])]
+    report: dict[str, Any] = {"expected_messages": expected, "incomplete_threads": []}
+
+    if args["backend"] == "postgres":
+        from src.agents.common.checkpointer import PostgresCheckpointSaver
+        from src.storage.postgres.manager import pg_manager
+        from src.storage.postgres.models_business import AgentCheckpoint, AgentCheckpointWrite
+
+        pg_manager.initialize()
+        graph = build_graph(PostgresCheckpointSaver(keep_last=args["keep_last"]))
+        for thread_id in thread_ids:
+            state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+            if len(state.values.get("messages", [])) != expected:
+                report["incomplete_threads"].append(thread_id)
+
+        prefix = f"{args['prefix']}-%"
+        async with pg_manager.get_async_session_context() as session:
+            per_thread = (
+                select(func.count().label("n"))
+                .where(AgentCheckpoint.thread_id.like(prefix))
+                .group_by(AgentCheckpoint.thread_id)
+                .subquery()
+            )
+            report["max_checkpoints_per_thread"] = await session.scalar(select(func.max(per_thread.c.n)))
+            report["total_checkpoints"] = await session.scalar(
+                select(func.count()).where(AgentCheckpoint.thread_id.like(prefix))
+            )
+            report["total_pending_writes"] = await session.scalar(
+                select(func.count()).where(AgentCheckpointWrite.thread_id.like(prefix))
+            )
+            if not args["keep"]:
+                await session.execute(delete(AgentCheckpoint).where(AgentCheckpoint.thread_id.like(prefix)))
+                await session.execute(delete(AgentCheckpointWrite).where(AgentCheckpointWrite.thread_id.like(prefix)))
+        await pg_manager.close()
+    else:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        async with AsyncSqliteSaver.from_conn_string(args["sqlite_path"]) as saver:
+            graph = build_graph(saver)
+            for thread_id in thread_ids:
+                state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+                if len(state.values.get("messages", [])) != expected:
+                    report["incomplete_threads"].append(thread_id)
+            async with saver.conn.execute("SELECT COUNT(*) FROM checkpoints") as cur:
+                report["total_checkpoints"] = (await cur.fetchone())[0]
+            async with saver.conn.execute("SELECT COUNT(*) FROM writes") as cur:
+                report["total_pending_writes"] = (await cur.fetchone())[0]
+    return report
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+
+async def setup_postgres() -> None:
+    from src.storage.postgres.manager import pg_manager
+
+    pg_manager.initialize()
+    await pg_manager.create_business_tables()
+    await pg_manager.close()
+
+
+def format_summary(args: dict[str, Any], results: list[dict[str, Any]], report: dict[str, Any], elapsed: float) -> str:
+    latencies = [value for r in results for value in r["latencies"]]
+    errors = [error for r in results for error in r["errors"]]
+    total_turns = args["threads"] * args["turns"]
+    lines = [
+        f"backend={args['backend']} workers={args['workers']} threads={args['threads']} "
+        f"turns={args['turns']} concurrency/worker={args['concurrency']}",
+        f"turns ok: {len(latencies)}/{total_turns}, errors: {len(errors)}",
+        f"turn latency: p50 {percentile(latencies, 50):.1f}ms, p95 {percentile(latencies, 95):.1f}ms, "
+        f"mean {statistics.fmean(latencies) if latencies else 0:.1f}ms",
+        f"throughput: {len(latencies) / elapsed:.1f} turns/s over {elapsed:.1f}s",
+        f"threads with full history: {args['threads'] - len(report['incomplete_threads'])}/{args['threads']}"
+        f" (expected {report['expected_messages']} messages each)",
+        f"checkpoints stored: {report.get('total_checkpoints')}, pending writes stored: "
+        f"{report.get('total_pending_writes')}",
+    ]
+    if "max_checkpoints_per_thread" in report:
+        lines.append(
+            f"max checkpoints per thread: {report['max_checkpoints_per_thread']} (keep-last {args['keep_last']})"
+        )
+    if errors:
+        lines.append("sample errors:")
+        lines.extend(f"  {error}" for error in sorted(set(errors))[:5])
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Multi-process load test for the agent checkpointer")
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default="postgres", help="Checkpointer backend")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes")
+    parser.add_argument("--threads", type=int, default=200, help="Number of conversation threads")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per thread")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent threads per worker")
+    parser.add_argument("--keep-last", type=int, default=5, help="Checkpoints kept per thread (postgres)")
+    parser.add_argument("--sqlite-path", default=None, help="Shared SQLite file (default: temp file)")
+    parser.add_argument("--output", default=None, help="Write full results as JSON to this path")
+    parser.add_argument("--keep", action="store_true", help="Keep the load-test checkpoints after the run")
+    return parser.parse_args()
+
+
+def main() -> int:
+    ns = parse_args()
+    args = vars(ns) | {"prefix": f"loadtest-{uuid.uuid4().hex[:8]}"}
+    if ns.backend == "sqlite" and not ns.sqlite_path:
+        args["sqlite_path"] = os.path.join(tempfile.mkdtemp(prefix="ckpt-loadtest-"), "aio_history.db")
+    if ns.backend == "postgres":
+        asyncio.run(setup_postgres())
+
+    results: list[dict[str, Any]] = []
+    ctx = mp.get_context("spawn")
+    started = time.perf_counter()
+    with ctx.Pool(ns.workers) as pool:
+        for turn in range(ns.turns):
+            # 同一轮内各 worker 并发处理不同线程；下一轮线程换到另一个 worker
+            turn_results = pool.map(worker_entry, [(args, worker_id, turn) for worker_id in range(ns.workers)])
+            results.extend(turn_results)
+            done = sum(len(r["latencies"]) for r in turn_results)
+            print(f"turn {turn + 1}/{ns.turns}: {done}/{ns.threads} ok")
+    elapsed = time.perf_counter() - started
+
+    report = asyncio.run(verify(args))
+    print()
+    print(format_summary(args, results, report, elapsed))
+
+    if ns.output:
+        output = Path(ns.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(
+            json.dumps({"args": args, "results": results, "report": report}, ensure_ascii=False, indent=2)
+        )
+        print(f"\nResults written to {output}")
+    return 0 if not report["incomplete_threads"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
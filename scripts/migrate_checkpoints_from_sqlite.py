@@ -0,0 +1,141 @@
+"""
+智能体检查点迁移脚本（SQLite -> PostgreSQL）
+
+智能体的 LangGraph 检查点原先保存在 saves/agents/<智能体>/aio_history.db，
+改为 PostgreSQL（agent_checkpoints / agent_checkpoint_writes）后，已有对话需要迁移才能延续上下文。
+每个线程只迁移最近 YUXI_CHECKPOINT_KEEP_LAST 个检查点，以及最新检查点上的中间写入。
+
+用法：
+    python scripts/migrate_checkpoints_from_sqlite.py --dry-run     # 预览迁移
+    python scripts/migrate_checkpoints_from_sqlite.py --execute     # 执行迁移
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+os.environ.setdefault("YUXI_SKIP_APP_INIT", "1")
+
+from sqlalchemy.dialects.postgresql import insert
+
+from src import config
+from src.agents.common.checkpointer import CHECKPOINT_KEEP_LAST
+from src.storage.postgres.manager import pg_manager
+from src.storage.postgres.models_business import AgentCheckpoint, AgentCheckpointWrite
+
+BATCH_SIZE = 500
+
+
+def read_sqlite_checkpoints(db_path: str, keep_last: int) -> tuple[list[dict], list[dict]]:
+    """读取每个线程最近 keep_last 个检查点及最新检查点上的中间写入"""
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        if "checkpoints" not in tables:
+            return [], []
+
+        limit_clause = "WHERE rn <= ?" if keep_last > 0 else ""
+        params = (keep_last,) if keep_last > 0 else ()
+        rows = conn.execute(
+            f"""
+            SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata, rn
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                ) AS rn
+                FROM checkpoints
+            )
+            {limit_clause}
+            """,
+            params,
+        ).fetchall()
+
+        checkpoints, latest = [], set()
+        for thread_id, ns, checkpoint_id, parent_id, type_, checkpoint, metadata, rn in rows:
+            checkpoints.append(
+                {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": ns or "",
+                    "checkpoint_id": checkpoint_id,
+                    "parent_checkpoint_id": parent_id,
+                    "type": type_,
+                    "checkpoint": checkpoint,
+                    "metadata": json.loads(metadata) if metadata else {},
+                }
+            )
+            if rn == 1:
+                latest.add((thread_id, ns or "", checkpoint_id))
+
+        writes = []
+        if "writes" in tables:
+            for thread_id, ns, checkpoint_id, task_id, idx, channel, type_, value in conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value FROM writes"
+            ):
+                if (thread_id, ns or "", checkpoint_id) not in latest:
+                    continue
+                writes.append(
+                    {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": ns or "",
+                        "checkpoint_id": checkpoint_id,
+                        "task_id": task_id,
+                        "idx": idx,
+                        "channel": channel,
+                        "type": type_,
+                        "value": value,
+                        "task_path": "",
+                    }
+                )
+        return checkpoints, writes
+    finally:
+        conn.close()
+
+
+async def write_rows(table, rows: list[dict]) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        async with pg_manager.get_async_session_context() as session:
+            await session.execute(insert(table.__table__).on_conflict_do_nothing(), rows[start : start + BATCH_SIZE])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="智能体检查点迁移（SQLite -> PostgreSQL）")
+    parser.add_argument("--dry-run", action="store_true", help="预览迁移，不执行")
+    parser.add_argument("--execute", action="store_true", help="执行迁移")
+    parser.add_argument(
+        "--keep-last", type=int, default=CHECKPOINT_KEEP_LAST, help="每个线程迁移的检查点数，0 表示全部"
+    )
+    args = parser.parse_args()
+
+    if not args.dry_run and not args.execute:
+        parser.print_help()
+        return
+
+    db_paths = sorted(glob.glob(os.path.join(config.save_dir, "agents", "*", "aio_history.db")))
+    if not db_paths:
+        print("未找到 aio_history.db，无需迁移")
+        return
+
+    if args.execute:
+        pg_manager.initialize()
+        await pg_manager.create_business_tables()
+
+    for db_path in db_paths:
+        checkpoints, writes = read_sqlite_checkpoints(db_path, args.keep_last)
+        threads = len({(c["thread_id"], c["checkpoint_ns"]) for c in checkpoints})
+        print(f"{db_path}: {threads} 个线程, {len(checkpoints)} 个检查点, {len(writes)} 条中间写入")
+        if args.execute:
+            await write_rows(AgentCheckpoint, checkpoints)
+            await write_rows(AgentCheckpointWrite, writes)
+            print("  ✓ 已迁移")
+
+    if args.execute:
+        await pg_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
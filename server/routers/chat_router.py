@@ -1,7 +1,7 @@
 import traceback
 import uuid
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, UploadFile, File
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,8 +11,10 @@ from server.routers.auth_router import get_admin_user
 from server.utils.auth_middleware import get_db, get_required_user
 from src import config as conf
 from src.agents import agent_manager
+from src.agents.common.build_cache import get_build_cache_stats
 from src.models import select_model
-from src.services.chat_stream_service import get_agent_state_view, stream_agent_chat, stream_agent_resume
+from src.services.chat_run_service import ChatRun, ChatRunConflictError, chat_run_registry, encode_run_events
+from src.services.chat_stream_service import get_agent_state_view, stream_agent_chat_in_session, stream_agent_resume
 from src.services.conversation_service import (
     create_thread_view,
     delete_thread_attachment_view,
@@ -24,7 +26,11 @@ from src.services.conversation_service import (
     upload_thread_attachment_view,
 )
 from src.services.feedback_service import get_message_feedback_view, submit_message_feedback_view
-from src.services.history_query_service import get_agent_history_view
+from src.services.history_query_service import (
+    get_agent_history_view,
+    get_tool_call_output_view,
+    iter_history_json,
+)
 from src.repositories.agent_config_repository import AgentConfigRepository
 from src.utils.logging_config import logger
 from src.utils.image_processor import process_uploaded_image
@@ -69,6 +75,15 @@ STREAM_RESPONSE_HEADERS = {
     "Cache-Control": "no-cache",
 }
 
+
+def _run_stream_response(run: ChatRun, after_seq: int, sse: bool) -> StreamingResponse:
+    return StreamingResponse(
+        encode_run_events(run, after_seq, sse=sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers=STREAM_RESPONSE_HEADERS,
+    )
+
+
 # =============================================================================
 # > === 智能体管理分组 ===
 # =============================================================================
@@ -379,14 +394,18 @@ async def delete_agent_config_profile(
 @chat.post("/agent/{agent_id}")
 async def chat_agent(
     agent_id: str,
+    request: Request,
     query: str = Body(...),
     config: dict = Body({}),
     meta: dict = Body({}),
     image_content: str | None = Body(None),
     current_user: User = Depends(get_required_user),
-    db: AsyncSession = Depends(get_db),
 ):
-    """使用特定智能体进行对话（需要登录）"""
+    """使用特定智能体进行对话（需要登录）
+
+    生成在后台运行，客户端断开不会中断生成，可通过 /agent/{agent_id}/runs/stream 重新接入。
+    请求头 Accept 包含 text/event-stream 时以 SSE 返回（事件带 id，可断点续传），否则返回 NDJSON。
+    """
     logger.info(f"agent_id: {agent_id}, query: {query}, config: {config}, meta: {meta}")
     logger.info(f"image_content present: {image_content is not None}")
     if image_content:
@@ -407,19 +426,60 @@ async def chat_agent(
             "has_image": bool(image_content),
         }
     )
-    return StreamingResponse(
-        stream_agent_chat(
-            agent_id=agent_id,
-            query=query,
-            config=config,
-            meta=meta,
-            image_content=image_content,
-            current_user=current_user,
-            db=db,
-        ),
-        media_type="application/x-ndjson",
-        headers=STREAM_RESPONSE_HEADERS,
-    )
+    try:
+        run = chat_run_registry.start(
+            run_id=meta["request_id"],
+            thread_id=config.get("thread_id") or meta["request_id"],
+            user_id=str(current_user.id),
+            source=stream_agent_chat_in_session(
+                agent_id=agent_id,
+                query=query,
+                config=config,
+                meta=meta,
+                image_content=image_content,
+                current_user=current_user,
+            ),
+        )
+    except ChatRunConflictError:
+        raise HTTPException(status_code=409, detail="该对话正在生成回复，请稍后再试")
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    return _run_stream_response(run, 0, sse)
+
+
+@chat.get("/agent/{agent_id}/runs/stream")
+async def attach_agent_run(
+    agent_id: str,
+    thread_id: str = Query(...),
+    last_event_id: int | None = Query(None),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(get_required_user),
+):
+    """接入对话正在进行的生成（需要登录），以 SSE 返回
+
+    刷新页面、多个标签页查看同一对话或断线重连时使用。带 Last-Event-ID（请求头或 last_event_id 参数）时
+    从该事件之后续传；否则从头回放仍在进行的生成。没有可接入的生成时返回 204，客户端加载历史记录即可。
+    """
+    if last_event_id is None and last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+
+    run = chat_run_registry.get(thread_id)
+    if run is None or run.user_id != str(current_user.id) or (last_event_id is None and run.done):
+        return Response(status_code=204)
+    return _run_stream_response(run, last_event_id or 0, sse=True)
+
+
+@chat.post("/agent/{agent_id}/runs/stop")
+async def stop_agent_run(
+    agent_id: str,
+    thread_id: str = Body(..., embed=True),
+    current_user: User = Depends(get_required_user),
+):
+    """停止对话正在进行的生成（需要登录），已生成的内容会被保存"""
+    run = chat_run_registry.get(thread_id)
+    if run is None or run.user_id != str(current_user.id):
+        return {"stopped": False}
+    return {"stopped": chat_run_registry.cancel(thread_id)}
 
 
 # =============================================================================
@@ -443,6 +503,12 @@ async def update_chat_models(model_provider: str, model_names: list[str], curren
     return {"models": conf.model_names[model_provider].models}
 
 
+@chat.get("/stats/build-cache")
+async def get_agent_build_cache_stats(current_user: User = Depends(get_admin_user)):
+    """获取智能体图与知识库工具构建缓存的命中率及节省的构建耗时"""
+    return {"stats": get_build_cache_stats(), "message": "success"}
+
+
 @chat.post("/agent/{agent_id}/resume")
 async def resume_agent_chat(
     agent_id: str,
@@ -545,22 +611,44 @@ async def save_agent_config(
 
 @chat.get("/agent/{agent_id}/history")
 async def get_agent_history(
-    agent_id: str, thread_id: str, current_user: User = Depends(get_required_user), db: AsyncSession = Depends(get_db)
+    agent_id: str,
+    thread_id: str,
+    limit: int | None = Query(None, ge=1, description="每页消息数"),
+    before: str | None = Query(None, description="上一页返回的 next_cursor，加载更早的消息"),
+    tool_output_limit: int | None = Query(None, ge=0, description="工具输出截断长度，0 表示不截断"),
+    current_user: User = Depends(get_required_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    """获取智能体历史消息（需要登录）- 包含用户反馈状态"""
+    """获取智能体历史消息（需要登录）- 包含用户反馈状态，按游标分页，从最新消息往前加载"""
     try:
-        return await get_agent_history_view(
+        view = await get_agent_history_view(
             agent_id=agent_id,
             thread_id=thread_id,
             current_user_id=str(current_user.id),
             db=db,
+            limit=limit,
+            before=before,
+            tool_output_limit=tool_output_limit,
         )
+        return StreamingResponse(iter_history_json(view), media_type="application/json")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取智能体历史消息出错: {e}, {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"获取智能体历史消息出错: {str(e)}")
 
 
+@chat.get("/tool-calls/{tool_call_id}")
+async def get_tool_call_output(
+    tool_call_id: int,
+    current_user: User = Depends(get_required_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """获取工具调用的完整输出（需要登录）- 历史消息中的工具输出被截断时使用"""
+    return await get_tool_call_output_view(tool_call_id=tool_call_id, current_user_id=str(current_user.id), db=db)
+
+
 @chat.get("/agent/{agent_id}/state")
 async def get_agent_state(
     agent_id: str,
@@ -10,15 +10,19 @@ import traceback
 from datetime import datetime, timedelta
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import Integer, String, cast, distinct, func, or_, select, text
+from sqlalchemy import String, cast, func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from server.routers.auth_router import get_admin_user
 from server.utils.auth_middleware import get_db
 from src.repositories.conversation_repository import ConversationRepository
-from src.storage.postgres.models_business import User
+from src.repositories.dashboard_rollup_repository import TOKEN_METRICS, DashboardRollupRepository
+from src.services.dashboard_rollup_service import dashboard_rollup
+from src.services.history_cursor import decode_cursor, encode_cursor
+from src.services.history_query_service import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, HISTORY_TOOL_OUTPUT_PREVIEW
+from src.storage.postgres.models_business import DashboardRollup, User
 from src.utils.datetime_utils import UTC, ensure_shanghai, shanghai_now, utc_now
 from src.utils.logging_config import logger
 
@@ -118,6 +122,8 @@ class ConversationDetailResponse(BaseModel):
     updated_at: str
     total_tokens: int
     messages: list[dict]
+    has_more: bool = False
+    next_cursor: str | None = None
 
 
 # =============================================================================
@@ -180,11 +186,18 @@ async def get_all_conversations(
 @dashboard.get("/conversations/{thread_id}", response_model=ConversationDetailResponse)
 async def get_conversation_detail(
     thread_id: str,
+    limit: int | None = Query(None, ge=1, description="每页消息数"),
+    before: str | None = Query(None, description="上一页返回的 next_cursor，加载更早的消息"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
 ):
-    """获取指定对话详情（管理员权限）"""
+    """获取指定对话详情（管理员权限）- 消息按游标分页，工具输出截断"""
     try:
+        try:
+            cursor = decode_cursor(before) if before else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
         conv_manager = ConversationRepository(db)
         conversation = await conv_manager.get_conversation_by_thread_id(thread_id)
 
@@ -192,8 +205,23 @@ async def get_conversation_detail(
             raise HTTPException(status_code=404, detail="Conversation not found")
 
         # Get messages and stats
-        messages = await conv_manager.get_messages(conversation.id)
+        page_size = min(limit or HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+        messages, has_more = await conv_manager.get_messages_page(conversation.id, page_size, cursor)
         stats = await conv_manager.get_stats(conversation.id)
+        tool_calls_by_message: dict[int, list[dict]] = {}
+        for tc in await conv_manager.get_tool_calls_for_messages(
+            [msg.id for msg in messages], HISTORY_TOOL_OUTPUT_PREVIEW or None
+        ):
+            tool_calls_by_message.setdefault(tc.message_id, []).append(
+                {
+                    "id": tc.id,
+                    "tool_name": tc.tool_name,
+                    "tool_input": tc.tool_input,
+                    "tool_output": tc.tool_output,
+                    "tool_output_truncated": bool(tc.output_length and tc.output_length > len(tc.tool_output or "")),
+                    "status": tc.status,
+                }
+            )
 
         # Format messages
         message_list = []
@@ -207,17 +235,8 @@ async def get_conversation_detail(
             }
 
             # Include tool calls if present
-            if msg.tool_calls:
-                msg_dict["tool_calls"] = [
-                    {
-                        "id": tc.id,
-                        "tool_name": tc.tool_name,
-                        "tool_input": tc.tool_input,
-                        "tool_output": tc.tool_output,
-                        "status": tc.status,
-                    }
-                    for tc in msg.tool_calls
-                ]
+            if msg.id in tool_calls_by_message:
+                msg_dict["tool_calls"] = tool_calls_by_message[msg.id]
 
             message_list.append(msg_dict)
 
@@ -232,6 +251,8 @@ async def get_conversation_detail(
             "updated_at": conversation.updated_at.isoformat(),
             "total_tokens": stats.total_tokens if stats else 0,
             "messages": message_list,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(messages[0].created_at, messages[0].id) if has_more and messages else None,
         }
     except HTTPException:
         raise
@@ -251,56 +272,25 @@ async def get_user_activity_stats(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
 ):
-    """获取用户活动统计（管理员权限）"""
+    """获取用户活动统计（管理员权限）- 读取后台维护的活跃用户汇总表"""
     try:
-        from src.storage.postgres.models_business import Conversation, User
-
-        now = utc_now()
         # PostgreSQL with asyncpg requires naive datetime for naive DateTime columns
-        naive_now = now.replace(tzinfo=None)
-
-        # Conversations may store either the numeric user primary key or the login user_id string.
-        # Join condition accounts for both representations.
-        user_join_condition = or_(
-            Conversation.user_id == User.user_id,
-            Conversation.user_id == cast(User.id, String),
-        )
-
-        # 基础用户统计（排除已删除用户）
-        total_users_result = await db.execute(select(func.count(User.id)).filter(User.is_deleted == 0))
-        total_users = total_users_result.scalar() or 0
+        naive_now = utc_now().replace(tzinfo=None)
 
-        # 不同时间段的活跃用户数（基于对话活动，排除已删除用户）
-        active_users_24h_result = await db.execute(
-            select(func.count(distinct(User.id)))
-            .select_from(Conversation)
-            .join(User, user_join_condition)
-            .filter(Conversation.updated_at >= naive_now - timedelta(days=1), User.is_deleted == 0)
+        await dashboard_rollup.ensure_ready()
+        total_users, daily_counts, active_users_30d = await DashboardRollupRepository(db).get_user_activity(
+            naive_now, days=30
         )
-        active_users_24h = active_users_24h_result.scalar() or 0
+        active_users_24h = daily_counts.get(0, 0)
 
-        active_users_30d_result = await db.execute(
-            select(func.count(distinct(User.id)))
-            .select_from(Conversation)
-            .join(User, user_join_condition)
-            .filter(Conversation.updated_at >= naive_now - timedelta(days=30), User.is_deleted == 0)
-        )
-        active_users_30d = active_users_30d_result.scalar() or 0
         # 最近7天每日活跃用户（排除已删除用户）
-        daily_active_users = []
-        for i in range(7):
-            day_start = naive_now - timedelta(days=i + 1)
-            day_end = naive_now - timedelta(days=i)
-
-            active_count_result = await db.execute(
-                select(func.count(distinct(User.id)))
-                .select_from(Conversation)
-                .join(User, user_join_condition)
-                .filter(Conversation.updated_at >= day_start, Conversation.updated_at < day_end, User.is_deleted == 0)
-            )
-            active_count = active_count_result.scalar() or 0
-
-            daily_active_users.append({"date": day_start.strftime("%Y-%m-%d"), "active_users": active_count})
+        daily_active_users = [
+            {
+                "date": (naive_now - timedelta(days=i + 1)).strftime("%Y-%m-%d"),
+                "active_users": daily_counts.get(i, 0),
+            }
+            for i in range(7)
+        ]
 
         return UserActivityStats(
             total_users=total_users,
@@ -325,54 +315,45 @@ async def get_tool_call_stats(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
 ):
-    """获取工具调用统计（管理员权限）"""
+    """获取工具调用统计（管理员权限）- 读取后台维护的工具调用汇总表"""
     try:
-        from src.storage.postgres.models_business import ToolCall
-
-        now = utc_now()
         # PostgreSQL with asyncpg requires naive datetime for naive DateTime columns
-        naive_now = now.replace(tzinfo=None)
+        naive_now = utc_now().replace(tzinfo=None)
+
+        await dashboard_rollup.ensure_ready()
+        rows = await DashboardRollupRepository(db).get_tool_stats(naive_now, days=7)
+
+        calls_by_tool: dict[str, int] = {}
+        daily_counts: dict[int, int] = {}
+        tool_error_distribution: dict[str, int] = {}
+        successful_calls = 0
+        for metric, tool_name, day_offset, value in rows:
+            value = int(value or 0)
+            if metric == "tool_calls":
+                calls_by_tool[tool_name] = calls_by_tool.get(tool_name, 0) + value
+                if day_offset is not None:
+                    daily_counts[day_offset] = daily_counts.get(day_offset, 0) + value
+            elif metric == "tool_success":
+                successful_calls += value
+            elif metric == "tool_errors":
+                tool_error_distribution[tool_name] = tool_error_distribution.get(tool_name, 0) + value
 
         # 基础工具调用统计
-        total_calls_result = await db.execute(select(func.count(ToolCall.id)))
-        total_calls = total_calls_result.scalar() or 0
-
-        successful_calls_result = await db.execute(select(func.count(ToolCall.id)).filter(ToolCall.status == "success"))
-        successful_calls = successful_calls_result.scalar() or 0
+        total_calls = sum(calls_by_tool.values())
         failed_calls = total_calls - successful_calls
         success_rate = round((successful_calls / total_calls * 100), 2) if total_calls > 0 else 0
 
         # 最常用工具
-        most_used_tools_result = await db.execute(
-            select(ToolCall.tool_name, func.count(ToolCall.id).label("count"))
-            .group_by(ToolCall.tool_name)
-            .order_by(func.count(ToolCall.id).desc())
-            .limit(10)
-        )
-        most_used_tools = most_used_tools_result.all()
-        most_used_tools = [{"tool_name": name, "count": count} for name, count in most_used_tools]
-
-        # 工具错误分布
-        tool_errors_result = await db.execute(
-            select(ToolCall.tool_name, func.count(ToolCall.id).label("error_count"))
-            .filter(ToolCall.status == "error")
-            .group_by(ToolCall.tool_name)
-        )
-        tool_errors = tool_errors_result.all()
-        tool_error_distribution = {name: count for name, count in tool_errors}
+        most_used_tools = [
+            {"tool_name": name, "count": count}
+            for name, count in sorted(calls_by_tool.items(), key=lambda item: item[1], reverse=True)[:10]
+        ]
 
         # 最近7天每日工具调用数
-        daily_tool_calls = []
-        for i in range(7):
-            day_start = naive_now - timedelta(days=i + 1)
-            day_end = naive_now - timedelta(days=i)
-
-            daily_count_result = await db.execute(
-                select(func.count(ToolCall.id)).filter(ToolCall.created_at >= day_start, ToolCall.created_at < day_end)
-            )
-            daily_count = daily_count_result.scalar() or 0
-
-            daily_tool_calls.append({"date": day_start.strftime("%Y-%m-%d"), "call_count": daily_count})
+        daily_tool_calls = [
+            {"date": (naive_now - timedelta(days=i + 1)).strftime("%Y-%m-%d"), "call_count": daily_counts.get(i, 0)}
+            for i in range(7)
+        ]
 
         return ToolCallStats(
             total_calls=total_calls,
@@ -719,6 +700,15 @@ async def get_all_feedbacks(
 # =============================================================================
 
 
+# 调用分析类型对应的汇总指标
+ROLLUP_METRICS_BY_TYPE = {
+    "models": ("model_calls",),
+    "agents": ("agent_calls",),
+    "tokens": TOKEN_METRICS,
+    "tools": ("tool_calls",),
+}
+
+
 class TimeSeriesStats(BaseModel):
     """时间序列统计数据"""
 
@@ -737,9 +727,10 @@ async def get_call_timeseries_stats(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_admin_user),
 ):
-    """获取调用分析时间序列统计（管理员权限）"""
+    """获取调用分析时间序列统计（管理员权限）- 读取后台维护的按小时汇总表"""
     try:
-        from src.storage.postgres.models_business import Conversation, Message, ToolCall
+        if type not in ROLLUP_METRICS_BY_TYPE:
+            raise HTTPException(status_code=422, detail=f"Invalid type: {type}")
 
         # 计算时间范围（使用北京时间 UTC+8）
         now = utc_now()
@@ -749,7 +740,6 @@ async def get_call_timeseries_stats(
             intervals = 14
             # 包含当前小时：从13小时前开始
             start_time = now - timedelta(hours=intervals - 1)
-            group_format = _get_time_group_format(Message.created_at, time_range)
             base_local_time = ensure_shanghai(start_time)
         elif time_range == "14weeks":
             intervals = 14
@@ -758,124 +748,26 @@ async def get_call_timeseries_stats(
             local_start = local_start - timedelta(days=local_start.weekday())
             local_start = local_start.replace(hour=0, minute=0, second=0, microsecond=0)
             start_time = local_start.astimezone(UTC)
-            group_format = _get_time_group_format(Message.created_at, time_range)
             base_local_time = local_start
         else:  # 14days (default)
             intervals = 14
             # 包含当前天：从13天前开始
             start_time = now - timedelta(days=intervals - 1)
-            group_format = _get_time_group_format(Message.created_at, time_range)
             base_local_time = ensure_shanghai(start_time)
 
         # Convert start_time to naive UTC datetime for PostgreSQL query
         # PostgreSQL with asyncpg and naive DateTime columns requires naive datetime objects
         query_start_time = start_time.replace(tzinfo=None)
 
-        # 根据类型查询数据
-        if type == "models":
-            # 模型调用统计（基于消息数量，按模型分组）
-            # 从message的extra_metadata中提取模型信息
-            category_expr = cast(Message.extra_metadata["response_metadata"]["model_name"], String)
-            query_result = await db.execute(
-                select(
-                    group_format.label("date"),
-                    func.count(Message.id).label("count"),
-                    category_expr.label("category"),
-                )
-                .filter(Message.role == "assistant", Message.created_at >= query_start_time)
-                .filter(Message.extra_metadata.isnot(None))
-                .group_by(group_format, category_expr)
-                .order_by(group_format)
-            )
-            query = query_result.all()
-        elif type == "agents":
-            # 智能体调用统计（基于对话更新时间，按智能体分组）
-            # 为对话创建独立的时间格式化器（使用 PostgreSQL 兼容的 to_char + INTERVAL）
-            conv_group_format = _get_time_group_format(Conversation.updated_at, time_range)
-
-            query_result = await db.execute(
-                select(
-                    conv_group_format.label("date"),
-                    func.count(Conversation.id).label("count"),
-                    Conversation.agent_id.label("category"),
-                )
-                .filter(Conversation.updated_at.isnot(None))
-                .filter(Conversation.updated_at >= query_start_time)
-                .group_by(conv_group_format, Conversation.agent_id)
-                .order_by(conv_group_format)
-            )
-            query = query_result.all()
-        elif type == "tokens":
-            # Token消耗统计（区分input/output tokens）
-            # 先查询input tokens
-            from sqlalchemy import literal
-
-            input_query_result = await db.execute(
-                select(
-                    group_format.label("date"),
-                    func.sum(
-                        func.coalesce(
-                            cast(cast(Message.extra_metadata["usage_metadata"]["input_tokens"], String), Integer), 0
-                        )
-                    ).label("count"),
-                    literal("input_tokens").label("category"),
-                )
-                .filter(
-                    Message.created_at >= query_start_time,
-                    Message.extra_metadata.isnot(None),
-                    Message.extra_metadata["usage_metadata"].isnot(None),
-                )
-                .group_by(group_format)
-                .order_by(group_format)
-            )
-            input_query = input_query_result.all()
-
-            # 查询output tokens
-            output_query_result = await db.execute(
-                select(
-                    group_format.label("date"),
-                    func.sum(
-                        func.coalesce(
-                            cast(cast(Message.extra_metadata["usage_metadata"]["output_tokens"], String), Integer), 0
-                        )
-                    ).label("count"),
-                    literal("output_tokens").label("category"),
-                )
-                .filter(
-                    Message.created_at >= query_start_time,
-                    Message.extra_metadata.isnot(None),
-                    Message.extra_metadata["usage_metadata"].isnot(None),
-                )
-                .group_by(group_format)
-                .order_by(group_format)
-            )
-            output_query = output_query_result.all()
-
-            # 合并两个查询结果
-            input_results = input_query
-            output_results = output_query
-            results = input_results + output_results
-        elif type == "tools":
-            # 工具调用统计（按工具名称分组）
-            # 为工具调用创建独立的时间格式化器（使用 PostgreSQL 兼容的 to_char + INTERVAL）
-            tool_group_format = _get_time_group_format(ToolCall.created_at, time_range)
-
-            query_result = await db.execute(
-                select(
-                    tool_group_format.label("date"),
-                    func.count(ToolCall.id).label("count"),
-                    ToolCall.tool_name.label("category"),
-                )
-                .filter(ToolCall.created_at >= query_start_time)
-                .group_by(tool_group_format, ToolCall.tool_name)
-                .order_by(tool_group_format)
-            )
-            query = query_result.all()
-        else:
-            raise HTTPException(status_code=422, detail=f"Invalid type: {type}")
-
-        if type != "tokens":
-            results = query
+        # 从汇总表按时间段读取数据（模型调用 / 智能体调用 / Token 消耗 / 工具调用）
+        await dashboard_rollup.ensure_ready()
+        results, tools_total = await DashboardRollupRepository(db).get_timeseries(
+            ROLLUP_METRICS_BY_TYPE[type],
+            query_start_time,
+            _get_time_group_format(DashboardRollup.bucket_start, time_range),
+            by_metric=type == "tokens",
+            total_metric="tool_calls" if type == "tools" else None,
+        )
 
         # 处理堆叠数据格式
         # 首先收集所有类别
@@ -953,10 +845,7 @@ async def get_call_timeseries_stats(
         # 计算统计指标
         if type == "tools":
             # 对于工具调用，显示所有时间的总数（与ToolStatsComponent保持一致）
-            from src.storage.postgres.models_business import ToolCall
-
-            total_count_result = await db.execute(select(func.count(ToolCall.id)))
-            total_count = total_count_result.scalar() or 0
+            total_count = tools_total or 0
         else:
             # 其他类型使用时间序列数据的总和
             total_count = sum(item["total"] for item in data)
@@ -1,13 +1,16 @@
 import traceback
+from urllib.parse import urlparse
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 
 from server.utils.auth_middleware import get_admin_user
 from src import graph_base, knowledge_base
 from src.knowledge.adapters.base import GraphAdapter
 from src.knowledge.adapters.factory import GraphAdapterFactory
+from src.knowledge.services.upload_graph_service import graph_stats_cache
+from src.knowledge.utils.graph_overview import etag_matches, graph_overview_store
+from src.services.task_service import TaskContext, tasker
 from src.storage.postgres.models_business import User
-from src.storage.minio.client import StorageError
 from src.utils.logging_config import logger
 
 graph = APIRouter(prefix="/graph", tags=["graph"])
@@ -61,7 +64,7 @@ async def get_graphs(current_user: User = Depends(get_admin_user)):
         graphs = []
 
         # 1. 获取默认 Neo4j 图谱信息 (Upload 类型)
-        neo4j_info = graph_base.get_graph_info()
+        neo4j_info = await graph_base.aget_graph_info()
         if neo4j_info:
             # 直接使用 Upload 适配器的默认 metadata
             from src.knowledge.adapters.upload import UploadGraphAdapter
@@ -157,6 +160,57 @@ async def get_subgraph(
         raise HTTPException(status_code=500, detail=f"Failed to get subgraph: {str(e)}")
 
 
+@graph.get("/overview")
+async def get_graph_overview(
+    request: Request,
+    db_id: str = Query(..., description="知识图谱ID"),
+    max_nodes: int = Query(100, description="最大节点数", ge=1, le=1000),
+    current_user: User = Depends(get_admin_user),
+):
+    """
+    图谱概览子图（高度数节点及其连接），用于可视化首屏
+
+    读取物化的概览快照，支持 ETag / If-None-Match，内容未变化时返回 304；
+    请求的节点数超过快照大小（YUXI_GRAPH_OVERVIEW_MAX_NODES）时按快照大小返回。
+    """
+    try:
+        adapter = await _get_graph_adapter(db_id)
+        body, etag = await graph_overview_store.get(db_id, adapter.get_overview, max_nodes)
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get graph overview: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get graph overview: {str(e)}")
+
+
+@graph.get("/expand")
+async def expand_graph_node(
+    db_id: str = Query(..., description="知识图谱ID"),
+    node_id: str = Query(..., description="要展开的节点ID"),
+    limit: int = Query(50, description="最多返回的邻居关系数", ge=1, le=500),
+    current_user: User = Depends(get_admin_user),
+):
+    """
+    按需展开节点的一跳邻居，配合概览子图渐进式加载
+    """
+    try:
+        adapter = await _get_graph_adapter(db_id)
+        result_data = await adapter.expand_node(node_id, limit=limit)
+        return {"success": True, "data": result_data}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to expand node {node_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to expand node: {str(e)}")
+
+
 @graph.get("/labels")
 async def get_graph_labels(
     db_id: str = Query(..., description="知识图谱ID"), current_user: User = Depends(get_admin_user)
@@ -165,9 +219,9 @@ async def get_graph_labels(
     获取图谱的所有标签
     """
     try:
-        # 使用统一的适配器获取标签
+        # 使用统一的适配器获取标签（读取统计缓存）
         adapter = await _get_graph_adapter(db_id)
-        labels = await adapter.get_labels()
+        labels = await graph_stats_cache.get(f"{db_id}:labels", adapter.get_labels)
         return {"success": True, "data": {"labels": labels}}
 
     except Exception as e:
@@ -186,22 +240,27 @@ async def get_graph_stats(
         # 使用适配器的统计信息 (适用于 kb_ 开头的数据库和 LightRAG 数据库)
         if db_id.startswith("kb_") or knowledge_base.is_lightrag_database(db_id):
             adapter = await _get_graph_adapter(db_id)
-            stats_data = await adapter.get_stats()
+            stats_data = await graph_stats_cache.get(f"{db_id}:stats", adapter.get_stats)
             return {"success": True, "data": stats_data}
         else:
             # Neo4j stats (直接管理的图谱)
-            info = graph_base.get_graph_info(graph_name=db_id)
+            info = await graph_base.aget_graph_info(graph_name=db_id)
             if not info:
                 raise HTTPException(status_code=404, detail="Graph info not found")
 
+            label_counts = info.get("label_counts", {})
+            entity_types = [
+                {"type": label, "count": label_counts.get(label, 0)}
+                for label in info.get("labels", [])
+                if not label.startswith("kb_")
+            ]
             return {
                 "success": True,
                 "data": {
                     "total_nodes": info.get("entity_count", 0),
                     "total_edges": info.get("relationship_count", 0),
-                    # Neo4j info currently returns 'labels' list, not counts per label.
-                    # Improving this would require updating GraphDatabase.get_graph_info
-                    "entity_types": [{"type": label, "count": "N/A"} for label in info.get("labels", [])],
+                    "entity_types": sorted(entity_types, key=lambda item: item["count"], reverse=True),
+                    "last_updated": info.get("last_updated"),
                 },
             }
 
@@ -235,7 +294,7 @@ async def get_neo4j_node(
 async def get_neo4j_info(current_user: User = Depends(get_admin_user)):
     """获取Neo4j图数据库信息"""
     try:
-        graph_info = graph_base.get_graph_info()
+        graph_info = await graph_base.aget_graph_info()
         if graph_info is None:
             raise HTTPException(status_code=400, detail="图数据库获取出错")
         return {"success": True, "data": graph_info}
@@ -271,19 +330,71 @@ async def add_neo4j_entities(
     kgdb_name: str | None = Body(None),
     embed_model_name: str | None = Body(None),
     batch_size: int | None = Body(None),
+    write_batch_size: int | None = Body(None),
+    start_offset: int = Body(0),
+    resume_task_id: str | None = Body(None),
     current_user: User = Depends(get_admin_user),
 ):
-    """通过JSONL文件添加图谱实体到Neo4j（只接受 MinIO URL）"""
+    """通过JSONL文件添加图谱实体到Neo4j（只接受 MinIO URL），以后台任务流式导入
+
+    指定 resume_task_id 时从该任务记录的字节位置继续导入（断点续传）。
+    """
+    if urlparse(file_path).scheme not in ("http", "https"):
+        raise HTTPException(
+            status_code=400, detail="不支持本地文件路径，只允许 MinIO URL。请先通过文件上传接口上传文件。"
+        )
+
+    if resume_task_id:
+        previous = await tasker.get_task(resume_task_id)
+        if not previous:
+            raise HTTPException(status_code=404, detail=f"任务 {resume_task_id} 不存在")
+        # 断点位置只对同一文件、同一图谱有效
+        payload = previous.get("payload") or {}
+        if (
+            previous.get("type") != "graph_import"
+            or payload.get("file_path") != file_path
+            or payload.get("kgdb_name") != kgdb_name
+        ):
+            raise HTTPException(status_code=400, detail=f"任务 {resume_task_id} 导入的文件或图谱与本次请求不一致")
+        start_offset = int((previous.get("result") or {}).get("offset") or 0)
+
+    async def run_import(context: TaskContext):
+        await context.set_progress(0.0, f"开始导入（起始位置 {start_offset} 字节）")
+
+        async def report(stats: dict):
+            # 每批写入后记录进度与断点位置，任务失败时可据此续传
+            await context.set_result(stats)
+            total = stats.get("total_bytes")
+            progress = stats["offset"] / total * 100 if total else 0.0
+            await context.set_progress(progress, f"已导入 {stats['triples']} 条三元组")
+            await context.raise_if_cancelled()
+
+        stats = await graph_base.jsonl_file_add_entity(
+            file_path,
+            kgdb_name,
+            embed_model_name,
+            batch_size,
+            write_batch_size=write_batch_size,
+            start_offset=start_offset,
+            progress_callback=report,
+        )
+        await context.set_result(stats)
+        await context.set_progress(100.0, f"导入完成，共 {stats['triples']} 条三元组")
+        return stats
+
     try:
-        # 服务层会验证 URL 并从 MinIO 下载文件
-        await graph_base.jsonl_file_add_entity(file_path, kgdb_name, embed_model_name, batch_size)
-        return {"success": True, "message": "实体添加成功", "status": "success"}
-    except StorageError as e:
-        # MinIO 验证或下载错误
-        raise HTTPException(status_code=400, detail=str(e))
-    except ValueError as e:
-        # 本地路径拒绝错误
-        raise HTTPException(status_code=400, detail=str(e))
+        task = await tasker.enqueue(
+            name=f"图谱三元组导入 ({file_path.rsplit('/', 1)[-1]})",
+            task_type="graph_import",
+            payload={"file_path": file_path, "kgdb_name": kgdb_name, "start_offset": start_offset},
+            coroutine=run_import,
+        )
+        return {
+            "success": True,
+            "message": "导入任务已提交，请在任务中心查看进度",
+            "status": "queued",
+            "task_id": task.id,
+        }
     except Exception as e:
         logger.error(f"添加实体失败: {e}, {traceback.format_exc()}")
         return {"success": False, "message": f"添加实体失败: {e}", "status": "failed"}
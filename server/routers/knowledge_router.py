@@ -11,18 +11,21 @@ from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Reques
 from fastapi.responses import FileResponse
 from starlette.responses import StreamingResponse
 
-from src.services.task_service import TaskContext, tasker
-from server.utils.auth_middleware import get_admin_user, get_current_user, get_required_user
+from server.utils.auth_middleware import get_admin_user, get_required_user
 from src import config, knowledge_base
 from src.knowledge.indexing import SUPPORTED_FILE_EXTENSIONS, is_supported_file_extension, process_file_to_markdown
+from src.knowledge.services.docling_service import docling_service
+from src.knowledge.services.parse_cache import parse_cache
 from src.knowledge.utils import calculate_content_hash
+from src.knowledge.utils.milvus_index import INDEX_PROFILE_AUTO, INDEX_PROFILES
 from src.models.embed import test_all_embedding_models_status, test_embedding_model_status
 from src.repositories.knowledge_base_repository import KnowledgeBaseRepository
 from src.repositories.task_repository import TaskRepository
-from src.storage.postgres.models_business import User
+from src.services.task_service import TaskContext, tasker
 from src.storage.minio.client import StorageError, aupload_file_to_minio, get_minio_client
-from src.utils.datetime_utils import utc_now_naive
+from src.storage.postgres.models_business import User
 from src.utils import logger
+from src.utils.datetime_utils import utc_now_naive
 
 knowledge = APIRouter(prefix="/knowledge", tags=["knowledge"])
 
@@ -72,6 +75,7 @@ async def _deny_agent_only_kb_from_web(db_id: str) -> None:
     if kb_row and (kb_row.visibility or KB_VISIBILITY_PUBLIC) == KB_VISIBILITY_AGENT_ONLY:
         raise HTTPException(status_code=404, detail="Database not found")
 
+
 media_types = {
     ".pdf": "application/pdf",
     ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
@@ -115,7 +119,7 @@ media_types = {
 @knowledge.get("/databases")
 async def get_databases(current_user: User = Depends(get_required_user)):
     """获取所有知识库（根据用户权限过滤）
-    
+
     权限说明：
     - 所有登录用户都可以访问
     - 超级管理员看到所有知识库
@@ -125,11 +129,7 @@ async def get_databases(current_user: User = Depends(get_required_user)):
       3. 不在黑名单中的知识库
     """
     try:
-        user_info = {
-            "role": current_user.role,
-            "user_id": current_user.id,
-            "department_id": current_user.department_id
-        }
+        user_info = {"role": current_user.role, "user_id": current_user.id, "department_id": current_user.department_id}
         return await knowledge_base.get_databases_by_user(user_info)
     except Exception as e:
         logger.error(f"获取数据库列表失败 {e}, {traceback.format_exc()}")
@@ -149,7 +149,7 @@ async def create_database(
     current_user: User = Depends(get_required_user),
 ):
     """创建知识库
-    
+
     所有登录用户都可以创建知识库。
     创建时自动设置部门为用户所在部门，如果用户没有部门则使用默认部门。
     所有知识库默认全员可见。
@@ -161,7 +161,9 @@ async def create_database(
     )
     try:
         if visibility not in KB_VISIBILITY_CHOICES:
-            raise HTTPException(status_code=400, detail=f"visibility 仅支持: {', '.join(sorted(KB_VISIBILITY_CHOICES))}")
+            raise HTTPException(
+                status_code=400, detail=f"visibility 仅支持: {', '.join(sorted(KB_VISIBILITY_CHOICES))}"
+            )
 
         # 先检查名称是否已存在
         if await knowledge_base.database_name_exists(database_name):
@@ -193,17 +195,16 @@ async def create_database(
         user_department_id = current_user.department_id
         if not user_department_id:
             # 获取默认部门
-            from src.storage.postgres.manager import pg_manager
             from sqlalchemy import text
-            
+
+            from src.storage.postgres.manager import pg_manager
+
             async with pg_manager.get_async_session_context() as session:
-                result = await session.execute(
-                    text("SELECT id FROM departments WHERE name = '默认部门' LIMIT 1")
-                )
+                result = await session.execute(text("SELECT id FROM departments WHERE name = '默认部门' LIMIT 1"))
                 default_dept = result.fetchone()
                 if default_dept:
                     user_department_id = default_dept[0]
-        
+
         # 归一化 share_config：
         # 1. 优先使用前端传入配置
         # 2. 未传入时，默认全员可见，并记录创建者部门用于部门检索
@@ -299,7 +300,9 @@ async def update_database_info(
     )
     try:
         if visibility is not None and visibility not in KB_VISIBILITY_CHOICES:
-            raise HTTPException(status_code=400, detail=f"visibility 仅支持: {', '.join(sorted(KB_VISIBILITY_CHOICES))}")
+            raise HTTPException(
+                status_code=400, detail=f"visibility 仅支持: {', '.join(sorted(KB_VISIBILITY_CHOICES))}"
+            )
         database = await knowledge_base.update_database(
             db_id,
             name,
@@ -334,6 +337,49 @@ async def delete_database(db_id: str, current_user: User = Depends(get_required_
         raise HTTPException(status_code=400, detail=f"删除数据库失败: {e}")
 
 
+@knowledge.post("/databases/{db_id}/fulltext-index/migrate")
+async def migrate_fulltext_index(db_id: str, current_user: User = Depends(get_admin_user)):
+    """将旧 Milvus 集合迁移为带 BM25 全文索引的结构（关键词/混合检索使用）"""
+    try:
+        kb_instance = await knowledge_base.aget_kb(db_id)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"知识库不存在: {e}")
+    if kb_instance.kb_type != "milvus":
+        raise HTTPException(status_code=400, detail="仅 Milvus 知识库支持全文索引迁移")
+
+    try:
+        result = await kb_instance.migrate_collection_to_bm25(db_id)
+        return {**result, "message": "success"}
+    except Exception as e:
+        logger.error(f"全文索引迁移失败 {e}, {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"全文索引迁移失败: {e}")
+
+
+@knowledge.post("/databases/{db_id}/vector-index/rebuild")
+async def rebuild_vector_index(
+    db_id: str,
+    profile: str | None = Body(None, embed=True, description="auto / FLAT / HNSW / IVF_SQ8 / IVF_PQ / DISKANN"),
+    current_user: User = Depends(get_admin_user),
+):
+    """切换 Milvus 知识库的向量索引档位并重建索引（重建期间该知识库不可检索）"""
+    if profile is not None and profile.upper() not in {INDEX_PROFILE_AUTO.upper(), *INDEX_PROFILES}:
+        raise HTTPException(status_code=400, detail=f"不支持的索引档位: {profile}")
+
+    try:
+        kb_instance = await knowledge_base.aget_kb(db_id)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"知识库不存在: {e}")
+    if kb_instance.kb_type != "milvus":
+        raise HTTPException(status_code=400, detail="仅 Milvus 知识库支持向量索引档位")
+
+    try:
+        result = await kb_instance.rebuild_vector_index(db_id, profile)
+        return {**result, "message": "success"}
+    except Exception as e:
+        logger.error(f"重建向量索引失败 {e}, {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"重建向量索引失败: {e}")
+
+
 @knowledge.get("/databases/{db_id}/export")
 async def export_database(
     db_id: str,
@@ -491,7 +537,13 @@ async def add_documents(
                                 await knowledge_base.update_file_params(
                                     db_id, file_id, indexing_params, operator_id=current_user.user_id
                                 )
-                                return await knowledge_base.index_file(db_id, file_id, operator_id=current_user.user_id)
+
+                                async def _report_stage(stage: str, stage_message: str) -> None:
+                                    await context.set_message(f"[3/3] {os.path.basename(item)}: {stage_message}")
+
+                                return await knowledge_base.index_file(
+                                    db_id, file_id, operator_id=current_user.user_id, progress_callback=_report_stage
+                                )
                             except Exception as index_error:
                                 logger.error(f"自动入库失败 {item} (file_id={file_id}): {index_error}")
                                 return {
@@ -507,9 +559,7 @@ async def add_documents(
                                     progress = 55.0 + (done_count / total_parsed) * 40.0
                                     await context.set_progress(progress, f"[3/3] 入库文件 {done_count}/{total_parsed}")
 
-                    index_results = await asyncio.gather(
-                        *[_index_one(item, file_id) for item, file_id in parsed_files]
-                    )
+                    index_results = await asyncio.gather(*[_index_one(item, file_id) for item, file_id in parsed_files])
                     processed_items.extend(index_results)
 
         except asyncio.CancelledError:
@@ -1207,9 +1257,9 @@ async def fetch_url(
     """
     logger.debug(f"Fetching URL: {url} for db_id: {db_id}")
     try:
+        from src.knowledge.utils import calculate_content_hash
         from src.knowledge.utils.url_fetcher import fetch_url_content
         from src.storage.minio import get_minio_client
-        from src.knowledge.utils import calculate_content_hash
 
         # 1. 下载内容 (包含白名单校验、大小限制、类型检查)
         content_bytes, final_url = await fetch_url_content(url)
@@ -1387,6 +1437,52 @@ async def get_knowledge_base_statistics(current_user: User = Depends(get_require
         return {"message": f"获取知识库统计失败 {e}", "stats": {}}
 
 
+@knowledge.get("/stats/docling")
+async def get_docling_conversion_stats(
+    limit: int = Query(50, ge=0, le=200), current_user: User = Depends(get_admin_user)
+):
+    """获取 Docling 文档转换耗时统计（汇总 + 最近文档明细）"""
+    return {"stats": docling_service.get_stats(limit=limit), "message": "success"}
+
+
+@knowledge.get("/stats/parse-cache")
+async def get_parse_cache_stats(current_user: User = Depends(get_admin_user)):
+    """获取文档解析缓存命中率统计"""
+    return {"stats": parse_cache.get_stats(), "message": "success"}
+
+
+@knowledge.delete("/parse-cache")
+async def invalidate_parse_cache(
+    content_hash: str | None = Query(None, description="文件内容哈希，不传则清空全部解析缓存"),
+    current_user: User = Depends(get_admin_user),
+):
+    """删除文档解析缓存"""
+    try:
+        deleted = await parse_cache.invalidate(content_hash)
+        return {"deleted": deleted, "message": "success"}
+    except Exception as e:
+        logger.error(f"清理解析缓存失败: {e}, {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"清理解析缓存失败: {e}")
+
+
+@knowledge.get("/stats/milvus-residency")
+async def get_milvus_residency_stats(current_user: User = Depends(get_admin_user)):
+    """获取 Milvus 集合加载 / 淘汰统计，用于评估 query node 内存规格"""
+    milvus_kb = knowledge_base.kb_instances.get("milvus")
+    if milvus_kb is None:
+        return {"stats": None, "message": "success"}
+    return {"stats": milvus_kb.get_residency_stats(), "message": "success"}
+
+
+@knowledge.get("/stats/lightrag-instances")
+async def get_lightrag_instance_stats(current_user: User = Depends(get_admin_user)):
+    """获取 LightRAG 实例池统计（创建耗时、命中、空闲释放）"""
+    lightrag_kb = knowledge_base.kb_instances.get("lightrag")
+    if lightrag_kb is None:
+        return {"stats": None, "message": "success"}
+    return {"stats": lightrag_kb.get_instance_stats(), "message": "success"}
+
+
 # =============================================================================
 # === Embedding模型状态检查分组 ===
 # =============================================================================
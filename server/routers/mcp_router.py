@@ -5,12 +5,14 @@ from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.services.mcp_service import (
+    check_mcp_server,
     create_mcp_server,
     get_mcp_tools_stats,
     delete_mcp_server,
     get_all_mcp_servers,
     get_all_mcp_tools,
     get_mcp_server,
+    get_mcp_session_stats,
     toggle_server_enabled,
     toggle_tool_enabled,
     update_mcp_server,
@@ -128,6 +130,12 @@ async def create_mcp_server_route(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@mcp.get("/stats/sessions")
+async def get_mcp_session_stats_route(current_user: User = Depends(get_admin_user)):
+    """获取各 MCP 服务器长连接状态（连接状态、工具数、重连次数、最近错误）"""
+    return {"success": True, "data": get_mcp_session_stats()}
+
+
 @mcp.get("/{name}")
 async def get_mcp_server_route(
     name: str,
@@ -222,7 +230,7 @@ async def test_mcp_server(
         await get_server_or_404(db, name)
 
         try:
-            tools = await get_all_mcp_tools(name)
+            tools = await check_mcp_server(name)
             return {
                 "success": True,
                 "message": f"连接成功，共发现 {len(tools)} 个工具",
@@ -2,10 +2,9 @@
 
 import time
 import logging
-from collections.abc import Callable
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # 创建专用的访问日志记录器
 access_logger = logging.getLogger("access_logger")
@@ -21,47 +20,57 @@ if not access_logger.handlers:
     access_logger.propagate = False
 
 
-def _extract_client_ip(request: Request) -> str:
+def _extract_client_ip(scope: Scope) -> str:
     """提取客户端IP地址"""
-    forwarded_for = request.headers.get("x-forwarded-for")
+    forwarded_for = Headers(scope=scope).get("x-forwarded-for")
     if forwarded_for:
         return forwarded_for.split(",")[0].strip()
-    if request.client:
-        return request.client.host
+    if scope.get("client"):
+        return scope["client"][0]
     return "unknown"
 
 
-class AccessLogMiddleware(BaseHTTPMiddleware):
-    """访问日志中间件 - 记录请求处理时间"""
+class AccessLogMiddleware:
+    """
+    访问日志中间件 - 记录请求处理时间
 
-    def __init__(self, app, logger: logging.Logger = None):
-        super().__init__(app)
+    纯 ASGI 实现，不包装响应流；流式响应（SSE）在输出结束后记录总耗时。
+    """
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger = None):
+        self.app = app
         self.logger = logger or access_logger
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """处理请求并记录访问日志"""
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # 记录请求开始时间
         start_time = time.perf_counter()
-
-        # 获取客户端IP
-        client_ip = _extract_client_ip(request)
-
-        # 处理请求
-        response = await call_next(request)
-
-        # 计算处理时间
-        process_time = time.perf_counter() - start_time
-        process_time_ms = int(process_time * 1000)  # 转换为毫秒
-
-        # 格式化日志消息，添加处理时间
-        log_message = (
-            f"{client_ip}:{request.client.port if request.client else 'unknown'} - "
-            f'"{request.method} {request.url.path}{"?" + request.url.query if request.url.query else ""} '
-            f'HTTP/{request.scope["http_version"]}" '
-            f"{response.status_code} - {process_time_ms}ms"
-        )
-
-        # 记录日志
-        self.logger.info(log_message)
-
-        return response
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 计算处理时间（毫秒）
+            process_time_ms = int((time.perf_counter() - start_time) * 1000)
+            client = scope.get("client")
+            query = scope.get("query_string", b"").decode("latin-1")
+
+            # 格式化日志消息，添加处理时间
+            log_message = (
+                f"{_extract_client_ip(scope)}:{client[1] if client else 'unknown'} - "
+                f'"{scope["method"]} {scope["path"]}{"?" + query if query else ""} '
+                f'HTTP/{scope["http_version"]}" '
+                f"{status_code} - {process_time_ms}ms"
+            )
+
+            # 记录日志
+            self.logger.info(log_message)
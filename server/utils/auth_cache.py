@@ -0,0 +1,118 @@
+"""
+登录用户缓存
+
+每个需要登录的请求都要校验 JWT 并按 token 中的用户 ID 查询一次 users 表。
+这里把 token 对应的用户信息缓存 YUXI_AUTH_CACHE_TTL 秒（不超过 token 自身的过期时间），
+命中时既不解码 JWT 也不查询数据库：
+- 用户被修改或删除时（见 auth_middleware 中的 ORM 事件）立即移除该用户的所有缓存；
+- 失效发生在查询数据库期间时，查询结果不写入缓存，避免把旧数据重新放回去；
+- 多 worker 部署时其他进程中的缓存最多滞后一个 TTL。
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# 缓存有效期（秒），0 表示不缓存
+AUTH_CACHE_TTL = _env_int("YUXI_AUTH_CACHE_TTL", 30, minimum=0)
+AUTH_CACHE_MAX_SIZE = _env_int("YUXI_AUTH_CACHE_MAX_SIZE", 10000)
+
+
+@dataclass
+class _Principal:
+    user_id: int
+    values: dict[str, Any]
+    expires_at: float
+
+
+class AuthPrincipalCache:
+    """token -> 用户字段的 LRU 缓存，支持按用户失效"""
+
+    def __init__(self, ttl_seconds: float = AUTH_CACHE_TTL, max_size: int = AUTH_CACHE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict[str, _Principal] = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+        # 每次失效加一；写入时版本已变化说明查询期间发生过失效
+        self.version = 0
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        """返回缓存的用户字段（副本），未命中或已过期时返回 None"""
+        entry = self._entries.get(token)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(token)
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(token)
+        self._stats["hits"] += 1
+        return dict(entry.values)
+
+    def set(
+        self,
+        token: str,
+        user_id: int,
+        values: dict[str, Any],
+        token_expires_at: float | None = None,
+        version: int | None = None,
+    ) -> bool:
+        """
+        缓存 token 对应的用户字段
+
+        Args:
+            token_expires_at: token 的过期时间（JWT exp，Unix 时间戳），缓存不会超过该时间
+            version: 查询用户前读取的 self.version；之后发生过失效时不写入
+        """
+        if self.ttl_seconds <= 0 or (version is not None and version != self.version):
+            return False
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, float(token_expires_at))
+
+        self._remove(token)
+        self._entries[token] = _Principal(user_id, dict(values), expires_at)
+        self._tokens_by_user.setdefault(user_id, set()).add(token)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+        return True
+
+    def invalidate_user(self, user_id: int) -> None:
+        """移除该用户所有 token 的缓存（用户信息变更、删除时调用）"""
+        self.version += 1
+        self._stats["invalidations"] += 1
+        for token in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        self.version += 1
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry.user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                self._tokens_by_user.pop(entry.user_id, None)
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "entries": len(self._entries), "users": len(self._tokens_by_user)}
+
+
+auth_principal_cache = AuthPrincipalCache()
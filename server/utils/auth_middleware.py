@@ -3,10 +3,13 @@ import re
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 
 from src.storage.postgres.manager import pg_manager
 from src.storage.postgres.models_business import User
+from server.utils.auth_cache import auth_principal_cache
 from server.utils.auth_utils import AuthUtils
 
 # 定义OAuth2密码承载器，指定token URL
@@ -41,6 +44,11 @@ async def get_current_user(token: str | None = Depends(oauth2_scheme), db: Async
     if token is None:
         return None
 
+    # 命中缓存时跳过 JWT 校验和用户查询
+    cached = auth_principal_cache.get(token)
+    if cached is not None:
+        return _attach_cached_user(db, cached)
+
     try:
         # 验证token
         payload = AuthUtils.verify_access_token(token)
@@ -59,16 +67,49 @@ async def get_current_user(token: str | None = Depends(oauth2_scheme), db: Async
         )
 
     # 查找用户（异步版本）
-    from sqlalchemy import select
-
+    cache_version = auth_principal_cache.version
     result = await db.execute(select(User).filter(User.id == int(user_id)))
     user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
 
+    values = {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+    auth_principal_cache.set(token, user.id, values, payload.get("exp"), version=cache_version)
     return user
 
 
+def _attach_cached_user(db: AsyncSession, values: dict) -> User:
+    """用缓存的字段构造 User 并关联到当前会话，路由中修改用户信息后 commit 仍会写回数据库"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+# 用户被修改或删除时清除其登录缓存；提交后再清除一次，覆盖提交前被其他请求重新缓存的情况
+_CHANGED_USERS_KEY = "auth_cache_changed_users"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _on_user_changed(mapper, connection, target: User) -> None:
+    auth_principal_cache.invalidate_user(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_USERS_KEY, ()):
+        auth_principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_session_rollback(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS_KEY, None)
+
+
 # 获取已登录用户（抛出401如果未登录）
 async def get_required_user(user: User | None = Depends(get_current_user)):
     if user is None:
@@ -1,17 +1,29 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from src.services.task_service import tasker
-from src.services.mcp_service import init_mcp_servers
+from src.knowledge import knowledge_base
+from src.knowledge.services.docling_service import docling_service
+from src.services.chat_run_service import chat_run_registry
+from src.services.dashboard_rollup_service import dashboard_rollup
 from src.services.first_run_seed_service import FirstRunSeedService
 from src.services.jingzhou_compliance_seed_service import JingzhouComplianceSeedService
 from src.services.kb_startup_recovery_service import recover_interrupted_kb_tasks_on_startup
+from src.services.mcp_service import init_mcp_servers, shutdown_mcp_sessions
+from src.services.task_service import tasker
 from src.storage.postgres.manager import pg_manager
-from src.knowledge import knowledge_base
 from src.utils import logger
 
 
+def _log_background_failure(action: str):
+    def _callback(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to {action}: {task.exception()}")
+
+    return _callback
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI lifespan事件管理器"""
@@ -41,8 +53,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to run HuizhouPowerQA startup binding check: {e}")
 
+    # 后台预热 Docling 转换工作进程，避免首个 docx/pptx 文档承担冷启动开销
+    docling_warmup = asyncio.create_task(docling_service.start())
+    docling_warmup.add_done_callback(_log_background_failure("warm up docling workers"))
+
     await tasker.start()
 
+    # 后台增量维护仪表板统计汇总表
+    await dashboard_rollup.start()
+
     # 启动恢复：服务重启后自动修复并补跑中断的知识库解析/入库任务
     try:
         await recover_interrupted_kb_tasks_on_startup()
@@ -56,5 +75,14 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to enqueue jingzhou compliance seed task: {e}")
 
     yield
+    # 停止仍在进行的对话生成，已生成的内容会被保存
+    await chat_run_registry.shutdown()
+    await shutdown_mcp_sessions()
+    await dashboard_rollup.shutdown()
     await tasker.shutdown()
+    docling_service.shutdown()
+
+    from src.plugins.http_client import aclose_http_clients
+
+    await aclose_http_clients()
     await pg_manager.close()
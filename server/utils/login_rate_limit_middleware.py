@@ -0,0 +1,78 @@
+"""登录限流中间件 - 按客户端IP限制登录尝试次数"""
+
+import asyncio
+import time
+from collections import defaultdict, deque
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+RATE_LIMIT_MAX_ATTEMPTS = 10
+RATE_LIMIT_WINDOW_SECONDS = 60
+RATE_LIMIT_ENDPOINTS = {("/api/auth/token", "POST")}
+
+# In-memory login attempt tracker to reduce brute-force exposure per worker
+_login_attempts: defaultdict[str, deque[float]] = defaultdict(deque)
+_attempt_lock = asyncio.Lock()
+
+
+def _extract_client_ip(scope: Scope) -> str:
+    forwarded_for = Headers(scope=scope).get("x-forwarded-for")
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    if scope.get("client"):
+        return scope["client"][0]
+    return "unknown"
+
+
+class LoginRateLimitMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        normalized_path = scope["path"].rstrip("/") or "/"
+        request_signature = (normalized_path, scope["method"].upper())
+        if request_signature not in RATE_LIMIT_ENDPOINTS:
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = _extract_client_ip(scope)
+        now = time.monotonic()
+
+        async with _attempt_lock:
+            attempt_history = _login_attempts[client_ip]
+
+            while attempt_history and now - attempt_history[0] > RATE_LIMIT_WINDOW_SECONDS:
+                attempt_history.popleft()
+
+            if len(attempt_history) >= RATE_LIMIT_MAX_ATTEMPTS:
+                retry_after = int(max(1, RATE_LIMIT_WINDOW_SECONDS - (now - attempt_history[0])))
+                response = JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"detail": "登录尝试过于频繁，请稍后再试"},
+                    headers={"Retry-After": str(retry_after)},
+                )
+                await response(scope, receive, send)
+                return
+
+            attempt_history.append(now)
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        if status_code < 400:
+            async with _attempt_lock:
+                _login_attempts.pop(client_ip, None)
@@ -17,7 +17,7 @@ class ChatbotAgent(BaseAgent):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    async def get_graph(self, **kwargs):
+    async def build_graph(self, **kwargs):
         """构建图"""
         context = self.context_schema()
         all_mcp_tools = (
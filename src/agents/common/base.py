@@ -11,7 +11,11 @@ from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver, aiosqlite
 from langgraph.graph.state import CompiledStateGraph
 
 from src import config as sys_config
+from src import knowledge_base
+from src.agents.common.build_cache import agent_graph_cache
+from src.agents.common.checkpointer import get_postgres_checkpointer, use_postgres_checkpointer
 from src.agents.common.context import BaseContext
+from src.services.mcp_service import get_mcp_tools_version
 from src.utils import logger
 
 
@@ -71,8 +75,7 @@ class BaseAgent:
         for event in graph.astream({"messages": messages}, stream_mode="values", context=context):
             yield event["messages"]
 
-    async def stream_messages(self, messages: list[str], input_context=None, **kwargs):
-        graph = await self.get_graph()
+    def _build_stream_input(self, messages: list, input_context=None) -> tuple[dict, BaseContext, dict]:
         context = self.context_schema()
         agent_config = (input_context or {}).get("agent_config")
         if isinstance(agent_config, dict):
@@ -87,15 +90,38 @@ class BaseAgent:
             "configurable": {"thread_id": context.thread_id, "user_id": context.user_id},
             "recursion_limit": 300,
         }
+        return {"messages": messages, "attachments": attachments}, context, input_config
+
+    async def stream_messages(self, messages: list[str], input_context=None, **kwargs):
+        graph = await self.get_graph()
+        graph_input, context, input_config = self._build_stream_input(messages, input_context)
 
         async for msg, metadata in graph.astream(
-            {"messages": messages, "attachments": attachments},
+            graph_input,
             stream_mode="messages",
             context=context,
             config=input_config,
         ):
             yield msg, metadata
 
+    async def stream_messages_and_updates(self, messages: list[str], input_context=None, **kwargs):
+        """
+        与 stream_messages 相同，同时返回各节点对状态的更新，用于增量维护 todos / files 等状态
+
+        Yields:
+            ("messages", (msg, metadata)) 或 ("updates", {node_name: update})
+        """
+        graph = await self.get_graph()
+        graph_input, context, input_config = self._build_stream_input(messages, input_context)
+
+        async for mode, payload in graph.astream(
+            graph_input,
+            stream_mode=["messages", "updates"],
+            context=context,
+            config=input_config,
+        ):
+            yield mode, payload
+
     async def invoke_messages(self, messages: list[str], input_context=None, **kwargs):
         graph = await self.get_graph()
         context = self.context_schema()
@@ -154,12 +180,33 @@ class BaseAgent:
     def reload_graph(self):
         """重置 graph 缓存，强制下次调用 get_graph 时重新构建"""
         self.graph = None
+        agent_graph_cache.invalidate(self.id)
         logger.info(f"{self.name} graph 缓存已清空，将在下次调用时重新构建")
 
-    @abstractmethod
     async def get_graph(self, **kwargs) -> CompiledStateGraph:
         """
-        获取并编译对话图实例。
+        获取编译后的对话图实例。
+
+        构建结果会被缓存，智能体配置文件、知识库集合或 MCP 工具变化后下次调用时自动重新构建。
+        """
+        self.graph = await agent_graph_cache.aget_or_build(
+            self.id, self._graph_fingerprint, lambda: self.build_graph(**kwargs)
+        )
+        return self.graph
+
+    def _graph_fingerprint(self) -> tuple:
+        """构建图时依赖的外部状态：智能体配置文件、知识库集合（知识库工具在构建时注册）、MCP 工具版本"""
+        try:
+            stat = (self.workdir / "config.yaml").stat()
+            config_version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            config_version = None
+        return config_version, knowledge_base.get_retrievers_fingerprint(), get_mcp_tools_version()
+
+    @abstractmethod
+    async def build_graph(self, **kwargs) -> CompiledStateGraph:
+        """
+        构建并编译对话图实例，由 get_graph 调用并缓存。
         必须确保在编译时设置 checkpointer，否则将无法获取历史记录。
         例如: graph = workflow.compile(checkpointer=sqlite_checkpointer)
         """
@@ -173,7 +220,11 @@ class BaseAgent:
         checkpointer = None
 
         try:
-            checkpointer = AsyncSqliteSaver(await self.get_async_conn())
+            # 多 worker 共享 PostgreSQL 中的检查点；未配置 PostgreSQL（如离线脚本）时使用本地 SQLite
+            if use_postgres_checkpointer():
+                checkpointer = get_postgres_checkpointer()
+            else:
+                checkpointer = AsyncSqliteSaver(await self.get_async_conn())
 
         except Exception as e:
             logger.error(f"构建 Graph 设置 checkpointer 时出错: {e}, 尝试使用内存存储")
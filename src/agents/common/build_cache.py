@@ -0,0 +1,120 @@
+"""
+智能体构建缓存
+
+create_agent 编译图、按知识库构建 StructuredTool 的开销随知识库和 MCP 服务数量增长，
+原先每次请求（甚至每次模型调用）都会重新构建。这里按 key 缓存构建结果，每个 key 只保留一份，
+同时记录构建时依赖的指纹（配置文件、知识库集合、MCP 工具版本），指纹变化时视为未命中并重新构建。
+
+每个缓存统计命中次数、构建耗时以及命中时节省的构建耗时（即被跳过的那次构建原本需要的时间）。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from src.utils import logger
+
+
+class BuildCache:
+    """按 key 缓存构建结果，指纹不一致时重新构建"""
+
+    def __init__(self, name: str, max_size: int = 64):
+        self.name = name
+        self.max_size = max_size
+        # key -> (指纹, 构建结果, 构建耗时)
+        self._entries: OrderedDict[Hashable, tuple[Hashable, Any, float]] = OrderedDict()
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def get(self, key: Hashable, fingerprint: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry[2]
+        return entry[1]
+
+    def put(self, key: Hashable, fingerprint: Hashable, value: Any, build_seconds: float) -> None:
+        self._entries[key] = (fingerprint, value, build_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_or_build(self, key: Hashable, fingerprint: Hashable, builder: Callable[[], Any]) -> Any:
+        """同步构建（调用方不会并发时使用）"""
+        value = self.get(key, fingerprint)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = builder()
+        self._record_build(key, fingerprint, value, time.perf_counter() - start)
+        return value
+
+    async def aget_or_build(
+        self,
+        key: Hashable,
+        fingerprint: Callable[[], Hashable],
+        builder: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        异步构建，同一 key 的并发请求只构建一次
+
+        Args:
+            fingerprint: 计算当前指纹的函数。构建过程本身可能改变指纹（例如首次加载 MCP 工具），
+                因此构建完成后重新计算一次，按构建后的指纹保存，避免下一次请求又重新构建
+        """
+        value = self.get(key, fingerprint())
+        if value is not None:
+            return value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # 等锁期间可能已由其他请求构建完成
+            value = self.get(key, fingerprint())
+            if value is not None:
+                return value
+
+            start = time.perf_counter()
+            value = await builder()
+            self._record_build(key, fingerprint(), value, time.perf_counter() - start)
+            return value
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """清除指定 key 的缓存，key 为 None 时全部清除"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _record_build(self, key: Hashable, fingerprint: Hashable, value: Any, seconds: float) -> None:
+        self.misses += 1
+        self.build_seconds += seconds
+        self.put(key, fingerprint, value, seconds)
+        logger.debug(f"Built {self.name} cache entry {key!r} in {seconds * 1000:.1f} ms")
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "build_seconds": round(self.build_seconds, 3),
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+# 编译后的智能体图，key 为智能体 id
+agent_graph_cache = BuildCache("agent_graph")
+# 知识库工具集，key 为知识库名称集合（None 表示全部知识库）
+kb_tools_cache = BuildCache("kb_tools")
+
+
+def get_build_cache_stats() -> dict:
+    return {cache.name: cache.get_stats() for cache in (agent_graph_cache, kb_tools_cache)}
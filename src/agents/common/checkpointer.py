@@ -0,0 +1,311 @@
+"""
+基于 PostgreSQL 的 LangGraph checkpointer
+
+原先每个智能体在本地 aio_history.db（SQLite）中保存检查点，多 worker 部署时各进程争用同一个文件，
+同一对话的后续请求落到其他 worker 时读到的状态也可能不一致，且检查点只增不减。
+这里把检查点写入业务库的 agent_checkpoints / agent_checkpoint_writes 两张表，复用 pg_manager 的连接池：
+- 每个线程（及子图命名空间）只保留最近 YUXI_CHECKPOINT_KEEP_LAST 个检查点，写入新检查点时在同一事务内清理；
+- 子图命名空间（如 node:<task_id>）每次运行都不相同，写入根命名空间的检查点时，
+  一并删除早于根命名空间保留窗口的所有子图检查点，避免命名空间无限增长；
+- 中间写入（pending writes）只在恢复中断的步骤时需要，父检查点之前的写入已合并进后续检查点，随之删除；
+- 删除对话时通过 delete_thread_checkpoints 清理该线程的全部检查点。
+"""
+
+from __future__ import annotations
+
+import os
+import random
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+from sqlalchemy import cast, delete, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.storage.postgres.manager import pg_manager
+from src.storage.postgres.models_business import AgentCheckpoint, AgentCheckpointWrite
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# 检查点存储：postgres（默认）或 sqlite（每个智能体一个本地 aio_history.db）
+CHECKPOINTER_BACKEND = os.getenv("YUXI_AGENT_CHECKPOINTER", "postgres").strip().lower()
+
+# 每个线程保留的检查点数，0 表示不清理
+CHECKPOINT_KEEP_LAST = _env_int("YUXI_CHECKPOINT_KEEP_LAST", 20, minimum=0)
+
+
+def _checkpoint_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class PostgresCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    使用 pg_manager 连接池的异步 checkpointer
+
+    只实现异步接口（智能体均通过 astream / aget_state 使用），同步接口沿用基类行为。
+    """
+
+    def __init__(self, keep_last: int = CHECKPOINT_KEEP_LAST, **kwargs):
+        super().__init__(**kwargs)
+        self.keep_last = keep_last
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+
+        query = select(AgentCheckpoint).where(
+            AgentCheckpoint.thread_id == thread_id, AgentCheckpoint.checkpoint_ns == checkpoint_ns
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            query = query.where(AgentCheckpoint.checkpoint_id == checkpoint_id)
+        else:
+            query = query.order_by(AgentCheckpoint.checkpoint_id.desc()).limit(1)
+
+        async with pg_manager.get_async_session_context() as session:
+            row = (await session.execute(query)).scalar_one_or_none()
+            if row is None:
+                return None
+            writes = await self._load_writes(session, [(row.thread_id, row.checkpoint_ns, row.checkpoint_id)])
+        return self._to_tuple(row, writes)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        query = select(AgentCheckpoint).order_by(AgentCheckpoint.checkpoint_id.desc())
+        if config is not None:
+            configurable = config["configurable"]
+            query = query.where(AgentCheckpoint.thread_id == str(configurable["thread_id"]))
+            if (checkpoint_ns := configurable.get("checkpoint_ns")) is not None:
+                query = query.where(AgentCheckpoint.checkpoint_ns == checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(AgentCheckpoint.checkpoint_id == checkpoint_id)
+        if filter:
+            query = query.where(cast(AgentCheckpoint.checkpoint_metadata, JSONB).contains(filter))
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            query = query.where(AgentCheckpoint.checkpoint_id < before_id)
+        if limit is not None:
+            query = query.limit(limit)
+
+        async with pg_manager.get_async_session_context() as session:
+            rows = list((await session.execute(query)).scalars().all())
+            # 一次查询取回所有检查点的中间写入
+            writes = await self._load_writes(session, [(r.thread_id, r.checkpoint_ns, r.checkpoint_id) for r in rows])
+        for row in rows:
+            yield self._to_tuple(row, writes)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        parent_id = configurable.get("checkpoint_id")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+
+        values = {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+            "parent_checkpoint_id": parent_id,
+            "type": type_,
+            "checkpoint": serialized,
+            "metadata": get_serializable_checkpoint_metadata(config, metadata),
+        }
+        stmt = insert(AgentCheckpoint.__table__).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["thread_id", "checkpoint_ns", "checkpoint_id"],
+            set_={
+                "parent_checkpoint_id": stmt.excluded.parent_checkpoint_id,
+                "type": stmt.excluded.type,
+                "checkpoint": stmt.excluded.checkpoint,
+                "metadata": stmt.excluded["metadata"],
+            },
+        )
+
+        async with pg_manager.get_async_session_context() as session:
+            await session.execute(stmt)
+            await self._prune(session, thread_id, checkpoint_ns, parent_id)
+        return _checkpoint_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if not writes:
+            return
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append(
+                {
+                    "thread_id": str(configurable["thread_id"]),
+                    "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                    "checkpoint_id": str(configurable["checkpoint_id"]),
+                    "task_id": task_id,
+                    "idx": WRITES_IDX_MAP.get(channel, idx),
+                    "channel": channel,
+                    "type": type_,
+                    "value": serialized,
+                    "task_path": task_path,
+                }
+            )
+
+        stmt = insert(AgentCheckpointWrite.__table__)
+        index_elements = ["thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"]
+        # 特殊写入（错误、中断、恢复）会被覆盖，普通写入只保留第一次
+        if all(channel in WRITES_IDX_MAP for channel, _ in writes):
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={"channel": stmt.excluded.channel, "type": stmt.excluded.type, "value": stmt.excluded.value},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+        async with pg_manager.get_async_session_context() as session:
+            await session.execute(stmt, rows)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.adelete_threads([thread_id])
+
+    async def adelete_threads(self, thread_ids: Sequence[str]) -> None:
+        """删除若干线程的全部检查点及中间写入（含子图命名空间）"""
+        thread_ids = [str(thread_id) for thread_id in thread_ids]
+        if not thread_ids:
+            return
+        async with pg_manager.get_async_session_context() as session:
+            await session.execute(delete(AgentCheckpoint).where(AgentCheckpoint.thread_id.in_(thread_ids)))
+            await session.execute(delete(AgentCheckpointWrite).where(AgentCheckpointWrite.thread_id.in_(thread_ids)))
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    async def _prune(self, session: AsyncSession, thread_id: str, checkpoint_ns: str, parent_id: str | None) -> None:
+        """
+        清理超出保留数量的检查点，以及父检查点之前已合并的中间写入
+
+        检查点 ID 随时间单调递增，可跨命名空间比较：写入根命名空间时，早于根命名空间保留窗口中
+        最旧检查点的子图检查点不会再被恢复（恢复最旧的根检查点只会重跑之后的步骤），一并删除。
+        """
+        if self.keep_last > 0:
+            cutoff = (
+                select(AgentCheckpoint.checkpoint_id)
+                .where(AgentCheckpoint.thread_id == thread_id, AgentCheckpoint.checkpoint_ns == checkpoint_ns)
+                .order_by(AgentCheckpoint.checkpoint_id.desc())
+                .offset(self.keep_last - 1)
+                .limit(1)
+                .scalar_subquery()
+            )
+            conditions = [AgentCheckpoint.thread_id == thread_id, AgentCheckpoint.checkpoint_id < cutoff]
+            # 根命名空间清理整个线程，子图命名空间只清理自身
+            if checkpoint_ns != "":
+                conditions.append(AgentCheckpoint.checkpoint_ns == checkpoint_ns)
+            await session.execute(delete(AgentCheckpoint).where(*conditions))
+            if checkpoint_ns == "":
+                await session.execute(
+                    delete(AgentCheckpointWrite).where(
+                        AgentCheckpointWrite.thread_id == thread_id,
+                        AgentCheckpointWrite.checkpoint_ns != "",
+                        AgentCheckpointWrite.checkpoint_id < cutoff,
+                    )
+                )
+        if parent_id:
+            await session.execute(
+                delete(AgentCheckpointWrite).where(
+                    AgentCheckpointWrite.thread_id == thread_id,
+                    AgentCheckpointWrite.checkpoint_ns == checkpoint_ns,
+                    AgentCheckpointWrite.checkpoint_id < parent_id,
+                )
+            )
+
+    async def _load_writes(
+        self, session: AsyncSession, keys: list[tuple[str, str, str]]
+    ) -> dict[tuple[str, str, str], list[tuple[str, str, Any]]]:
+        if not keys:
+            return {}
+        key_columns = (
+            AgentCheckpointWrite.thread_id,
+            AgentCheckpointWrite.checkpoint_ns,
+            AgentCheckpointWrite.checkpoint_id,
+        )
+        result = await session.execute(
+            select(AgentCheckpointWrite)
+            .where(tuple_(*key_columns).in_(keys))
+            .order_by(AgentCheckpointWrite.task_path, AgentCheckpointWrite.task_id, AgentCheckpointWrite.idx)
+        )
+        writes: dict[tuple[str, str, str], list[tuple[str, str, Any]]] = {}
+        for w in result.scalars():
+            writes.setdefault((w.thread_id, w.checkpoint_ns, w.checkpoint_id), []).append(
+                (w.task_id, w.channel, self.serde.loads_typed((w.type, w.value)))
+            )
+        return writes
+
+    def _to_tuple(self, row: AgentCheckpoint, writes: dict) -> CheckpointTuple:
+        return CheckpointTuple(
+            config=_checkpoint_config(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+            checkpoint=self.serde.loads_typed((row.type, row.checkpoint)),
+            metadata=row.checkpoint_metadata or {},
+            parent_config=(
+                _checkpoint_config(row.thread_id, row.checkpoint_ns, row.parent_checkpoint_id)
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=writes.get((row.thread_id, row.checkpoint_ns, row.checkpoint_id), []),
+        )
+
+
+_postgres_checkpointer: PostgresCheckpointSaver | None = None
+
+
+def get_postgres_checkpointer() -> PostgresCheckpointSaver:
+    """进程内所有智能体共享一个 checkpointer（按 thread_id 区分数据）"""
+    global _postgres_checkpointer
+    if _postgres_checkpointer is None:
+        _postgres_checkpointer = PostgresCheckpointSaver()
+    return _postgres_checkpointer
+
+
+def use_postgres_checkpointer() -> bool:
+    return CHECKPOINTER_BACKEND == "postgres" and pg_manager.is_postgresql
+
+
+async def delete_thread_checkpoints(thread_ids: Sequence[str]) -> None:
+    """删除对话时清理其检查点（SQLite 后端的检查点保存在各智能体的本地文件中，不在此处理）"""
+    if thread_ids and use_postgres_checkpointer():
+        await get_postgres_checkpointer().adelete_threads(thread_ids)
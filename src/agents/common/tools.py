@@ -5,12 +5,13 @@ import uuid
 from typing import Annotated, Any
 
 import requests
-from langchain.tools import tool
+from langchain.tools import ToolRuntime, tool
 from langchain_core.tools import StructuredTool
 from langgraph.types import interrupt
 from pydantic import BaseModel, Field
 
 from src import config, graph_base, knowledge_base
+from src.agents.common.build_cache import kb_tools_cache
 from src.services.mcp_service import get_enabled_mcp_tools
 from src.storage.minio import aupload_file_to_minio
 from src.utils import logger
@@ -132,11 +133,11 @@ KG_QUERY_DESCRIPTION = """
 
 
 @tool(name_or_callable="查询知识图谱", description=KG_QUERY_DESCRIPTION)
-def query_knowledge_graph(query: Annotated[str, "The keyword to query knowledge graph."]) -> Any:
+async def query_knowledge_graph(query: Annotated[str, "The keyword to query knowledge graph."]) -> Any:
     """使用这个工具可以查询知识图谱中包含的三元组信息。关键词（query），使用可能帮助回答这个问题的关键词进行查询，不要直接使用用户的原始输入去查询。"""
     try:
         logger.debug(f"Querying knowledge graph with: {query}")
-        result = graph_base.query_node(query, hops=2, return_format="triples")
+        result = await graph_base.aquery_node(query, hops=2, return_format="triples")
         logger.debug(
             f"Knowledge graph query returned "
             f"{len(result.get('triples', [])) if isinstance(result, dict) else 'N/A'} triples"
@@ -166,11 +167,75 @@ class KnowledgeRetrieverModel(BaseModel):
 class CommonKnowledgeRetriever(KnowledgeRetrieverModel):
     """Common knowledge retriever model."""
 
-    file_name: str = Field(description="限定文件名称，当操作类型为 'search' 时，可以指定文件名称，支持模糊匹配")
+    file_name: str | None = Field(
+        default=None,
+        description=(
+            "限定文件名称，当操作类型为 'search' 时，可以指定文件名称。"
+            "与知识库中的文件名完全一致时只检索该文件，否则检索文件名包含该关键词的文件"
+        ),
+    )
+
+
+MULTI_KB_TOOL_NAME = "检索全部知识库"
+
+
+def _create_multi_kb_tool(default_db_ids: list[str], retrievers: dict[str, dict]) -> StructuredTool:
+    """创建多知识库检索工具：一次调用并发检索所有已启用的知识库并统一重排序"""
+
+    async def multi_kb_retriever(
+        query_text: Annotated[
+            str, "查询的关键词，应该尽量以可能帮助回答这个问题的关键词进行查询，不要直接使用用户的原始输入去查询。"
+        ],
+        runtime: ToolRuntime,
+    ) -> Any:
+        # 工具在中间件初始化时按全部知识库注册，执行时以当前对话配置的知识库为准
+        target_db_ids = default_db_ids
+        knowledges = getattr(getattr(runtime, "context", None), "knowledges", None)
+        if knowledges:
+            current = knowledge_base.get_retrievers()
+            target_db_ids = [db_id for db_id, info in current.items() if info["name"] in knowledges]
+
+        try:
+            logger.debug(f"Retrieving from {len(target_db_ids)} databases with query: {query_text}")
+            result = await knowledge_base.aquery_multi(query_text, target_db_ids)
+            logger.debug(f"Retrieved {len(result)} results from {len(target_db_ids)} databases")
+            return result
+        except Exception as e:
+            logger.error(f"Error in multi-kb retriever: {e}, {traceback.format_exc()}")
+            return f"检索失败: {str(e)}"
+
+    kb_lines = "\n".join(
+        f"- {retrievers[db_id]['name']}：{retrievers[db_id]['description'] or '没有描述。'}" for db_id in default_db_ids
+    )
+    description = (
+        "同时检索所有已启用的知识库，返回统一排序后的文档片段（metadata.kb_name 为来源知识库）。\n"
+        "需要在多个知识库中查找内容时优先使用本工具，一次调用即可覆盖全部知识库；"
+        "需要限定文件名或查看思维导图时，再使用对应知识库的单独工具。\n\n"
+        f"可检索的知识库：\n{kb_lines}"
+    )
+
+    return StructuredTool.from_function(
+        coroutine=multi_kb_retriever,
+        name=MULTI_KB_TOOL_NAME,
+        description=description,
+        metadata={"name": "多知识库检索", "tag": ["knowledgebase"]},
+    )
 
 
 def get_kb_based_tools(db_names: list[str] | None = None) -> list:
-    """获取所有知识库基于的工具"""
+    """获取所有知识库基于的工具
+
+    构建结果按知识库名称集合缓存，知识库增删或名称、描述变化后自动重建
+    """
+    key = None if db_names is None else tuple(sorted(set(db_names)))
+    tools = kb_tools_cache.get_or_build(
+        key, knowledge_base.get_retrievers_fingerprint(), lambda: _build_kb_based_tools(db_names)
+    )
+    # 返回副本，调用方可以直接在列表上追加其他工具
+    return list(tools)
+
+
+def _build_kb_based_tools(db_names: list[str] | None = None) -> list:
     # 获取所有知识库
     kb_tools = []
     retrievers = knowledge_base.get_retrievers()
@@ -286,6 +351,11 @@ def get_kb_based_tools(db_names: list[str] | None = None) -> list:
             logger.error(f"Failed to create tool for database {db_id}: {e}, \n{traceback.format_exc()}")
             continue
 
+    # 多个知识库时额外提供一个并发检索全部知识库的工具，避免模型逐个调用
+    selected_db_ids = [db_id for db_id in retrievers if db_ids is None or db_id in db_ids]
+    if len(selected_db_ids) > 1:
+        kb_tools.append(_create_multi_kb_tool(selected_db_ids, retrievers))
+
     return kb_tools
 
 
@@ -92,7 +92,7 @@ class DeepAgent(BaseAgent):
         )
         return tools
 
-    async def get_graph(self, **kwargs):
+    async def build_graph(self, **kwargs):
         """构建 Deep Agent 的图"""
         # 获取上下文配置
         context = self.context_schema.from_file(module_name=self.module_name)
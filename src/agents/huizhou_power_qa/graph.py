@@ -13,7 +13,7 @@ class HuizhouPowerQAAgent(BaseAgent):
     capabilities = ["file_upload"]
     context_schema = HuizhouPowerQAContext
 
-    async def get_graph(self, **kwargs):
+    async def build_graph(self, **kwargs):
         context = self.context_schema()
         all_mcp_tools = await get_tools_from_all_servers()
 
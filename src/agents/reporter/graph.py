@@ -38,7 +38,7 @@ class SqlReporterAgent(BaseAgent):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    async def get_graph(self, **kwargs):
+    async def build_graph(self, **kwargs):
         """构建图"""
         context = self.context_schema.from_file(module_name=self.module_name)
         all_mcp_tools = await get_tools_from_all_servers()
@@ -1,13 +1,41 @@
+import asyncio
 import os
 import re
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Any
 
+from neo4j import AsyncGraphDatabase
 from neo4j import GraphDatabase as GD
 
 from src.utils import logger
 
+# 实体名称全文索引使用的分析器；cjk 按双字切分中日韩文本，拉丁文按词切分
+FULLTEXT_ANALYZER = os.getenv("YUXI_GRAPH_FULLTEXT_ANALYZER", "cjk")
+
+
+def build_fulltext_query(keyword: str) -> str | None:
+    """
+    将关键词转换为全文索引的短语查询（Lucene 语法）
+
+    cjk 分析器把中文切成相邻双字，短语查询要求这些双字连续出现，效果等同于子串匹配；
+    单个字符无法用双字索引表达，返回 None，由调用方回退到 CONTAINS 匹配。
+    """
+    keyword = (keyword or "").strip()
+    if len(keyword) < 2:
+        return None
+    escaped = keyword.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def fulltext_index_ddl(index_name: str, label: str, properties: list[str]) -> str:
+    """生成创建全文索引的语句（label 与属性名需由调用方校验）"""
+    fields = ", ".join(f"n.`{prop}`" for prop in properties)
+    return (
+        f"CREATE FULLTEXT INDEX `{index_name}` IF NOT EXISTS FOR (n:`{label}`) ON EACH [{fields}] "
+        f"OPTIONS {{indexConfig: {{`fulltext.analyzer`: '{FULLTEXT_ANALYZER}'}}}}"
+    )
+
 
 @dataclass
 class GraphQueryConfig:
@@ -77,6 +105,14 @@ class GraphAdapter(ABC):
         """获取统计信息 (Get statistics)"""
         return {}
 
+    async def get_overview(self, max_nodes: int = 300) -> dict[str, Any]:
+        """计算概览子图（高度数节点及其连接），节点按重要程度排列，用于物化概览快照"""
+        return await self.query_nodes("*", max_nodes=max_nodes, max_depth=1)
+
+    async def expand_node(self, node_id: str, limit: int = 50, **kwargs) -> dict[str, Any]:
+        """获取节点的一跳邻居子图，用于可视化中按需展开 (Expand node)"""
+        return {"nodes": [], "edges": []}
+
     def _create_query_config(self, **kwargs) -> GraphQueryConfig:
         """创建查询配置"""
         # 优先使用适配器的默认配置
@@ -155,17 +191,31 @@ class Neo4jConnectionManager:
 
     def __init__(self):
         self.driver = None
+        self._async_driver = None
         self.status = "closed"
         self._connect()
 
+    @staticmethod
+    def _get_connection_config() -> tuple[str, str, str]:
+        uri = os.environ.get("NEO4J_URI", "bolt://localhost:7687")
+        username = os.environ.get("NEO4J_USERNAME", "neo4j")
+        password = os.environ.get("NEO4J_PASSWORD", "0123456789")
+        return uri, username, password
+
+    @property
+    def async_driver(self):
+        """异步驱动（首次使用时创建），供检索等在事件循环中执行的查询使用"""
+        if self._async_driver is None and self.is_running():
+            uri, username, password = self._get_connection_config()
+            self._async_driver = AsyncGraphDatabase.driver(uri, auth=(username, password))
+        return self._async_driver
+
     def _connect(self):
         """建立 Neo4j 连接"""
         if self.driver and self._is_connected():
             return
 
-        uri = os.environ.get("NEO4J_URI", "bolt://localhost:7687")
-        username = os.environ.get("NEO4J_USERNAME", "neo4j")
-        password = os.environ.get("NEO4J_PASSWORD", "0123456789")
+        uri, username, password = self._get_connection_config()
 
         try:
             self.driver = GD.driver(uri, auth=(username, password))
@@ -227,6 +277,12 @@ class Neo4jConnectionManager:
 
     def close(self):
         """关闭数据库连接"""
+        if self._async_driver:
+            async_driver, self._async_driver = self._async_driver, None
+            try:
+                asyncio.get_running_loop().create_task(async_driver.close())
+            except RuntimeError:
+                pass  # 没有运行中的事件循环（如进程退出时），连接随进程释放
         if self.driver:
             self.driver.close()
             self.driver = None
@@ -495,6 +551,48 @@ class BaseNeo4jAdapter:
         with self.driver.session() as session:
             return session.execute_read(query, num)
 
+    def _get_node_neighbors(self, node_id: str, limit: int = 50, label_filter: str = None) -> dict[str, list]:
+        """
+        获取节点（按 id 属性匹配）及其一跳邻居
+        Args:
+            node_id: 节点 id 属性
+            limit: 最多返回的邻居关系数量
+            label_filter: 节点标签过滤器 (例如: "Upload")
+        """
+        if not self._is_connected():
+            raise Exception("Neo4j connection is not available")
+
+        label_clause = f":{label_filter}" if label_filter else ""
+        query_str = f"""
+        MATCH (n{label_clause} {{id: $node_id}})-[rel]-(m{label_clause})
+        RETURN
+            {{id: n.id, element_id: elementId(n), name: n.name, properties: properties(n)}} AS h,
+            {{
+                id: elementId(rel),
+                type: rel.type,
+                source_id: startNode(rel).id,
+                target_id: endNode(rel).id,
+                properties: properties(rel)
+            }} AS r,
+            {{id: m.id, element_id: elementId(m), name: m.name, properties: properties(m)}} AS t
+        LIMIT $limit
+        """
+
+        def query(tx):
+            formatted_results = {"nodes": [], "edges": []}
+            node_ids = set()
+            for item in tx.run(query_str, node_id=node_id, limit=int(limit)):
+                for key in ("h", "t"):
+                    node = self._process_record_props(item[key])
+                    if node and node["id"] not in node_ids:
+                        formatted_results["nodes"].append(node)
+                        node_ids.add(node["id"])
+                formatted_results["edges"].append(self._process_record_props(item["r"]))
+            return formatted_results
+
+        with self.driver.session() as session:
+            return session.execute_read(query)
+
     def _get_graph_stats(self, label_filter: str = None) -> dict[str, Any]:
         """
         获取图统计信息
@@ -1,8 +1,16 @@
+import asyncio
 from typing import Any
 
 from src.utils import logger
 
-from .base import BaseNeo4jAdapter, GraphAdapter, GraphMetadata
+from .base import BaseNeo4jAdapter, GraphAdapter, GraphMetadata, build_fulltext_query, fulltext_index_ddl
+
+# 已确认建有实体全文索引的知识库标签（每个 LightRAG 知识库一个索引）
+_fulltext_indexed_kbs: set[str] = set()
+
+
+def _fulltext_index_name(kb_id: str) -> str:
+    return f"{kb_id}_entity_fulltext"
 
 
 class LightRAGGraphAdapter(GraphAdapter):
@@ -37,16 +45,97 @@ class LightRAGGraphAdapter(GraphAdapter):
         if keyword == "*":
             max_depth = max(max_depth, 1)
 
-        query = self._build_cypher_query(keyword, kb_id, limit, max_depth)
-
         try:
             with self._db.driver.session() as session:
+                # 指定知识库时优先走全文索引，按相关度返回种子节点
+                fulltext_query = build_fulltext_query(keyword) if keyword != "*" else None
+                if fulltext_query and kb_id and all(c.isalnum() or c == "_" for c in kb_id):
+                    try:
+                        self._ensure_fulltext_index(session, kb_id)
+                        query = self._build_cypher_query(keyword, kb_id, limit, max_depth, use_fulltext=True)
+                        result = session.run(
+                            query, index_name=_fulltext_index_name(kb_id), fulltext_query=fulltext_query, limit=limit
+                        )
+                        processed = self._process_query_result(result, limit=limit)
+                        # 全文索引未命中（如英文单词的一部分、下划线连接的 id 片段）时回退到 CONTAINS 匹配
+                        if processed["nodes"]:
+                            return processed
+                    except Exception as e:
+                        # 索引尚未就绪（如刚创建、正在填充）时回退到扫描
+                        logger.warning(f"全文索引查询失败，回退到 CONTAINS 匹配: {e}")
+
+                query = self._build_cypher_query(keyword, kb_id, limit, max_depth)
                 result = session.run(query, keyword=keyword, kb_id=kb_id, limit=limit)
                 return self._process_query_result(result, limit=limit)
         except Exception as e:
             logger.error(f"Neo4j query failed: {e}")
             return {"nodes": [], "edges": []}
 
+    @staticmethod
+    def _ensure_fulltext_index(session, kb_id: str) -> None:
+        """为知识库实体（entity_id / name）创建全文索引，已有知识库首次检索时补建"""
+        if kb_id in _fulltext_indexed_kbs:
+            return
+        session.run(fulltext_index_ddl(_fulltext_index_name(kb_id), kb_id, ["entity_id", "name"])).consume()
+        _fulltext_indexed_kbs.add(kb_id)
+
+    async def get_overview(self, max_nodes: int = 300) -> dict[str, Any]:
+        """概览子图：按度数取前 max_nodes 个节点及它们之间的关系"""
+        kb_id = self.kb_id
+        if not kb_id or not all(c.isalnum() or c == "_" for c in kb_id):
+            return await super().get_overview(max_nodes)
+
+        query = f"""
+        MATCH (n:`{kb_id}`)
+        WITH n, COUNT {{ (n)--() }} AS degree
+        ORDER BY degree DESC
+        LIMIT $limit
+        WITH collect(n) AS nodes
+        CALL {{
+            WITH nodes
+            UNWIND nodes AS a
+            MATCH (a)-[r]-(b)
+            WHERE b IN nodes AND elementId(a) < elementId(b)
+            RETURN collect(DISTINCT r) AS rels
+        }}
+        RETURN nodes, rels
+        """
+        # 同步驱动放到线程中执行；查询失败直接抛出，避免空结果被当作快照缓存
+        return await asyncio.to_thread(self._query_overview, query, max_nodes)
+
+    def _query_overview(self, query: str, max_nodes: int) -> dict[str, Any]:
+        with self._db.driver.session() as session:
+            record = session.run(query, limit=max_nodes).single()
+        if record is None:
+            return {"nodes": [], "edges": []}
+        # 节点保持度数降序，截取快照前 N 个节点即为度数最高的 N 个
+        return {
+            "nodes": [self.normalize_node(node) for node in record["nodes"]],
+            "edges": [self.normalize_edge(rel) for rel in record["rels"]],
+        }
+
+    async def expand_node(self, node_id: str, limit: int = 50, **kwargs) -> dict[str, Any]:
+        """按需展开节点（element_id）的一跳邻居"""
+        kb_id = kwargs.get("kb_id") or self.kb_id
+        if kb_id and not all(c.isalnum() or c == "_" for c in kb_id):
+            logger.warning(f"Invalid kb_id: {kb_id}")
+            return {"nodes": [], "edges": []}
+
+        neighbor_label = f":`{kb_id}`" if kb_id else ""
+        query = f"""
+        MATCH (n) WHERE elementId(n) = $node_id
+        OPTIONAL MATCH (n)-[r]-(m{neighbor_label})
+        RETURN n, r, m
+        LIMIT $limit
+        """
+        try:
+            with self._db.driver.session() as session:
+                result = session.run(query, node_id=node_id, limit=limit)
+                return self._process_query_result(result)
+        except Exception as e:
+            logger.error(f"Neo4j expand query failed: {e}")
+            return {"nodes": [], "edges": []}
+
     async def get_labels(self) -> list[str]:
         """获取所有标签 (Get all labels)"""
         query = "CALL db.labels()"
@@ -165,8 +254,14 @@ class LightRAGGraphAdapter(GraphAdapter):
             edge_id=edge_id, source_id=start_node_id, target_id=end_node_id, edge_type=edge_type, properties=properties
         )
 
-    def _build_cypher_query(self, keyword: str, kb_id: str = None, limit: int = 50, max_depth: int = 0) -> str:
-        """构建 Cypher 查询"""
+    def _build_cypher_query(
+        self, keyword: str, kb_id: str = None, limit: int = 50, max_depth: int = 0, use_fulltext: bool = False
+    ) -> str:
+        """构建 Cypher 查询
+
+        use_fulltext=True 时种子节点由全文索引 $index_name 按 $fulltext_query 检索（需指定 kb_id），
+        否则对 name / entity_id 做 CONTAINS 扫描。
+        """
         # 安全性检查：kb_id 只能包含字母、数字和下划线
         if kb_id:
             if not all(c.isalnum() or c == "_" for c in kb_id):
@@ -176,14 +271,19 @@ class LightRAGGraphAdapter(GraphAdapter):
         where_clauses = []
 
         # 确定 MATCH 子句
-        if kb_id:
+        if use_fulltext and kb_id:
+            # 全文索引按相关度从高到低返回，索引只覆盖该知识库标签的节点
+            match_clause = (
+                "CALL db.index.fulltext.queryNodes($index_name, $fulltext_query, {limit: $limit}) YIELD node AS n"
+            )
+        elif kb_id:
             # 如果提供了 kb_id，直接匹配该标签
             # 这样即使节点没有 Entity 标签也能匹配到
             match_clause = f"MATCH (n:`{kb_id}`)"
         else:
             match_clause = "MATCH (n:Entity)"
 
-        if keyword and keyword != "*":
+        if keyword and keyword != "*" and not (use_fulltext and kb_id):
             # 兼容 LightRAG 格式 (entity_id) 和普通格式 (name)
             where_clauses.append(
                 "(toLower(n.name) CONTAINS toLower($keyword) OR toLower(n.entity_id) CONTAINS toLower($keyword))"
@@ -1,3 +1,4 @@
+import asyncio
 from typing import TYPE_CHECKING, Any
 
 from src.knowledge.adapters.base import BaseNeo4jAdapter
@@ -44,15 +45,16 @@ class UploadGraphAdapter(GraphAdapter):
 
         # 如果关键词是 "*" 或者为空，则执行采样查询
         if not params["keyword"] or params["keyword"] == "*":
-            # 使用 BaseNeo4jAdapter 的连通子图查询
+            # 使用 BaseNeo4jAdapter 的连通子图查询（同步驱动，放到线程中执行以免阻塞事件循环）
             num = kwargs.get("max_nodes", 100)
-            raw_results = self._db._get_sample_nodes_with_connections(
+            raw_results = await asyncio.to_thread(
+                self._db._get_sample_nodes_with_connections,
                 num=num,
                 label_filter="Upload",
             )
         else:
             # 否则执行关键词搜索（使用 service 的查询功能）
-            raw_results = self.service.query_node(
+            raw_results = await self.service.aquery_node(
                 keyword=params["keyword"],
                 threshold=params.get("threshold", 0.9),
                 kgdb_name=params.get("kgdb_name", "neo4j"),
@@ -62,6 +64,11 @@ class UploadGraphAdapter(GraphAdapter):
 
         return self._format_results(raw_results)
 
+    async def expand_node(self, node_id: str, limit: int = 50, **kwargs) -> dict[str, Any]:
+        """按需展开节点的一跳邻居"""
+        raw_results = await asyncio.to_thread(self._db._get_node_neighbors, node_id, limit, "Upload")
+        return self._format_results(raw_results)
+
     def normalize_node(self, raw_node: Any) -> dict[str, Any]:
         """
         raw_node expected format: {id: str, name: str, ...}
@@ -96,9 +103,9 @@ class UploadGraphAdapter(GraphAdapter):
         )
 
     async def get_labels(self) -> list[str]:
-        """获取所有标签 - 使用 UploadGraphService"""
+        """获取所有标签 - 使用 UploadGraphService（读取统计缓存）"""
         kgdb_name = self.config.get("kgdb_name", "neo4j")
-        info = self.service.get_graph_info(graph_name=kgdb_name)
+        info = await self.service.aget_graph_info(graph_name=kgdb_name)
         return info.get("labels", []) if info else []
 
     def _normalize_query_params(self, keyword: str, kwargs: dict) -> dict[str, Any]:
@@ -3,6 +3,7 @@ import datetime as dt
 import os
 import socket
 from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
 from datetime import timedelta
 from typing import Any
 from urllib.parse import urlparse
@@ -10,6 +11,9 @@ from urllib.parse import urlparse
 from src.utils import logger
 from src.utils.datetime_utils import coerce_any_to_utc_datetime, format_utc_datetime, utc_isoformat, utc_now
 
+# 入库阶段进度回调：(阶段, 说明)
+IndexProgressCallback = Callable[[str, str], Awaitable[None]]
+
 
 class FileStatus:
     UPLOADED = "uploaded"
@@ -309,13 +313,21 @@ class KnowledgeBase(ABC):
                 markdown_content = await process_url_to_markdown(file_path, params=params)
             else:
                 from src.knowledge.indexing import process_file_to_markdown
+                from src.knowledge.services.parse_cache import parse_cache
 
                 # Prepare params
                 params = file_meta.get("processing_params", {}) or {}
                 params["db_id"] = db_id
 
-                # Process file to Markdown
-                markdown_content = await process_file_to_markdown(file_path, params=params)
+                # Reuse cached result for identical content and parse params (across knowledge bases)
+                content_hash = file_meta.get("content_hash")
+                file_name = file_meta.get("filename") or file_path
+                markdown_content = await parse_cache.get(content_hash, file_name, params)
+
+                if markdown_content is None:
+                    # Process file to Markdown
+                    markdown_content = await process_file_to_markdown(file_path, params=params)
+                    await parse_cache.put(content_hash, file_name, params, markdown_content)
 
             # Save Markdown to MinIO
             markdown_file_path = await self._save_markdown_to_minio(db_id, file_id, markdown_content)
@@ -467,7 +479,13 @@ class KnowledgeBase(ABC):
         return content_bytes.decode("utf-8")
 
     @abstractmethod
-    async def index_file(self, db_id: str, file_id: str, operator_id: str | None = None) -> dict:
+    async def index_file(
+        self,
+        db_id: str,
+        file_id: str,
+        operator_id: str | None = None,
+        progress_callback: IndexProgressCallback | None = None,
+    ) -> dict:
         """
         Index parsed file (Status: INDEXING -> INDEXED/ERROR_INDEXING)
 
@@ -475,6 +493,7 @@ class KnowledgeBase(ABC):
             db_id: Database ID
             file_id: File ID
             operator_id: ID of the user performing the operation
+            progress_callback: Optional async callback receiving (stage, message)
 
         Returns:
             Updated file metadata
@@ -859,9 +878,7 @@ class KnowledgeBase(ABC):
             try:
                 db = int(parsed.path.lstrip("/"))
             except ValueError:
-                logger.warning(
-                    f"Invalid redis db in YUXI_PROCESSING_QUEUE_REDIS_URL: {parsed.path}, use db=0 instead"
-                )
+                logger.warning(f"Invalid redis db in YUXI_PROCESSING_QUEUE_REDIS_URL: {parsed.path}, use db=0 instead")
 
         cls._redis_queue_config = {
             "host": host,
@@ -883,10 +900,10 @@ class KnowledgeBase(ABC):
             return None
 
         def _pack_command(command_parts: tuple[str, ...]) -> bytes:
-            out = [f"*{len(command_parts)}\r\n".encode("utf-8")]
+            out = [f"*{len(command_parts)}\r\n".encode()]
             for part in command_parts:
                 encoded = part.encode("utf-8")
-                out.append(f"${len(encoded)}\r\n".encode("utf-8"))
+                out.append(f"${len(encoded)}\r\n".encode())
                 out.append(encoded + b"\r\n")
             return b"".join(out)
 
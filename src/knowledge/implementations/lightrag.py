@@ -1,23 +1,81 @@
 import asyncio
 import os
+import time
 import traceback
+from contextlib import asynccontextmanager
 from functools import partial
+from urllib.parse import unquote, urlparse
 
 from lightrag import LightRAG, QueryParam
-from lightrag.kg.shared_storage import initialize_pipeline_status
+from lightrag.base import DocStatus
+from lightrag.kg.shared_storage import get_namespace_data, initialize_pipeline_status
 from lightrag.llm.openai import openai_complete_if_cache, openai_embed
 from lightrag.utils import EmbeddingFunc
 from neo4j import GraphDatabase
 from pymilvus import connections, utility
 
 from src import config
-from src.knowledge.base import FileStatus, KnowledgeBase
+from src.knowledge.base import FileStatus, IndexProgressCallback, KnowledgeBase
 from src.knowledge.indexing import process_file_to_markdown
+from src.knowledge.utils.graph_overview import graph_overview_store
+from src.knowledge.utils.instance_pool import InstancePool
 from src.knowledge.utils.kb_utils import get_embedding_config
+from src.knowledge.utils.lightrag_ingest import InsertBatcher, describe_stage, split_unique_batches
+from src.knowledge.utils.llm_limiter import LLM_MAX_CONCURRENCY, get_llm_limiter, get_llm_limiter_stats
 from src.utils import hashstr, logger
 from src.utils.datetime_utils import utc_isoformat
 
 
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# 实例池：同时创建的实例数、最多保留的实例数（0 表示不限制）、空闲释放时间（秒，0 表示不释放）
+INIT_CONCURRENCY = _env_int("YUXI_LIGHTRAG_INIT_CONCURRENCY", 2)
+MAX_INSTANCES = _env_int("YUXI_LIGHTRAG_MAX_INSTANCES", 16, minimum=0)
+IDLE_SECONDS = _env_int("YUXI_LIGHTRAG_IDLE_SECONDS", 1800, minimum=0)
+
+# 批量入库：窗口期（毫秒）内提交的文档合并为一次 ainsert，每批最多 INSERT_BATCH_SIZE 个文档
+INSERT_BATCH_SIZE = _env_int("YUXI_LIGHTRAG_INSERT_BATCH_SIZE", 8)
+INSERT_BATCH_WINDOW_SECONDS = _env_int("YUXI_LIGHTRAG_INSERT_BATCH_WINDOW_MS", 1000, minimum=0) / 1000
+# 等待文档处理完成时查询文档状态的间隔（秒）
+STATUS_POLL_SECONDS = 2
+# 等待单个文档处理完成的最长时间（秒）：超时后重新触发一次流水线，再次超时则将文档标记为失败
+DOC_TIMEOUT_SECONDS = _env_int("YUXI_LIGHTRAG_DOC_TIMEOUT_SECONDS", 3600)
+
+# KV 与文档状态存储：json 为每个知识库一组 JSON 文件（初始化时整体读入内存），postgres 按需查询
+KV_BACKEND = (os.getenv("YUXI_LIGHTRAG_KV_BACKEND") or "json").lower()
+KV_STORAGES = {
+    "json": ("JsonKVStorage", "JsonDocStatusStorage"),
+    "postgres": ("PGKVStorage", "PGDocStatusStorage"),
+}
+
+
+def _ensure_postgres_env() -> None:
+    """LightRAG 的 Postgres 存储读取 POSTGRES_HOST 等变量，未配置时从 POSTGRES_URL 解析"""
+    url = os.getenv("POSTGRES_URL")
+    if not url:
+        return
+    parsed = urlparse(url)
+    defaults = {
+        "POSTGRES_HOST": parsed.hostname,
+        "POSTGRES_PORT": str(parsed.port) if parsed.port else None,
+        "POSTGRES_USER": unquote(parsed.username) if parsed.username else None,
+        "POSTGRES_PASSWORD": unquote(parsed.password) if parsed.password else None,
+        "POSTGRES_DATABASE": parsed.path.lstrip("/") or None,
+    }
+    for name, value in defaults.items():
+        if value and not os.getenv(name):
+            os.environ[name] = value
+
+
+async def _finalize_instance(instance: LightRAG) -> None:
+    await instance.finalize_storages()
+
+
 class LightRagKB(KnowledgeBase):
     """基于 LightRAG 的知识库实现"""
 
@@ -31,8 +89,22 @@ class LightRagKB(KnowledgeBase):
         """
         super().__init__(work_dir)
 
-        # 存储 LightRAG 实例映射 {db_id: LightRAG}
-        self.instances: dict[str, LightRAG] = {}
+        # LightRAG 实例池：首次使用时创建，空闲或超出数量上限时释放
+        self._instance_pool = InstancePool(
+            max_instances=MAX_INSTANCES,
+            idle_seconds=IDLE_SECONDS,
+            init_concurrency=INIT_CONCURRENCY,
+            finalizer=_finalize_instance,
+        )
+
+        # 批量入库队列 {db_id: InsertBatcher}
+        self._insert_batchers: dict[str, InsertBatcher] = {}
+
+        if KV_BACKEND not in KV_STORAGES:
+            logger.warning(f"Unknown YUXI_LIGHTRAG_KV_BACKEND={KV_BACKEND}, falling back to json")
+        self._kv_storage, self._doc_status_storage = KV_STORAGES.get(KV_BACKEND, KV_STORAGES["json"])
+        if self._kv_storage.startswith("PG"):
+            _ensure_postgres_env()
 
         logger.info("LightRagKB initialized")
 
@@ -43,6 +115,10 @@ class LightRagKB(KnowledgeBase):
 
     def delete_database(self, db_id: str) -> dict:
         """删除数据库，同时清除Milvus和Neo4j中的数据"""
+        graph_overview_store.discard(db_id)
+        self._instance_pool.discard(db_id)
+        self._insert_batchers.pop(db_id, None)
+
         # Drop Milvus collection
         try:
             milvus_uri = os.getenv("MILVUS_URI") or "http://localhost:19530"
@@ -123,11 +199,13 @@ class LightRagKB(KnowledgeBase):
             llm_model_func=self._get_llm_func(llm_info),
             embedding_func=self._get_embedding_func(embed_info),
             vector_storage="MilvusVectorDBStorage",
-            kv_storage="JsonKVStorage",
+            kv_storage=self._kv_storage,
             graph_storage="Neo4JStorage",
-            doc_status_storage="JsonDocStatusStorage",
+            doc_status_storage=self._doc_status_storage,
             log_file_path=os.path.join(working_dir, "lightrag.log"),
             addon_params=addon_params,
+            # 实际并发由进程内共享的模型限流器控制
+            llm_model_max_async=LLM_MAX_CONCURRENCY,
         )
 
         return rag
@@ -136,31 +214,159 @@ class LightRagKB(KnowledgeBase):
         """初始化 LightRAG 实例"""
         logger.info(f"Initializing LightRAG instance for {instance.working_dir}")
         await instance.initialize_storages()
-        await initialize_pipeline_status()
+        await initialize_pipeline_status(workspace=instance.workspace)
 
-    async def _get_lightrag_instance(self, db_id: str) -> LightRAG | None:
-        """获取或创建 LightRAG 实例"""
-        if db_id in self.instances:
-            return self.instances[db_id]
+    async def _load_lightrag_instance(self, db_id: str) -> LightRAG:
+        """创建并初始化 LightRAG 实例"""
+        rag = await self._create_kb_instance(db_id, {})
+        await self._initialize_kb_instance(rag)
+        return rag
 
-        if db_id not in self.databases_meta:
+    async def _get_lightrag_instance(self, db_id: str, pin: bool = False) -> LightRAG | None:
+        """获取或创建 LightRAG 实例（首次使用时创建，并发请求只创建一次）；pin 时同时标记占用"""
+        if db_id not in self._instance_pool and db_id not in self.databases_meta:
             return None
 
         try:
-            # 创建实例
-            rag = await self._create_kb_instance(db_id, {})
-
-            # 异步初始化存储
-            await self._initialize_kb_instance(rag)
-
-            self.instances[db_id] = rag
-            return rag
-
+            return await self._instance_pool.get(db_id, partial(self._load_lightrag_instance, db_id), pin=pin)
         except Exception as e:
             logger.error(f"Failed to create LightRAG instance for {db_id}: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             return None
 
+    @asynccontextmanager
+    async def _lightrag_instance(self, db_id: str):
+        """获取 LightRAG 实例，并在使用期间保持占用，避免入库等长时间操作中被空闲释放"""
+        rag = await self._get_lightrag_instance(db_id, pin=True)
+        if rag is None:
+            yield None
+            return
+
+        try:
+            yield rag
+        finally:
+            self._instance_pool.unpin(db_id)
+
+    def get_instance_stats(self) -> dict:
+        """LightRAG 实例池统计"""
+        return {
+            **self._instance_pool.get_stats(),
+            "kv_storage": self._kv_storage,
+            "doc_status_storage": self._doc_status_storage,
+            "llm_limiters": get_llm_limiter_stats(),
+        }
+
+    async def _insert_document(
+        self,
+        db_id: str,
+        rag: LightRAG,
+        file_id: str,
+        content: str,
+        file_path: str | None,
+        progress_callback: IndexProgressCallback | None = None,
+    ) -> None:
+        """提交文档到该知识库的批量入库队列，并等待文档处理完成"""
+        batcher = self._insert_batchers.get(db_id)
+        if batcher is None:
+            batcher = InsertBatcher(self._flush_documents, INSERT_BATCH_SIZE, INSERT_BATCH_WINDOW_SECONDS)
+            self._insert_batchers[db_id] = batcher
+
+        if progress_callback:
+            await progress_callback("queued", "排队中")
+        await batcher.submit({"rag": rag, "id": file_id, "content": content, "file_path": file_path})
+        await self._wait_for_document(rag, file_id, file_path, progress_callback)
+
+    @staticmethod
+    async def _flush_documents(items: list[dict]) -> None:
+        """
+        同一知识库的一批文档一次写入，由 LightRAG 流水线并行处理
+
+        LightRAG 会丢弃同一次写入中内容重复的文档、遇到重复 id 直接报错，因此 id 或内容相同的文档拆到不同批次；
+        整批写入仍因参数校验失败（ValueError）时逐个文档重试，避免一个文档拖累同批的其他文档。
+        """
+        rag = items[0]["rag"]
+        for batch in split_unique_batches(items):
+            logger.info(f"Inserting {len(batch)} documents into LightRAG {rag.workspace}")
+            try:
+                await LightRagKB._ainsert(rag, batch)
+                continue
+            except ValueError as e:
+                logger.warning(f"Batch insert into LightRAG {rag.workspace} failed, retrying one by one: {e}")
+            for item in batch:
+                try:
+                    await LightRagKB._ainsert(rag, [item])
+                except ValueError as e:
+                    # 该文档不会出现在 doc_status 中，由 _wait_for_document 报告未被接收
+                    logger.error(f"Failed to insert document {item['id']} into LightRAG: {e}")
+
+    @staticmethod
+    async def _ainsert(rag: LightRAG, items: list[dict]) -> None:
+        await rag.ainsert(
+            input=[item["content"] for item in items],
+            ids=[item["id"] for item in items],
+            file_paths=[item["file_path"] for item in items],
+        )
+
+    @staticmethod
+    async def _wait_for_document(
+        rag: LightRAG, file_id: str, file_path: str | None, progress_callback: IndexProgressCallback | None
+    ) -> None:
+        """
+        等待文档处理完成，并上报阶段进度
+
+        流水线正忙时（如其他批次正在处理）ainsert 只登记文档即返回，文档由正在运行的流水线接着处理，
+        因此以 doc_status 中的状态为准。超过 DOC_TIMEOUT_SECONDS 仍未完成时，若流水线已空闲则重新触发一次处理，
+        再次超时则将文档标记为失败。
+        """
+        last_message = None
+        deadline = time.monotonic() + DOC_TIMEOUT_SECONDS
+        retrigger_task: asyncio.Task | None = None
+        while True:
+            record = await rag.doc_status.get_by_id(file_id)
+            if record is None:
+                raise RuntimeError(f"Document {file_id} was not accepted by LightRAG")
+
+            try:
+                pipeline_status = await get_namespace_data("pipeline_status", workspace=rag.workspace)
+                latest_message = pipeline_status.get("latest_message", "")
+                pipeline_busy = bool(pipeline_status.get("busy"))
+            except Exception:
+                latest_message = ""
+                pipeline_busy = False
+
+            stage, message = describe_stage(record, latest_message, file_path)
+            if message != last_message:
+                last_message = message
+                logger.debug(f"LightRAG document {file_id}: {stage} {message}")
+                if progress_callback:
+                    await progress_callback(stage, message)
+
+            if stage == "done":
+                return
+            if stage == "failed":
+                raise RuntimeError(message)
+
+            if time.monotonic() >= deadline:
+                if retrigger_task is None and not pipeline_busy:
+                    # 文档停留在队列中而流水线已空闲（如流水线异常退出），重新触发处理
+                    logger.warning(f"LightRAG document {file_id} timed out while pipeline idle, re-triggering")
+                    deadline = time.monotonic() + DOC_TIMEOUT_SECONDS
+                    retrigger_task = asyncio.create_task(rag.apipeline_process_enqueue_documents())
+                else:
+                    error = f"文档处理超时（超过 {DOC_TIMEOUT_SECONDS} 秒）"
+                    await rag.doc_status.upsert(
+                        {
+                            file_id: {
+                                **record,
+                                "status": DocStatus.FAILED,
+                                "error_msg": error,
+                                "updated_at": utc_isoformat(),
+                            }
+                        }
+                    )
+                    raise TimeoutError(error)
+            await asyncio.sleep(STATUS_POLL_SECONDS)
+
     def _get_llm_func(self, llm_info: dict):
         """获取 LLM 函数"""
         from src.models import select_model
@@ -177,17 +383,20 @@ class LightRagKB(KnowledgeBase):
             logger.info(f"Using default LLM from environment: {model_spec}")
 
         model = select_model(model_spec=model_spec)
+        # 同一模型的调用在所有知识库间共享并发与速率上限
+        limiter = get_llm_limiter(model_spec)
 
         async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwargs):
-            return await openai_complete_if_cache(
-                model=model.model_name,
-                prompt=prompt,
-                system_prompt=system_prompt,
-                history_messages=history_messages,
-                api_key=model.api_key,
-                base_url=model.base_url,
-                **kwargs,
-            )
+            async with limiter.slot():
+                return await openai_complete_if_cache(
+                    model=model.model_name,
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    history_messages=history_messages,
+                    api_key=model.api_key,
+                    base_url=model.base_url,
+                    **kwargs,
+                )
 
         return llm_model_func
 
@@ -233,7 +442,13 @@ class LightRagKB(KnowledgeBase):
             ),
         )
 
-    async def index_file(self, db_id: str, file_id: str, operator_id: str | None = None) -> dict:
+    async def index_file(
+        self,
+        db_id: str,
+        file_id: str,
+        operator_id: str | None = None,
+        progress_callback: IndexProgressCallback | None = None,
+    ) -> dict:
         """
         Index parsed file (Status: INDEXING -> INDEXED/ERROR_INDEXING)
 
@@ -241,6 +456,7 @@ class LightRagKB(KnowledgeBase):
             db_id: Database ID
             file_id: File ID
             operator_id: ID of the user performing the operation
+            progress_callback: Optional async callback receiving (stage, message)
 
         Returns:
             Updated file metadata
@@ -248,266 +464,270 @@ class LightRagKB(KnowledgeBase):
         if db_id not in self.databases_meta:
             raise ValueError(f"Database {db_id} not found")
 
-        rag = await self._get_lightrag_instance(db_id)
-        if not rag:
-            raise ValueError(f"Failed to get LightRAG instance for {db_id}")
-
-        # Get file meta
-        if file_id not in self.files_meta:
-            raise ValueError(f"File {file_id} not found")
-        file_meta = self.files_meta[file_id]
-
-        # Validate current status - only allow indexing from these states
-        current_status = file_meta.get("status")
-        allowed_statuses = {
-            FileStatus.PARSED,
-            FileStatus.ERROR_INDEXING,
-            FileStatus.INDEXED,  # For re-indexing
-            "done",  # Legacy status
-        }
-
-        if current_status not in allowed_statuses:
-            raise ValueError(
-                f"Cannot index file with status '{current_status}'. "
-                f"File must be parsed first (status should be one of: {', '.join(allowed_statuses)})"
-            )
-
-        # Check markdown file exists
-        if not file_meta.get("markdown_file"):
-            raise ValueError("File has not been parsed yet (no markdown_file)")
-
-        # Clear previous error if any
-        if "error" in file_meta:
-            self.files_meta[file_id].pop("error", None)
-
-        # Update status and add to processing queue
-        self.files_meta[file_id]["status"] = FileStatus.INDEXING
-        self.files_meta[file_id]["updated_at"] = utc_isoformat()
-        if operator_id:
-            self.files_meta[file_id]["updated_by"] = operator_id
-        await self._save_metadata()
-
-        # Add to processing queue
-        self._add_to_processing_queue(file_id)
-
-        try:
-            # Read markdown
-            markdown_content = await self._read_markdown_from_minio(file_meta["markdown_file"])
-            file_path = file_meta.get("path")
-
-            # Clean up existing chunks if any (for re-indexing)
-            await self.delete_file_chunks_only(db_id, file_id)
+        async with self._lightrag_instance(db_id) as rag:
+            if not rag:
+                raise ValueError(f"Failed to get LightRAG instance for {db_id}")
 
-            # Insert
-            await rag.ainsert(input=markdown_content, ids=file_id, file_paths=file_path)
+            # Get file meta
+            if file_id not in self.files_meta:
+                raise ValueError(f"File {file_id} not found")
+            file_meta = self.files_meta[file_id]
 
-            logger.info(f"Indexed file {file_id} into LightRAG")
+            # Validate current status - only allow indexing from these states
+            current_status = file_meta.get("status")
+            allowed_statuses = {
+                FileStatus.PARSED,
+                FileStatus.ERROR_INDEXING,
+                FileStatus.INDEXED,  # For re-indexing
+                "done",  # Legacy status
+            }
 
-            # Update status
-            self.files_meta[file_id]["status"] = FileStatus.INDEXED
-            self.files_meta[file_id]["updated_at"] = utc_isoformat()
-            if operator_id:
-                self.files_meta[file_id]["updated_by"] = operator_id
-            await self._save_metadata()
+            if current_status not in allowed_statuses:
+                raise ValueError(
+                    f"Cannot index file with status '{current_status}'. "
+                    f"File must be parsed first (status should be one of: {', '.join(allowed_statuses)})"
+                )
 
-            return self.files_meta[file_id]
+            # Check markdown file exists
+            if not file_meta.get("markdown_file"):
+                raise ValueError("File has not been parsed yet (no markdown_file)")
 
-        except asyncio.CancelledError as e:
-            error_msg = str(e) or "indexing task cancelled"
-            logger.warning(f"Indexing cancelled for {file_id}: {error_msg}")
-            self.files_meta[file_id]["status"] = FileStatus.ERROR_INDEXING
-            self.files_meta[file_id]["error"] = error_msg
-            self.files_meta[file_id]["updated_at"] = utc_isoformat()
-            if operator_id:
-                self.files_meta[file_id]["updated_by"] = operator_id
-            await self._save_metadata()
-            raise
+            # Clear previous error if any
+            if "error" in file_meta:
+                self.files_meta[file_id].pop("error", None)
 
-        except Exception as e:
-            logger.error(f"Indexing failed for {file_id}: {e}")
-            self.files_meta[file_id]["status"] = FileStatus.ERROR_INDEXING
-            self.files_meta[file_id]["error"] = str(e)
+            # Update status and add to processing queue
+            self.files_meta[file_id]["status"] = FileStatus.INDEXING
             self.files_meta[file_id]["updated_at"] = utc_isoformat()
             if operator_id:
                 self.files_meta[file_id]["updated_by"] = operator_id
             await self._save_metadata()
-            raise
 
-        finally:
-            # Remove from processing queue
-            self._remove_from_processing_queue(file_id)
-
-    async def update_content(self, db_id: str, file_ids: list[str], params: dict | None = None) -> list[dict]:
-        """更新内容 - 根据file_ids重新解析文件并更新向量库"""
-        if db_id not in self.databases_meta:
-            raise ValueError(f"Database {db_id} not found")
-
-        rag = await self._get_lightrag_instance(db_id)
-        if not rag:
-            raise ValueError(f"Failed to get LightRAG instance for {db_id}")
-
-        # 处理默认参数
-        if params is None:
-            params = {}
-        content_type = params.get("content_type", "file")
-        processed_items_info = []
-
-        for file_id in file_ids:
-            # 从元数据中获取文件信息
-            if file_id not in self.files_meta:
-                logger.warning(f"File {file_id} not found in metadata, skipping")
-                continue
-
-            file_meta = self.files_meta[file_id]
-            file_path = file_meta.get("path")
-
-            if not file_path:
-                logger.warning(f"File path not found for {file_id}, skipping")
-                continue
-
-            # 添加到处理队列
+            # Add to processing queue
             self._add_to_processing_queue(file_id)
 
             try:
-                # 更新状态为处理中
-                self.files_meta[file_id]["processing_params"] = params.copy()
-                self.files_meta[file_id]["status"] = "processing"
-                await self._save_metadata()
-
-                # 重新解析文件为 markdown
-                if content_type != "file":
-                    raise ValueError("URL 内容解析已禁用")
-                markdown_content = await process_file_to_markdown(file_path, params=params)
-                markdown_content_lines = markdown_content[:100].replace("\n", " ")
-                logger.info(f"Markdown content: {markdown_content_lines}...")
+                # Read markdown
+                markdown_content = await self._read_markdown_from_minio(file_meta["markdown_file"])
+                file_path = file_meta.get("path")
 
-                # 先删除现有的 LightRAG 数据（仅删除chunks，保留元数据）
+                # Clean up existing chunks if any (for re-indexing)
                 await self.delete_file_chunks_only(db_id, file_id)
 
-                # 使用 LightRAG 重新插入内容
-                await rag.ainsert(input=markdown_content, ids=file_id, file_paths=file_path)
+                # Insert（与同时提交的其他文档合并为一批）
+                await self._insert_document(db_id, rag, file_id, markdown_content, file_path, progress_callback)
+                graph_overview_store.invalidate(db_id)
 
-                logger.info(f"Updated {content_type} {file_path} in LightRAG. Done.")
+                logger.info(f"Indexed file {file_id} into LightRAG")
 
-                # 更新元数据状态
-                self.files_meta[file_id]["status"] = "done"
+                # Update status
+                self.files_meta[file_id]["status"] = FileStatus.INDEXED
+                self.files_meta[file_id]["updated_at"] = utc_isoformat()
+                if operator_id:
+                    self.files_meta[file_id]["updated_by"] = operator_id
                 await self._save_metadata()
 
-                # 从处理队列中移除
-                self._remove_from_processing_queue(file_id)
+                return self.files_meta[file_id]
 
-                # 返回更新后的文件信息
-                updated_file_meta = file_meta.copy()
-                updated_file_meta["status"] = "done"
-                updated_file_meta["file_id"] = file_id
-                processed_items_info.append(updated_file_meta)
+            except asyncio.CancelledError as e:
+                error_msg = str(e) or "indexing task cancelled"
+                logger.warning(f"Indexing cancelled for {file_id}: {error_msg}")
+                self.files_meta[file_id]["status"] = FileStatus.ERROR_INDEXING
+                self.files_meta[file_id]["error"] = error_msg
+                self.files_meta[file_id]["updated_at"] = utc_isoformat()
+                if operator_id:
+                    self.files_meta[file_id]["updated_by"] = operator_id
+                await self._save_metadata()
+                raise
 
             except Exception as e:
-                error_msg = str(e)
-                logger.error(f"更新{content_type} {file_path} 失败: {error_msg}, {traceback.format_exc()}")
-                self.files_meta[file_id]["status"] = "failed"
-                self.files_meta[file_id]["error"] = error_msg
+                logger.error(f"Indexing failed for {file_id}: {e}")
+                self.files_meta[file_id]["status"] = FileStatus.ERROR_INDEXING
+                self.files_meta[file_id]["error"] = str(e)
+                self.files_meta[file_id]["updated_at"] = utc_isoformat()
+                if operator_id:
+                    self.files_meta[file_id]["updated_by"] = operator_id
                 await self._save_metadata()
+                raise
 
-                # 从处理队列中移除
+            finally:
+                # Remove from processing queue
                 self._remove_from_processing_queue(file_id)
 
-                # 返回失败的文件信息
-                failed_file_meta = file_meta.copy()
-                failed_file_meta["status"] = "failed"
-                failed_file_meta["file_id"] = file_id
-                failed_file_meta["error"] = error_msg
-                processed_items_info.append(failed_file_meta)
+    async def update_content(self, db_id: str, file_ids: list[str], params: dict | None = None) -> list[dict]:
+        """更新内容 - 根据file_ids重新解析文件并更新向量库"""
+        if db_id not in self.databases_meta:
+            raise ValueError(f"Database {db_id} not found")
 
-        return processed_items_info
+        async with self._lightrag_instance(db_id) as rag:
+            if not rag:
+                raise ValueError(f"Failed to get LightRAG instance for {db_id}")
+
+            # 处理默认参数
+            if params is None:
+                params = {}
+            content_type = params.get("content_type", "file")
+            # 多个文件并发解析，入库时合并为同一批次
+            semaphore = asyncio.Semaphore(INSERT_BATCH_SIZE)
+
+            async def _update_one(file_id: str) -> dict | None:
+                # 从元数据中获取文件信息
+                if file_id not in self.files_meta:
+                    logger.warning(f"File {file_id} not found in metadata, skipping")
+                    return None
+
+                file_meta = self.files_meta[file_id]
+                file_path = file_meta.get("path")
+
+                if not file_path:
+                    logger.warning(f"File path not found for {file_id}, skipping")
+                    return None
+
+                # 添加到处理队列
+                self._add_to_processing_queue(file_id)
+
+                try:
+                    async with semaphore:
+                        # 更新状态为处理中
+                        self.files_meta[file_id]["processing_params"] = params.copy()
+                        self.files_meta[file_id]["status"] = "processing"
+                        await self._save_metadata()
+
+                        # 重新解析文件为 markdown
+                        if content_type != "file":
+                            raise ValueError("URL 内容解析已禁用")
+                        markdown_content = await process_file_to_markdown(file_path, params=params)
+                        markdown_content_lines = markdown_content[:100].replace("\n", " ")
+                        logger.info(f"Markdown content: {markdown_content_lines}...")
+
+                        # 先删除现有的 LightRAG 数据（仅删除chunks，保留元数据）
+                        await self.delete_file_chunks_only(db_id, file_id)
+
+                    # 使用 LightRAG 重新插入内容（不占用解析并发名额，便于同批次合并）
+                    await self._insert_document(db_id, rag, file_id, markdown_content, file_path)
+                    graph_overview_store.invalidate(db_id)
+
+                    logger.info(f"Updated {content_type} {file_path} in LightRAG. Done.")
+
+                    # 更新元数据状态
+                    self.files_meta[file_id]["status"] = "done"
+                    await self._save_metadata()
+
+                    # 返回更新后的文件信息
+                    updated_file_meta = file_meta.copy()
+                    updated_file_meta["status"] = "done"
+                    updated_file_meta["file_id"] = file_id
+                    return updated_file_meta
+
+                except Exception as e:
+                    error_msg = str(e)
+                    logger.error(f"更新{content_type} {file_path} 失败: {error_msg}, {traceback.format_exc()}")
+                    self.files_meta[file_id]["status"] = "failed"
+                    self.files_meta[file_id]["error"] = error_msg
+                    await self._save_metadata()
+
+                    # 返回失败的文件信息
+                    failed_file_meta = file_meta.copy()
+                    failed_file_meta["status"] = "failed"
+                    failed_file_meta["file_id"] = file_id
+                    failed_file_meta["error"] = error_msg
+                    return failed_file_meta
+
+                finally:
+                    # 从处理队列中移除
+                    self._remove_from_processing_queue(file_id)
+
+            results = await asyncio.gather(*(_update_one(file_id) for file_id in file_ids))
+            return [item for item in results if item is not None]
 
     async def aquery(self, query_text: str, db_id: str, agent_call: bool = False, **kwargs) -> str:
         """异步查询知识库"""
-        rag = await self._get_lightrag_instance(db_id)
-        if not rag:
-            raise ValueError(f"Database {db_id} not found")
-
-        try:
-            # QueryParam 支持的参数列表
-            valid_params = {
-                "mode",
-                "only_need_context",
-                "only_need_prompt",
-                "response_type",
-                "stream",
-                "top_k",
-                "chunk_top_k",
-                "max_entity_tokens",
-                "max_relation_tokens",
-                "max_total_tokens",
-                "hl_keywords",
-                "ll_keywords",
-                "conversation_history",
-                "history_turns",
-                "model_func",
-                "user_prompt",
-                "enable_rerank",
-                "include_references",
-            }
-
-            # 过滤 kwargs，只保留 QueryParam 支持的参数
-            query_params = self._get_query_params(db_id)
-            query_params = query_params | kwargs
-            filtered_kwargs = {k: v for k, v in query_params.items() if k in valid_params}
-
-            # 设置查询参数
-            params_dict = {
-                "mode": "mix",
-                "only_need_context": True,
-                "top_k": 10,
-            } | filtered_kwargs
-            param = QueryParam(**params_dict)
-
-            # 执行查询
-            response = await rag.aquery_data(query_text, param)
-            logger.debug(f"Query response: {str(response)[:1000]}...")
-
-            if agent_call:
-                scope = query_params.get("retrieval_content_scope", "chunks")
-                data = response.get("data", {}) or {}
-
-                if scope == "chunks":
-                    return data.get("chunks", [])
+        async with self._lightrag_instance(db_id) as rag:
+            if not rag:
+                raise ValueError(f"Database {db_id} not found")
 
-                result = {}
-                if scope in ["graph", "all"]:
-                    # 过滤掉无关信息，保留实体和关系的核心内容
-                    exclude_keys = {"source_id", "file_path", "created_at"}
-
-                    ents = data.get("entities", [])
-                    rels = data.get("relationships", [])
-
-                    result["entities"] = [{k: v for k, v in e.items() if k not in exclude_keys} for e in ents]
-                    result["relationships"] = [{k: v for k, v in r.items() if k not in exclude_keys} for r in rels]
-                    result["references"] = data.get("references", [])
-
-                if scope == "all":
-                    result["chunks"] = data.get("chunks", [])
-
-                return result
-
-            return response
+            try:
+                # QueryParam 支持的参数列表
+                valid_params = {
+                    "mode",
+                    "only_need_context",
+                    "only_need_prompt",
+                    "response_type",
+                    "stream",
+                    "top_k",
+                    "chunk_top_k",
+                    "max_entity_tokens",
+                    "max_relation_tokens",
+                    "max_total_tokens",
+                    "hl_keywords",
+                    "ll_keywords",
+                    "conversation_history",
+                    "history_turns",
+                    "model_func",
+                    "user_prompt",
+                    "enable_rerank",
+                    "include_references",
+                }
+
+                # 过滤 kwargs，只保留 QueryParam 支持的参数
+                query_params = self._get_query_params(db_id)
+                query_params = query_params | kwargs
+                filtered_kwargs = {k: v for k, v in query_params.items() if k in valid_params}
+
+                # 设置查询参数
+                params_dict = {
+                    "mode": "mix",
+                    "only_need_context": True,
+                    "top_k": 10,
+                } | filtered_kwargs
+                param = QueryParam(**params_dict)
+
+                # 执行查询
+                response = await rag.aquery_data(query_text, param)
+                logger.debug(f"Query response: {str(response)[:1000]}...")
+
+                if agent_call:
+                    scope = query_params.get("retrieval_content_scope", "chunks")
+                    data = response.get("data", {}) or {}
+
+                    if scope == "chunks":
+                        return data.get("chunks", [])
+
+                    result = {}
+                    if scope in ["graph", "all"]:
+                        # 过滤掉无关信息，保留实体和关系的核心内容
+                        exclude_keys = {"source_id", "file_path", "created_at"}
+
+                        ents = data.get("entities", [])
+                        rels = data.get("relationships", [])
+
+                        result["entities"] = [{k: v for k, v in e.items() if k not in exclude_keys} for e in ents]
+                        result["relationships"] = [{k: v for k, v in r.items() if k not in exclude_keys} for r in rels]
+                        result["references"] = data.get("references", [])
+
+                    if scope == "all":
+                        result["chunks"] = data.get("chunks", [])
+
+                    return result
+
+                return response
 
-        except Exception as e:
-            logger.error(f"Query error: {e}, {traceback.format_exc()}")
-            return ""
+            except Exception as e:
+                logger.error(f"Query error: {e}, {traceback.format_exc()}")
+                return ""
 
     async def delete_file_chunks_only(self, db_id: str, file_id: str) -> None:
         """仅删除文件的chunks数据，保留元数据（用于更新操作）"""
-        rag = await self._get_lightrag_instance(db_id)
-        if rag:
-            try:
-                # 使用 LightRAG 删除文档
-                await rag.adelete_by_doc_id(file_id)
-                logger.info(f"Deleted chunks for file {file_id} from LightRAG")
-            except Exception as e:
-                logger.error(f"Error deleting file {file_id} from LightRAG: {e}")
-        # 注意：这里不删除 files_meta[file_id]，保留元数据用于后续操作
+        async with self._lightrag_instance(db_id) as rag:
+            if rag:
+                try:
+                    # 使用 LightRAG 删除文档
+                    await rag.adelete_by_doc_id(file_id)
+                    graph_overview_store.invalidate(db_id)
+                    logger.info(f"Deleted chunks for file {file_id} from LightRAG")
+                except Exception as e:
+                    logger.error(f"Error deleting file {file_id} from LightRAG: {e}")
+            # 注意：这里不删除 files_meta[file_id]，保留元数据用于后续操作
 
     async def delete_file(self, db_id: str, file_id: str) -> None:
         """删除文件（包括元数据）"""
@@ -539,43 +759,49 @@ class LightRagKB(KnowledgeBase):
 
         # 使用 LightRAG 获取 chunks
         content_info = {"lines": []}
-        rag = await self._get_lightrag_instance(db_id)
-        if rag:
-            try:
-                # 获取文档的所有 chunks
-                # LightRAG v1.4+ 使用 JsonKVStorage，通过 _data 属性访问所有数据
-                if hasattr(rag.text_chunks, "_data"):
-                    all_chunks = dict(rag.text_chunks._data)
-                else:
-                    logger.warning("text_chunks does not have _data attribute, cannot get file content")
-                    return content_info
-
-                # 筛选属于该文档的 chunks
-                doc_chunks = []
-                for chunk_id, chunk_data in all_chunks.items():
-                    if isinstance(chunk_data, dict) and chunk_data.get("full_doc_id") == file_id:
-                        chunk_data["id"] = chunk_id
-                        chunk_data["content_vector"] = []
-                        doc_chunks.append(chunk_data)
-
-                # 按 chunk_order_index 排序
-                doc_chunks.sort(key=lambda x: x.get("chunk_order_index", 0))
-                content_info["lines"] = doc_chunks
-
-            except Exception as e:
-                logger.error(f"Failed to get file content from LightRAG: {e}")
-                content_info["lines"] = []
-
-        # Try to read markdown content if available
-        file_meta = self.files_meta[file_id]
-        if file_meta.get("markdown_file"):
-            try:
-                content = await self._read_markdown_from_minio(file_meta["markdown_file"])
-                content_info["content"] = content
-            except Exception as e:
-                logger.error(f"Failed to read markdown file for {file_id}: {e}")
-
-        return content_info
+        async with self._lightrag_instance(db_id) as rag:
+            if rag:
+                try:
+                    # 获取文档的所有 chunks
+                    # LightRAG v1.4+ 使用 JsonKVStorage，通过 _data 属性访问所有数据
+                    if hasattr(rag.text_chunks, "_data"):
+                        all_chunks = dict(rag.text_chunks._data)
+                    else:
+                        # Postgres 等存储：按文档状态中记录的 chunk id 查询
+                        doc_status = await rag.doc_status.get_by_id(file_id) or {}
+                        chunk_ids = doc_status.get("chunks_list") or []
+                        if not chunk_ids:
+                            logger.warning(f"No chunks_list in doc status of {file_id}, cannot get file content")
+                            return content_info
+                        chunks = await rag.text_chunks.get_by_ids(chunk_ids)
+                        all_chunks = {cid: chunk for cid, chunk in zip(chunk_ids, chunks) if chunk}
+
+                    # 筛选属于该文档的 chunks
+                    doc_chunks = []
+                    for chunk_id, chunk_data in all_chunks.items():
+                        if isinstance(chunk_data, dict) and chunk_data.get("full_doc_id") == file_id:
+                            chunk_data["id"] = chunk_id
+                            chunk_data["content_vector"] = []
+                            doc_chunks.append(chunk_data)
+
+                    # 按 chunk_order_index 排序
+                    doc_chunks.sort(key=lambda x: x.get("chunk_order_index", 0))
+                    content_info["lines"] = doc_chunks
+
+                except Exception as e:
+                    logger.error(f"Failed to get file content from LightRAG: {e}")
+                    content_info["lines"] = []
+
+            # Try to read markdown content if available
+            file_meta = self.files_meta[file_id]
+            if file_meta.get("markdown_file"):
+                try:
+                    content = await self._read_markdown_from_minio(file_meta["markdown_file"])
+                    content_info["content"] = content
+                except Exception as e:
+                    logger.error(f"Failed to read markdown file for {file_id}: {e}")
+
+            return content_info
 
     async def get_file_info(self, db_id: str, file_id: str) -> dict:
         """获取文件完整信息（基本信息+内容信息）- 保持向后兼容"""
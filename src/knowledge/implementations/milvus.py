@@ -1,4 +1,5 @@
 import asyncio
+import json
 import os
 import re
 import time
@@ -6,21 +7,145 @@ import traceback
 from functools import partial
 from typing import Any
 
-from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections, db, utility
+from pymilvus import (
+    AnnSearchRequest,
+    Collection,
+    CollectionSchema,
+    DataType,
+    FieldSchema,
+    Function,
+    FunctionType,
+    RRFRanker,
+    connections,
+    db,
+    utility,
+)
+from pymilvus.client.types import LoadState
 
 from src import config
-from src.knowledge.base import FileStatus, KnowledgeBase
+from src.knowledge.base import FileStatus, IndexProgressCallback, KnowledgeBase
 from src.knowledge.indexing import process_file_to_markdown
 from src.knowledge.utils.kb_utils import (
     get_embedding_config,
     split_text_into_chunks,
 )
+from src.knowledge.utils.milvus_index import (
+    DEFAULT_DISKANN_SEARCH_LIST,
+    DEFAULT_HNSW_EF,
+    DEFAULT_IVF_NPROBE,
+    build_index_params,
+    build_search_params,
+    estimate_collection_bytes,
+    normalize_index_profile,
+    resolve_index_type,
+)
+from src.knowledge.utils.milvus_residency import CollectionResidencyManager
 from src.models.embed import OtherEmbedding
 from src.utils import hashstr, logger
 from src.utils.datetime_utils import utc_isoformat
 
 MILVUS_AVAILABLE = True
 
+# BM25 全文检索使用的稀疏向量字段（由 Milvus 根据 content 自动生成）
+SPARSE_FIELD = "sparse"
+OUTPUT_FIELDS = ["content", "source", "chunk_id", "file_id", "chunk_index"]
+
+# 过滤条件解析为空文件集合时使用的恒假表达式（file_id 不会为空）
+NO_MATCH_EXPR = 'file_id == ""'
+
+# content 字段分词器，默认使用 Milvus 内置中文分词（jieba）
+TEXT_ANALYZER = os.getenv("YUXI_MILVUS_TEXT_ANALYZER") or "chinese"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+RRF_K = _env_int("YUXI_MILVUS_RRF_K", 60)
+
+# 标量索引：file_id 用倒排索引（== / in 过滤与按文件删除），source 用 Trie 索引（等值与前缀匹配）
+SCALAR_INDEXES = {"file_id": "INVERTED", "source": "Trie"}
+
+# 可选的分区键字段（additional_params.partition_key），按文件过滤时只扫描对应分区
+PARTITION_KEY_FIELDS = ("file_id",)
+NUM_PARTITIONS = _env_int("YUXI_MILVUS_NUM_PARTITIONS", 16)
+
+# 文件名/文件夹过滤下推为 file_id in [...] 时每个 in 子句的最大 id 数，超出时拆为多个子句 OR 连接
+FILE_FILTER_MAX_IDS = _env_int("YUXI_MILVUS_FILE_FILTER_MAX_IDS", 200)
+
+# 已加载集合的估算内存预算（MB），0 表示不限制；超出时按 LRU 释放冷集合
+try:
+    MEMORY_BUDGET_MB = max(0, int(os.getenv("YUXI_MILVUS_MEMORY_BUDGET_MB") or 0))
+except ValueError:
+    MEMORY_BUDGET_MB = 0
+EVICT_MIN_IDLE_SECONDS = _env_int("YUXI_MILVUS_EVICT_MIN_IDLE_SECONDS", 60)
+
+
+def resolve_filter_file_ids(
+    files_meta: dict[str, dict], db_id: str, file_name: str | None = None, folder_id: str | None = None
+) -> list[str] | None:
+    """
+    根据文件元数据把文件名 / 文件夹过滤解析为 file_id 列表
+
+    文件名优先完全匹配，没有完全匹配时按包含匹配；文件夹包含所有子孙文件。
+    返回 None 表示文件名无法解析（含通配符或元数据中无匹配），调用方应回退到 source like 过滤，
+    指定了文件夹时需与文件夹的文件范围同时生效；文件夹本身总能解析（可能为空列表）。
+    """
+    files = {
+        fid: meta for fid, meta in files_meta.items() if meta.get("database_id") == db_id and not meta.get("is_folder")
+    }
+
+    if folder_id:
+        children: dict[str | None, list[str]] = {}
+        for fid, meta in files_meta.items():
+            if meta.get("database_id") == db_id:
+                children.setdefault(meta.get("parent_id"), []).append(fid)
+        folder_files, stack = set(), [folder_id]
+        while stack:
+            for child_id in children.get(stack.pop(), []):
+                if child_id in files:
+                    folder_files.add(child_id)
+                else:
+                    stack.append(child_id)
+        files = {fid: files[fid] for fid in folder_files}
+
+    if file_name:
+        if "%" in file_name:
+            return None
+        matched = [fid for fid, meta in files.items() if meta.get("filename") == file_name]
+        if not matched:
+            matched = [fid for fid, meta in files.items() if file_name in (meta.get("filename") or "")]
+        if not matched:
+            return None
+        files = {fid: files[fid] for fid in matched}
+
+    return sorted(files)
+
+
+def build_file_ids_expr(file_ids: list[str]) -> str:
+    """file_id in [...] 表达式，id 数超过 FILE_FILTER_MAX_IDS 时拆成多个 in 子句 OR 连接"""
+    clauses = [
+        f"file_id in {json.dumps(list(file_ids[i : i + FILE_FILTER_MAX_IDS]), ensure_ascii=False)}"
+        for i in range(0, len(file_ids), FILE_FILTER_MAX_IDS)
+    ]
+    return clauses[0] if len(clauses) == 1 else "(" + " or ".join(clauses) + ")"
+
+
+def similarity_radius(metric_type: str, similarity_threshold: float) -> float | None:
+    """
+    把相似度阈值换算为 range search 的 radius，阈值不大于 0 时返回 None（不过滤）
+
+    与普通向量检索的相似度定义一致：COSINE / IP 直接使用距离，L2 按 1 / (1 + distance) 计算。
+    """
+    if similarity_threshold <= 0:
+        return None
+    if metric_type == "L2":
+        return 1 / similarity_threshold - 1
+    return similarity_threshold
+
 
 class MilvusKB(KnowledgeBase):
     """基于 Milvus 的生产级向量库"""
@@ -58,6 +183,15 @@ class MilvusKB(KnowledgeBase):
         # 元数据锁
         self._metadata_lock = asyncio.Lock()
 
+        # 各集合当前向量索引类型 {db_id: index_type}，以及重建索引锁
+        self._index_types: dict[str, str] = {}
+        self._reindex_locks: dict[str, asyncio.Lock] = {}
+        self._reindex_tasks: set[asyncio.Task] = set()
+
+        # 集合驻留管理：首次访问时加载，超出内存预算时释放冷集合
+        self._residency = CollectionResidencyManager(MEMORY_BUDGET_MB * 1024**2, EVICT_MIN_IDLE_SECONDS)
+        self._adopted_loaded = False
+
         # 初始化连接
         self._init_connection()
 
@@ -119,6 +253,7 @@ class MilvusKB(KnowledgeBase):
                     utility.drop_collection(collection_name, using=self.connection_alias)
                     return self._create_new_collection(collection_name, embed_info, db_id)
 
+                self._ensure_scalar_indexes(collection)
                 logger.info(f"Retrieved existing collection: {collection_name}")
                 return collection
             else:
@@ -137,40 +272,251 @@ class MilvusKB(KnowledgeBase):
         """创建新的 Milvus 集合"""
         embedding_dim = embed_info.get("dimension", 1024)
         model_name = embed_info.get("name", "default")
+        partition_key = self._get_partition_key(db_id)
 
         # 定义集合Schema
         fields = [
             FieldSchema(name="id", dtype=DataType.VARCHAR, max_length=100, is_primary=True),
-            FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=65535),
+            FieldSchema(
+                name="content",
+                dtype=DataType.VARCHAR,
+                max_length=65535,
+                enable_analyzer=True,
+                analyzer_params={"type": TEXT_ANALYZER},
+            ),
             FieldSchema(name="source", dtype=DataType.VARCHAR, max_length=500),
             FieldSchema(name="chunk_id", dtype=DataType.VARCHAR, max_length=100),
-            FieldSchema(name="file_id", dtype=DataType.VARCHAR, max_length=100),
+            FieldSchema(
+                name="file_id",
+                dtype=DataType.VARCHAR,
+                max_length=100,
+                is_partition_key=partition_key == "file_id",
+            ),
             FieldSchema(name="chunk_index", dtype=DataType.INT64),
             FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=embedding_dim),
+            FieldSchema(name=SPARSE_FIELD, dtype=DataType.SPARSE_FLOAT_VECTOR),
         ]
 
+        # 写入时由 Milvus 对 content 分词并生成 BM25 稀疏向量
+        bm25_function = Function(
+            name="content_bm25",
+            function_type=FunctionType.BM25,
+            input_field_names=["content"],
+            output_field_names=[SPARSE_FIELD],
+        )
+
         schema = CollectionSchema(
-            fields=fields, description=f"Knowledge base collection for {db_id} using {model_name}"
+            fields=fields,
+            functions=[bm25_function],
+            description=f"Knowledge base collection for {db_id} using {model_name}",
         )
 
         # 创建集合
-        collection = Collection(name=collection_name, schema=schema, using=self.connection_alias)
+        collection_kwargs = {"num_partitions": NUM_PARTITIONS} if partition_key else {}
+        collection = Collection(name=collection_name, schema=schema, using=self.connection_alias, **collection_kwargs)
 
         # 创建索引
-        index_params = {"metric_type": "COSINE", "index_type": "IVF_FLAT", "params": {"nlist": 1024}}
-        collection.create_index("embedding", index_params)
-
-        logger.info(f"Created new Milvus collection: {collection_name} '{model_name=}', {embedding_dim=}")
+        index_type = resolve_index_type(self._get_index_profile(db_id), 0)
+        collection.create_index("embedding", build_index_params(index_type, 0, embedding_dim))
+        sparse_index_params = {
+            "metric_type": "BM25",
+            "index_type": "SPARSE_INVERTED_INDEX",
+            "params": {"inverted_index_algo": "DAAT_MAXSCORE"},
+        }
+        collection.create_index(SPARSE_FIELD, sparse_index_params)
+        self._ensure_scalar_indexes(collection)
+
+        logger.info(
+            f"Created new Milvus collection: {collection_name} '{model_name=}', {embedding_dim=}, "
+            f"{index_type=}, {partition_key=}"
+        )
 
         return collection
 
-    async def _initialize_kb_instance(self, instance: Any) -> None:
-        """初始化 Milvus 集合（加载到内存）"""
+    def _get_partition_key(self, db_id: str) -> str | None:
+        """知识库创建时选择的分区键字段（additional_params.partition_key），默认不分区"""
+        metadata = self.databases_meta.get(db_id, {}).get("metadata") or {}
+        partition_key = metadata.get("partition_key")
+        return partition_key if partition_key in PARTITION_KEY_FIELDS else None
+
+    def _ensure_scalar_indexes(self, collection: Collection) -> None:
+        """为过滤字段补建标量索引（旧集合首次加载时也会补建）"""
+        indexed_fields = {index.field_name for index in collection.indexes}
+        for field_name, index_type in SCALAR_INDEXES.items():
+            if field_name in indexed_fields:
+                continue
+            try:
+                collection.create_index(field_name, {"index_type": index_type}, index_name=f"{field_name}_idx")
+                logger.info(f"Created {index_type} scalar index on {collection.name}.{field_name}")
+            except Exception as e:
+                logger.warning(f"Failed to create scalar index on {collection.name}.{field_name}: {e}")
+
+    def _build_file_expr(self, db_id: str, params: dict) -> str | None:
+        """
+        构建文件过滤表达式
+
+        优先下推为 file_id in [...]（走倒排索引、分区键裁剪），文件名无法解析时回退到 source like 模糊匹配。
+        过滤条件只会缩小检索范围：文件夹始终限定为其中的文件，解析为空时返回恒假表达式。
+        """
+        file_ids = params.get("file_ids")
+        file_name = params.get("file_name")
+        folder_id = params.get("folder_id")
+
+        if not file_ids and (file_name or folder_id):
+            file_ids = resolve_filter_file_ids(self.files_meta, db_id, file_name, folder_id)
+            if file_ids is None:
+                like_expr = self._build_source_like_expr(file_name)
+                if not folder_id:
+                    return like_expr
+                folder_file_ids = resolve_filter_file_ids(self.files_meta, db_id, folder_id=folder_id)
+                if not folder_file_ids:
+                    return NO_MATCH_EXPR
+                return f"{build_file_ids_expr(folder_file_ids)} and {like_expr}"
+            if not file_ids:
+                # 空文件夹：不能当作"不过滤"，否则会检索整个知识库
+                return NO_MATCH_EXPR
+
+        if file_ids:
+            return build_file_ids_expr(list(file_ids))
+        return None
+
+    @staticmethod
+    def _build_source_like_expr(file_name: str) -> str:
+        safe_file_name = file_name.replace('"', '\\"')
+        if "%" not in safe_file_name:
+            return f'source like "%{safe_file_name}%"'
+        return f'source like "{safe_file_name}"'
+
+    def _get_index_profile(self, db_id: str) -> str:
+        """知识库创建时选择的索引档位（additional_params.index_profile），默认 auto"""
+        metadata = self.databases_meta.get(db_id, {}).get("metadata") or {}
+        return normalize_index_profile(metadata.get("index_profile"))
+
+    def _get_index_type(self, db_id: str, collection: Collection) -> str:
+        """集合当前向量索引类型"""
+        if db_id not in self._index_types:
+            index_type = "FLAT"
+            for index in collection.indexes:
+                if index.field_name == "embedding":
+                    index_type = index.params.get("index_type", "IVF_FLAT")
+            self._index_types[db_id] = index_type
+        return self._index_types[db_id]
+
+    def _rebuild_vector_index(self, collection: Collection, index_type: str, row_count: int, reload: bool) -> None:
+        """重建向量索引（需先释放集合，重建期间该知识库不可检索），结束后（含失败）按需重新加载集合"""
+        dim = next(field.params.get("dim", 1024) for field in collection.schema.fields if field.name == "embedding")
+        collection.release()
         try:
-            instance.load()
-            logger.info("Milvus collection loaded into memory")
-        except Exception as e:
-            logger.warning(f"Failed to load collection into memory: {e}")
+            for index in collection.indexes:
+                if index.field_name == "embedding":
+                    collection.drop_index(index_name=index.index_name)
+            collection.create_index("embedding", build_index_params(index_type, row_count, dim))
+        finally:
+            if reload:
+                collection.load()
+
+    async def _maybe_reindex(self, db_id: str, collection: Collection, force: bool = False) -> str | None:
+        """数据量跨过档位阈值（或档位变更）时重建索引，返回新的索引类型"""
+        lock = self._reindex_locks.setdefault(db_id, asyncio.Lock())
+        if lock.locked():
+            return None
+
+        async with lock:
+            try:
+                row_count = await asyncio.to_thread(lambda: collection.num_entities)
+                current = self._get_index_type(db_id, collection)
+                target = resolve_index_type(self._get_index_profile(db_id), row_count)
+                if target == current and not force:
+                    return None
+
+                logger.info(f"Rebuilding vector index for {db_id}: {current} -> {target}, rows={row_count}")
+                start = time.time()
+                # 重建时集合被释放：先移除驻留登记，下次访问时由驻留管理器重新加载并登记
+                was_resident = self._residency.is_resident(db_id)
+                self._residency.discard(db_id)
+                self._index_types.pop(db_id, None)
+                await asyncio.to_thread(self._rebuild_vector_index, collection, target, row_count, was_resident)
+                self._index_types[db_id] = target
+                logger.info(f"Rebuilt vector index for {db_id} in {time.time() - start:.1f}s")
+                return target
+            except Exception as e:
+                self._index_types.pop(db_id, None)
+                logger.error(f"Failed to rebuild vector index for {db_id}: {e}, {traceback.format_exc()}")
+                return None
+
+    def _schedule_reindex(self, db_id: str, collection: Collection) -> asyncio.Task:
+        """入库后在后台检查是否需要按数据量重建索引，不阻塞入库流程"""
+        task = asyncio.create_task(self._maybe_reindex(db_id, collection))
+        self._reindex_tasks.add(task)
+        task.add_done_callback(self._reindex_tasks.discard)
+        return task
+
+    async def rebuild_vector_index(self, db_id: str, profile: str | None = None) -> dict:
+        """
+        按指定档位（或当前档位）重建向量索引
+
+        Args:
+            db_id: 知识库ID
+            profile: auto / FLAT / HNSW / IVF_SQ8 / IVF_PQ / DISKANN，不传则保持原档位
+
+        Returns:
+            {"db_id", "profile", "index_type"}
+        """
+        if db_id not in self.databases_meta:
+            raise ValueError(f"Database {db_id} not found")
+
+        collection = await self._get_milvus_collection(db_id)
+        if not collection:
+            raise ValueError(f"Failed to get Milvus collection for {db_id}")
+
+        if profile is not None:
+            profile = normalize_index_profile(profile)
+            metadata = self.databases_meta[db_id].setdefault("metadata", {})
+            metadata["index_profile"] = profile
+
+            from src.repositories.knowledge_base_repository import KnowledgeBaseRepository
+
+            await KnowledgeBaseRepository().update(db_id, {"additional_params": dict(metadata)})
+
+        index_type = await self._maybe_reindex(db_id, collection, force=True)
+        if index_type is None:
+            raise RuntimeError(f"Vector index rebuild for {db_id} failed or is already running")
+        return {"db_id": db_id, "profile": self._get_index_profile(db_id), "index_type": index_type}
+
+    async def _initialize_kb_instance(self, instance: Any) -> None:
+        """初始化 Milvus 集合（不再立即加载，由驻留管理器在访问时按需加载）"""
+
+    def _estimate_collection_bytes(self, db_id: str, collection: Collection) -> int:
+        """估算集合加载后的内存占用"""
+        dim = next(field.params.get("dim", 1024) for field in collection.schema.fields if field.name == "embedding")
+        return estimate_collection_bytes(collection.num_entities, dim, self._get_index_type(db_id, collection))
+
+    async def _adopt_loaded_collections(self) -> None:
+        """登记服务启动前已在 Milvus 中加载的集合，使其参与内存预算与淘汰"""
+        if self._adopted_loaded or self._residency.budget_bytes <= 0:
+            return
+        self._adopted_loaded = True
+
+        def _scan() -> list[tuple[str, Collection, int]]:
+            loaded = []
+            for db_id in list(self.databases_meta):
+                try:
+                    if not utility.has_collection(db_id, using=self.connection_alias):
+                        continue
+                    if utility.load_state(db_id, using=self.connection_alias) != LoadState.Loaded:
+                        continue
+                    collection = self.collections.get(db_id) or Collection(name=db_id, using=self.connection_alias)
+                    loaded.append((db_id, collection, self._estimate_collection_bytes(db_id, collection)))
+                except Exception as e:
+                    logger.debug(f"Failed to check load state of {db_id}: {e}")
+            return loaded
+
+        for db_id, collection, size_bytes in await asyncio.to_thread(_scan):
+            self._residency.adopt(db_id, collection, size_bytes)
+
+    def get_residency_stats(self) -> dict:
+        """集合加载 / 淘汰统计，用于评估 Milvus query node 内存规格"""
+        return self._residency.get_stats()
 
     def _get_async_embedding(self, embed_info: dict):
         """获取 embedding 函数"""
@@ -199,32 +545,155 @@ class MilvusKB(KnowledgeBase):
 
         return partial(embedding_model.batch_encode, batch_size=40)
 
-    async def _get_milvus_collection(self, db_id: str):
-        """获取或创建 Milvus 集合"""
-        if db_id in self.collections:
-            return self.collections[db_id]
+    def get_embedding_key(self, db_id: str) -> str:
+        """知识库所用 embedding 模型的标识，多知识库检索时同一模型只向量化一次"""
+        embed_info = self.databases_meta.get(db_id, {}).get("embed_info") or {}
+        return embed_info.get("model_id") or embed_info.get("name") or "default"
 
-        if db_id not in self.databases_meta:
-            return None
+    async def aembed_query(self, db_id: str, query_text: str) -> list[list[float]]:
+        """使用知识库的 embedding 模型向量化查询"""
+        embed_info = self.databases_meta.get(db_id, {}).get("embed_info", {})
+        return await self._get_async_embedding_function(embed_info)([query_text])
 
-        try:
-            # 创建集合
-            collection = await self._create_kb_instance(db_id, {})
-            await self._initialize_kb_instance(collection)
+    async def _get_milvus_collection(self, db_id: str):
+        """获取或创建 Milvus 集合，并确保集合已加载（超出内存预算时释放冷集合）"""
+        collection = self.collections.get(db_id)
+        if collection is None:
+            if db_id not in self.databases_meta:
+                return None
 
-            self.collections[db_id] = collection
-            return collection
+            try:
+                # 创建集合
+                collection = await self._create_kb_instance(db_id, {})
+                await self._initialize_kb_instance(collection)
+                self.collections[db_id] = collection
+            except Exception as e:
+                logger.error(f"Failed to create Milvus collection for {db_id}: {e}")
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                return None
 
+        try:
+            await self._adopt_loaded_collections()
+            await self._residency.acquire(
+                db_id, collection, partial(self._estimate_collection_bytes, db_id, collection)
+            )
         except Exception as e:
-            logger.error(f"Failed to create Milvus collection for {db_id}: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return None
+            logger.warning(f"Failed to load collection {db_id} into memory: {e}")
+        return collection
 
     def _split_text_into_chunks(self, text: str, file_id: str, filename: str, params: dict) -> list[dict]:
         """将文本分割成块"""
         return split_text_into_chunks(text, file_id, filename, params)
 
-    async def index_file(self, db_id: str, file_id: str, operator_id: str | None = None) -> dict:
+    @staticmethod
+    def _build_rows(chunks: list[dict], embeddings: list) -> list[dict]:
+        """构建按行插入的数据（BM25 稀疏向量由 Milvus 自动生成，无需写入）"""
+        return [
+            {
+                "id": chunk["id"],
+                "content": chunk["content"],
+                "source": chunk["source"],
+                "chunk_id": chunk["chunk_id"],
+                "file_id": chunk["file_id"],
+                "chunk_index": chunk["chunk_index"],
+                "embedding": embedding,
+            }
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+
+    @staticmethod
+    def _supports_bm25(collection: Collection) -> bool:
+        """集合是否已建立 BM25 全文索引（旧集合需先迁移）"""
+        return any(field.name == SPARSE_FIELD for field in collection.schema.fields)
+
+    @staticmethod
+    def _hit_to_chunk(hit: Any) -> dict:
+        entity = hit.entity
+        metadata = {
+            "source": entity.get("source", "未知来源"),
+            "chunk_id": entity.get("chunk_id"),
+            "file_id": entity.get("file_id"),
+            "chunk_index": entity.get("chunk_index"),
+        }
+        return {"content": entity.get("content", ""), "metadata": metadata}
+
+    async def migrate_collection_to_bm25(self, db_id: str, batch_size: int = 1000) -> dict:
+        """
+        将旧集合迁移为带 BM25 全文索引的新结构
+
+        复制全部数据（含已有向量，无需重新 embedding）到临时集合，然后把旧集合重命名为备份、
+        临时集合重命名为正式名称，切换成功后才删除备份；切换失败时恢复备份。
+        若进程在两次重命名之间中断，重新执行迁移会先恢复备份集合。迁移期间请勿向该知识库导入文件。
+
+        Returns:
+            {"db_id", "status": "migrated"|"skipped", "rows"}
+        """
+        if db_id not in self.databases_meta:
+            raise ValueError(f"Database {db_id} not found")
+
+        temp_name = f"{db_id}_bm25_migrating"
+        backup_name = f"{db_id}_bm25_backup"
+
+        def _restore_backup() -> None:
+            if utility.has_collection(backup_name, using=self.connection_alias) and not utility.has_collection(
+                db_id, using=self.connection_alias
+            ):
+                utility.rename_collection(backup_name, db_id, using=self.connection_alias)
+                logger.warning(f"Restored Milvus collection {db_id} from interrupted BM25 migration backup")
+
+        await asyncio.to_thread(_restore_backup)
+
+        collection = await self._get_milvus_collection(db_id)
+        if not collection:
+            raise ValueError(f"Failed to get Milvus collection for {db_id}")
+        if self._supports_bm25(collection):
+            return {"db_id": db_id, "status": "skipped", "rows": 0}
+
+        embed_info = self.databases_meta[db_id].get("embed_info") or config.embed_model_names[config.embed_model]
+
+        def _migrate() -> tuple[Collection, int]:
+            for name in (temp_name, backup_name):
+                if utility.has_collection(name, using=self.connection_alias):
+                    utility.drop_collection(name, using=self.connection_alias)
+            new_collection = self._create_new_collection(temp_name, embed_info, db_id)
+
+            copied = 0
+            copy_fields = ["id", *OUTPUT_FIELDS, "embedding"]
+            iterator = collection.query_iterator(batch_size=batch_size, expr='id != ""', output_fields=copy_fields)
+            try:
+                while rows := iterator.next():
+                    new_collection.insert([{key: row[key] for key in copy_fields} for row in rows])
+                    copied += len(rows)
+            finally:
+                iterator.close()
+            new_collection.flush()
+
+            # 先把旧集合改名为备份，新集合就位后再删除备份，任一步失败都不会丢失数据
+            utility.rename_collection(db_id, backup_name, using=self.connection_alias)
+            try:
+                utility.rename_collection(temp_name, db_id, using=self.connection_alias)
+            except Exception:
+                utility.rename_collection(backup_name, db_id, using=self.connection_alias)
+                raise
+            utility.drop_collection(backup_name, using=self.connection_alias)
+            return Collection(name=db_id, using=self.connection_alias), copied
+
+        migrated_collection, rows = await asyncio.to_thread(_migrate)
+        # 旧集合已删除，新集合在下次访问时由驻留管理器加载
+        self._residency.discard(db_id)
+        self.collections[db_id] = migrated_collection
+        self._index_types.pop(db_id, None)
+        await self._maybe_reindex(db_id, migrated_collection)
+        logger.info(f"Migrated Milvus collection {db_id} to BM25 full-text index, rows={rows}")
+        return {"db_id": db_id, "status": "migrated", "rows": rows}
+
+    async def index_file(
+        self,
+        db_id: str,
+        file_id: str,
+        operator_id: str | None = None,
+        progress_callback: IndexProgressCallback | None = None,
+    ) -> dict:
         """
         Index parsed file (Status: INDEXING -> INDEXED/ERROR_INDEXING)
 
@@ -232,6 +701,7 @@ class MilvusKB(KnowledgeBase):
             db_id: Database ID
             file_id: File ID
             operator_id: ID of the user performing the operation
+            progress_callback: Optional async callback receiving (stage, message)
 
         Returns:
             Updated file metadata
@@ -296,6 +766,8 @@ class MilvusKB(KnowledgeBase):
             filename = file_meta.get("filename")
 
             # Split
+            if progress_callback:
+                await progress_callback("chunking", "分块中")
             chunks = self._split_text_into_chunks(markdown_content, file_id, filename, params)
             logger.info(
                 f"Split {filename} into {len(chunks)} chunks with params: "
@@ -305,18 +777,12 @@ class MilvusKB(KnowledgeBase):
             )
 
             if chunks:
+                if progress_callback:
+                    await progress_callback("embedding", f"向量化中（{len(chunks)} 个分块）")
                 texts = [chunk["content"] for chunk in chunks]
                 embeddings = await embedding_function(texts)
 
-                entities = [
-                    [chunk["id"] for chunk in chunks],
-                    [chunk["content"] for chunk in chunks],
-                    [chunk["source"] for chunk in chunks],
-                    [chunk["chunk_id"] for chunk in chunks],
-                    [chunk["file_id"] for chunk in chunks],
-                    [chunk["chunk_index"] for chunk in chunks],
-                    embeddings,
-                ]
+                entities = self._build_rows(chunks, embeddings)
 
                 # Clean up existing chunks if any (for re-indexing)
                 await self.delete_file_chunks_only(db_id, file_id)
@@ -327,6 +793,7 @@ class MilvusKB(KnowledgeBase):
                 await asyncio.to_thread(_insert_records)
 
             logger.info(f"Indexed file {file_id} into Milvus")
+            self._schedule_reindex(db_id, collection)
 
             # Update status
             async with self._metadata_lock:
@@ -335,7 +802,7 @@ class MilvusKB(KnowledgeBase):
                 if operator_id:
                     self.files_meta[file_id]["updated_by"] = operator_id
                 await self._save_metadata()
-                
+
                 return self.files_meta[file_id]
 
         except asyncio.CancelledError as e:
@@ -436,15 +903,7 @@ class MilvusKB(KnowledgeBase):
                     texts = [chunk["content"] for chunk in chunks]
                     embeddings = await embedding_function(texts)
 
-                    entities = [
-                        [chunk["id"] for chunk in chunks],
-                        [chunk["content"] for chunk in chunks],
-                        [chunk["source"] for chunk in chunks],
-                        [chunk["chunk_id"] for chunk in chunks],
-                        [chunk["file_id"] for chunk in chunks],
-                        [chunk["chunk_index"] for chunk in chunks],
-                        embeddings,
-                    ]
+                    entities = self._build_rows(chunks, embeddings)
 
                     def _insert_records():
                         collection.insert(entities)
@@ -452,6 +911,7 @@ class MilvusKB(KnowledgeBase):
                     await asyncio.to_thread(_insert_records)
 
                 logger.info(f"Updated {content_type} {file_path} in Milvus. Done.")
+                self._schedule_reindex(db_id, collection)
 
                 # 更新元数据状态
                 async with self._metadata_lock:
@@ -484,12 +944,162 @@ class MilvusKB(KnowledgeBase):
 
         return processed_items_info
 
+    def _bm25_search(self, collection: Collection, query_text: str, limit: int, expr: str | None) -> list[dict]:
+        """BM25 全文检索，分数按本次结果最大值归一化到 0-1"""
+        results = collection.search(
+            data=[query_text],
+            anns_field=SPARSE_FIELD,
+            param={"metric_type": "BM25"},
+            limit=limit,
+            expr=expr,
+            output_fields=OUTPUT_FIELDS,
+        )
+        hits = list(results[0]) if results else []
+        max_score = max((hit.distance for hit in hits), default=0.0)
+
+        chunks = []
+        for hit in hits:
+            chunk = self._hit_to_chunk(hit)
+            score = hit.distance / max_score if max_score > 0 else 0.0
+            chunk.update({"score": score, "keyword_score": score, "bm25_score": hit.distance})
+            chunks.append(chunk)
+        return chunks
+
+    def _hybrid_search(
+        self,
+        collection: Collection,
+        query_text: str,
+        query_embedding: list,
+        search_params: dict,
+        vector_limit: int,
+        keyword_limit: int,
+        expr: str | None,
+        similarity_threshold: float = 0.0,
+    ) -> list[dict]:
+        """
+        向量 + BM25 混合检索，使用 RRF 融合两路排名
+
+        相似度阈值以 range search 的 radius 下推到向量一路；score 为 RRF 分数除以两路均排第一时的最大值（0-1），
+        原始融合分数保留在 rrf_score。
+        """
+        dense_params = search_params
+        radius = similarity_radius(search_params.get("metric_type", "COSINE"), similarity_threshold)
+        if radius is not None:
+            dense_params = {**search_params, "params": {**search_params.get("params", {}), "radius": radius}}
+
+        requests = [
+            AnnSearchRequest(
+                data=query_embedding, anns_field="embedding", param=dense_params, limit=vector_limit, expr=expr
+            ),
+            AnnSearchRequest(
+                data=[query_text],
+                anns_field=SPARSE_FIELD,
+                param={"metric_type": "BM25"},
+                limit=keyword_limit,
+                expr=expr,
+            ),
+        ]
+        results = collection.hybrid_search(
+            reqs=requests,
+            rerank=RRFRanker(RRF_K),
+            limit=max(vector_limit, keyword_limit),
+            output_fields=OUTPUT_FIELDS,
+        )
+
+        max_rrf_score = len(requests) / (RRF_K + 1)
+        chunks = []
+        for hit in results[0] if results else []:
+            chunk = self._hit_to_chunk(hit)
+            chunk.update({"score": min(hit.distance / max_rrf_score, 1.0), "rrf_score": hit.distance})
+            chunks.append(chunk)
+        return chunks
+
+    def _legacy_keyword_query(
+        self, collection: Collection, query_text: str, limit: int, expr: str | None
+    ) -> list[dict]:
+        """未迁移到 BM25 的旧集合：使用 like 匹配并按关键词出现次数打分"""
+        raw_keywords = re.split(r"[\s,，;；]+", str(query_text))
+        keywords = [kw.strip() for kw in raw_keywords if kw and kw.strip()]
+        if not keywords:
+            return []
+
+        keyword_clauses = []
+        for kw in keywords:
+            safe_kw = kw.replace('"', '\\"')
+            keyword_clauses.append(f'content like "%{safe_kw}%"')
+
+        keyword_expr = " or ".join(keyword_clauses)
+        if expr:
+            keyword_expr = f"({keyword_expr}) and ({expr})"
+
+        results = collection.query(expr=keyword_expr, output_fields=OUTPUT_FIELDS, limit=limit)
+
+        keyword_scores = []
+        for result in results or []:
+            text_lower = result.get("content", "").lower()
+            match_count = sum(text_lower.count(kw.lower()) for kw in keywords if kw)
+            if match_count <= 0:
+                continue
+
+            metadata = {
+                "source": result.get("source", "未知来源"),
+                "chunk_id": result.get("chunk_id"),
+                "file_id": result.get("file_id"),
+                "chunk_index": result.get("chunk_index"),
+            }
+            keyword_scores.append((result, metadata, match_count))
+
+        keyword_results = []
+        if keyword_scores:
+            max_count = max(item[2] for item in keyword_scores)
+            for result, metadata, match_count in keyword_scores:
+                score = match_count / max_count if max_count > 0 else 0.0
+                keyword_results.append(
+                    {
+                        "content": result.get("content", ""),
+                        "metadata": metadata,
+                        "score": score,
+                        "keyword_score": score,
+                    }
+                )
+            keyword_results.sort(key=lambda item: item.get("score", 0.0), reverse=True)
+        return keyword_results
+
+    @staticmethod
+    def _merge_legacy_hybrid(vector_results: list[dict], keyword_results: list[dict]) -> list[dict]:
+        """旧集合的混合检索：按 chunk_id 合并两路结果，取较高分数"""
+        merged: dict[str, dict] = {}
+        for item in vector_results:
+            chunk_id = item.get("metadata", {}).get("chunk_id")
+            if chunk_id:
+                merged[chunk_id] = item
+            else:
+                merged[id(item)] = item
+
+        for item in keyword_results:
+            chunk_id = item.get("metadata", {}).get("chunk_id")
+            if chunk_id in merged:
+                existing = merged[chunk_id]
+                keyword_score = item.get("keyword_score", item.get("score", 0.0))
+                existing_score = existing.get("score", 0.0)
+                existing["score"] = max(existing_score, keyword_score)
+                existing["keyword_score"] = keyword_score
+            else:
+                merged[chunk_id or id(item)] = item
+
+        retrieved_chunks = list(merged.values())
+        retrieved_chunks.sort(key=lambda item: item.get("score", 0.0), reverse=True)
+        return retrieved_chunks
+
     async def aquery(self, query_text: str, db_id: str, agent_call: bool = False, **kwargs) -> list[dict]:
         """异步查询知识库"""
         collection = await self._get_milvus_collection(db_id)
         if not collection:
             raise ValueError(f"Database {db_id} not found")
 
+        # 多知识库检索时由调用方预先计算好的查询向量
+        precomputed_embedding = kwargs.pop("query_embedding", None)
+
         query_params = self._get_query_params(db_id)
         # 合并查询参数：kwargs（临时参数）优先级高于 query_params（持久化参数）
         # 这样允许用户在单次查询中临时覆盖持久化配置
@@ -514,137 +1124,83 @@ class MilvusKB(KnowledgeBase):
             else:
                 recall_top_k = final_top_k
 
-            # 构建过滤表达式（文件名）
-            file_expr = None
-            if file_name := merged_kwargs.get("file_name"):
-                safe_file_name = file_name.replace('"', '\\"')
-                if "%" not in safe_file_name:
-                    file_expr = f'source like "%{safe_file_name}%"'
-                else:
-                    file_expr = f'source like "{safe_file_name}"'
+            # 构建过滤表达式（文件 / 文件夹）
+            file_expr = self._build_file_expr(db_id, merged_kwargs)
+            if file_expr == NO_MATCH_EXPR:
+                return []
+            if file_expr:
                 logger.debug(f"Using filter expression: {file_expr}")
 
-            vector_results: list[dict] = []
-            if search_mode in {"vector", "hybrid"}:
+            keyword_top_k = max(int(merged_kwargs.get("keyword_top_k", final_top_k)), 1)
+            use_bm25 = search_mode != "vector" and self._supports_bm25(collection)
+            search_params = build_search_params(
+                self._get_index_type(db_id, collection), metric_type, recall_top_k, merged_kwargs
+            )
+
+            query_embedding = precomputed_embedding
+            if search_mode in {"vector", "hybrid"} and query_embedding is None:
                 embed_info = self.databases_meta[db_id].get("embed_info", {})
                 embedding_function = self._get_embedding_function(embed_info)
                 query_embedding = embedding_function([query_text])
 
-                search_params = {"metric_type": metric_type, "params": {"nprobe": 10}}
-
-                results = collection.search(
-                    data=query_embedding,
-                    anns_field="embedding",
-                    param=search_params,
-                    limit=recall_top_k,
-                    expr=file_expr,
-                    output_fields=["content", "source", "chunk_id", "file_id", "chunk_index"],
+            if search_mode == "hybrid" and use_bm25:
+                # 向量检索与 BM25 全文检索在 Milvus 端完成 RRF 融合
+                retrieved_chunks = await asyncio.to_thread(
+                    self._hybrid_search,
+                    collection,
+                    query_text,
+                    query_embedding,
+                    search_params,
+                    recall_top_k,
+                    keyword_top_k,
+                    file_expr,
+                    similarity_threshold,
                 )
+                logger.debug(f"Milvus hybrid query response: {len(retrieved_chunks)} chunks found")
+            else:
+                vector_results: list[dict] = []
+                if search_mode in {"vector", "hybrid"}:
+                    results = collection.search(
+                        data=query_embedding,
+                        anns_field="embedding",
+                        param=search_params,
+                        limit=recall_top_k,
+                        expr=file_expr,
+                        output_fields=OUTPUT_FIELDS,
+                    )
 
-                if results and len(results) > 0 and len(results[0]) > 0:
-                    for hit in results[0]:
-                        similarity = hit.distance if metric_type == "COSINE" else 1 / (1 + hit.distance)
-                        if similarity < similarity_threshold:
-                            continue
-
-                        entity = hit.entity
-                        metadata = {
-                            "source": entity.get("source", "未知来源"),
-                            "chunk_id": entity.get("chunk_id"),
-                            "file_id": entity.get("file_id"),
-                            "chunk_index": entity.get("chunk_index"),
-                        }
-
-                        chunk = {"content": entity.get("content", ""), "metadata": metadata, "score": similarity}
-                        if include_distances:
-                            chunk["distance"] = hit.distance
-                        vector_results.append(chunk)
-
-                logger.debug(
-                    f"Milvus vector query response: {len(vector_results)} chunks found (after similarity filtering)"
-                )
+                    if results and len(results) > 0 and len(results[0]) > 0:
+                        for hit in results[0]:
+                            similarity = hit.distance if metric_type == "COSINE" else 1 / (1 + hit.distance)
+                            if similarity < similarity_threshold:
+                                continue
 
-            keyword_results: list[dict] = []
-            if search_mode in {"keyword", "hybrid"}:
-                keyword_top_k = int(merged_kwargs.get("keyword_top_k", final_top_k))
-                keyword_top_k = max(keyword_top_k, 1)
-                raw_keywords = re.split(r"[\s,，;；]+", str(query_text))
-                keywords = [kw.strip() for kw in raw_keywords if kw and kw.strip()]
-
-                if keywords:
-                    keyword_clauses = []
-                    for kw in keywords:
-                        safe_kw = kw.replace('"', '\\"')
-                        keyword_clauses.append(f'content like "%{safe_kw}%"')
-
-                    keyword_expr = " or ".join(keyword_clauses)
-                    if file_expr:
-                        keyword_expr = f"({keyword_expr}) and ({file_expr})"
-
-                    results = collection.query(
-                        expr=keyword_expr,
-                        output_fields=["content", "source", "chunk_id", "file_id", "chunk_index"],
-                        limit=keyword_top_k,
+                            chunk = self._hit_to_chunk(hit)
+                            chunk["score"] = similarity
+                            if include_distances:
+                                chunk["distance"] = hit.distance
+                            vector_results.append(chunk)
+
+                    logger.debug(
+                        f"Milvus vector query response: {len(vector_results)} chunks found (after similarity filtering)"
                     )
 
-                    keyword_scores = []
-                    for result in results or []:
-                        content = result.get("content", "")
-                        text_lower = content.lower()
-                        match_count = sum(text_lower.count(kw.lower()) for kw in keywords if kw)
-                        if match_count <= 0:
-                            continue
-
-                        metadata = {
-                            "source": result.get("source", "未知来源"),
-                            "chunk_id": result.get("chunk_id"),
-                            "file_id": result.get("file_id"),
-                            "chunk_index": result.get("chunk_index"),
-                        }
-                        keyword_scores.append((result, metadata, match_count))
-
-                    if keyword_scores:
-                        max_count = max(item[2] for item in keyword_scores)
-                        for result, metadata, match_count in keyword_scores:
-                            score = match_count / max_count if max_count > 0 else 0.0
-                            keyword_results.append(
-                                {
-                                    "content": result.get("content", ""),
-                                    "metadata": metadata,
-                                    "score": score,
-                                    "keyword_score": score,
-                                }
-                            )
-                        keyword_results.sort(key=lambda item: item.get("score", 0.0), reverse=True)
-
-                logger.debug(f"Milvus keyword query response: {len(keyword_results)} chunks found")
-
-            if search_mode == "vector":
-                retrieved_chunks = vector_results
-            elif search_mode == "keyword":
-                retrieved_chunks = keyword_results
-            else:
-                merged: dict[str, dict] = {}
-                for item in vector_results:
-                    chunk_id = item.get("metadata", {}).get("chunk_id")
-                    if chunk_id:
-                        merged[chunk_id] = item
+                keyword_results: list[dict] = []
+                if search_mode in {"keyword", "hybrid"}:
+                    if use_bm25:
+                        keyword_results = await asyncio.to_thread(
+                            self._bm25_search, collection, query_text, keyword_top_k, file_expr
+                        )
                     else:
-                        merged[id(item)] = item
-
-                for item in keyword_results:
-                    chunk_id = item.get("metadata", {}).get("chunk_id")
-                    if chunk_id in merged:
-                        existing = merged[chunk_id]
-                        keyword_score = item.get("keyword_score", item.get("score", 0.0))
-                        existing_score = existing.get("score", 0.0)
-                        existing["score"] = max(existing_score, keyword_score)
-                        existing["keyword_score"] = keyword_score
-                    else:
-                        merged[chunk_id or id(item)] = item
+                        keyword_results = self._legacy_keyword_query(collection, query_text, keyword_top_k, file_expr)
+                    logger.debug(f"Milvus keyword query response: {len(keyword_results)} chunks found")
 
-                retrieved_chunks = list(merged.values())
-                retrieved_chunks.sort(key=lambda item: item.get("score", 0.0), reverse=True)
+                if search_mode == "vector":
+                    retrieved_chunks = vector_results
+                elif search_mode == "keyword":
+                    retrieved_chunks = keyword_results
+                else:
+                    retrieved_chunks = self._merge_legacy_hybrid(vector_results, keyword_results)
 
             if not retrieved_chunks:
                 return []
@@ -836,6 +1392,8 @@ class MilvusKB(KnowledgeBase):
                 logger.info(f"Milvus collection {db_id} does not exist, skipping")
         except Exception as e:
             logger.error(f"Failed to drop Milvus collection {db_id}: {e}")
+        self.collections.pop(db_id, None)
+        self._residency.discard(db_id)
 
         # Call base method to delete local files and metadata
         return super().delete_database(db_id)
@@ -851,8 +1409,8 @@ class MilvusKB(KnowledgeBase):
                 "default": "vector",
                 "options": [
                     {"value": "vector", "label": "向量检索", "description": "仅使用向量相似度检索"},
-                    {"value": "keyword", "label": "关键词检索", "description": "仅使用关键词匹配检索"},
-                    {"value": "hybrid", "label": "混合检索", "description": "向量检索与关键词检索融合"},
+                    {"value": "keyword", "label": "关键词检索", "description": "BM25 全文检索（中文分词）"},
+                    {"value": "hybrid", "label": "混合检索", "description": "向量检索与 BM25 全文检索按 RRF 融合排序"},
                 ],
                 "description": "选择检索模式",
             },
@@ -884,6 +1442,33 @@ class MilvusKB(KnowledgeBase):
                 "max": 200,
                 "description": "关键词/混合检索时的候选数量",
             },
+            {
+                "key": "hnsw_ef",
+                "label": "HNSW 搜索宽度（ef）",
+                "type": "number",
+                "default": DEFAULT_HNSW_EF,
+                "min": 16,
+                "max": 512,
+                "description": "HNSW 索引检索时的候选队列长度，越大召回越高、速度越慢（不小于召回数量）",
+            },
+            {
+                "key": "ivf_nprobe",
+                "label": "IVF 探测分桶数（nprobe）",
+                "type": "number",
+                "default": DEFAULT_IVF_NPROBE,
+                "min": 1,
+                "max": 256,
+                "description": "IVF_SQ8 / IVF_PQ 索引检索时探测的聚类桶数，越大召回越高、速度越慢",
+            },
+            {
+                "key": "diskann_search_list",
+                "label": "DiskANN 搜索列表长度",
+                "type": "number",
+                "default": DEFAULT_DISKANN_SEARCH_LIST,
+                "min": 16,
+                "max": 1000,
+                "description": "DiskANN 索引检索时的候选列表长度（不小于召回数量）",
+            },
             {
                 "key": "include_distances",
                 "label": "显示相似度",
@@ -1,5 +1,4 @@
 import asyncio
-import base64
 import io
 import os
 import re
@@ -8,8 +7,6 @@ import zipfile
 from pathlib import Path
 
 import aiofiles
-from docling.datamodel.base_models import InputFormat
-from docling.document_converter import DocumentConverter
 from langchain_community.document_loaders import (
     CSVLoader,
     JSONLoader,
@@ -23,6 +20,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from markdownify import markdownify as md_convert
 from openpyxl import load_workbook
 
+from src.knowledge.services.docling_service import docling_service
 from src.knowledge.utils import calculate_content_hash
 from src.storage.minio import get_minio_client
 from src.utils import hashstr, logger
@@ -55,120 +53,6 @@ def is_supported_file_extension(file_name: str | os.PathLike[str]) -> bool:
     return Path(file_name).suffix.lower() in SUPPORTED_FILE_EXTENSIONS
 
 
-# Docling 文档转换器（单例模式）
-_docling_converter: DocumentConverter | None = None
-
-
-def _get_docling_converter() -> DocumentConverter:
-    """获取 Docling 文档转换器单例"""
-    global _docling_converter
-    if _docling_converter is None:
-        _docling_converter = DocumentConverter(
-            format_options={
-                InputFormat.DOCX: None,
-                InputFormat.XLSX: None,
-                InputFormat.PPTX: None,
-            }
-        )
-    return _docling_converter
-
-
-def _upload_image_to_minio(image_data: bytes, filename: str, db_id: str) -> str:
-    """上传图片到 MinIO，返回 URL"""
-    minio_client = get_minio_client()
-    minio_client.ensure_bucket_exists("kb-images")
-    file_id = hashstr(filename, length=16)
-    timestamp = int(time.time() * 1000000)
-    suffix = Path(filename).suffix.lower()
-    object_name = f"{db_id}/{file_id}/images/{timestamp}_{Path(filename).name}"
-    content_type_map = {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".gif": "image/gif",
-        ".webp": "image/webp",
-        ".bmp": "image/bmp",
-        ".tif": "image/tiff",
-        ".tiff": "image/tiff",
-    }
-    content_type = content_type_map.get(suffix, "image/jpeg")
-
-    result = minio_client.upload_file(
-        bucket_name="kb-images",
-        object_name=object_name,
-        data=image_data,
-        content_type=content_type,
-    )
-    return result.url
-
-
-def _parse_data_uri(data_uri: str) -> tuple[bytes, str]:
-    """解析 data URI，返回 (image_data, mime_type)"""
-    header, base64_data = data_uri.split(",", 1)
-    mime_type = header.split(":")[1].split(";")[0]
-    image_data = base64.b64decode(base64_data)
-    return image_data, mime_type
-
-
-def _convert_with_docling(file_path: Path, params: dict | None = None) -> str:
-    """
-    使用 Docling 将 docx/xlsx/pptx 转换为 Markdown
-
-    Args:
-        file_path: 文件路径
-        params: 参数，包含 db_id 用于图片上传
-
-    Returns:
-        Markdown 字符串
-    """
-    params = params or {}
-    db_id = params.get("db_id") or "docling-docs"
-
-    converter = _get_docling_converter()
-    result = converter.convert(file_path)
-
-    if result.status.name != "SUCCESS":
-        raise RuntimeError(f"Docling 转换失败: {result.status}")
-
-    doc = result.document
-
-    # 提取图片并上传到 MinIO
-    if hasattr(doc, "pictures") and doc.pictures:
-        image_refs: list[tuple[str, bytes]] = []
-
-        for pic in doc.pictures:
-            if hasattr(pic, "image") and hasattr(pic.image, "uri"):
-                uri = str(pic.image.uri)
-                if uri.startswith("data:"):
-                    image_data, mime_type = _parse_data_uri(uri)
-                    timestamp = int(time.time() * 1000000)  # 微秒级时间戳
-                    filename = f"image_{timestamp}.{mime_type.split('/')[-1]}"
-                    image_refs.append((filename, image_data))
-
-        # 上传图片并收集 URL
-        image_urls: list[str] = []
-        for filename, image_data in image_refs:
-            try:
-                url = _upload_image_to_minio(image_data, filename, db_id)
-                image_urls.append(f"![{filename}]({url})")
-            except Exception as e:
-                logger.error(f"上传图片失败 {filename}: {e}")
-                image_urls.append(f"[图片: {filename}]")
-
-        # 导出 Markdown
-        markdown = doc.export_to_markdown()
-
-        # 替换 <!-- image --> 占位符为图片 URL
-        # Docling 使用 <!-- image --> 作为占位符
-        for url in reversed(image_urls):
-            markdown = re.sub(r"<!--\s*image\s*-->", url, markdown, count=1)
-
-        return markdown
-
-    # 无图片时直接导出
-    return doc.export_to_markdown()
-
-
 def _escape_markdown_cell(value) -> str:
     """将单元格内容转为安全的 Markdown 文本"""
     if value is None:
@@ -424,11 +308,48 @@ def parse_image(file, params=None):
 
 
 async def parse_pdf_async(file, params=None):
-    return await asyncio.to_thread(parse_pdf, file, params=params)
+    """异步解析PDF：不启用OCR时在线程中读取；OCR 由处理器的异步接口执行（远程服务不占用线程池）"""
+    from src.plugins.document_processor_base import DocumentProcessorException
+    from src.plugins.document_processor_factory import DocumentProcessorFactory
+
+    params = params or {}
+    opt_ocr = params.get("enable_ocr", "disable")
+
+    if opt_ocr == "disable":
+        return await asyncio.to_thread(pdfreader, file, params=params)
+
+    try:
+        return await DocumentProcessorFactory.aprocess_file(opt_ocr, file, params)
+
+    except DocumentProcessorException as e:
+        logger.error(f"文档处理失败: {e.service_name} - {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"PDF 解析失败: {str(e)}")
+        raise DocumentProcessorException(f"PDF解析失败: {str(e)}", opt_ocr, "parsing_failed")
 
 
 async def parse_image_async(file, params=None):
-    return await asyncio.to_thread(parse_image, file, params=params)
+    """异步解析图像文件，参数与异常同 parse_image"""
+    from src.plugins.document_processor_base import DocumentProcessorException
+    from src.plugins.document_processor_factory import DocumentProcessorFactory
+
+    params = params or {}
+    opt_ocr = params.get("enable_ocr", "disable")
+
+    if opt_ocr == "disable":
+        # 复用同步版本的参数校验与错误提示
+        return parse_image(file, params=params)
+
+    try:
+        return await DocumentProcessorFactory.aprocess_file(opt_ocr, file, params)
+
+    except DocumentProcessorException as e:
+        logger.error(f"图像处理失败: {e.service_name} - {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"图像解析失败: {str(e)}")
+        raise DocumentProcessorException(f"图像解析失败: {str(e)}", opt_ocr, "parsing_failed")
 
 
 async def process_file_to_markdown(file_path: str, params: dict | None = None) -> str:
@@ -517,8 +438,8 @@ async def process_file_to_markdown(file_path: str, params: dict | None = None) -
             result = f"{content}"
 
         elif file_ext in [".docx", ".pptx"]:
-            # 使用 Docling 处理 docx 和 pptx
-            result = _convert_with_docling(file_path_obj, params=params)
+            # 使用 Docling 处理 docx 和 pptx（在工作进程中执行，不阻塞事件循环）
+            result = await docling_service.convert_to_markdown(file_path_obj, params=params)
 
         elif file_ext == ".doc":
             # 旧版 .doc 文件仍使用原有解析方式
@@ -564,7 +485,7 @@ async def process_file_to_markdown(file_path: str, params: dict | None = None) -
 
         elif file_ext == ".xls":
             # 旧版 xls 仍使用 Docling
-            result = _convert_with_docling(file_path_obj, params=params)
+            result = await docling_service.convert_to_markdown(file_path_obj, params=params)
 
         elif file_ext == ".json":
             # 处理 JSON 文件
@@ -804,6 +725,7 @@ async def process_url_to_markdown(url: str, params: dict | None = None) -> str:
 
     try:
         import httpx
+
         # 使用异步 HTTP 客户端获取页面
         async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
             response = await client.get(url, headers={"User-Agent": "Mozilla/5.0"})
@@ -1,7 +1,8 @@
 import asyncio
+import json
 import os
 
-from src.knowledge.base import KBNotFoundError, KnowledgeBase
+from src.knowledge.base import IndexProgressCallback, KBNotFoundError, KnowledgeBase
 from src.knowledge.factory import KnowledgeBaseFactory
 from src.utils import logger
 from src.utils.datetime_utils import utc_isoformat
@@ -11,6 +12,9 @@ KB_VISIBILITY_PRIVATE = "private"
 KB_VISIBILITY_AGENT_ONLY = "agent_only"
 KB_VISIBILITY_CHOICES = {KB_VISIBILITY_PUBLIC, KB_VISIBILITY_PRIVATE, KB_VISIBILITY_AGENT_ONLY}
 
+# 多知识库检索未配置重排序模型时的 RRF 平滑参数
+MULTI_KB_RRF_K = 60
+
 
 class KnowledgeBaseManager:
     """
@@ -468,14 +472,20 @@ class KnowledgeBaseManager:
             await kb_instance._load_metadata()
             return await kb_instance.parse_file(db_id, file_id, operator_id)
 
-    async def index_file(self, db_id: str, file_id: str, operator_id: str | None = None) -> dict:
+    async def index_file(
+        self,
+        db_id: str,
+        file_id: str,
+        operator_id: str | None = None,
+        progress_callback: IndexProgressCallback | None = None,
+    ) -> dict:
         """Index parsed file"""
         kb_instance = await self._get_kb_for_database(db_id)
         try:
-            return await kb_instance.index_file(db_id, file_id, operator_id)
+            return await kb_instance.index_file(db_id, file_id, operator_id, progress_callback=progress_callback)
         except ValueError:
             await kb_instance._load_metadata()
-            return await kb_instance.index_file(db_id, file_id, operator_id)
+            return await kb_instance.index_file(db_id, file_id, operator_id, progress_callback=progress_callback)
 
     async def update_file_params(self, db_id: str, file_id: str, params: dict, operator_id: str | None = None) -> None:
         """Update file processing params"""
@@ -491,6 +501,126 @@ class KnowledgeBaseManager:
         kb_instance = await self._get_kb_for_database(db_id)
         return await kb_instance.aquery(query_text, db_id, **kwargs)
 
+    async def aquery_multi(
+        self,
+        query_text: str,
+        db_ids: list[str],
+        final_top_k: int = 10,
+        reranker_model: str | None = None,
+        **kwargs,
+    ) -> list[dict]:
+        """
+        多知识库并发检索
+
+        - 同一 embedding 模型的知识库只向量化一次查询
+        - 所有目标知识库并发检索（各自不做重排序）
+        - 合并候选并按内容去重，统一做一次重排序；未配置重排序模型时按各库排名做 RRF 融合
+
+        Args:
+            query_text: 查询文本
+            db_ids: 目标知识库ID列表
+            final_top_k: 最终返回数量
+            reranker_model: 重排序模型，不传时使用目标知识库查询参数中配置的模型
+            **kwargs: 透传给各知识库 aquery 的临时查询参数
+
+        Returns:
+            合并后的文档块列表，metadata 中附带 db_id 与 kb_name
+        """
+        targets: list[tuple[str, KnowledgeBase]] = []
+        for db_id in dict.fromkeys(db_ids):
+            try:
+                targets.append((db_id, await self._get_kb_for_database(db_id)))
+            except KBNotFoundError as e:
+                logger.warning(f"Skip knowledge base {db_id} in multi-kb query: {e}")
+        if not targets:
+            return []
+
+        # 1. 同一 embedding 模型只向量化一次
+        embed_groups: dict[str, tuple[KnowledgeBase, str]] = {}
+        for db_id, kb_instance in targets:
+            if hasattr(kb_instance, "aembed_query"):
+                embed_groups.setdefault(kb_instance.get_embedding_key(db_id), (kb_instance, db_id))
+
+        embed_results = await asyncio.gather(
+            *(kb_instance.aembed_query(db_id, query_text) for kb_instance, db_id in embed_groups.values()),
+            return_exceptions=True,
+        )
+        query_embeddings = {}
+        for embed_key, embedding in zip(embed_groups, embed_results):
+            if isinstance(embedding, Exception):
+                logger.warning(f"Failed to embed query with {embed_key}, fallback to per-kb embedding: {embedding}")
+                continue
+            query_embeddings[embed_key] = embedding
+
+        # 2. 并发检索所有目标知识库
+        async def _query_one(db_id: str, kb_instance: KnowledgeBase):
+            query_kwargs = {"final_top_k": final_top_k, **kwargs, "use_reranker": False}
+            if hasattr(kb_instance, "aembed_query"):
+                embedding = query_embeddings.get(kb_instance.get_embedding_key(db_id))
+                if embedding is not None:
+                    query_kwargs["query_embedding"] = embedding
+            return await kb_instance.aquery(query_text, db_id, agent_call=True, **query_kwargs)
+
+        results = await asyncio.gather(
+            *(_query_one(db_id, kb_instance) for db_id, kb_instance in targets), return_exceptions=True
+        )
+
+        # 3. 合并候选，跨库相同内容只保留排名靠前的一条
+        candidates: list[dict] = []
+        seen_contents: set[str] = set()
+        for (db_id, kb_instance), result in zip(targets, results):
+            kb_name = kb_instance.databases_meta.get(db_id, {}).get("name", db_id)
+            if isinstance(result, Exception):
+                logger.error(f"Multi-kb query failed for {db_id}: {result}")
+                continue
+
+            items = result if isinstance(result, list) else [result]
+            for rank, item in enumerate(items):
+                if not isinstance(item, dict) or "content" not in item:
+                    item = {"content": item if isinstance(item, str) else json.dumps(item, ensure_ascii=False)}
+                content = str(item.get("content") or "")
+                if not content or content in seen_contents:
+                    continue
+                seen_contents.add(content)
+
+                metadata = {**(item.get("metadata") or {}), "db_id": db_id, "kb_name": kb_name}
+                candidates.append({**item, "metadata": metadata, "kb_rank": rank})
+
+        if not candidates:
+            return []
+
+        # 4. 统一重排序
+        if reranker_model is None:
+            for db_id, kb_instance in targets:
+                params = kb_instance._get_query_params(db_id)
+                if params.get("use_reranker") and params.get("reranker_model"):
+                    reranker_model = params["reranker_model"]
+                    break
+
+        if reranker_model:
+            try:
+                from src.models.rerank import get_reranker
+
+                reranker = get_reranker(reranker_model)
+                try:
+                    documents = [str(chunk["content"]) for chunk in candidates]
+                    rerank_scores = await reranker.acompute_score([query_text, documents], normalize=True)
+                finally:
+                    await reranker.aclose()
+
+                for chunk, rerank_score in zip(candidates, rerank_scores):
+                    chunk["rerank_score"] = float(rerank_score)
+                candidates.sort(key=lambda chunk: chunk.get("rerank_score", 0.0), reverse=True)
+                return candidates[:final_top_k]
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Multi-kb reranking failed: {e}, falling back to rank fusion")
+
+        # 各库分数不可直接比较，按各库内排名做 RRF 融合
+        for chunk in candidates:
+            chunk["fusion_score"] = 1.0 / (MULTI_KB_RRF_K + chunk["kb_rank"] + 1)
+        candidates.sort(key=lambda chunk: (chunk["fusion_score"], chunk.get("score", 0.0)), reverse=True)
+        return candidates[:final_top_k]
+
     async def export_data(self, db_id: str, format: str = "zip", **kwargs) -> str:
         """导出知识库数据"""
         kb_instance = await self._get_kb_for_database(db_id)
@@ -773,6 +903,20 @@ class KnowledgeBaseManager:
 
         return all_retrievers
 
+    def get_retrievers_fingerprint(self) -> tuple:
+        """
+        知识库集合的指纹，用于判断基于知识库构建的工具是否需要重建
+
+        只包含构建工具时用到的字段（id、名称、描述、类型），不需要构建检索器本身
+        """
+        return tuple(
+            sorted(
+                (db_id, meta.get("name"), meta.get("description"), meta.get("kb_type"))
+                for kb_instance in self.kb_instances.values()
+                for db_id, meta in list(kb_instance.databases_meta.items())
+            )
+        )
+
     # =============================================================================
     # 管理器特有的方法
     # =============================================================================
@@ -0,0 +1,272 @@
+"""
+Docling 文档转换执行服务
+
+- 转换在独立工作进程中执行（进程启动时预热 DocumentConverter），不阻塞事件循环；
+  工作进程入口位于 src.utils.docling_worker，不导入 src.knowledge（避免初始化知识库管理器、图数据库连接）
+- 提取出的图片并发上传 MinIO（有并发上限）
+- Markdown 中的 <!-- image --> 占位符一次遍历完成替换
+- 记录每个文档的分阶段耗时，供运维接口查询
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+from src.storage.minio import get_minio_client
+from src.utils import hashstr, logger
+from src.utils.datetime_utils import utc_isoformat
+from src.utils.docling_worker import convert_document, get_converter, init_worker, warmup_worker
+
+KB_IMAGES_BUCKET = "kb-images"
+
+# Docling 使用 <!-- image --> 作为图片占位符
+IMAGE_PLACEHOLDER_PATTERN = re.compile(r"<!--\s*image\s*-->")
+
+IMAGE_CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+}
+
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    raw = os.getenv(name, str(default)).strip()
+    try:
+        return max(minimum, int(raw))
+    except (TypeError, ValueError):
+        return default
+
+
+def replace_image_placeholders(markdown: str, replacements: list[str | None]) -> str:
+    """
+    按出现顺序一次性替换图片占位符
+
+    第 i 个占位符替换为 replacements[i]；为 None 或超出列表长度时保留原占位符。
+    """
+    if not replacements:
+        return markdown
+
+    iterator = iter(replacements)
+
+    def _replace(match: re.Match) -> str:
+        replacement = next(iterator, None)
+        return replacement if replacement is not None else match.group(0)
+
+    return IMAGE_PLACEHOLDER_PATTERN.sub(_replace, markdown)
+
+
+class DoclingExecutionService:
+    """
+    Docling 转换执行服务
+
+    通过环境变量配置：
+    - YUXI_DOCLING_WORKERS: 工作进程数，0 表示在线程中执行（默认 1）
+    - YUXI_DOCLING_IMAGE_UPLOAD_CONCURRENCY: 单文档图片并发上传数（默认 8）
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        upload_concurrency: int | None = None,
+        history_size: int = 200,
+    ):
+        self.max_workers = max_workers if max_workers is not None else _env_int("YUXI_DOCLING_WORKERS", 1)
+        self.upload_concurrency = upload_concurrency or _env_int("YUXI_DOCLING_IMAGE_UPLOAD_CONCURRENCY", 8, minimum=1)
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._history: deque[dict[str, Any]] = deque(maxlen=history_size)
+        self._totals = {
+            "documents": 0,
+            "failed": 0,
+            "images": 0,
+            "image_upload_failed": 0,
+            "convert_seconds": 0.0,
+            "upload_seconds": 0.0,
+            "total_seconds": 0.0,
+        }
+
+    @property
+    def use_processes(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # 工作进程只需要 Docling，跳过应用级初始化（知识库管理器、图数据库连接等）
+                previous = os.environ.get("YUXI_SKIP_APP_INIT")
+                os.environ["YUXI_SKIP_APP_INIT"] = "1"
+                try:
+                    executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=get_context("spawn"),
+                        initializer=init_worker,
+                    )
+                    # 立即拉起全部工作进程，使其继承上面的环境变量并完成预热
+                    for future in [executor.submit(warmup_worker) for _ in range(self.max_workers)]:
+                        future.result()
+                finally:
+                    if previous is None:
+                        os.environ.pop("YUXI_SKIP_APP_INIT", None)
+                    else:
+                        os.environ["YUXI_SKIP_APP_INIT"] = previous
+                self._executor = executor
+                logger.info(f"Docling 工作进程已就绪: workers={self.max_workers}")
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def start(self) -> None:
+        """预热转换器（进程模式下拉起工作进程），可在服务启动时调用"""
+        if self.use_processes:
+            await asyncio.to_thread(self._get_executor)
+        else:
+            await asyncio.to_thread(get_converter)
+
+    def shutdown(self) -> None:
+        self._reset_executor()
+
+    async def _run_conversion(self, file_path: Path) -> dict[str, Any]:
+        if not self.use_processes:
+            return await asyncio.to_thread(convert_document, str(file_path))
+
+        loop = asyncio.get_running_loop()
+        executor = await asyncio.to_thread(self._get_executor)
+        try:
+            return await loop.run_in_executor(executor, convert_document, str(file_path))
+        except BrokenProcessPool:
+            # 工作进程异常退出（如内存不足被杀），重建进程池后重试一次
+            logger.warning(f"Docling 工作进程异常退出，重建进程池后重试: {file_path.name}")
+            self._reset_executor()
+            executor = await asyncio.to_thread(self._get_executor)
+            return await loop.run_in_executor(executor, convert_document, str(file_path))
+
+    async def _upload_images(self, images: list[tuple[str, bytes] | None], db_id: str) -> list[str | None]:
+        """并发上传图片，返回与 images 对应的 Markdown 片段"""
+        minio_client = get_minio_client()
+        await asyncio.to_thread(minio_client.ensure_bucket_exists, KB_IMAGES_BUCKET)
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+
+        async def _upload(item: tuple[str, bytes] | None) -> str | None:
+            if item is None:
+                return None
+            filename, image_data = item
+            file_id = hashstr(filename, length=16)
+            timestamp = int(time.time() * 1000000)
+            object_name = f"{db_id}/{file_id}/images/{timestamp}_{Path(filename).name}"
+            content_type = IMAGE_CONTENT_TYPES.get(Path(filename).suffix.lower(), "image/jpeg")
+            async with semaphore:
+                try:
+                    result = await minio_client.aupload_file(
+                        bucket_name=KB_IMAGES_BUCKET,
+                        object_name=object_name,
+                        data=image_data,
+                        content_type=content_type,
+                    )
+                    return f"![{filename}]({result.url})"
+                except Exception as e:
+                    logger.error(f"上传图片失败 {filename}: {e}")
+                    return f"[图片: {filename}]"
+
+        return await asyncio.gather(*(_upload(item) for item in images))
+
+    async def convert_to_markdown(self, file_path: Path, params: dict | None = None) -> str:
+        """
+        使用 Docling 将 docx/xls/pptx 转换为 Markdown，并将内嵌图片上传至 MinIO
+
+        Args:
+            file_path: 文件路径
+            params: 参数，包含 db_id 用于图片上传
+
+        Returns:
+            Markdown 字符串
+        """
+        params = params or {}
+        db_id = params.get("db_id") or "docling-docs"
+        file_path = Path(file_path)
+
+        stats: dict[str, Any] = {
+            "file_name": file_path.name,
+            "file_type": file_path.suffix.lower(),
+            "db_id": db_id,
+            "mode": "process" if self.use_processes else "thread",
+            "started_at": utc_isoformat(),
+            "status": "success",
+        }
+        start = time.perf_counter()
+        try:
+            converted = await self._run_conversion(file_path)
+            dispatched = time.perf_counter() - start
+            stats["convert_seconds"] = round(converted["convert_seconds"], 4)
+            stats["export_seconds"] = round(converted["export_seconds"], 4)
+            # 排队 + 进程间传输开销
+            stats["queue_seconds"] = round(
+                max(0.0, dispatched - converted["convert_seconds"] - converted["export_seconds"]), 4
+            )
+
+            images = converted["images"]
+            upload_start = time.perf_counter()
+            replacements = await self._upload_images(images, db_id) if any(images) else []
+            stats["upload_seconds"] = round(time.perf_counter() - upload_start, 4)
+            stats["image_count"] = sum(1 for item in images if item is not None)
+            stats["image_failed"] = sum(1 for item in replacements if item and item.startswith("[图片: "))
+
+            return replace_image_placeholders(converted["markdown"], replacements)
+        except Exception as e:
+            stats["status"] = "failed"
+            stats["error"] = str(e)
+            raise
+        finally:
+            stats["total_seconds"] = round(time.perf_counter() - start, 4)
+            self._record(stats)
+
+    def _record(self, stats: dict[str, Any]) -> None:
+        self._history.append(stats)
+        self._totals["documents"] += 1
+        if stats["status"] != "success":
+            self._totals["failed"] += 1
+        self._totals["images"] += stats.get("image_count", 0)
+        self._totals["image_upload_failed"] += stats.get("image_failed", 0)
+        self._totals["convert_seconds"] += stats.get("convert_seconds", 0.0)
+        self._totals["upload_seconds"] += stats.get("upload_seconds", 0.0)
+        self._totals["total_seconds"] += stats["total_seconds"]
+        logger.info(
+            f"Docling 转换完成: {stats['file_name']}, status={stats['status']}, "
+            f"total={stats['total_seconds']}s, convert={stats.get('convert_seconds')}s, "
+            f"upload={stats.get('upload_seconds')}s, images={stats.get('image_count', 0)}"
+        )
+
+    def get_stats(self, limit: int = 50) -> dict[str, Any]:
+        """返回汇总统计与最近若干文档的耗时明细"""
+        totals = dict(self._totals)
+        documents = totals["documents"]
+        totals["avg_total_seconds"] = round(totals["total_seconds"] / documents, 4) if documents else 0.0
+        for key in ("convert_seconds", "upload_seconds", "total_seconds"):
+            totals[key] = round(totals[key], 4)
+        recent = list(self._history)[-limit:] if limit > 0 else []
+        return {
+            "mode": "process" if self.use_processes else "thread",
+            "workers": self.max_workers,
+            "upload_concurrency": self.upload_concurrency,
+            "totals": totals,
+            "recent": list(reversed(recent)),
+        }
+
+
+docling_service = DoclingExecutionService()
@@ -0,0 +1,205 @@
+"""
+文档解析结果缓存
+
+同一份文件（按内容哈希识别）在不同知识库中导入、或以相同参数重新解析时，
+直接复用上一次的 Markdown 结果，避免重复跑 OCR / Docling 转换。
+
+缓存存放在 MinIO 的 kb-parse-cache 存储桶中，对象名：
+    {content_hash}/{parser_type}/{fingerprint}.md
+其中 fingerprint 由影响解析结果的参数与解析器版本计算得到。
+会把图片上传到 kb-images/{db_id}/ 并在 Markdown 中引用的解析器（Docling、MinerU），
+fingerprint 额外包含 db_id，缓存只在同一知识库内复用，避免图片链接指向其他知识库。
+"""
+
+import json
+import os
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from src.storage.minio import StorageError, get_minio_client
+from src.utils import hashstr, logger
+
+PARSE_CACHE_BUCKET = "kb-parse-cache"
+
+# 解析逻辑有不兼容变更时递增，旧缓存自动失效
+PARSE_CACHE_VERSION = "1"
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif"}
+
+# 只缓存解析代价较高的类型；txt/md/json 等直接读取更快，zip 会写入知识库相关的图片信息，不缓存
+CACHEABLE_EXTENSIONS = {".pdf", ".doc", ".docx", ".pptx", ".xls", ".xlsx", *IMAGE_EXTENSIONS}
+
+# 会影响解析结果的参数，其余参数（如 chunk_size）不参与缓存键计算
+PARSE_PARAM_KEYS = (
+    "enable_ocr",
+    "zoom_x",
+    "zoom_y",
+    "backend",
+    "parse_method",
+    "language",
+    "lang_list",
+    "is_ocr",
+    "enable_formula",
+    "enable_table",
+    "page_ranges",
+    "use_formula_recognition",
+    "use_seal_recognition",
+    "use_table_recognition",
+    "excel_max_rows_per_sheet",
+)
+
+# 解析结果中引用 kb-images/{db_id}/... 图片的 OCR 方式
+IMAGE_UPLOADING_OCR = {"mineru_ocr", "mineru_official"}
+
+
+def resolve_parser_type(file_name: str, params: dict[str, Any] | None = None) -> str | None:
+    """根据文件扩展名与参数确定实际使用的解析器，不可缓存的类型返回 None"""
+    params = params or {}
+    file_ext = Path(file_name.split("?")[0]).suffix.lower()
+    if file_ext not in CACHEABLE_EXTENSIONS:
+        return None
+
+    if file_ext == ".pdf":
+        return f"pdf-{params.get('enable_ocr', 'disable')}"
+    if file_ext in IMAGE_EXTENSIONS:
+        return f"image-{params.get('enable_ocr', 'disable')}"
+    if file_ext in {".docx", ".pptx", ".xls"}:
+        return "docling"
+    if file_ext == ".xlsx":
+        return "xlsx"
+    return "unstructured"
+
+
+def uploads_kb_images(parser_type: str) -> bool:
+    """解析器是否会把图片上传到知识库目录下并写入 Markdown 链接"""
+    if parser_type == "docling":
+        return True
+    return parser_type.split("-", 1)[-1] in IMAGE_UPLOADING_OCR
+
+
+@lru_cache(maxsize=8)
+def resolve_parser_version(parser_type: str) -> str:
+    """解析器版本：缓存版本号 + 本地解析库版本（升级 docling 后旧缓存自动失效）"""
+    parser_version = os.getenv("YUXI_PARSE_CACHE_VERSION") or PARSE_CACHE_VERSION
+    if parser_type == "docling":
+        try:
+            parser_version = f"{parser_version}+docling{version('docling')}"
+        except PackageNotFoundError:
+            pass
+    return parser_version
+
+
+def build_cache_key(content_hash: str, parser_type: str, params: dict[str, Any] | None = None) -> str:
+    """生成缓存对象名"""
+    params = params or {}
+    relevant = {key: params[key] for key in PARSE_PARAM_KEYS if params.get(key) is not None}
+    if uploads_kb_images(parser_type):
+        relevant["db_id"] = params.get("db_id")
+    fingerprint = hashstr(
+        json.dumps(
+            {"params": relevant, "version": resolve_parser_version(parser_type)},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        ),
+        length=16,
+    )
+    return f"{content_hash}/{parser_type}/{fingerprint}.md"
+
+
+class ParseCacheService:
+    """基于 MinIO 的解析结果缓存，记录命中率"""
+
+    def __init__(self):
+        self.enabled = os.getenv("YUXI_PARSE_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0, "invalidated": 0, "bytes_served": 0}
+
+    def _cache_key(self, content_hash: str | None, file_name: str, params: dict[str, Any] | None) -> str | None:
+        if not self.enabled or not content_hash:
+            return None
+        if params and params.get("skip_parse_cache"):
+            return None
+
+        parser_type = resolve_parser_type(file_name, params)
+        if parser_type is None:
+            return None
+        return build_cache_key(content_hash, parser_type, params)
+
+    async def get(self, content_hash: str | None, file_name: str, params: dict[str, Any] | None = None) -> str | None:
+        """查询缓存，未命中或不可缓存时返回 None"""
+        object_name = self._cache_key(content_hash, file_name, params)
+        if object_name is None:
+            return None
+
+        minio_client = get_minio_client()
+        try:
+            data = await minio_client.adownload_file(PARSE_CACHE_BUCKET, object_name)
+        except StorageError as e:
+            self._stats["misses"] += 1
+            if "不存在" not in str(e) and "NoSuchBucket" not in str(e):
+                self._stats["errors"] += 1
+                logger.warning(f"读取解析缓存失败 {object_name}: {e}")
+            return None
+        except Exception as e:
+            # 缓存不可用时按未命中处理，不影响正常解析
+            self._stats["errors"] += 1
+            self._stats["misses"] += 1
+            logger.warning(f"读取解析缓存失败 {object_name}: {e}")
+            return None
+
+        self._stats["hits"] += 1
+        self._stats["bytes_served"] += len(data)
+        logger.info(f"解析缓存命中: {file_name} -> {object_name}")
+        return data.decode("utf-8", errors="replace")
+
+    async def put(self, content_hash: str | None, file_name: str, params: dict[str, Any] | None, markdown: str) -> bool:
+        """写入缓存，失败只记录日志"""
+        object_name = self._cache_key(content_hash, file_name, params)
+        if object_name is None or not markdown:
+            return False
+
+        minio_client = get_minio_client()
+        try:
+            await minio_client.aupload_file(
+                bucket_name=PARSE_CACHE_BUCKET,
+                object_name=object_name,
+                data=markdown.encode("utf-8", errors="replace"),
+                content_type="text/markdown",
+            )
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"写入解析缓存失败 {object_name}: {e}")
+            return False
+
+        self._stats["writes"] += 1
+        return True
+
+    async def invalidate(self, content_hash: str | None = None) -> int:
+        """
+        删除缓存
+
+        Args:
+            content_hash: 指定文件内容哈希时只删除该文件的缓存，否则清空全部缓存
+
+        Returns:
+            删除的缓存对象数量
+        """
+        prefix = f"{content_hash}/" if content_hash else ""
+        deleted = await get_minio_client().adelete_prefix(PARSE_CACHE_BUCKET, prefix)
+        self._stats["invalidated"] += deleted
+        logger.info(f"解析缓存已清理: prefix='{prefix}', deleted={deleted}")
+        return deleted
+
+    def get_stats(self) -> dict[str, Any]:
+        """返回命中率统计"""
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+parse_cache = ParseCacheService()
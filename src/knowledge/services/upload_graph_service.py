@@ -1,12 +1,16 @@
+import asyncio
 import json
 import os
-import tempfile
+import time
 import traceback
 import warnings
 from urllib.parse import urlparse
 
 from src import config
-from src.knowledge.adapters.base import Neo4jConnectionManager
+from src.knowledge.adapters.base import Neo4jConnectionManager, build_fulltext_query, fulltext_index_ddl
+from src.knowledge.utils.graph_overview import graph_overview_store
+from src.knowledge.utils.graph_stats_cache import GraphStatsCache
+from src.knowledge.utils.jsonl_stream import JsonlBatchReader
 from src.models import select_embedding_model
 from src.storage.minio.client import get_minio_client
 from src.utils import logger
@@ -14,6 +18,357 @@ from src.utils.datetime_utils import utc_isoformat
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
+VECTOR_INDEX_NAME = "entityEmbeddings"
+
+# 向量索引不存在时的复查间隔（秒），索引存在后不再检查
+VECTOR_INDEX_RECHECK_SECONDS = 60
+
+# 所有分词的向量检索合并为一次查询，同一实体取最高分
+BATCH_VECTOR_QUERY = f"""
+UNWIND range(0, size($embeddings) - 1) AS i
+CALL db.index.vector.queryNodes('{VECTOR_INDEX_NAME}', 10, $embeddings[i])
+YIELD node, score
+WITH node, score
+WHERE 'Upload' IN labels(node) AND score > $threshold
+RETURN node.name AS name, max(score) AS score
+"""
+
+# 实体名称全文索引，模糊匹配优先走该索引，避免逐个扫描 Upload 节点
+FULLTEXT_INDEX_NAME = "entityNameFulltext"
+CREATE_FULLTEXT_INDEX_QUERY = fulltext_index_ddl(FULLTEXT_INDEX_NAME, "Upload", ["name"])
+
+# 每个分词最多取 $limit 个全文命中，同一实体取最高分，并返回命中该实体的查询语句
+BATCH_FULLTEXT_QUERY = f"""
+UNWIND $queries AS query
+CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX_NAME}', query, {{limit: $limit}})
+YIELD node, score
+RETURN node.name AS name, max(score) AS score, collect(query) AS queries
+"""
+FULLTEXT_MATCH_LIMIT = 20
+
+# 无法用全文索引表达的分词（如单字）、以及全文索引没有命中的分词（如英文单词的一部分）回退到 CONTAINS 扫描
+BATCH_FUZZY_QUERY = """
+UNWIND $keywords AS keyword
+MATCH (n:Upload)
+WHERE toLower(n.name) CONTAINS toLower(keyword)
+RETURN DISTINCT n.name AS name, null AS score
+"""
+
+# 模糊命中的权重上限，避免覆盖向量高分
+FUZZY_MATCH_WEIGHT = 0.3
+
+# 一次 UNWIND 展开全部实体的 1~2 跳出入边，每个实体最多返回 $limit 条
+BATCH_EXPAND_QUERY = """
+UNWIND $entity_names AS entity_name
+CALL {
+    WITH entity_name
+    WITH [
+        [(n:Upload {name: entity_name})-[r1]->(m1) |
+         {h: {id: n.id, element_id: elementId(n), name: n.name, properties: properties(n)},
+          r: {id: elementId(r1), type: r1.type, source_id: n.id, target_id: m1.id, properties: properties(r1)},
+          t: {id: m1.id, element_id: elementId(m1), name: m1.name, properties: properties(m1)}}],
+        [(n:Upload {name: entity_name})-[r1]->(m1)-[r2]->(m2) |
+         {h: {id: m1.id, element_id: elementId(m1), name: m1.name, properties: properties(m1)},
+          r: {id: elementId(r2), type: r2.type, source_id: m1.id, target_id: m2.id, properties: properties(r2)},
+          t: {id: m2.id, element_id: elementId(m2), name: m2.name, properties: properties(m2)}}],
+        [(m1)-[r1]->(n:Upload {name: entity_name}) |
+         {h: {id: m1.id, element_id: elementId(m1), name: m1.name, properties: properties(m1)},
+          r: {id: elementId(r1), type: r1.type, source_id: m1.id, target_id: n.id, properties: properties(r1)},
+          t: {id: n.id, element_id: elementId(n), name: n.name, properties: properties(n)}}],
+        [(m2)-[r2]->(m1)-[r1]->(n:Upload {name: entity_name}) |
+         {h: {id: m2.id, element_id: elementId(m2), name: m2.name, properties: properties(m2)},
+          r: {id: elementId(r2), type: r2.type, source_id: m2.id, target_id: m1.id, properties: properties(r2)},
+          t: {id: m1.id, element_id: elementId(m1), name: m1.name, properties: properties(m1)}}]
+    ] AS all_results
+    UNWIND all_results AS result_list
+    UNWIND result_list AS item
+    RETURN item
+    LIMIT $limit
+}
+RETURN item.h AS h, item.r AS r, item.t AS t
+"""
+
+FIND_PARENT_PATHS_QUERY = """
+MATCH (n:Upload)
+WHERE n.name IN $names
+RETURN n.id AS parent_id, n.name AS name
+"""
+
+# 直接查询所有路径前缀匹配的子节点，不要求边连接；限制层级差避免返回过深的节点
+CHILDREN_QUERY = """
+UNWIND $parent_paths AS parent_path
+MATCH (child:Upload)
+WHERE child.id STARTS WITH parent_path + '/'
+      AND size(split(child.id, '/')) - size(split(parent_path, '/')) <= 3
+      AND size(split(child.id, '/')) - size(split(parent_path, '/')) >= 1
+WITH parent_path, child
+LIMIT 150
+
+// 为每个子节点找到其直接父节点的边
+MATCH (parent:Upload {id: parent_path})
+OPTIONAL MATCH (child)-[r:RELATION]->(related)
+WHERE related.id = parent_path OR related.id STARTS WITH parent_path + '/'
+
+RETURN DISTINCT
+    {id: child.id, element_id: elementId(child), name: child.name, properties: properties(child)} AS child_node,
+    CASE WHEN r IS NOT NULL THEN
+        {
+            id: elementId(r),
+            type: r.type,
+            source_id: child.id,
+            target_id: related.id,
+            properties: properties(r)
+        }
+    ELSE null END AS edge
+"""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# JSONL 三元组流式导入：每批写入的三元组数量（独立事务）、读取块大小、待计算 embedding 的批次队列长度
+GRAPH_IMPORT_BATCH_SIZE = _env_int("YUXI_GRAPH_IMPORT_BATCH_SIZE", 1000)
+GRAPH_IMPORT_CHUNK_BYTES = 256 * 1024
+GRAPH_IMPORT_EMBED_QUEUE_SIZE = 4
+# 导入过程中记录已送入 embedding 队列的实体 id，超过上限时清空（重复送入的实体会被 embedding 协程按已有向量跳过）
+GRAPH_IMPORT_DEDUP_IDS = _env_int("YUXI_GRAPH_IMPORT_DEDUP_IDS", 200_000)
+
+# 图谱统计缓存：超过刷新间隔后台重算，超过陈旧上限时请求等待重算
+GRAPH_STATS_REFRESH_SECONDS = _env_int("YUXI_GRAPH_STATS_REFRESH_SECONDS", 60)
+GRAPH_STATS_MAX_STALE_SECONDS = _env_int("YUXI_GRAPH_STATS_MAX_STALE_SECONDS", 600)
+
+# 上传图谱与 LightRAG 图谱的统计共用一个缓存（key 区分）
+graph_stats_cache = GraphStatsCache(GRAPH_STATS_REFRESH_SECONDS, GRAPH_STATS_MAX_STALE_SECONDS)
+
+# MERGE 依赖 id 查找，没有索引时每次 MERGE 都要全量扫描
+CREATE_ENTITY_ID_INDEX_QUERY = "CREATE INDEX entity_id_index IF NOT EXISTS FOR (n:Entity) ON (n.id)"
+
+# 索引配置不支持参数，维度通过 format(dim=...) 填入
+CREATE_VECTOR_INDEX_QUERY = (
+    f"CREATE VECTOR INDEX {VECTOR_INDEX_NAME} IF NOT EXISTS FOR (n:Entity) ON (n.embedding) "
+    "OPTIONS {{indexConfig: {{`vector.dimensions`: {dim}, `vector.similarity_function`: 'cosine'}}}}"
+)
+
+BATCH_MERGE_TRIPLES_QUERY = """
+UNWIND $rows AS row
+MERGE (h:Entity:Upload {id: row.h_id})
+SET h.name = row.h_name, h += row.h_props
+MERGE (t:Entity:Upload {id: row.t_id})
+SET t.name = row.t_name, t += row.t_props
+MERGE (h)-[r:RELATION {type: row.r_type}]->(t)
+SET r += row.r_props
+"""
+
+NODES_WITHOUT_EMBEDDING_QUERY = """
+UNWIND $ids AS entity_id
+MATCH (n:Entity {id: entity_id})
+WHERE n.embedding IS NULL
+RETURN n.id AS id, n.name AS name
+"""
+
+# 续传时补齐此前中断而未计算 embedding 的实体（按 id 分页）
+UPLOAD_NODES_WITHOUT_EMBEDDING_QUERY = """
+MATCH (n:Entity:Upload)
+WHERE n.embedding IS NULL AND n.id > $last_id
+RETURN n.id AS id
+ORDER BY n.id
+LIMIT $limit
+"""
+
+BATCH_SET_EMBEDDINGS_QUERY = """
+UNWIND $rows AS row
+MATCH (e:Entity {id: row.id})
+CALL db.create.setNodeVectorProperty(e, 'embedding', row.embedding)
+"""
+
+
+def _take_new_ids(queued_ids: set, entity_ids) -> list:
+    """返回尚未送入 embedding 队列的 id 并记录；记录数超过上限时先清空，避免大文件导入时无限增长"""
+    if len(queued_ids) >= GRAPH_IMPORT_DEDUP_IDS:
+        queued_ids.clear()
+    new_ids = []
+    for entity_id in entity_ids:
+        if entity_id not in queued_ids:
+            queued_ids.add(entity_id)
+            new_ids.append(entity_id)
+    return new_ids
+
+
+def _process_record_props(record):
+    """处理记录中的属性：扁平化 properties 并移除 embedding"""
+    if record is None:
+        return None
+
+    # 复制一份以避免修改原字典
+    data = dict(record)
+    props = data.pop("properties", {}) or {}
+
+    # 移除 embedding
+    if "embedding" in props:
+        del props["embedding"]
+
+    # 合并属性（优先保留原字典中的 id, name, type 等核心字段）
+    return {**props, **data}
+
+
+def _split_keyword(keyword) -> list[str]:
+    """简单空格分词，OR 聚合"""
+    tokens = [t for t in str(keyword).split(" ") if t]
+    return tokens or [str(keyword)]
+
+
+def _split_fulltext_tokens(tokens: list[str]) -> tuple[dict[str, str], list[str]]:
+    """将分词分为全文索引查询语句（查询语句 -> 分词）与需要回退到 CONTAINS 扫描的分词"""
+    queries, scan_tokens = {}, []
+    for token in tokens:
+        query = build_fulltext_query(token)
+        if query:
+            queries[query] = token
+        else:
+            scan_tokens.append(token)
+    return queries, scan_tokens
+
+
+def _unmatched_fulltext_tokens(queries: dict[str, str], rows: list[dict]) -> list[str]:
+    """全文索引没有命中的分词
+
+    短语查询按分析器切出的词匹配，英文单词的一部分（如 "Bao" 之于 "Baoyu"）或下划线连接的 id 片段无法命中，
+    这些分词需要再用 CONTAINS 匹配，保持与原子串匹配一致的召回
+    """
+    matched = {query for row in rows for query in row.get("queries") or []}
+    return [token for query, token in queries.items() if query not in matched]
+
+
+def _fuzzy_scores(rows: list[dict]) -> dict[str, float]:
+    """全文命中按本次最高分归一化到 (0, FUZZY_MATCH_WEIGHT]，CONTAINS 命中直接取 FUZZY_MATCH_WEIGHT"""
+    max_score = max((row["score"] for row in rows if row.get("score")), default=0.0)
+    scores: dict[str, float] = {}
+    for row in rows:
+        if row.get("score") and max_score:
+            weight = FUZZY_MATCH_WEIGHT * row["score"] / max_score
+        else:
+            weight = FUZZY_MATCH_WEIGHT
+        scores[row["name"]] = max(scores.get(row["name"], 0.0), weight)
+    return scores
+
+
+def _dedup_query_results(results: dict, return_format: str) -> dict:
+    """节点按 id、边按 (source, target, type)、三元组按值去重"""
+    if return_format == "graph":
+        seen_node_ids = set()
+        dedup_nodes = []
+        for n in results["nodes"]:
+            nid = n.get("id") if isinstance(n, dict) else n
+            if nid not in seen_node_ids:
+                seen_node_ids.add(nid)
+                dedup_nodes.append(n)
+        results["nodes"] = dedup_nodes
+
+        seen_edges = set()
+        dedup_edges = []
+        for e in results["edges"]:
+            key = (e.get("source_id"), e.get("target_id"), e.get("type"))
+            if key not in seen_edges:
+                seen_edges.add(key)
+                dedup_edges.append(e)
+        results["edges"] = dedup_edges
+
+    elif return_format == "triples":
+        results["triples"] = list(dict.fromkeys(results["triples"]))
+
+    return results
+
+
+def _parse_node(node_data):
+    """
+    智能解析节点数据，支持多种格式：
+    1. 简单字符串: "节点名"
+    2. 路径字符串: "父节点/子节点/节点名"
+    3. 字典格式: {"name": "节点名", "id": "唯一标识", ...}
+
+    返回: (node_id, name, props)
+    """
+    if isinstance(node_data, dict):
+        # 字典格式：提取 id、name 和其他属性
+        props = node_data.copy()
+        node_id = props.pop("id", None) or props.pop("path", None) or props.pop("name", "")
+        name = props.pop("name", node_id)
+        return node_id, name, props
+
+    elif isinstance(node_data, str):
+        # 字符串格式：检查是否是路径
+        if "/" in node_data:
+            # 路径格式: "父/子/节点"
+            parts = node_data.split("/")
+            node_id = node_data  # 完整路径作为唯一 ID
+            name = parts[-1]  # 最后一段作为显示名称
+            props = {
+                "path": node_data,  # 保存完整路径
+                "level": len(parts),  # 层级深度
+            }
+            return node_id, name, props
+        else:
+            # 简单字符串: "节点名"
+            return node_data, node_data, {}
+
+    # 兜底：转为字符串
+    node_str = str(node_data)
+    return node_str, node_str, {}
+
+
+def _parse_relation(rel_data):
+    """解析关系数据，返回 (type, props)"""
+    if isinstance(rel_data, dict):
+        props = rel_data.copy()
+        rel_type = props.pop("type", "")
+        return rel_type, props
+    return str(rel_data), {}
+
+
+def _apply_stats_delta(info: dict, nodes: int = 0, relationships: int = 0, embedded: int = 0) -> None:
+    """按写入计数增量修正缓存的图谱统计（新节点带 Entity、Upload 标签，新关系均为实体间的 RELATION）"""
+    info["entity_count"] = max(0, info.get("entity_count", 0) + nodes)
+    info["relationship_count"] = max(0, info.get("relationship_count", 0) + relationships)
+    info["triples_count"] = max(0, info.get("triples_count", 0) + relationships)
+    info["unindexed_node_count"] = max(0, info.get("unindexed_node_count", 0) + nodes - embedded)
+    if nodes:
+        label_counts = info.setdefault("label_counts", {})
+        labels = info.setdefault("labels", [])
+        for label in ("Entity", "Upload"):
+            label_counts[label] = max(0, label_counts.get(label, 0) + nodes)
+            if label not in labels:
+                labels.append(label)
+
+
+def _build_triple_rows(triples: list) -> list[dict]:
+    """将 JSONL 三元组转换为 UNWIND 写入参数，跳过缺少头尾节点或关系类型的条目"""
+    rows = []
+    for entry in triples:
+        if not isinstance(entry, dict):
+            continue
+        h_id, h_name, h_props = _parse_node(entry.get("h"))
+        t_id, t_name, t_props = _parse_node(entry.get("t"))
+        r_type, r_props = _parse_relation(entry.get("r"))
+        if not h_id or not t_id or not r_type:
+            continue
+        rows.append(
+            {
+                "h_id": h_id,
+                "h_name": h_name,
+                "h_props": h_props,
+                "t_id": t_id,
+                "t_name": t_name,
+                "t_props": t_props,
+                "r_type": r_type,
+                "r_props": r_props,
+            }
+        )
+    return rows
+
 
 class UploadGraphService:
     """
@@ -31,6 +386,11 @@ class UploadGraphService:
         os.makedirs(self.work_dir, exist_ok=True)
         self.is_initialized_from_file = False
 
+        # 向量索引存在性缓存（aquery_node 使用）
+        self._vector_index_exists = False
+        self._vector_index_checked_at: float | None = None
+        self._fulltext_index_ready = False
+
         # 尝试加载已保存的图数据库信息
         if not self.load_graph_info():
             logger.debug("创建新的图数据库配置")
@@ -83,202 +443,183 @@ class UploadGraphService:
         if self.status == "closed":
             self.start()
 
-    async def jsonl_file_add_entity(self, file_path, kgdb_name="neo4j", embed_model_name=None, batch_size=None):
-        """从JSONL文件添加实体三元组到Neo4j"""
+    async def jsonl_file_add_entity(
+        self,
+        file_path,
+        kgdb_name="neo4j",
+        embed_model_name=None,
+        batch_size=None,
+        write_batch_size=None,
+        start_offset=0,
+        progress_callback=None,
+    ):
+        """
+        从 JSONL 文件流式导入实体三元组到 Neo4j（只接受 MinIO URL）
+
+        文件按块读取，不整体载入内存；每 write_batch_size 条三元组通过一次 UNWIND 在独立事务中写入，
+        新实体的 embedding 由后台协程按批计算，与后续批次的写入并行。
+        返回值中的 offset 为已写入的字节位置，导入中断后可以通过 start_offset 从该位置续传。
+
+        Args:
+            batch_size: embedding 批次大小
+            write_batch_size: 每个写事务的三元组数量，默认 YUXI_GRAPH_IMPORT_BATCH_SIZE
+            start_offset: 起始字节偏移（续传），需位于行首
+            progress_callback: 每批写入后以当前统计调用的异步函数
+        """
         assert self.driver is not None, "Database is not connected"
-        self.connection.status = "processing"
         kgdb_name = kgdb_name or "neo4j"
-        self.use_database(kgdb_name)  # 切换到指定数据库
-        logger.info(f"Start adding entity to {kgdb_name} with {file_path}")
+        self.use_database(kgdb_name)
 
         # 检测 file_path 是否是 URL
-        parsed_url = urlparse(file_path)
+        if urlparse(file_path).scheme not in ("http", "https"):
+            # 本地文件路径 - 拒绝不安全的本地路径
+            raise ValueError("不支持本地文件路径，只允许 MinIO URL。请先通过文件上传接口上传文件。")
+
+        # 使用知识库的方式：直接解析 URL 并使用内部 endpoint 下载（避免 HOST_IP 配置问题）
+        from src.knowledge.utils.kb_utils import parse_minio_url
+
+        bucket_name, object_name = parse_minio_url(file_path)
+        dim = self._prepare_embed_model(embed_model_name)
+        write_batch_size = write_batch_size or GRAPH_IMPORT_BATCH_SIZE
+        driver = self.connection.async_driver
+        assert driver is not None, "Database is not connected"
+
+        logger.info(f"Start adding entity to {kgdb_name} with {file_path} (offset={start_offset})")
+        stats = {
+            "offset": start_offset,
+            "total_bytes": None,
+            "triples": 0,
+            "skipped": 0,
+            "invalid_lines": 0,
+            "embedded": 0,
+            "embed_failed": 0,
+        }
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=GRAPH_IMPORT_EMBED_QUEUE_SIZE)
+        queued_ids: set = set()
+        embed_task = None
+        response = None
 
+        self.connection.status = "processing"
         try:
-            if parsed_url.scheme in ("http", "https"):  # 如果是 URL
-                logger.info(f"检测到 URL，正在从 MinIO 下载文件: {file_path}")
-
-                # 使用知识库的方式：直接解析 URL 并使用内部 endpoint 下载（避免 HOST_IP 配置问题）
-                from src.knowledge.utils.kb_utils import parse_minio_url
-
-                bucket_name, object_name = parse_minio_url(file_path)
-                minio_client = get_minio_client()
-
-                # 直接下载文件内容
-                file_data = await minio_client.adownload_file(bucket_name, object_name)
-                logger.info(f"成功从 MinIO 下载文件: {object_name} ({len(file_data)} bytes)")
-
-                # 创建临时文件
-                with tempfile.NamedTemporaryFile(mode="wb", suffix=".jsonl", delete=False) as temp_file:
-                    temp_file.write(file_data)
-                    actual_file_path = temp_file.name
-
-                try:
-
-                    def read_triples(file_path):
-                        with open(file_path, encoding="utf-8") as file:
-                            for line in file:
-                                if line.strip():
-                                    yield json.loads(line.strip())
-
-                    triples = list(read_triples(actual_file_path))
-                    await self.txt_add_vector_entity(triples, kgdb_name, embed_model_name, batch_size)
-                finally:
-                    # 清理临时文件
-                    if os.path.exists(actual_file_path):
-                        os.unlink(actual_file_path)
-
-            else:
-                # 本地文件路径 - 拒绝不安全的本地路径
-                raise ValueError("不支持本地文件路径，只允许 MinIO URL。请先通过文件上传接口上传文件。")
+            await self._awrite(driver, CREATE_ENTITY_ID_INDEX_QUERY)
+            await self._awrite(driver, CREATE_VECTOR_INDEX_QUERY.format(dim=int(dim)))
+            await self._awrite(driver, CREATE_FULLTEXT_INDEX_QUERY)
+            self._fulltext_index_ready = True
+            self._vector_index_checked_at = None
+
+            response = await get_minio_client().adownload_response(bucket_name, object_name, offset=start_offset)
+            content_length = response.headers.get("Content-Length")
+            if content_length:
+                stats["total_bytes"] = start_offset + int(content_length)
+            reader = JsonlBatchReader(response.stream(GRAPH_IMPORT_CHUNK_BYTES), start_offset=start_offset)
+
+            embed_task = asyncio.create_task(self._aembed_worker(driver, embed_queue, stats, batch_size))
+            if start_offset > 0:
+                # 续传时补齐上次已写入但未完成 embedding 的实体
+                await self._aenqueue_pending_embeddings(driver, embed_queue, queued_ids)
+
+            while True:
+                triples = await asyncio.to_thread(reader.read_batch, write_batch_size)
+                if not triples:
+                    break
+
+                rows = _build_triple_rows(triples)
+                if rows:
+                    counters = await self._awrite(driver, BATCH_MERGE_TRIPLES_QUERY, rows=rows)
+                    self._update_stats_cache(nodes=counters.nodes_created, relationships=counters.relationships_created)
+
+                    new_ids = _take_new_ids(queued_ids, (eid for row in rows for eid in (row["h_id"], row["t_id"])))
+                    if new_ids:
+                        await embed_queue.put(new_ids)
+
+                stats["triples"] += len(rows)
+                stats["skipped"] += len(triples) - len(rows)
+                stats["offset"] = reader.offset
+                stats["invalid_lines"] = reader.invalid_lines
+                if progress_callback:
+                    await progress_callback(dict(stats))
+
+            # 概览快照在下次访问时后台重算
+            graph_overview_store.invalidate(kgdb_name)
+
+            # 等待剩余的 embedding 批次完成
+            await embed_queue.put(None)
+            await embed_task
+            logger.info(f"Finished adding entity to {kgdb_name}: {stats}")
 
         except Exception as e:
-            logger.error(f"处理文件失败: {e}")
+            logger.error(f"处理文件失败: {e}, stats={stats}")
             raise
         finally:
+            if embed_task is not None and not embed_task.done():
+                embed_task.cancel()
+            if response is not None:
+                response.close()
+                response.release_conn()
             self.connection.status = "open"
 
-        # 更新并保存图数据库信息
-        self.save_graph_info()
-        return kgdb_name
-
-    async def txt_add_vector_entity(self, triples, kgdb_name="neo4j", embed_model_name=None, batch_size=None):
-        """添加实体三元组"""
-        assert self.driver is not None, "Database is not connected"
-        self.use_database(kgdb_name)
+        # 更新并保存图数据库信息（可能需要全图统计并写文件，放到线程中执行）
+        await asyncio.to_thread(self.save_graph_info)
+        return stats
 
-        def _index_exists(tx, index_name):
-            """检查索引是否存在"""
-            result = tx.run("SHOW INDEXES")
-            for record in result:
-                if record["name"] == index_name:
-                    return True
-            return False
+    async def _aembed_worker(self, driver, queue: asyncio.Queue, stats: dict, batch_size=None) -> None:
+        """消费实体 id 批次，为其中尚无 embedding 的实体计算并写入向量；收到 None 时退出"""
+        while True:
+            entity_ids = await queue.get()
+            if entity_ids is None:
+                return
 
-        def _parse_node(node_data):
-            """
-            智能解析节点数据，支持多种格式：
-            1. 简单字符串: "节点名"
-            2. 路径字符串: "父节点/子节点/节点名"
-            3. 字典格式: {"name": "节点名", "id": "唯一标识", ...}
-            
-            返回: (node_id, name, props)
-            """
-            if isinstance(node_data, dict):
-                # 字典格式：提取 id、name 和其他属性
-                props = node_data.copy()
-                node_id = props.pop("id", None) or props.pop("path", None) or props.pop("name", "")
-                name = props.pop("name", node_id)
-                return node_id, name, props
-                
-            elif isinstance(node_data, str):
-                # 字符串格式：检查是否是路径
-                if "/" in node_data:
-                    # 路径格式: "父/子/节点"
-                    parts = node_data.split("/")
-                    node_id = node_data  # 完整路径作为唯一 ID
-                    name = parts[-1]  # 最后一段作为显示名称
-                    props = {
-                        "path": node_data,  # 保存完整路径
-                        "level": len(parts),  # 层级深度
-                    }
-                    return node_id, name, props
-                else:
-                    # 简单字符串: "节点名"
-                    return node_data, node_data, {}
-            
-            # 兜底：转为字符串
-            node_str = str(node_data)
-            return node_str, node_str, {}
-
-        def _parse_relation(rel_data):
-            """解析关系数据，返回 (type, props)"""
-            if isinstance(rel_data, dict):
-                props = rel_data.copy()
-                rel_type = props.pop("type", "")
-                return rel_type, props
-            return str(rel_data), {}
-
-        def _create_graph(tx, data):
-            """添加三元组，支持路径和 ID 模式"""
-            for entry in data:
-                h_id, h_name, h_props = _parse_node(entry.get("h"))
-                t_id, t_name, t_props = _parse_node(entry.get("t"))
-                r_type, r_props = _parse_relation(entry.get("r"))
-
-                if not h_id or not t_id or not r_type:
+            try:
+                nodes = await self._aread(driver, NODES_WITHOUT_EMBEDDING_QUERY, ids=entity_ids)
+                if not nodes:
                     continue
 
-                # 使用 id 作为唯一标识，name 用于显示
-                tx.run(
-                    """
-                MERGE (h:Entity:Upload {id: $h_id})
-                SET h.name = $h_name, h += $h_props
-                MERGE (t:Entity:Upload {id: $t_id})
-                SET t.name = $t_name, t += $t_props
-                MERGE (h)-[r:RELATION {type: $r_type}]->(t)
-                SET r += $r_props
-                """,
-                    h_id=h_id,
-                    h_name=h_name,
-                    h_props=h_props,
-                    t_id=t_id,
-                    t_name=t_name,
-                    t_props=t_props,
-                    r_type=r_type,
-                    r_props=r_props,
-                )
-
-        def _create_vector_index(tx, dim):
-            """创建向量索引"""
-            # NOTE 这里是否是会重复构建索引？
-            index_name = "entityEmbeddings"
-            if not _index_exists(tx, index_name):
-                tx.run(f"""
-                CREATE VECTOR INDEX {index_name}
-                FOR (n: Entity) ON (n.embedding)
-                OPTIONS {{indexConfig: {{
-                `vector.dimensions`: {dim},
-                `vector.similarity_function`: 'cosine'
-                }} }};
-                """)
-
-        def _get_nodes_without_embedding(tx, entity_names):
-            """获取没有embedding的节点列表（基于 id 查询）"""
-            # 构建参数字典，将列表转换为"param0"、"param1"等键值对形式
-            params = {f"param{i}": name for i, name in enumerate(entity_names)}
-
-            if not params:
-                return []
-
-            # 构建查询参数列表
-            param_placeholders = ", ".join([f"${key}" for key in params.keys()])
-
-            # 执行查询（改为使用 id 字段）
-            result = tx.run(
-                f"""
-            MATCH (n:Entity)
-            WHERE n.id IN [{param_placeholders}] AND n.embedding IS NULL
-            RETURN n.id AS id, n.name AS name
-            """,
-                params,
+                # 使用 name 计算 embedding
+                embeddings = await self.aget_embedding([node["name"] for node in nodes], batch_size=batch_size or 40)
+                rows = [{"id": node["id"], "embedding": embedding} for node, embedding in zip(nodes, embeddings)]
+                await self._awrite(driver, BATCH_SET_EMBEDDINGS_QUERY, rows=rows)
+                stats["embedded"] += len(rows)
+                self._update_stats_cache(embedded=len(rows))
+            except Exception as e:
+                # 单批失败不影响导入，可稍后通过"为节点添加索引"补齐
+                stats["embed_failed"] += len(entity_ids)
+                logger.error(f"计算实体 embedding 失败（{len(entity_ids)} 个实体）: {e}")
+
+    async def _aenqueue_pending_embeddings(self, driver, queue: asyncio.Queue, queued_ids: set) -> None:
+        """按 id 分页找出上传图谱中尚无 embedding 的实体，送入 embedding 队列"""
+        last_id = ""
+        while True:
+            rows = await self._aread(
+                driver, UPLOAD_NODES_WITHOUT_EMBEDDING_QUERY, last_id=last_id, limit=GRAPH_IMPORT_BATCH_SIZE
+            )
+            if not rows:
+                return
+            entity_ids = [row["id"] for row in rows]
+            if new_ids := _take_new_ids(queued_ids, entity_ids):
+                await queue.put(new_ids)
+            last_id = entity_ids[-1]
+
+    @staticmethod
+    async def _awrite(driver, query: str, **params):
+        """在写事务中执行语句，返回写入计数（SummaryCounters）"""
+
+        async def _work(tx):
+            result = await tx.run(query, **params)
+            summary = await result.consume()
+            return summary.counters
+
+        async with driver.session() as session:
+            return await session.execute_write(_work)
+
+    def _update_stats_cache(self, nodes: int = 0, relationships: int = 0, embedded: int = 0) -> None:
+        """写入后增量修正统计缓存"""
+        if nodes or relationships or embedded:
+            graph_stats_cache.update(
+                self.kgdb_name, lambda info: _apply_stats_delta(info, nodes, relationships, embedded)
             )
 
-            return [{"id": record["id"], "name": record["name"]} for record in result]
-
-        def _batch_set_embeddings(tx, entity_embedding_pairs):
-            """批量设置实体的嵌入向量（使用 id 匹配）"""
-            for entity_info, embedding in entity_embedding_pairs:
-                entity_id = entity_info if isinstance(entity_info, str) else entity_info.get("id")
-                tx.run(
-                    """
-                MATCH (e:Entity {id: $id})
-                CALL db.create.setNodeVectorProperty(e, 'embedding', $embedding)
-                """,
-                    id=entity_id,
-                    embedding=embedding,
-                )
-
+    def _prepare_embed_model(self, embed_model_name=None) -> int:
+        """确定导入使用的 embedding 模型，返回向量维度"""
         # 检查是否允许更新模型
         if embed_model_name and not self.is_initialized_from_file:
             if embed_model_name != self.embed_model_name:
@@ -296,27 +637,37 @@ class UploadGraphService:
         # 允许 self.embed_model_name 与 config.embed_model 不同（用户自定义选择的情况）
         # 但必须在支持的模型列表中
         assert self.embed_model_name in config.embed_model_names, f"Unsupported embed model: {self.embed_model_name}"
+        return getattr(cur_embed_info, "dimension", 1024)
+
+    async def txt_add_vector_entity(self, triples, kgdb_name="neo4j", embed_model_name=None, batch_size=None):
+        """添加实体三元组"""
+        assert self.driver is not None, "Database is not connected"
+        self.use_database(kgdb_name)
+        dim = self._prepare_embed_model(embed_model_name)
+        rows = _build_triple_rows(triples)
 
         with self.driver.session() as session:
             logger.info(f"Adding entity to {kgdb_name}")
-            session.execute_write(_create_graph, triples)
-            logger.info(f"Creating vector index for {kgdb_name} with {config.embed_model}")
-            session.execute_write(_create_vector_index, getattr(cur_embed_info, "dimension", 1024))
-
-            # 收集所有需要处理的实体名称，去重（使用 id）
-            all_entities = set()
-            for entry in triples:
-                h_id, h_name, _ = _parse_node(entry.get("h"))
-                t_id, t_name, _ = _parse_node(entry.get("t"))
-                if h_id:
-                    all_entities.add(h_id)
-                if t_id:
-                    all_entities.add(t_id)
-
-            all_entities_list = list(all_entities)
-
-            # 筛选出没有embedding的节点
-            nodes_without_embedding = session.execute_read(_get_nodes_without_embedding, all_entities_list)
+            session.run(CREATE_ENTITY_ID_INDEX_QUERY).consume()
+            for i in range(0, len(rows), GRAPH_IMPORT_BATCH_SIZE):
+                batch_rows = rows[i : i + GRAPH_IMPORT_BATCH_SIZE]
+                summary = session.execute_write(
+                    lambda tx, batch=batch_rows: tx.run(BATCH_MERGE_TRIPLES_QUERY, rows=batch).consume()
+                )
+                counters = summary.counters
+                self._update_stats_cache(nodes=counters.nodes_created, relationships=counters.relationships_created)
+            logger.info(f"Creating vector index for {kgdb_name} with {self.embed_model_name}")
+            session.run(CREATE_VECTOR_INDEX_QUERY.format(dim=int(dim))).consume()
+            session.run(CREATE_FULLTEXT_INDEX_QUERY).consume()
+            self._fulltext_index_ready = True
+            self._vector_index_checked_at = None
+            graph_overview_store.invalidate(kgdb_name)
+
+            # 收集所有需要处理的实体（使用 id 去重），筛选出没有 embedding 的节点
+            all_entities_list = list(dict.fromkeys(eid for row in rows for eid in (row["h_id"], row["t_id"])))
+            nodes_without_embedding = session.execute_read(
+                lambda tx: tx.run(NODES_WITHOUT_EMBEDDING_QUERY, ids=all_entities_list).data()
+            )
             if not nodes_without_embedding:
                 logger.info("所有实体已有embedding，无需重新计算")
                 return
@@ -335,19 +686,17 @@ class UploadGraphService:
                 )
 
                 # 批量获取嵌入向量（使用 name 计算）
-                batch_names = [
-                    e["name"] if isinstance(e, dict) else e for e in batch_entities
-                ]
-                batch_embeddings = await self.aget_embedding(batch_names, batch_size=batch_size)
-
-                # 将实体信息和嵌入向量配对
-                entity_embedding_pairs = list(zip(batch_entities, batch_embeddings))
+                batch_embeddings = await self.aget_embedding([e["name"] for e in batch_entities], batch_size=batch_size)
+                embedding_rows = [{"id": e["id"], "embedding": emb} for e, emb in zip(batch_entities, batch_embeddings)]
 
                 # 批量写入数据库
-                session.execute_write(_batch_set_embeddings, entity_embedding_pairs)
+                session.execute_write(
+                    lambda tx, batch=embedding_rows: tx.run(BATCH_SET_EMBEDDINGS_QUERY, rows=batch).consume()
+                )
+                self._update_stats_cache(embedded=len(embedding_rows))
 
             # 数据添加完成后保存图信息
-            self.save_graph_info()
+            await asyncio.to_thread(self.save_graph_info)
 
     async def add_embedding_to_nodes(self, node_names=None, kgdb_name="neo4j", batch_size=None):
         """为节点添加嵌入向量
@@ -377,6 +726,7 @@ class UploadGraphService:
                 except Exception as e:
                     logger.error(f"为节点 '{node_name}' 添加嵌入向量失败: {e}, {traceback.format_exc()}")
 
+        self._update_stats_cache(embedded=count)
         return count
 
     def delete_entity(self, entity_name=None, kgdb_name="neo4j"):
@@ -385,16 +735,23 @@ class UploadGraphService:
         self.use_database(kgdb_name)
         with self.driver.session() as session:
             if entity_name:
-                session.execute_write(self._delete_specific_entity, entity_name)
+                counters = session.execute_write(self._delete_specific_entity, entity_name)
+                # 被删节点的标签与 embedding 状态未知，总数先按计数修正，其余由后台刷新
+                self._update_stats_cache(nodes=-counters.nodes_deleted, relationships=-counters.relationships_deleted)
+                graph_stats_cache.mark_stale(kgdb_name)
+                graph_overview_store.invalidate(kgdb_name)
             else:
                 session.execute_write(self._delete_all_entities)
+                # 清空会删除同一实例中的全部节点（包括 LightRAG 图谱），所有统计都需重算
+                graph_stats_cache.invalidate()
+                graph_overview_store.invalidate()
 
     def _delete_specific_entity(self, tx, entity_name):
         query = """
         MATCH (n {name: $entity_name})
         DETACH DELETE n
         """
-        tx.run(query, entity_name=entity_name)
+        return tx.run(query, entity_name=entity_name).consume().counters
 
     def _delete_all_entities(self, tx):
         query = """
@@ -439,16 +796,29 @@ class UploadGraphService:
             # 获取所有标签
             labels = tx.run("CALL db.labels() YIELD label RETURN collect(label) AS labels").single()["labels"]
 
+            # 单标签计数直接读取计数存储，不扫描节点；LightRAG 知识库的 kb_ 标签不计入
+            label_counts = {}
+            for label in labels:
+                if label.startswith("kb_"):
+                    continue
+                escaped = label.replace("`", "``")
+                label_counts[label] = tx.run(f"MATCH (n:`{escaped}`) RETURN count(n) AS count").single()["count"]
+
+            unindexed_node_count = tx.run(
+                "MATCH (n:Entity) WHERE n.embedding IS NULL RETURN count(n) AS count"
+            ).single()["count"]
+
             return {
                 "graph_name": graph_name,
                 "entity_count": entity_count,
                 "relationship_count": relationship_count,
                 "triples_count": triples_count,
                 "labels": labels,
+                "label_counts": label_counts,
                 "status": self.status,
                 "embed_model_name": self.embed_model_name,
                 "embed_model_configurable": not self.is_initialized_from_file,
-                "unindexed_node_count": len(self.query_nodes_without_embedding(graph_name)),
+                "unindexed_node_count": unindexed_node_count,
             }
 
         try:
@@ -468,13 +838,39 @@ class UploadGraphService:
             logger.error(f"获取图数据库信息失败：{e}, {traceback.format_exc()}")
             return None
 
+    async def aget_graph_info(self, graph_name="neo4j"):
+        """
+        获取图数据库信息（读取统计缓存）
+
+        统计部分在导入/删除时增量修正，并按 YUXI_GRAPH_STATS_REFRESH_SECONDS 在后台刷新，
+        最多陈旧 YUXI_GRAPH_STATS_MAX_STALE_SECONDS 秒；状态与嵌入模型等实时返回。
+        """
+        graph_info = await graph_stats_cache.get(graph_name, lambda: asyncio.to_thread(self.get_graph_info, graph_name))
+        if graph_info is not None:
+            graph_info["status"] = self.status
+            graph_info["embed_model_name"] = self.embed_model_name
+            graph_info["embed_model_configurable"] = not self.is_initialized_from_file
+        return graph_info
+
     def save_graph_info(self, graph_name="neo4j"):
         """
         将图数据库的基本信息保存到工作目录中的JSON文件
         保存的信息包括：数据库名称、状态、嵌入模型名称等
         """
         try:
-            graph_info = self.get_graph_info(graph_name)
+            # 统计缓存已按写入增量修正，有缓存时不再重新做全图统计
+            graph_info = graph_stats_cache.peek(graph_name)
+            if graph_info is not None:
+                graph_info.update(
+                    status=self.status,
+                    embed_model_name=self.embed_model_name,
+                    embed_model_configurable=not self.is_initialized_from_file,
+                    last_updated=utc_isoformat(),
+                )
+            else:
+                graph_info = self.get_graph_info(graph_name)
+                if graph_info is not None:
+                    graph_stats_cache.set(graph_name, graph_info)
             if graph_info is None:
                 logger.error("图数据库信息为空，无法保存")
                 return False
@@ -553,16 +949,14 @@ class UploadGraphService:
     def query_node(
         self, keyword, threshold=0.9, kgdb_name="neo4j", hops=2, max_entities=8, return_format="graph", **kwargs
     ):
-        """知识图谱查询节点的入口"""
+        """知识图谱查询节点的同步入口（在事件循环中请使用 aquery_node）"""
         assert self.driver is not None, "Database is not connected"
         assert self.is_running(), "图数据库未启动"
 
         self.use_database(kgdb_name)
 
         # 简单空格分词，OR 聚合
-        tokens = [t for t in str(keyword).split(" ") if t]
-        if not tokens:
-            tokens = [str(keyword)]
+        tokens = _split_keyword(keyword)
 
         # name -> score 聚合；向量分数累加，模糊命中给予轻权重
         entity_to_score = {}
@@ -604,148 +998,232 @@ class UploadGraphService:
                 all_query_results["triples"].extend(query_result["triples"])
             else:
                 raise ValueError(f"Invalid return_format: {return_format}")
-        
+
         # 对于路径模式的数据，额外包含所有直接子节点（文件和子文件夹）
         # 这样搜索"发展部"时，会直接显示其下的所有子项
         if return_format == "graph" and qualified_entities:
             self._add_child_nodes_for_path_entities(all_query_results, qualified_entities, kgdb_name)
-        
 
         # 基础去重
-        if return_format == "graph":
-            seen_node_ids = set()
-            dedup_nodes = []
-            for n in all_query_results["nodes"]:
-                nid = n.get("id") if isinstance(n, dict) else n
-                if nid not in seen_node_ids:
-                    seen_node_ids.add(nid)
-                    dedup_nodes.append(n)
-            all_query_results["nodes"] = dedup_nodes
-
-            seen_edges = set()
-            dedup_edges = []
-            for e in all_query_results["edges"]:
-                key = (e.get("source_id"), e.get("target_id"), e.get("type"))
-                if key not in seen_edges:
-                    seen_edges.add(key)
-                    dedup_edges.append(e)
-            all_query_results["edges"] = dedup_edges
-
-        elif return_format == "triples":
-            seen_triples = set()
-            dedup_triples = []
-            for t in all_query_results["triples"]:
-                if t not in seen_triples:
-                    seen_triples.add(t)
-                    dedup_triples.append(t)
-            all_query_results["triples"] = dedup_triples
+        return _dedup_query_results(all_query_results, return_format)
+
+    async def aquery_node(
+        self, keyword, threshold=0.9, kgdb_name="neo4j", hops=2, max_entities=8, return_format="graph", **kwargs
+    ):
+        """
+        知识图谱查询节点的异步入口
+
+        使用异步驱动，不阻塞事件循环：所有分词一次批量向量化，向量检索与模糊匹配各一次查询（并发执行），
+        合格实体通过一次 UNWIND 查询展开。各阶段耗时写入日志，return_timings=True 时随结果返回。
+        """
+        assert self.is_running(), "图数据库未启动"
+        if return_format not in ("graph", "triples"):
+            raise ValueError(f"Invalid return_format: {return_format}")
+
+        self.use_database(kgdb_name)
+        driver = self.connection.async_driver
+        assert driver is not None, "Database is not connected"
+
+        total_start = time.perf_counter()
+        timings: dict[str, float] = {}
+        tokens = _split_keyword(keyword)
 
+        # name -> score 聚合；向量分数取最高，模糊命中给予轻权重
+        vector_rows, fuzzy_rows = await asyncio.gather(
+            self._aquery_with_vector_sim(driver, tokens, threshold, timings),
+            self._aquery_with_fuzzy_match(driver, tokens, timings),
+        )
+        entity_to_score = {row["name"]: float(row["score"]) for row in vector_rows}
+        for name, weight in _fuzzy_scores(fuzzy_rows).items():
+            entity_to_score[name] = max(entity_to_score.get(name, 0.0), weight)
+
+        # 排序并截断
+        sorted_entity_to_score = sorted(entity_to_score.items(), key=lambda x: x[1], reverse=True)
+        qualified_entities = [name for name, _ in sorted_entity_to_score][:max_entities]
+        logger.debug(f"Graph Query Entities: {keyword}, {qualified_entities=}")
+
+        all_query_results = {"nodes": [], "edges": [], "triples": []}
+        if qualified_entities:
+            start = time.perf_counter()
+            records = await self._aread(driver, BATCH_EXPAND_QUERY, entity_names=qualified_entities, limit=100)
+            timings["expand_ms"] = (time.perf_counter() - start) * 1000
+
+            for item in records:
+                h = _process_record_props(item["h"])
+                r = _process_record_props(item["r"])
+                t = _process_record_props(item["t"])
+                if return_format == "graph":
+                    all_query_results["nodes"].extend([h, t])
+                    all_query_results["edges"].append(r)
+                else:
+                    all_query_results["triples"].append((h["name"], r["type"], t["name"]))
+
+            # 对于路径模式的数据，额外包含所有直接子节点（文件和子文件夹）
+            if return_format == "graph":
+                start = time.perf_counter()
+                await self._aadd_child_nodes_for_path_entities(driver, all_query_results, qualified_entities)
+                timings["children_ms"] = (time.perf_counter() - start) * 1000
+
+        all_query_results = _dedup_query_results(all_query_results, return_format)
+        timings["total_ms"] = (time.perf_counter() - total_start) * 1000
+        timings = {key: round(value, 1) for key, value in timings.items()}
+        logger.info(f"Graph query {keyword!r}: {len(tokens)} tokens, {len(qualified_entities)} entities, {timings=}")
+
+        if kwargs.get("return_timings"):
+            all_query_results["timings"] = timings
         return all_query_results
 
+    @staticmethod
+    async def _aread(driver, query: str, **params) -> list[dict]:
+        """在读事务中执行查询并返回字典列表"""
+
+        async def _work(tx):
+            result = await tx.run(query, **params)
+            return await result.data()
+
+        async with driver.session() as session:
+            return await session.execute_read(_work)
+
+    async def _aensure_vector_index(self, driver) -> None:
+        """检查向量索引是否存在；存在后缓存结果，不存在时按间隔复查"""
+        if self._vector_index_exists:
+            return
+
+        checked_at = self._vector_index_checked_at
+        if checked_at is None or time.monotonic() - checked_at > VECTOR_INDEX_RECHECK_SECONDS:
+            rows = await self._aread(
+                driver, "SHOW INDEXES YIELD name WHERE name = $name RETURN count(*) AS count", name=VECTOR_INDEX_NAME
+            )
+            self._vector_index_exists = bool(rows and rows[0]["count"])
+            self._vector_index_checked_at = time.monotonic()
+
+        if not self._vector_index_exists:
+            raise Exception(
+                "向量索引不存在，请先创建索引，或当前图谱中未上传任何三元组（知识库中自动构建的，不会在此处展示和检索）。"
+            )
+
+    async def _aensure_fulltext_index(self, driver) -> None:
+        """确保实体名称全文索引存在（旧图谱首次查询时补建）"""
+        if not self._fulltext_index_ready:
+            await self._awrite(driver, CREATE_FULLTEXT_INDEX_QUERY)
+            self._fulltext_index_ready = True
+
+    async def _aquery_with_vector_sim(self, driver, tokens: list[str], threshold: float, timings: dict) -> list[dict]:
+        """批量向量查询"""
+        start = time.perf_counter()
+        await self._aensure_vector_index(driver)
+        timings["index_check_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        embeddings = await self.aget_embedding(tokens)
+        timings["embed_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        rows = await self._aread(driver, BATCH_VECTOR_QUERY, embeddings=embeddings, threshold=threshold)
+        timings["vector_ms"] = (time.perf_counter() - start) * 1000
+        return rows
+
+    async def _aquery_with_fuzzy_match(self, driver, tokens: list[str], timings: dict) -> list[dict]:
+        """批量模糊查询（不区分大小写）：优先走全文索引并返回相关度分数，单字及全文未命中的分词回退到 CONTAINS"""
+        start = time.perf_counter()
+        queries, scan_tokens = _split_fulltext_tokens(tokens)
+        rows = []
+        if queries:
+            try:
+                await self._aensure_fulltext_index(driver)
+                rows = await self._aread(
+                    driver, BATCH_FULLTEXT_QUERY, queries=list(queries), limit=FULLTEXT_MATCH_LIMIT
+                )
+                scan_tokens += _unmatched_fulltext_tokens(queries, rows)
+            except Exception as e:
+                # 索引尚未就绪（如刚创建、正在填充）时回退到扫描
+                logger.warning(f"全文索引查询失败，回退到 CONTAINS 匹配: {e}")
+                scan_tokens = tokens
+        if scan_tokens:
+            rows += await self._aread(driver, BATCH_FUZZY_QUERY, keywords=scan_tokens)
+        timings["fuzzy_ms"] = (time.perf_counter() - start) * 1000
+        logger.debug(f"Fuzzy Query Results: {rows}")
+        return rows
+
+    async def _aadd_child_nodes_for_path_entities(self, driver, results, entity_names) -> None:
+        """异步版本的 _add_child_nodes_for_path_entities"""
+        try:
+            parent_rows = await self._aread(driver, FIND_PARENT_PATHS_QUERY, names=entity_names)
+            parent_paths = [row["parent_id"] for row in parent_rows if row["parent_id"]]
+            if not parent_paths:
+                return
+            child_records = await self._aread(driver, CHILDREN_QUERY, parent_paths=parent_paths)
+            self._merge_child_records(results, child_records)
+            logger.debug(f"为 {len(entity_names)} 个实体添加了 {len(child_records)} 个子节点")
+        except Exception as e:
+            logger.warning(f"添加子节点失败: {e}")
+
     def _add_child_nodes_for_path_entities(self, results, entity_names, kgdb_name="neo4j"):
         """
         为路径实体添加其所有直接子节点
-        
+
         当搜索"发展部"时，会找到所有 id 以 "文件汇总/发展部/" 开头的节点
         这样可以确保显示该文件夹下的所有文件和子文件夹
         """
-        def _process_record_props(record):
-            """处理记录中的属性：扁平化 properties 并移除 embedding"""
-            if record is None:
-                return None
-            data = dict(record)
-            props = data.pop("properties", {}) or {}
-            if "embedding" in props:
-                del props["embedding"]
-            return {**props, **data}
-        
+
         def query_children(tx, entity_names):
             """查询所有匹配实体的所有后代节点（不要求边连接）"""
             # 首先找到这些实体的 ID（路径）
-            find_ids_query = """
-            MATCH (n:Upload)
-            WHERE n.name IN $names
-            RETURN n.id AS parent_id, n.name AS name
-            """
-            parent_results = tx.run(find_ids_query, names=entity_names)
-            parent_paths = []
-            for record in parent_results:
-                parent_id = record["parent_id"]
-                if parent_id:  # 确保有路径信息
-                    parent_paths.append(parent_id)
-            
+            parent_records = tx.run(FIND_PARENT_PATHS_QUERY, names=entity_names)
+            parent_paths = [record["parent_id"] for record in parent_records if record["parent_id"]]
             if not parent_paths:
                 return []
-            
-            # 直接查询所有路径前缀匹配的子节点，不要求边连接
-            # 限制层级差避免返回过深的节点
-            children_query = """
-            UNWIND $parent_paths AS parent_path
-            MATCH (child:Upload)
-            WHERE child.id STARTS WITH parent_path + '/'
-                  AND size(split(child.id, '/')) - size(split(parent_path, '/')) <= 3
-                  AND size(split(child.id, '/')) - size(split(parent_path, '/')) >= 1
-            WITH parent_path, child
-            LIMIT 150
-            
-            // 为每个子节点找到其直接父节点的边
-            MATCH (parent:Upload {id: parent_path})
-            OPTIONAL MATCH (child)-[r:RELATION]->(related)
-            WHERE related.id = parent_path OR related.id STARTS WITH parent_path + '/'
-            
-            RETURN DISTINCT
-                {id: child.id, element_id: elementId(child), name: child.name, properties: properties(child)} AS child_node,
-                CASE WHEN r IS NOT NULL THEN
-                    {
-                        id: elementId(r),
-                        type: r.type,
-                        source_id: child.id,
-                        target_id: related.id,
-                        properties: properties(r)
-                    }
-                ELSE null END AS edge
-            """
-            
-            return list(tx.run(children_query, parent_paths=parent_paths))
-        
+            return [record.data() for record in tx.run(CHILDREN_QUERY, parent_paths=parent_paths)]
+
         try:
             with self.driver.session() as session:
                 child_records = session.execute_read(query_children, entity_names)
-                
-                for record in child_records:
-                    child_node = _process_record_props(record["child_node"])
-                    edge = _process_record_props(record["edge"])
-                    
-                    if child_node:
-                        results["nodes"].append(child_node)
-                    if edge:
-                        results["edges"].append(edge)
-                
+                self._merge_child_records(results, child_records)
                 logger.debug(f"为 {len(entity_names)} 个实体添加了 {len(child_records)} 个子节点")
-                
+
         except Exception as e:
             logger.warning(f"添加子节点失败: {e}")
 
+    @staticmethod
+    def _merge_child_records(results, child_records):
+        for record in child_records:
+            child_node = _process_record_props(record["child_node"])
+            edge = _process_record_props(record["edge"])
+
+            if child_node:
+                results["nodes"].append(child_node)
+            if edge:
+                results["edges"].append(edge)
+
     def _query_with_fuzzy_match(self, keyword, kgdb_name="neo4j"):
         """模糊查询"""
         assert self.driver is not None, "Database is not connected"
         self.use_database(kgdb_name)
 
+        def query_fulltext(tx, fulltext_query):
+            return tx.run(BATCH_FULLTEXT_QUERY, queries=[fulltext_query], limit=FULLTEXT_MATCH_LIMIT).values()
+
         def query_fuzzy_match(tx, keyword):
-            result = tx.run(
-                """
-            MATCH (n:Upload)
-            WHERE toLower(n.name) CONTAINS toLower($keyword)
-            RETURN DISTINCT n.name AS name
-            """,
-                keyword=keyword,
-            )
-            values = result.values()
-            logger.debug(f"Fuzzy Query Results: {values}")
-            return values
+            return tx.run(BATCH_FUZZY_QUERY, keywords=[keyword]).values()
 
+        fulltext_query = build_fulltext_query(keyword)
         with self.driver.session() as session:
-            return session.execute_read(query_fuzzy_match, keyword)
+            if fulltext_query:
+                try:
+                    if not self._fulltext_index_ready:
+                        session.run(CREATE_FULLTEXT_INDEX_QUERY).consume()
+                        self._fulltext_index_ready = True
+                    values = session.execute_read(query_fulltext, fulltext_query)
+                    logger.debug(f"Fulltext Query Results: {values}")
+                    # 全文索引未命中（如英文单词的一部分）时回退到 CONTAINS 匹配
+                    if values:
+                        return values
+                except Exception as e:
+                    logger.warning(f"全文索引查询失败，回退到 CONTAINS 匹配: {e}")
+
+            values = session.execute_read(query_fuzzy_match, keyword)
+            logger.debug(f"Fuzzy Query Results: {values}")
+            return values
 
     def _query_with_vector_sim(self, keyword, kgdb_name="neo4j", threshold=0.9):
         """向量查询"""
@@ -792,22 +1270,6 @@ class UploadGraphService:
 
         self.use_database(kgdb_name)
 
-        def _process_record_props(record):
-            """处理记录中的属性：扁平化 properties 并移除 embedding"""
-            if record is None:
-                return None
-
-            # 复制一份以避免修改原字典
-            data = dict(record)
-            props = data.pop("properties", {}) or {}
-
-            # 移除 embedding
-            if "embedding" in props:
-                del props["embedding"]
-
-            # 合并属性（优先保留原字典中的 id, name, type 等核心字段）
-            return {**props, **data}
-
         def query(tx, entity_name, hops, limit):
             try:
                 query_str = """
@@ -0,0 +1,222 @@
+"""
+图谱概览快照
+
+图谱可视化首屏的采样子图（高度数节点及其连接）每次现算代价较高，这里按图谱物化一份概览快照：
+- 快照以 gzip 压缩的 JSON 保存在磁盘，服务重启后无需重新计算；内存中保留序列化后的响应体直接返回；
+- 版本号取内容哈希，作为 ETag，客户端携带 If-None-Match 且内容未变化时返回 304；
+- 图谱写入后调用 invalidate 标记过期：已有快照继续返回，同时在后台重新计算（同一图谱只计算一次）；
+- 多进程部署时以磁盘快照为准：invalidate 同时删除磁盘快照，其他进程发现磁盘快照被删除或更新后
+  随之失效或重新读取；超过 YUXI_GRAPH_OVERVIEW_MAX_AGE 秒的快照同样视为过期。
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from src import config
+from src.utils import logger
+
+# 快照保存的最大节点数，请求的节点数不超过该值时从快照截取
+GRAPH_OVERVIEW_MAX_NODES = int(os.getenv("YUXI_GRAPH_OVERVIEW_MAX_NODES", "300"))
+# 快照最长有效时间（秒），兜底未经 invalidate 的写入（如外部直接修改 Neo4j），0 表示不过期
+GRAPH_OVERVIEW_MAX_AGE = int(os.getenv("YUXI_GRAPH_OVERVIEW_MAX_AGE", "3600"))
+
+
+@dataclass
+class OverviewSnapshot:
+    data: dict
+    version: str
+    computed_at: float
+    stale: bool = False
+    mtime: float | None = None  # 对应磁盘快照的修改时间，未落盘为 None
+
+
+def slice_subgraph(data: dict, max_nodes: int) -> dict:
+    """截取前 max_nodes 个节点（快照按度数从高到低排列），只保留两端都在其中的边"""
+    nodes = data.get("nodes", [])[:max_nodes]
+    node_ids = {node.get("id") for node in nodes}
+    edges = [
+        edge
+        for edge in data.get("edges", [])
+        if edge.get("source_id") in node_ids and edge.get("target_id") in node_ids
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中当前 ETag（忽略弱校验前缀）"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class GraphOverviewStore:
+    """按图谱保存概览快照，并缓存不同节点数的序列化结果"""
+
+    def __init__(self, work_dir: str, max_nodes: int = GRAPH_OVERVIEW_MAX_NODES, max_age: int = GRAPH_OVERVIEW_MAX_AGE):
+        self.work_dir = work_dir
+        self.max_nodes = max_nodes
+        self.max_age = max_age
+        self._snapshots: dict[str, OverviewSnapshot] = {}
+        self._serialized: dict[str, dict[int, tuple[bytes, str]]] = {}
+        self._loading: dict[str, asyncio.Task] = {}
+
+    async def get(
+        self, db_id: str, loader: Callable[[int], Awaitable[dict]], max_nodes: int | None = None
+    ) -> tuple[bytes, str]:
+        """
+        返回 (响应体, ETag)
+
+        Args:
+            loader: 以节点数为参数计算采样子图的异步函数，返回 {"nodes": [...], "edges": [...]}
+            max_nodes: 请求的节点数，超过快照大小时按快照大小返回
+        """
+        snapshot = self._snapshots.get(db_id)
+        if snapshot is not None:
+            snapshot = await asyncio.to_thread(self._sync_with_disk, db_id, snapshot)
+        else:
+            snapshot = await asyncio.to_thread(self._read_snapshot, db_id)
+        if snapshot is not None and self.max_age and time.time() - snapshot.computed_at > self.max_age:
+            snapshot.stale = True
+
+        if snapshot is None:
+            snapshot = await asyncio.shield(self._schedule_compute(db_id, loader))
+        elif snapshot.stale:
+            # 先返回旧快照，后台重新计算
+            self._schedule_compute(db_id, loader)
+
+        size = min(max_nodes or self.max_nodes, self.max_nodes)
+        serialized = self._serialized.setdefault(db_id, {})
+        cached = serialized.get(size)
+        etag = f'"{snapshot.version}-{size}"'
+        if cached is None or cached[1] != etag:
+            payload = {
+                "success": True,
+                "data": slice_subgraph(snapshot.data, size),
+                "version": snapshot.version,
+                "computed_at": snapshot.computed_at,
+            }
+            cached = (json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), etag)
+            serialized[size] = cached
+        return cached
+
+    def invalidate(self, db_id: str | None = None) -> None:
+        """
+        图谱内容变化后调用：已有快照标记为过期，下次访问时后台重新计算；db_id 为 None 表示全部图谱
+
+        同时删除磁盘快照，其他进程据此得知快照已过期
+        """
+        if db_id is None:
+            for snapshot in self._snapshots.values():
+                snapshot.stale = True
+            if os.path.isdir(self.work_dir):
+                for name in os.listdir(self.work_dir):
+                    if name.endswith(".json.gz"):
+                        self._remove_file(os.path.join(self.work_dir, name))
+            return
+
+        snapshot = self._snapshots.get(db_id)
+        if snapshot is not None:
+            snapshot.stale = True
+        self._remove_file(self._snapshot_path(db_id))
+
+    def discard(self, db_id: str) -> None:
+        """删除图谱时移除快照"""
+        self._snapshots.pop(db_id, None)
+        self._serialized.pop(db_id, None)
+        self._remove_file(self._snapshot_path(db_id))
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _schedule_compute(self, db_id: str, loader: Callable[[int], Awaitable[dict]]) -> asyncio.Task:
+        task = self._loading.get(db_id)
+        if task is None:
+            task = asyncio.create_task(self._compute(db_id, loader))
+            # 后台刷新无人等待，取出异常避免 "exception was never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[db_id] = task
+        return task
+
+    async def _compute(self, db_id: str, loader: Callable[[int], Awaitable[dict]]) -> OverviewSnapshot:
+        start = time.monotonic()
+        try:
+            result = await loader(self.max_nodes)
+        except Exception as e:
+            logger.warning(f"Failed to compute graph overview for {db_id}: {e}")
+            raise
+        finally:
+            self._loading.pop(db_id, None)
+
+        data = {"nodes": result.get("nodes", []), "edges": result.get("edges", [])}
+        content = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        snapshot = OverviewSnapshot(data, hashlib.sha1(content).hexdigest()[:16], time.time())
+        self._snapshots[db_id] = snapshot
+        self._serialized.pop(db_id, None)
+
+        try:
+            snapshot.mtime = await asyncio.to_thread(self._write_snapshot, db_id, snapshot)
+        except Exception as e:
+            logger.warning(f"Failed to persist graph overview for {db_id}: {e}")
+
+        logger.info(
+            f"Computed graph overview for {db_id}: {len(data['nodes'])} nodes, {len(data['edges'])} edges "
+            f"in {time.monotonic() - start:.2f}s"
+        )
+        return snapshot
+
+    def _snapshot_path(self, db_id: str) -> str:
+        safe_id = re.sub(r"[^0-9A-Za-z_-]", "_", db_id)
+        return os.path.join(self.work_dir, f"{safe_id}.json.gz")
+
+    def _write_snapshot(self, db_id: str, snapshot: OverviewSnapshot) -> float:
+        os.makedirs(self.work_dir, exist_ok=True)
+        path = self._snapshot_path(db_id)
+        tmp_path = f"{path}.tmp"
+        record = {"version": snapshot.version, "computed_at": snapshot.computed_at, "data": snapshot.data}
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        return os.path.getmtime(path)
+
+    def _sync_with_disk(self, db_id: str, snapshot: OverviewSnapshot) -> OverviewSnapshot:
+        """对照磁盘快照：被其他进程删除则标记过期，被其他进程重新计算则重新读取"""
+        if snapshot.mtime is None or db_id in self._loading:
+            return snapshot
+        try:
+            mtime = os.path.getmtime(self._snapshot_path(db_id))
+        except FileNotFoundError:
+            snapshot.stale = True
+            return snapshot
+        if mtime > snapshot.mtime:
+            return self._read_snapshot(db_id) or snapshot
+        return snapshot
+
+    def _read_snapshot(self, db_id: str) -> OverviewSnapshot | None:
+        path = self._snapshot_path(db_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            mtime = os.path.getmtime(path)
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                record = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to read graph overview snapshot {path}: {e}")
+            return None
+        snapshot = OverviewSnapshot(record["data"], record["version"], record["computed_at"], mtime=mtime)
+        self._snapshots[db_id] = snapshot
+        return snapshot
+
+
+graph_overview_store = GraphOverviewStore(os.path.join(config.save_dir, "knowledge_graph", "overviews"))
@@ -0,0 +1,124 @@
+"""
+图谱统计缓存
+
+图谱统计（节点数、边数、标签分布等）需要在 Neo4j 上做全图聚合，代价随图规模增长。
+这里把统计结果缓存在内存中：
+- 超过 refresh_seconds 的结果仍直接返回，同时在后台刷新（同一个 key 只有一个刷新任务）；
+- 超过 max_stale_seconds 的结果不再返回，请求等待重新计算，以此限制数据陈旧程度；
+- 导入、删除等写操作可以通过 update 增量修正缓存，不必等待下一次刷新。
+"""
+
+import asyncio
+import copy
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from src.utils import logger
+
+
+@dataclass
+class _CacheEntry:
+    data: Any
+    computed_at: float
+
+
+class GraphStatsCache:
+    """带陈旧上限与后台刷新的统计缓存"""
+
+    def __init__(self, refresh_seconds: float = 60, max_stale_seconds: float = 600):
+        self.refresh_seconds = refresh_seconds
+        self.max_stale_seconds = max(max_stale_seconds, refresh_seconds)
+        self._entries: dict[str, _CacheEntry] = {}
+        self._loading: dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "loads": 0, "load_failures": 0, "updates": 0}
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """返回缓存的统计；缺失或超过陈旧上限时等待 loader 重新计算"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.computed_at
+            if age <= self.refresh_seconds:
+                self._stats["hits"] += 1
+                return copy.deepcopy(entry.data)
+            if age <= self.max_stale_seconds:
+                # 先返回旧值，后台刷新
+                self._stats["stale_hits"] += 1
+                self._schedule_load(key, loader)
+                return copy.deepcopy(entry.data)
+
+        # shield：调用方被取消时不影响其他等待同一次计算的请求
+        data = await asyncio.shield(self._schedule_load(key, loader))
+        return copy.deepcopy(data)
+
+    def peek(self, key: str) -> Any | None:
+        """返回缓存值（不触发计算），不存在时返回 None"""
+        entry = self._entries.get(key)
+        return copy.deepcopy(entry.data) if entry is not None else None
+
+    def set(self, key: str, data: Any) -> None:
+        self._entries[key] = _CacheEntry(data, time.monotonic())
+
+    def update(self, key: str, updater: Callable[[Any], None]) -> bool:
+        """对缓存值做增量修正（原地修改），不存在时返回 False，下次访问时重新计算"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        try:
+            updater(entry.data)
+            self._stats["updates"] += 1
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to update graph stats cache {key}: {e}")
+            self._entries.pop(key, None)
+            return False
+
+    def mark_stale(self, key: str) -> None:
+        """标记为需要刷新：下次访问仍返回当前值，同时在后台重新计算"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.computed_at = min(entry.computed_at, time.monotonic() - self.refresh_seconds - 1)
+
+    def invalidate(self, key: str | None = None) -> None:
+        """移除指定 key（None 表示全部），下次访问时重新计算"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _schedule_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            # 后台刷新无人等待，取出异常避免 "exception was never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[key] = task
+        return task
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        try:
+            data = await loader()
+        except Exception as e:
+            self._stats["load_failures"] += 1
+            logger.warning(f"Failed to refresh graph stats {key}: {e}")
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+        self._stats["loads"] += 1
+        if data is None:
+            # 图数据库未就绪等情况，不缓存
+            return None
+        # 计算期间如有增量修正，以重新计算的结果为准
+        self._entries[key] = _CacheEntry(data, time.monotonic())
+        logger.debug(f"Refreshed graph stats {key} in {time.monotonic() - start:.2f}s")
+        return data
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            **self._stats,
+            "entries": {key: round(now - entry.computed_at, 1) for key, entry in self._entries.items()},
+        }
@@ -0,0 +1,198 @@
+"""
+按需创建的实例池
+
+知识库实例（如 LightRAG）初始化时需要读取存储、建立连接，代价较高：
+- 实例在首次使用时才创建，同一个 key 的并发请求合并为一次创建；
+- 同时进行的创建数量受 init_concurrency 限制，避免服务启动后的请求高峰同时加载大量数据；
+- 空闲超过 idle_seconds 或实例数超过 max_instances 时，按最近最少使用顺序释放未被占用的实例；
+- get(pin=True) 在取得（或创建）实例的同一步标记占用，淘汰不会在返回给调用方之前释放该实例。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from src.utils import logger
+
+
+@dataclass
+class _PooledInstance:
+    instance: Any
+    last_access: float
+    pins: int = 0
+
+
+class InstancePool:
+    """带并发创建上限与空闲淘汰的实例池"""
+
+    def __init__(
+        self,
+        max_instances: int = 0,
+        idle_seconds: float = 0,
+        init_concurrency: int = 2,
+        finalizer: Callable[[Any], Awaitable[None]] | None = None,
+    ):
+        """
+        Args:
+            max_instances: 最多保留的实例数，<= 0 表示不限制
+            idle_seconds: 空闲超过该时间的实例会被释放，<= 0 表示不按空闲时间释放
+            init_concurrency: 同时进行的实例创建数量上限
+            finalizer: 释放实例时调用的异步函数（如关闭存储连接）
+        """
+        self.max_instances = max_instances
+        self.idle_seconds = idle_seconds
+        self._finalizer = finalizer
+        self._init_semaphore = asyncio.Semaphore(max(1, init_concurrency))
+        self._entries: OrderedDict[str, _PooledInstance] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}
+        # 正在等待创建、并要求占用的请求数，创建完成时记到实例上
+        self._pending_pins: dict[str, int] = {}
+        self._evict_lock = asyncio.Lock()
+        self._stats = {"hits": 0, "creates": 0, "coalesced": 0, "evictions": 0, "create_failures": 0}
+        self._create_seconds = 0.0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    async def get(self, key: str, factory: Callable[[], Awaitable[Any]], pin: bool = False) -> Any:
+        """
+        返回 key 对应的实例，不存在时调用 factory 创建（失败时抛出 factory 的异常）
+
+        Args:
+            pin: 同时标记实例正在使用，用完后需调用 unpin
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            if pin:
+                entry.pins += 1
+            self._schedule_evict(keep=key)
+            return entry.instance
+
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._create(key, factory))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[key] = task
+        else:
+            self._stats["coalesced"] += 1
+        if pin:
+            self._pending_pins[key] = self._pending_pins.get(key, 0) + 1
+        try:
+            # shield：单个调用方被取消时不影响其他等待同一次创建的请求
+            return await asyncio.shield(task)
+        except BaseException:
+            if pin:
+                self._release_pending_pin(key, task)
+            raise
+
+    def pin(self, key: str) -> None:
+        """标记实例正在使用（如长时间的入库任务），使用期间不会被释放"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.pins += 1
+            entry.last_access = time.monotonic()
+
+    def unpin(self, key: str) -> None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.pins = max(0, entry.pins - 1)
+            entry.last_access = time.monotonic()
+
+    def _release_pending_pin(self, key: str, task: asyncio.Task) -> None:
+        """等待创建的请求被取消或创建失败时撤销其占用"""
+        if not task.done():
+            self._pending_pins[key] -= 1
+        elif not task.cancelled() and task.exception() is None:
+            # 实例已创建并记上了占用
+            self.unpin(key)
+
+    def discard(self, key: str) -> None:
+        """移除实例（如知识库已删除），在后台执行 finalizer"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        try:
+            asyncio.get_running_loop().create_task(self._finalize(key, entry.instance))
+        except RuntimeError:
+            # 没有运行中的事件循环，无法执行异步释放，交给垃圾回收
+            pass
+
+    async def _create(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            async with self._init_semaphore:
+                start = time.monotonic()
+                instance = await factory()
+        except Exception:
+            self._stats["create_failures"] += 1
+            raise
+        finally:
+            self._loading.pop(key, None)
+            pins = self._pending_pins.pop(key, 0)
+
+        elapsed = time.monotonic() - start
+        self._stats["creates"] += 1
+        self._create_seconds += elapsed
+        self._entries[key] = _PooledInstance(instance, time.monotonic(), pins=pins)
+        logger.info(f"Created instance {key} in {elapsed:.2f}s ({len(self._entries)} active)")
+        self._schedule_evict(keep=key)
+        return instance
+
+    def _select_victims(self, now: float, keep: str | None = None) -> list[str]:
+        """空闲超时的实例，以及超出数量上限时最久未访问的实例（均不含占用中的实例和 keep）"""
+        idle = [key for key, entry in self._entries.items() if entry.pins == 0 and key != keep]
+        victims = [
+            key for key in idle if self.idle_seconds > 0 and now - self._entries[key].last_access > self.idle_seconds
+        ]
+        if self.max_instances > 0:
+            excess = len(self._entries) - len(victims) - self.max_instances
+            for key in idle:
+                if excess <= 0:
+                    break
+                if key not in victims:
+                    victims.append(key)
+                    excess -= 1
+        return victims
+
+    def _schedule_evict(self, keep: str | None = None) -> None:
+        """后台淘汰实例；keep 为刚访问或创建的实例，本轮淘汰不会释放它"""
+        if self._select_victims(time.monotonic(), keep):
+            task = asyncio.create_task(self._evict(keep))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _evict(self, keep: str | None = None) -> None:
+        async with self._evict_lock:
+            for key in self._select_victims(time.monotonic(), keep):
+                entry = self._entries.pop(key, None)
+                if entry is None:
+                    continue
+                self._stats["evictions"] += 1
+                await self._finalize(key, entry.instance)
+
+    async def _finalize(self, key: str, instance: Any) -> None:
+        if self._finalizer is None:
+            return
+        try:
+            await self._finalizer(instance)
+            logger.info(f"Released instance {key}")
+        except Exception as e:
+            logger.warning(f"Failed to release instance {key}: {e}")
+
+    def get_stats(self) -> dict:
+        """创建 / 命中 / 淘汰计数与当前实例"""
+        now = time.monotonic()
+        return {
+            **self._stats,
+            "create_seconds": round(self._create_seconds, 3),
+            "max_instances": self.max_instances,
+            "idle_seconds": self.idle_seconds,
+            "active": [
+                {"key": key, "idle_seconds": round(now - entry.last_access, 1), "pins": entry.pins}
+                for key, entry in reversed(self._entries.items())
+            ],
+        }
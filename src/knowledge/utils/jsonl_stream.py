@@ -0,0 +1,68 @@
+"""
+JSONL 流式读取
+
+从字节块流中按行解析 JSONL，不把整个文件读入内存；
+offset 记录已完整消费的字节位置，导入失败后可从该位置继续读取（断点续传）。
+"""
+
+import json
+from collections.abc import Iterable
+
+from src.utils import logger
+
+
+class JsonlBatchReader:
+    """按批次读取 JSONL 记录"""
+
+    def __init__(self, chunks: Iterable[bytes], start_offset: int = 0):
+        """
+        Args:
+            chunks: 字节块迭代器（如 MinIO 响应的 stream()），需从 start_offset 处开始
+            start_offset: 起始字节偏移，需位于行首
+        """
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self._pos = 0
+        self.offset = start_offset
+        self.lines_read = 0
+        self.invalid_lines = 0
+
+    def _next_line(self) -> bytes | None:
+        while True:
+            idx = self._buffer.find(b"\n", self._pos)
+            if idx >= 0:
+                line = self._buffer[self._pos : idx + 1]
+                self._pos = idx + 1
+                return line
+
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                # 最后一行可能没有换行符
+                line = self._buffer[self._pos :]
+                self._buffer, self._pos = b"", 0
+                return line or None
+            self._buffer = self._buffer[self._pos :] + chunk
+            self._pos = 0
+
+    def read_batch(self, size: int) -> list[dict]:
+        """读取最多 size 条记录，返回空列表表示已读完；无法解析的行跳过并计数"""
+        items: list[dict] = []
+        while len(items) < size:
+            line = self._next_line()
+            if line is None:
+                break
+
+            line_offset = self.offset
+            self.offset += len(line)
+            self.lines_read += 1
+            text = line.strip()
+            if not text:
+                continue
+
+            try:
+                items.append(json.loads(text))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                self.invalid_lines += 1
+                if self.invalid_lines <= 10:
+                    logger.warning(f"跳过无法解析的 JSONL 行（字节偏移 {line_offset}）: {e}")
+        return items
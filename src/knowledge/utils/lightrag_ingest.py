@@ -0,0 +1,135 @@
+"""
+LightRAG 批量入库
+
+- InsertBatcher：把短时间内提交的多个文档合并为一次 ainsert，由 LightRAG 在一个流水线批次内并行处理
+  （并行文档数由 LightRAG 的 MAX_PARALLEL_INSERT 控制），避免逐个文件串行入库；
+- split_unique_batches：LightRAG 在一次 ainsert 内会丢弃内容重复的文档、遇到重复 id 直接报错，
+  因此同一批内 id 或内容相同的文档拆到不同的写入批次；
+- describe_stage：根据文档状态与流水线最新消息推断文档所处阶段（分块 / 实体抽取 / 图谱合并）。
+"""
+
+import asyncio
+import hashlib
+import re
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+# LightRAG 流水线消息，如 "Extracting stage 1/3: xxx.md"、"Merging stage 2/3: xxx.md"
+_STAGE_PATTERN = re.compile(r"(Extracting|Merging) stage \d+/\d+: (.+)$")
+
+STAGE_MESSAGES = {
+    "queued": "排队中",
+    "chunking": "分块中",
+    "extracting": "实体与关系抽取中",
+    "merging": "图谱合并中",
+    "done": "入库完成",
+    "failed": "入库失败",
+}
+
+
+def _status_value(record: dict | None) -> str:
+    status = str((record or {}).get("status", "")).lower()
+    # 兼容 DocStatus 枚举直接转字符串的情况（如 "docstatus.processed"）
+    return status.rsplit(".", 1)[-1]
+
+
+def describe_stage(record: dict | None, latest_message: str | None, file_path: str | None) -> tuple[str, str]:
+    """
+    返回 (阶段, 说明)
+
+    Args:
+        record: 文档在 LightRAG doc_status 中的记录
+        latest_message: LightRAG 流水线状态中的最新消息
+        file_path: 入库时传入的文件路径，用于判断流水线消息是否属于该文档
+    """
+    status = _status_value(record)
+    if status == "processed":
+        return "done", STAGE_MESSAGES["done"]
+    if status == "failed":
+        error = (record or {}).get("error_msg") or (record or {}).get("error")
+        return "failed", f"{STAGE_MESSAGES['failed']}: {error}" if error else STAGE_MESSAGES["failed"]
+
+    chunks_count = (record or {}).get("chunks_count")
+    match = _STAGE_PATTERN.search((latest_message or "").strip())
+    if status == "processing" and match and file_path and match.group(2).strip() == file_path:
+        stage = "extracting" if match.group(1) == "Extracting" else "merging"
+    elif status == "processing":
+        stage = "extracting" if chunks_count else "chunking"
+    else:
+        return "queued", STAGE_MESSAGES["queued"]
+
+    message = STAGE_MESSAGES[stage]
+    if chunks_count:
+        message = f"{message}（{chunks_count} 个分块）"
+    return stage, message
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.md5((content or "").strip().encode("utf-8")).hexdigest()
+
+
+def split_unique_batches(items: list[dict]) -> list[list[dict]]:
+    """将文档拆分为若干批，每批内 id 与内容（去除首尾空白后）均不重复，保持提交顺序"""
+    batches: list[tuple[list[dict], set[str], set[str]]] = []
+    for item in items:
+        content_hash = _content_hash(item["content"])
+        for batch, ids, hashes in batches:
+            if item["id"] not in ids and content_hash not in hashes:
+                break
+        else:
+            batch, ids, hashes = [], set(), set()
+            batches.append((batch, ids, hashes))
+        batch.append(item)
+        ids.add(item["id"])
+        hashes.add(content_hash)
+    return [batch for batch, _, _ in batches]
+
+
+class InsertBatcher:
+    """把窗口期内提交的文档合并为一批写入；批次写入完成（或失败）后各提交方返回"""
+
+    def __init__(
+        self, flush: Callable[[list[Any]], Awaitable[None]], max_batch_size: int = 8, window_seconds: float = 1.0
+    ):
+        self._flush = flush
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_seconds = window_seconds
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_seconds, self._flush_pending)
+        await future
+
+    def _flush_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        try:
+            await self._flush([item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
@@ -0,0 +1,111 @@
+"""
+LLM 调用限流
+
+LightRAG 每个知识库实例各自控制并发（llm_model_max_async），多个知识库同时入库时请求量会叠加，
+容易压垮自部署的模型服务。这里按模型维护进程内共享的限流器：
+- 并发上限：同一模型同时进行的请求数；
+- 速率上限（令牌桶）：每分钟发起的请求数，0 表示不限制。
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from src.utils import logger
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+LLM_MAX_CONCURRENCY = _env_int("YUXI_LIGHTRAG_LLM_CONCURRENCY", 8)
+LLM_REQUESTS_PER_MINUTE = _env_int("YUXI_LIGHTRAG_LLM_RPM", 0, minimum=0)
+
+
+class LLMRateLimiter:
+    """并发上限 + 令牌桶速率限制"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE):
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = max(0, requests_per_minute)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._rate = self.requests_per_minute / 60
+        # 桶容量不超过并发上限，避免空闲后瞬间放出大量请求
+        self._capacity = float(max(1, min(self.requests_per_minute, self.max_concurrency)))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._bucket_lock = asyncio.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._stats = {"calls": 0, "wait_seconds": 0.0}
+
+    @asynccontextmanager
+    async def slot(self):
+        """占用一个调用名额，退出时释放"""
+        start = time.monotonic()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+            try:
+                await self._take_token()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self._waiting -= 1
+
+        self._stats["calls"] += 1
+        self._stats["wait_seconds"] += time.monotonic() - start
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    async def _take_token(self) -> None:
+        if self._rate <= 0:
+            return
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests_per_minute,
+            "active": self._active,
+            "waiting": self._waiting,
+            "calls": self._stats["calls"],
+            "wait_seconds": round(self._stats["wait_seconds"], 3),
+        }
+
+
+_limiters: dict[str, LLMRateLimiter] = {}
+
+
+def get_llm_limiter(model_key: str) -> LLMRateLimiter:
+    """返回模型对应的进程内共享限流器"""
+    limiter = _limiters.get(model_key)
+    if limiter is None:
+        limiter = LLMRateLimiter()
+        _limiters[model_key] = limiter
+        logger.info(
+            f"Created LLM limiter for {model_key}: concurrency={limiter.max_concurrency}, "
+            f"rpm={limiter.requests_per_minute or 'unlimited'}"
+        )
+    return limiter
+
+
+def get_llm_limiter_stats() -> dict[str, dict]:
+    return {model_key: limiter.get_stats() for model_key, limiter in _limiters.items()}
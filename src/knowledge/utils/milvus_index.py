@@ -0,0 +1,106 @@
+"""
+Milvus 向量索引配置
+
+按知识库选择索引类型（FLAT / HNSW / IVF_SQ8 / IVF_PQ / DISKANN），并根据数据量生成构建参数与检索参数。
+默认 auto 档位：小库用 FLAT（精确检索、无需训练），中等规模用 HNSW，超大规模用 IVF_SQ8 压缩内存。
+"""
+
+import math
+import os
+from typing import Any
+
+INDEX_PROFILE_AUTO = "auto"
+INDEX_PROFILES = ("FLAT", "HNSW", "IVF_SQ8", "IVF_PQ", "DISKANN")
+
+# 检索参数默认值（可被知识库查询参数覆盖）
+DEFAULT_HNSW_EF = 64
+DEFAULT_IVF_NPROBE = 16
+DEFAULT_DISKANN_SEARCH_LIST = 100
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# auto 档位的切换阈值（行数）
+FLAT_MAX_ROWS = _env_int("YUXI_MILVUS_FLAT_MAX_ROWS", 20_000)
+HNSW_MAX_ROWS = _env_int("YUXI_MILVUS_HNSW_MAX_ROWS", 2_000_000)
+
+
+def normalize_index_profile(profile: str | None) -> str:
+    """规范化索引档位名称，未知值按 auto 处理"""
+    value = str(profile or INDEX_PROFILE_AUTO).strip().upper()
+    return value if value in INDEX_PROFILES else INDEX_PROFILE_AUTO
+
+
+def resolve_index_type(profile: str | None, row_count: int) -> str:
+    """根据档位与数据量确定实际索引类型"""
+    profile = normalize_index_profile(profile)
+    if profile != INDEX_PROFILE_AUTO:
+        return profile
+    if row_count <= FLAT_MAX_ROWS:
+        return "FLAT"
+    if row_count <= HNSW_MAX_ROWS:
+        return "HNSW"
+    return "IVF_SQ8"
+
+
+def _ivf_nlist(row_count: int) -> int:
+    # 经验值：nlist ≈ 4 * sqrt(N)，限制在 [128, 65536]
+    return min(max(int(4 * math.sqrt(max(row_count, 1))), 128), 65536)
+
+
+def _pq_m(dim: int) -> int:
+    # m 需整除向量维度，每个子空间 4~16 维较为合适
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2):
+        if dim % m == 0 and dim // m >= 4:
+            return m
+    return 1
+
+
+def build_index_params(index_type: str, row_count: int, dim: int, metric_type: str = "COSINE") -> dict[str, Any]:
+    """生成 create_index 使用的索引参数"""
+    if index_type == "FLAT":
+        params: dict[str, Any] = {}
+    elif index_type == "HNSW":
+        params = {"M": 16, "efConstruction": 200}
+    elif index_type == "IVF_SQ8":
+        params = {"nlist": _ivf_nlist(row_count)}
+    elif index_type == "IVF_PQ":
+        params = {"nlist": _ivf_nlist(row_count), "m": _pq_m(dim), "nbits": 8}
+    elif index_type == "DISKANN":
+        params = {}
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
+
+    return {"metric_type": metric_type, "index_type": index_type, "params": params}
+
+
+def build_search_params(index_type: str, metric_type: str, limit: int, options: dict | None = None) -> dict[str, Any]:
+    """生成 search 使用的检索参数，ef / search_list 不小于返回数量"""
+    options = options or {}
+    if index_type == "HNSW":
+        params = {"ef": max(int(options.get("hnsw_ef", DEFAULT_HNSW_EF)), limit)}
+    elif index_type == "DISKANN":
+        params = {"search_list": max(int(options.get("diskann_search_list", DEFAULT_DISKANN_SEARCH_LIST)), limit)}
+    elif index_type.startswith("IVF"):
+        params = {"nprobe": max(int(options.get("ivf_nprobe", DEFAULT_IVF_NPROBE)), 1)}
+    else:
+        params = {}
+    return {"metric_type": metric_type, "params": params}
+
+
+# 加载后向量部分相对原始 float32 向量的内存占比（FLAT/IVF_FLAT 保留原始向量，SQ8/PQ 为压缩码，DISKANN 主要在磁盘）
+_VECTOR_MEMORY_FACTOR = {"FLAT": 1.0, "IVF_FLAT": 1.0, "HNSW": 1.1, "IVF_SQ8": 0.25, "IVF_PQ": 0.1, "DISKANN": 0.25}
+
+# 每行标量字段（content/source/id 等）与 BM25 稀疏向量的粗略内存占用
+ROW_SCALAR_BYTES = 4096
+
+
+def estimate_collection_bytes(row_count: int, dim: int, index_type: str) -> int:
+    """估算集合加载到 query node 后占用的内存（字节），用于内存预算与淘汰"""
+    vector_bytes = dim * 4 * _VECTOR_MEMORY_FACTOR.get(index_type, 1.0)
+    return int(max(row_count, 0) * (vector_bytes + ROW_SCALAR_BYTES))
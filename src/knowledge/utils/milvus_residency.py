@@ -0,0 +1,161 @@
+"""
+Milvus 集合驻留管理
+
+集合在首次访问时才加载到 query node，并记录最近访问时间与估算内存占用；
+已加载集合的估算总量超过内存预算时，按最近最少使用（LRU）顺序释放冷集合。
+同一集合的并发加载请求会合并为一次 load。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from src.utils import logger
+
+
+@dataclass
+class ResidentCollection:
+    collection: Any
+    size_bytes: int
+    last_access: float
+
+
+class CollectionResidencyManager:
+    """按内存预算管理集合的加载与释放"""
+
+    def __init__(self, budget_bytes: int = 0, min_idle_seconds: float = 60):
+        """
+        Args:
+            budget_bytes: 已加载集合的估算内存上限，<= 0 表示不限制（只做按需加载）
+            min_idle_seconds: 最近这段时间内访问过的集合不会被释放，避免释放正在检索的集合
+        """
+        self.budget_bytes = budget_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self._resident: OrderedDict[str, ResidentCollection] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}
+        self._evict_lock = asyncio.Lock()
+        self._stats = {
+            "hits": 0,
+            "loads": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "load_failures": 0,
+            "load_seconds": 0.0,
+        }
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._resident.values())
+
+    def is_resident(self, key: str) -> bool:
+        return key in self._resident
+
+    async def acquire(self, key: str, collection: Any, estimate_size: Callable[[], int]) -> None:
+        """确保集合已加载，并刷新最近访问时间"""
+        entry = self._resident.get(key)
+        if entry is not None:
+            entry.last_access = time.monotonic()
+            self._resident.move_to_end(key)
+            self._stats["hits"] += 1
+            return
+
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, collection, estimate_size))
+            self._loading[key] = task
+        else:
+            self._stats["coalesced"] += 1
+        # shield：单个调用方被取消时不影响其他等待同一次加载的请求
+        await asyncio.shield(task)
+
+    def adopt(self, key: str, collection: Any, size_bytes: int) -> None:
+        """登记已在 Milvus 中处于加载状态的集合（如服务重启前加载的），视为最久未访问"""
+        if key in self._resident or key in self._loading:
+            return
+        self._resident[key] = ResidentCollection(collection, size_bytes, last_access=0.0)
+        self._resident.move_to_end(key, last=False)
+
+    def discard(self, key: str) -> None:
+        """移除登记（集合已删除或正在重建时使用），不执行 release"""
+        self._resident.pop(key, None)
+
+    async def _load(self, key: str, collection: Any, estimate_size: Callable[[], int]) -> None:
+        start = time.monotonic()
+        try:
+            await asyncio.to_thread(collection.load)
+        except Exception:
+            self._stats["load_failures"] += 1
+            self._loading.pop(key, None)
+            raise
+
+        try:
+            size_bytes = await asyncio.to_thread(estimate_size)
+        except Exception as e:
+            logger.warning(f"Failed to estimate size of collection {key}: {e}")
+            size_bytes = 0
+
+        elapsed = time.monotonic() - start
+        self._stats["loads"] += 1
+        self._stats["load_seconds"] += elapsed
+        self._resident[key] = ResidentCollection(collection, size_bytes, time.monotonic())
+        self._loading.pop(key, None)
+        logger.info(f"Loaded Milvus collection {key} in {elapsed:.2f}s, estimated {size_bytes / 1024**2:.1f}MB")
+
+        await self._evict(exclude=key)
+
+    async def _evict(self, exclude: str) -> None:
+        """超出预算时按 LRU 顺序释放冷集合"""
+        if self.budget_bytes <= 0:
+            return
+
+        async with self._evict_lock:
+            now = time.monotonic()
+            total = self.resident_bytes
+            victims: list[str] = []
+            for key, entry in self._resident.items():
+                if total <= self.budget_bytes:
+                    break
+                if key == exclude or now - entry.last_access < self.min_idle_seconds:
+                    continue
+                victims.append(key)
+                total -= entry.size_bytes
+
+            for key in victims:
+                entry = self._resident.pop(key, None)
+                if entry is None:
+                    continue
+                try:
+                    await asyncio.to_thread(entry.collection.release)
+                    self._stats["evictions"] += 1
+                    logger.info(f"Released cold Milvus collection {key} ({entry.size_bytes / 1024**2:.1f}MB)")
+                except Exception as e:
+                    logger.warning(f"Failed to release Milvus collection {key}: {e}")
+
+            if total > self.budget_bytes:
+                logger.warning(
+                    f"Milvus resident collections ({total / 1024**2:.1f}MB) exceed budget "
+                    f"({self.budget_bytes / 1024**2:.1f}MB), no idle collection to release"
+                )
+
+    def get_stats(self) -> dict:
+        """加载 / 淘汰计数与当前驻留集合"""
+        now = time.monotonic()
+        total_requests = self._stats["hits"] + self._stats["loads"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "load_seconds": round(self._stats["load_seconds"], 3),
+            "hit_rate": round(self._stats["hits"] / total_requests, 4) if total_requests else 0.0,
+            "budget_mb": round(self.budget_bytes / 1024**2, 1),
+            "resident_mb": round(self.resident_bytes / 1024**2, 1),
+            "resident": [
+                {
+                    "db_id": key,
+                    "size_mb": round(entry.size_bytes / 1024**2, 1),
+                    "idle_seconds": round(now - entry.last_access, 1) if entry.last_access else None,
+                }
+                for key, entry in reversed(self._resident.items())
+            ],
+        }
@@ -4,6 +4,7 @@ DeepSeek OCR Parser
 Uses DeepSeek-OCR via SiliconFlow API for document parsing and OCR.
 """
 
+import asyncio
 import base64
 import os
 import re
@@ -11,10 +12,17 @@ import time
 from pathlib import Path
 from typing import Any
 
+import aiofiles
 import fitz  # PyMuPDF
-import requests
+import httpx
 
 from src.plugins.document_processor_base import BaseDocumentProcessor, DocumentParserException
+from src.plugins.http_client import (
+    get_async_http_client,
+    get_http_client,
+    get_service_concurrency,
+    get_service_limiter,
+)
 from src.utils import logger
 
 
@@ -58,7 +66,7 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
         try:
             # We can't easily "ping" without cost, but we can check if the model list is accessible
             models_url = "https://api.siliconflow.cn/v1/models"
-            response = requests.get(models_url, headers=self.headers, timeout=10)
+            response = get_http_client(self.get_service_name()).get(models_url, headers=self.headers, timeout=10)
 
             if response.status_code == 200:
                 return {
@@ -77,10 +85,7 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
         except Exception as e:
             return {"status": "unavailable", "message": f"Connection failed: {str(e)}", "details": {"error": str(e)}}
 
-    def process_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
-        """
-        Process file using DeepSeek OCR via SiliconFlow
-        """
+    def _validate_file(self, file_path: str) -> str:
         if not os.path.exists(file_path):
             raise DocumentParserException(f"File not found: {file_path}", self.get_service_name(), "file_not_found")
 
@@ -89,6 +94,20 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
             raise DocumentParserException(
                 f"Unsupported file type: {file_ext}", self.get_service_name(), "unsupported_file_type"
             )
+        return file_ext
+
+    def _wrap_error(self, e: Exception) -> DocumentParserException:
+        if isinstance(e, DocumentParserException):
+            return e
+        error_msg = f"DeepSeek OCR failed: {str(e)}"
+        logger.error(error_msg)
+        return DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
+
+    def process_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
+        """
+        Process file using DeepSeek OCR via SiliconFlow
+        """
+        file_ext = self._validate_file(file_path)
 
         try:
             start_time = time.time()
@@ -107,11 +126,35 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
             return content
 
         except Exception as e:
-            if isinstance(e, DocumentParserException):
-                raise
-            error_msg = f"DeepSeek OCR failed: {str(e)}"
-            logger.error(error_msg)
-            raise DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
+            raise self._wrap_error(e)
+
+    async def aprocess_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
+        """
+        Process file asynchronously; PDF pages are recognized concurrently within the service limit
+        """
+        file_ext = self._validate_file(file_path)
+
+        try:
+            start_time = time.time()
+            logger.info(f"DeepSeek OCR starting: {os.path.basename(file_path)}")
+
+            if file_ext == ".pdf":
+                content = await self._aprocess_pdf(file_path)
+            else:
+                async with aiofiles.open(file_path, "rb") as f:
+                    file_content = await f.read()
+                async with get_service_limiter(self.get_service_name()):
+                    content = await self._acall_api(file_content, self._get_mime_type(file_path))
+
+            processing_time = time.time() - start_time
+            logger.info(
+                f"DeepSeek OCR finished: {os.path.basename(file_path)} - {len(content)} chars ({processing_time:.2f}s)"
+            )
+
+            return content
+
+        except Exception as e:
+            raise self._wrap_error(e)
 
     def _process_pdf(self, file_path: str) -> str:
         """Process PDF by converting pages to images"""
@@ -124,17 +167,60 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
 
             for i, page in enumerate(doc):
                 logger.debug(f"Processing page {i + 1}/{total_pages}")
-                # Convert page to image (200 DPI for better quality)
-                pix = page.get_pixmap(dpi=200)
-                img_bytes = pix.tobytes("png")
-
-                page_text = self._call_api(img_bytes, "image/png")
+                page_text = self._call_api(self._render_page(page), "image/png")
                 full_text.append(page_text)
 
             return "\n\n".join(full_text)
         finally:
             doc.close()
 
+    async def _aprocess_pdf(self, file_path: str) -> str:
+        """
+        Process PDF pages concurrently.
+
+        A page is rendered only after a window slot is free, so rendered pages held in memory
+        stay bounded by the service concurrency limit.
+        """
+        service_name = self.get_service_name()
+        limiter = get_service_limiter(service_name)
+        window = asyncio.Semaphore(get_service_concurrency(service_name))
+        doc = await asyncio.to_thread(fitz.open, file_path)
+        tasks: list[asyncio.Task] = []
+        try:
+            total_pages = len(doc)
+            logger.info(f"Processing PDF with {total_pages} pages")
+
+            async def _recognize(img_bytes: bytes) -> str:
+                try:
+                    async with limiter:
+                        return await self._acall_api(img_bytes, "image/png")
+                finally:
+                    window.release()
+
+            for i in range(total_pages):
+                await window.acquire()
+                try:
+                    logger.debug(f"Processing page {i + 1}/{total_pages}")
+                    img_bytes = await asyncio.to_thread(self._render_page, doc[i])
+                except BaseException:
+                    window.release()
+                    raise
+                tasks.append(asyncio.create_task(_recognize(img_bytes)))
+
+            return "\n\n".join(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            doc.close()
+
+    @staticmethod
+    def _render_page(page) -> bytes:
+        # Convert page to image (200 DPI for better quality)
+        pix = page.get_pixmap(dpi=200)
+        return pix.tobytes("png")
+
     def _process_image(self, file_path: str) -> str:
         """Process single image file"""
         mime_type = self._get_mime_type(file_path)
@@ -142,8 +228,7 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
             file_content = f.read()
         return self._call_api(file_content, mime_type)
 
-    def _call_api(self, data_bytes: bytes, mime_type: str) -> str:
-        """Call SiliconFlow API"""
+    def _build_payload(self, data_bytes: bytes, mime_type: str) -> dict[str, Any]:
         encoded_string = base64.b64encode(data_bytes).decode("utf-8")
         data_url = f"data:{mime_type};base64,{encoded_string}"
 
@@ -157,10 +242,9 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
             }
         ]
 
-        payload = {"model": self.model, "messages": messages, "max_tokens": 4096, "temperature": 0.1}
-
-        response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=120)
+        return {"model": self.model, "messages": messages, "max_tokens": 4096, "temperature": 0.1}
 
+    def _parse_response(self, response: httpx.Response) -> str:
         if response.status_code != 200:
             error_msg = f"API Error {response.status_code}: {response.text}"
             logger.error(error_msg)
@@ -176,6 +260,22 @@ class DeepSeekOCRParser(BaseDocumentProcessor):
 
         return content.strip()
 
+    def _call_api(self, data_bytes: bytes, mime_type: str) -> str:
+        """Call SiliconFlow API"""
+        payload = self._build_payload(data_bytes, mime_type)
+        response = get_http_client(self.get_service_name()).post(
+            self.api_url, headers=self.headers, json=payload, timeout=120
+        )
+        return self._parse_response(response)
+
+    async def _acall_api(self, data_bytes: bytes, mime_type: str) -> str:
+        """Call SiliconFlow API asynchronously (caller holds the service limiter)"""
+        payload = self._build_payload(data_bytes, mime_type)
+        response = await get_async_http_client(self.get_service_name()).post(
+            self.api_url, headers=self.headers, json=payload, timeout=120
+        )
+        return self._parse_response(response)
+
     def _get_mime_type(self, file_path: str) -> str:
         file_ext = Path(file_path).suffix.lower()
         return self.MIME_TYPE_MAP.get(file_ext, "image/jpeg")  # Default fallback
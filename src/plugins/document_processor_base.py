@@ -4,6 +4,7 @@
 这个模块定义了统一的文档处理器接口,用于OCR和文档解析服务。
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any
 
@@ -61,6 +62,15 @@ class BaseDocumentProcessor(ABC):
         """
         pass
 
+    async def aprocess_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
+        """
+        异步处理文件并返回提取的文本
+
+        默认在线程中执行 process_file；调用远程服务的处理器应覆盖为原生异步实现，
+        避免长时间占用默认线程池。
+        """
+        return await asyncio.to_thread(self.process_file, file_path, params)
+
     @abstractmethod
     def check_health(self) -> dict[str, Any]:
         """
@@ -81,6 +81,25 @@ class DocumentProcessorFactory:
         processor = cls.get_processor(processor_type)
         return processor.process_file(file_path, params)
 
+    @classmethod
+    async def aprocess_file(cls, processor_type: str, file_path: str, params: dict | None = None) -> str:
+        """
+        使用指定处理器异步处理文件 (便捷方法)
+
+        Args:
+            processor_type: 处理器类型
+            file_path: 文件路径
+            params: 处理参数
+
+        Returns:
+            str: 提取的文本
+
+        Raises:
+            DocumentProcessorException: 处理失败
+        """
+        processor = cls.get_processor(processor_type)
+        return await processor.aprocess_file(file_path, params)
+
     @classmethod
     def check_health(cls, processor_type: str) -> dict[str, Any]:
         """
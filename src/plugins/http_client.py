@@ -0,0 +1,152 @@
+"""
+远程解析服务共享 HTTP 客户端
+
+- 每个服务一个连接复用（keep-alive）的同步 httpx.Client，供线程中的同步调用使用
+- 每个事件循环、每个服务一个 httpx.AsyncClient，供异步解析路径使用
+- 每个服务一个并发限制器，批量导入时不会压垮远程服务，也不会占满默认线程池
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+
+from src.utils import logger
+
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=8, keepalive_expiry=60.0)
+
+# 各服务默认并发上限，可通过 YUXI_REMOTE_PARSER_CONCURRENCY_<SERVICE> 覆盖
+DEFAULT_SERVICE_CONCURRENCY = {
+    "mineru_ocr": 2,
+    "mineru_official": 8,
+    "paddlex_ocr": 2,
+    "deepseek_ocr": 4,
+}
+
+_sync_clients: dict[str, httpx.Client] = {}
+_sync_clients_lock = threading.Lock()
+
+# 异步客户端与限流器都绑定在创建它们的事件循环上
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_service_concurrency(service_name: str) -> int:
+    """获取服务并发上限：服务级环境变量 > 全局环境变量 > 内置默认值"""
+    default = DEFAULT_SERVICE_CONCURRENCY.get(service_name, 4)
+    raw = os.getenv(f"YUXI_REMOTE_PARSER_CONCURRENCY_{service_name.upper()}") or os.getenv(
+        "YUXI_REMOTE_PARSER_CONCURRENCY", str(default)
+    )
+    try:
+        return max(1, int(raw))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_http_client(service_name: str) -> httpx.Client:
+    """获取服务共享的同步 HTTP 客户端（线程安全）"""
+    client = _sync_clients.get(service_name)
+    if client is None or client.is_closed:
+        with _sync_clients_lock:
+            client = _sync_clients.get(service_name)
+            if client is None or client.is_closed:
+                client = httpx.Client(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS, follow_redirects=True)
+                _sync_clients[service_name] = client
+    return client
+
+
+def get_async_http_client(service_name: str) -> httpx.AsyncClient:
+    """获取当前事件循环中服务共享的异步 HTTP 客户端"""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(service_name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS, follow_redirects=True)
+        clients[service_name] = client
+    return client
+
+
+def get_service_limiter(service_name: str) -> asyncio.Semaphore:
+    """获取当前事件循环中服务的并发限制器"""
+    loop = asyncio.get_running_loop()
+    limiters = _limiters.setdefault(loop, {})
+    limiter = limiters.get(service_name)
+    if limiter is None:
+        limiter = asyncio.Semaphore(get_service_concurrency(service_name))
+        limiters[service_name] = limiter
+    return limiter
+
+
+async def aclose_http_clients() -> None:
+    """关闭当前事件循环中的异步客户端及所有同步客户端"""
+    try:
+        loop = asyncio.get_running_loop()
+        clients = _async_clients.pop(loop, {})
+    except RuntimeError:
+        clients = {}
+
+    for service_name, client in clients.items():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭 {service_name} 异步 HTTP 客户端失败: {e}")
+
+    with _sync_clients_lock:
+        sync_clients = list(_sync_clients.items())
+        _sync_clients.clear()
+    for service_name, client in sync_clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"关闭 {service_name} HTTP 客户端失败: {e}")
+
+
+async def poll_with_backoff[T](
+    fetch: Callable[[], Awaitable[T]],
+    is_done: Callable[[T], bool],
+    *,
+    timeout: float,
+    initial_delay: float = 2.0,
+    max_delay: float = 15.0,
+    factor: float = 1.5,
+) -> T:
+    """
+    异步轮询直到 is_done 返回 True，轮询间隔按指数退避增长
+
+    Raises:
+        TimeoutError: 超过 timeout 秒仍未完成
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        result = await fetch()
+        if is_done(result):
+            return result
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"轮询超时（{timeout:.0f}s）")
+
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * factor, max_delay)
+
+
+def response_error_detail(response: Any) -> str:
+    """从错误响应中提取可读的错误信息"""
+    try:
+        error_data = response.json()
+        if isinstance(error_data, dict):
+            return str(error_data.get("detail") or error_data.get("msg") or error_data)
+        return str(error_data)
+    except Exception:
+        return response.text or f"HTTP {response.status_code}"
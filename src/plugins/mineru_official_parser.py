@@ -4,22 +4,119 @@ MinerU Official 解析器
 使用 MinerU 官方云服务 API 进行文档解析
 """
 
+import asyncio
+import json
 import os
 import tempfile
 import time
+import weakref
 import zipfile
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-import requests
+import aiofiles
+import httpx
 
 from src.plugins.document_processor_base import BaseDocumentProcessor, DocumentParserException
+from src.plugins.http_client import get_async_http_client, get_http_client, get_service_limiter, poll_with_backoff
 from src.utils import hashstr, logger
 
 
+def _env_number(name: str, default: float, minimum: float) -> float:
+    try:
+        return max(minimum, float(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class _PendingFile:
+    file_path: str
+    entry: dict[str, Any]
+    future: asyncio.Future
+
+
+class _MinerUBatchSubmitter:
+    """
+    将短时间窗口内的并发解析请求合并为一个 MinerU 批次提交
+
+    批次级参数（公式/表格识别、语言）相同的文件才会合并；达到批次上限时立即提交。
+    """
+
+    def __init__(self, parser: "MinerUOfficialParser", batch_size: int, window: float):
+        self.parser = parser
+        self.batch_size = batch_size
+        self.window = window
+        self._groups: dict[str, list[_PendingFile]] = {}
+        self._options: dict[str, dict[str, Any]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, file_path: str, params: dict[str, Any]) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        options = self.parser._batch_options(params)
+        key = json.dumps(options, sort_keys=True)
+
+        group = self._groups.setdefault(key, [])
+        self._options[key] = options
+
+        entry = self.parser._file_entry(file_path, params)
+        # 同一批次内 data_id 需唯一，用于匹配解析结果
+        if any(item.entry["data_id"] == entry["data_id"] for item in group):
+            entry["data_id"] = f"{entry['data_id']}_{len(group)}"
+
+        future = loop.create_future()
+        group.append(_PendingFile(file_path=file_path, entry=entry, future=future))
+
+        if len(group) >= self.batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: str) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        items = [item for item in self._groups.pop(key, []) if not item.future.done()]
+        options = self._options.pop(key, {})
+        if not items:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(items, options))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: list[_PendingFile], options: dict[str, Any]) -> None:
+        try:
+            results = await self.parser._arun_batch(items, options)
+        except Exception as e:
+            results = {item.entry["data_id"]: e for item in items}
+
+        for item in items:
+            if item.future.done():
+                continue
+            result = results.get(item.entry["data_id"])
+            if result is None:
+                service_name = self.parser.get_service_name()
+                result = DocumentParserException("批次结果中缺少该文件", service_name, "missing_result")
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+
 class MinerUOfficialParser(BaseDocumentProcessor):
     """MinerU 官方 API 解析器"""
 
+    # 健康状态缓存时间（秒），避免每个文件都额外创建一次测试任务
+    HEALTH_CACHE_TTL = 300
+    # 由于没有专门的 ping 接口，我们尝试创建一个测试任务的请求来验证 API 密钥
+    HEALTH_CHECK_TASK = {"url": "https://cdn-mineru.openxlab.org.cn/demo/example.pdf", "is_ocr": True}
+
     def __init__(self, api_key: str | None = None):
         self.api_key = api_key or os.getenv("MINERU_API_KEY")
         if not self.api_key:
@@ -30,6 +127,12 @@ class MinerUOfficialParser(BaseDocumentProcessor):
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
+        self.batch_size = int(_env_number("YUXI_MINERU_BATCH_SIZE", 20, minimum=1))
+        self.batch_window = _env_number("YUXI_MINERU_BATCH_WINDOW", 1.0, minimum=0.0)
+        self._healthy_until = 0.0
+        self._batchers: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _MinerUBatchSubmitter] = (
+            weakref.WeakKeyDictionary()
+        )
 
     def get_service_name(self) -> str:
         return "mineru_official"
@@ -38,59 +141,94 @@ class MinerUOfficialParser(BaseDocumentProcessor):
         """MinerU 官方 API 支持的文件格式"""
         return [".pdf", ".doc", ".docx", ".ppt", ".pptx", ".png", ".jpg", ".jpeg"]
 
-    def check_health(self) -> dict[str, Any]:
-        """检查 API 可用性和密钥有效性"""
-        try:
-            # 使用一个简单的测试请求来验证 API 密钥
-            # 由于没有专门的 ping 接口，我们尝试创建一个测试任务的请求
-            test_data = {"url": "https://cdn-mineru.openxlab.org.cn/demo/example.pdf", "is_ocr": True}
-
-            response = requests.post(f"{self.api_base}/extract/task", headers=self.headers, json=test_data, timeout=10)
-
-            # 如果返回 401 或特定的 API 错误码，说明密钥有问题
-            if response.status_code == 401:
-                return {"status": "unhealthy", "message": "API 密钥无效或已过期", "details": {"error_code": "A0202"}}
-            elif response.status_code == 403:
-                return {"status": "unhealthy", "message": "API 密钥权限不足", "details": {"error_code": "A0211"}}
-            elif response.status_code == 200:
-                # 解析响应检查是否成功创建任务
-                try:
-                    result = response.json()
-                    if result.get("code") == 0:
-                        return {
-                            "status": "healthy",
-                            "message": "MinerU 官方 API 服务可用",
-                            "details": {"api_base": self.api_base},
-                        }
-                    else:
-                        return {
-                            "status": "unhealthy",
-                            "message": f"API 返回错误: {result.get('msg', '未知错误')}",
-                            "details": {"error_code": result.get("code")},
-                        }
-                except Exception:
+    def _health_from_response(self, response: httpx.Response) -> dict[str, Any]:
+        # 如果返回 401 或特定的 API 错误码，说明密钥有问题
+        if response.status_code == 401:
+            return {"status": "unhealthy", "message": "API 密钥无效或已过期", "details": {"error_code": "A0202"}}
+        elif response.status_code == 403:
+            return {"status": "unhealthy", "message": "API 密钥权限不足", "details": {"error_code": "A0211"}}
+        elif response.status_code == 200:
+            # 解析响应检查是否成功创建任务
+            try:
+                result = response.json()
+                if result.get("code") == 0:
                     return {
                         "status": "healthy",
                         "message": "MinerU 官方 API 服务可用",
                         "details": {"api_base": self.api_base},
                     }
-            else:
+                else:
+                    return {
+                        "status": "unhealthy",
+                        "message": f"API 返回错误: {result.get('msg', '未知错误')}",
+                        "details": {"error_code": result.get("code")},
+                    }
+            except Exception:
                 return {
-                    "status": "unhealthy",
-                    "message": f"API 服务异常: HTTP {response.status_code}",
-                    "details": {"status_code": response.status_code},
+                    "status": "healthy",
+                    "message": "MinerU 官方 API 服务可用",
+                    "details": {"api_base": self.api_base},
                 }
+        else:
+            return {
+                "status": "unhealthy",
+                "message": f"API 服务异常: HTTP {response.status_code}",
+                "details": {"status_code": response.status_code},
+            }
 
-        except requests.exceptions.Timeout:
+    def _health_from_error(self, e: Exception) -> dict[str, Any]:
+        if isinstance(e, httpx.TimeoutException):
             return {"status": "timeout", "message": "API 请求超时", "details": {"timeout": "10s"}}
-        except requests.exceptions.ConnectionError:
+        if isinstance(e, httpx.ConnectError):
             return {
                 "status": "unavailable",
                 "message": "无法连接到 MinerU 官方 API 服务",
                 "details": {"api_base": self.api_base},
             }
+        return {"status": "error", "message": f"健康检查失败: {str(e)}", "details": {"error": str(e)}}
+
+    def check_health(self) -> dict[str, Any]:
+        """检查 API 可用性和密钥有效性"""
+        try:
+            response = get_http_client(self.get_service_name()).post(
+                f"{self.api_base}/extract/task", headers=self.headers, json=self.HEALTH_CHECK_TASK, timeout=10
+            )
+            return self._health_from_response(response)
         except Exception as e:
-            return {"status": "error", "message": f"健康检查失败: {str(e)}", "details": {"error": str(e)}}
+            return self._health_from_error(e)
+
+    async def acheck_health(self) -> dict[str, Any]:
+        """异步检查 API 可用性，健康结果缓存 HEALTH_CACHE_TTL 秒"""
+        if time.monotonic() < self._healthy_until:
+            return {"status": "healthy", "message": "MinerU 官方 API 服务可用", "details": {"cached": True}}
+
+        try:
+            response = await get_async_http_client(self.get_service_name()).post(
+                f"{self.api_base}/extract/task", headers=self.headers, json=self.HEALTH_CHECK_TASK, timeout=10
+            )
+            health = self._health_from_response(response)
+        except Exception as e:
+            health = self._health_from_error(e)
+
+        if health["status"] == "healthy":
+            self._healthy_until = time.monotonic() + self.HEALTH_CACHE_TTL
+        return health
+
+    def _validate_file(self, file_path: str) -> None:
+        if not os.path.exists(file_path):
+            raise DocumentParserException(f"文件不存在: {file_path}", self.get_service_name(), "file_not_found")
+
+        file_ext = Path(file_path).suffix.lower()
+        if not self.supports_file_type(file_ext):
+            raise DocumentParserException(
+                f"不支持的文件类型: {file_ext}", self.get_service_name(), "unsupported_file_type"
+            )
+
+    def _ensure_healthy(self, health: dict[str, Any]) -> None:
+        if health["status"] != "healthy":
+            raise DocumentParserException(
+                f"MinerU 官方 API 不可用: {health['message']}", self.get_service_name(), health["status"]
+            )
 
     def process_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
         """
@@ -109,29 +247,18 @@ class MinerUOfficialParser(BaseDocumentProcessor):
         Returns:
             str: 提取的 Markdown 文本
         """
-        if not os.path.exists(file_path):
-            raise DocumentParserException(f"文件不存在: {file_path}", self.get_service_name(), "file_not_found")
-
-        file_ext = Path(file_path).suffix.lower()
-        if not self.supports_file_type(file_ext):
-            raise DocumentParserException(
-                f"不支持的文件类型: {file_ext}", self.get_service_name(), "unsupported_file_type"
-            )
+        self._validate_file(file_path)
 
         # 先检查 API 健康状态
-        health = self.check_health()
-        if health["status"] != "healthy":
-            raise DocumentParserException(
-                f"MinerU 官方 API 不可用: {health['message']}", self.get_service_name(), health["status"]
-            )
+        self._ensure_healthy(self.check_health())
 
         # 处理参数
         params = params or {}
 
         # 由于官方 API 不支持直接文件上传，我们需要先上传文件到可访问的 URL
         # 这里使用批量文件上传接口
+        start_time = time.time()
         try:
-            start_time = time.time()
             logger.info(f"MinerU Official 开始处理: {os.path.basename(file_path)}")
 
             # 步骤 1: 申请文件上传链接
@@ -142,220 +269,306 @@ class MinerUOfficialParser(BaseDocumentProcessor):
             result = self._poll_batch_result(batch_id)
             logger.info(f"任务完成，状态: {result['state']}")
 
-            zip_url = result.get("full_zip_url")
+            # 步骤 3: 下载并解析结果
+            zip_content = self._download_zip(result.get("full_zip_url"))
+            text = asyncio.run(self._extract_markdown(zip_content, params))
+            self._log_success(file_path, text, start_time)
+            return text
 
-            try:
-                zip_path = self._download_zip(zip_url)
-            except Exception:
-                text = self._download_and_extract(zip_url)
-                processing_time = time.time() - start_time
-                logger.info(
-                    f"MinerU Official: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)"
-                )
-                return text
+        except Exception as e:
+            raise self._wrap_error(e, start_time)
 
-            import asyncio
+    async def aprocess_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
+        """
+        异步处理文件，参数同 process_file
 
-            from src.knowledge.indexing import _process_zip_file
+        短时间内的并发请求会合并为一个 MinerU 批次提交（YUXI_MINERU_BATCH_SIZE / YUXI_MINERU_BATCH_WINDOW），
+        结果轮询使用指数退避，不占用线程池。
+        """
+        self._validate_file(file_path)
+        self._ensure_healthy(await self.acheck_health())
+        params = params or {}
 
-            try:
-                processed = asyncio.run(_process_zip_file(zip_path, params.get("db_id") or "ocr-test"))
-                text = processed["markdown_content"]
-            except Exception:
-                import zipfile
-
-                text = ""
-                logger.error(f"从 zip 文件中提取 full.md 失败: {zip_path}，使用第一个 md 文件")
-                with zipfile.ZipFile(zip_path, "r") as zf:
-                    md_files = [n for n in zf.namelist() if n.lower().endswith(".md")]
-                    if md_files:
-                        md_file = next((n for n in md_files if Path(n).name == "full.md"), md_files[0])
-                        with zf.open(md_file) as f:
-                            text = f.read().decode("utf-8")
-            finally:
-                try:
-                    os.unlink(zip_path)
-                except Exception:
-                    pass
-
-            processing_time = time.time() - start_time
-            logger.info(
-                f"MinerU Official 处理成功: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)"
-            )
+        start_time = time.time()
+        try:
+            logger.info(f"MinerU Official 开始处理: {os.path.basename(file_path)}")
 
+            loop = asyncio.get_running_loop()
+            batcher = self._batchers.get(loop)
+            if batcher is None:
+                batcher = _MinerUBatchSubmitter(self, self.batch_size, self.batch_window)
+                self._batchers[loop] = batcher
+            result = await batcher.submit(file_path, params)
+
+            zip_content = await self._adownload_zip(result.get("full_zip_url"))
+            text = await self._extract_markdown(zip_content, params)
+            self._log_success(file_path, text, start_time)
             return text
 
         except Exception as e:
-            if isinstance(e, DocumentParserException):
-                raise
-            processing_time = time.time() - start_time
-            error_msg = f"MinerU Official 处理失败: {str(e)}"
-            logger.error(f"{error_msg} ({processing_time:.2f}s)")
-            raise DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
+            raise self._wrap_error(e, start_time)
+
+    def _log_success(self, file_path: str, text: str, start_time: float) -> None:
+        processing_time = time.time() - start_time
+        logger.info(
+            f"MinerU Official 处理成功: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)"
+        )
+
+    def _wrap_error(self, e: Exception, start_time: float) -> DocumentParserException:
+        if isinstance(e, DocumentParserException):
+            return e
+        processing_time = time.time() - start_time
+        if isinstance(e, TimeoutError):
+            logger.error(f"MinerU Official 任务处理超时 ({processing_time:.2f}s)")
+            return DocumentParserException("任务处理超时", self.get_service_name(), "timeout")
+        error_msg = f"MinerU Official 处理失败: {str(e)}"
+        logger.error(f"{error_msg} ({processing_time:.2f}s)")
+        return DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
+
+    # =========================================================================
+    # 请求构建与结果解析
+    # =========================================================================
+
+    @staticmethod
+    def _batch_options(params: dict[str, Any]) -> dict[str, Any]:
+        """批次级参数，同一批次内的文件共享"""
+        return {
+            "enable_formula": params.get("enable_formula", True),
+            "enable_table": params.get("enable_table", True),
+            "language": params.get("language", "ch"),
+        }
 
-    def _upload_file(self, file_path: str, params: dict[str, Any]) -> str:
-        """上传文件并返回 batch_id"""
+    @staticmethod
+    def _file_entry(file_path: str, params: dict[str, Any]) -> dict[str, Any]:
+        """文件级参数"""
         filename = os.path.basename(file_path)
 
         data_id = params.get("data_id", filename)
         if len(data_id) > 30:
             data_id = data_id[:30] + "_" + hashstr(data_id, length=8)
 
-        upload_data = {
-            "enable_formula": params.get("enable_formula", True),
-            "enable_table": params.get("enable_table", True),
-            "language": params.get("language", "ch"),
-            "files": [
-                {
-                    "name": filename,
-                    "is_ocr": params.get("is_ocr", True),
-                    "data_id": data_id,
-                    "page_ranges": params.get("page_ranges"),
-                }
-            ],
+        return {
+            "name": filename,
+            "is_ocr": params.get("is_ocr", True),
+            "data_id": data_id,
+            "page_ranges": params.get("page_ranges"),
         }
 
-        # 申请上传链接
-        response = requests.post(f"{self.api_base}/file-urls/batch", headers=self.headers, json=upload_data, timeout=30)
-
+    def _check_api_response(self, response: httpx.Response, action: str, http_error_code: str) -> dict[str, Any]:
         if response.status_code != 200:
             raise DocumentParserException(
-                f"申请上传链接失败: HTTP {response.status_code}", self.get_service_name(), "upload_url_failed"
+                f"{action}失败: HTTP {response.status_code}", self.get_service_name(), http_error_code
             )
 
         result = response.json()
         if result.get("code") != 0:
             error_msg = result.get("msg", "未知错误")
             raise DocumentParserException(
-                f"申请上传链接失败: {error_msg}", self.get_service_name(), f"api_error_{result.get('code', 'unknown')}"
+                f"{action}失败: {error_msg}", self.get_service_name(), f"api_error_{result.get('code', 'unknown')}"
             )
+        return result["data"]
 
-        batch_id = result["data"]["batch_id"]
-        upload_urls = result["data"]["file_urls"]
-
-        if not upload_urls:
+    def _parse_upload_urls(self, data: dict[str, Any], expected: int) -> tuple[str, list[str]]:
+        batch_id = data["batch_id"]
+        upload_urls = data["file_urls"]
+        if not upload_urls or len(upload_urls) < expected:
             raise DocumentParserException("未获取到文件上传链接", self.get_service_name(), "no_upload_url")
+        return batch_id, upload_urls
 
-        # 上传文件
-        upload_url = upload_urls[0]
-        with open(file_path, "rb") as f:
-            upload_response = requests.put(upload_url, data=f, timeout=60)
+    def _check_upload_response(self, response: httpx.Response) -> None:
+        if response.status_code != 200:
+            raise DocumentParserException(
+                f"文件上传失败: HTTP {response.status_code}", self.get_service_name(), "file_upload_failed"
+            )
 
-        if upload_response.status_code != 200:
+    def _check_download_response(self, zip_url: str | None, response: httpx.Response | None = None) -> None:
+        if not zip_url:
+            raise DocumentParserException("未获取到结果下载链接", self.get_service_name(), "no_download_url")
+        if response is not None and response.status_code != 200:
             raise DocumentParserException(
-                f"文件上传失败: HTTP {upload_response.status_code}", self.get_service_name(), "file_upload_failed"
+                f"下载结果失败: HTTP {response.status_code}", self.get_service_name(), "download_failed"
             )
 
+    async def _extract_markdown(self, zip_content: bytes, params: dict[str, Any]) -> str:
+        """从结果 ZIP 中提取 Markdown（图片上传至 MinIO），失败时降级为直接读取 md 文件"""
+        from src.knowledge.indexing import _process_zip_file
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp_file:
+            tmp_file.write(zip_content)
+            zip_path = tmp_file.name
+
+        try:
+            processed = await _process_zip_file(zip_path, params.get("db_id") or "ocr-test")
+            return processed["markdown_content"]
+        except Exception:
+            logger.error(f"从 zip 文件中提取 full.md 失败: {zip_path}，尝试直接读取结果文件")
+            return self._extract_text_from_zip(zip_path)
+        finally:
+            try:
+                os.unlink(zip_path)
+            except Exception:
+                pass
+
+    def _extract_text_from_zip(self, zip_path: str) -> str:
+        """直接从结果 ZIP 中读取文本（不处理图片）"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with zipfile.ZipFile(zip_path, "r") as zip_ref:
+                zip_ref.extractall(tmp_dir)
+
+            # 查找 markdown 文件，优先 full.md
+            md_files = sorted(Path(tmp_dir).rglob("*.md"))
+            if md_files:
+                md_file = next((p for p in md_files if p.name == "full.md"), md_files[0])
+                return md_file.read_text(encoding="utf-8")
+
+            # 如果没有 markdown 文件，查找 json 文件
+            json_files = sorted(Path(tmp_dir).rglob("*.json"))
+            if json_files:
+                with open(json_files[0], encoding="utf-8") as f:
+                    data = json.load(f)
+                # 尝试提取文本内容
+                if isinstance(data, dict) and "content" in data:
+                    return str(data["content"])
+                return str(data)
+
+            raise DocumentParserException("无法从结果中提取文本内容", self.get_service_name(), "extract_content_failed")
+
+    # =========================================================================
+    # 同步路径（线程中调用）
+    # =========================================================================
+
+    def _upload_file(self, file_path: str, params: dict[str, Any]) -> str:
+        """上传文件并返回 batch_id"""
+        client = get_http_client(self.get_service_name())
+        upload_data = {**self._batch_options(params), "files": [self._file_entry(file_path, params)]}
+
+        # 申请上传链接
+        response = client.post(f"{self.api_base}/file-urls/batch", headers=self.headers, json=upload_data, timeout=30)
+        data = self._check_api_response(response, "申请上传链接", "upload_url_failed")
+        batch_id, upload_urls = self._parse_upload_urls(data, 1)
+
+        # 上传文件
+        with open(file_path, "rb") as f:
+            upload_response = client.put(upload_urls[0], content=f.read(), timeout=60)
+        self._check_upload_response(upload_response)
+
         return batch_id
 
     def _poll_batch_result(self, batch_id: str, max_wait_time: int = 600) -> dict[str, Any]:
-        """轮询批量任务结果"""
+        """轮询批量任务结果（单文件批次）"""
+        client = get_http_client(self.get_service_name())
         start_time = time.time()
+        delay = 2.0
 
         while time.time() - start_time < max_wait_time:
-            response = requests.get(
-                f"{self.api_base}/extract-results/batch/{batch_id}", headers=self.headers, timeout=30
-            )
+            response = client.get(f"{self.api_base}/extract-results/batch/{batch_id}", headers=self.headers, timeout=30)
+            data = self._check_api_response(response, "查询任务状态", "status_query_failed")
 
-            if response.status_code != 200:
-                raise DocumentParserException(
-                    f"查询任务状态失败: HTTP {response.status_code}", self.get_service_name(), "status_query_failed"
-                )
+            extract_results = data.get("extract_result", [])
+            if extract_results:
+                # 检查第一个文件的状态
+                file_result = extract_results[0]
+                state = file_result.get("state")
 
-            result = response.json()
-            if result.get("code") != 0:
-                error_msg = result.get("msg", "未知错误")
-                raise DocumentParserException(
-                    f"查询任务状态失败: {error_msg}",
-                    self.get_service_name(),
-                    f"api_error_{result.get('code', 'unknown')}",
-                )
-
-            extract_results = result["data"].get("extract_result", [])
-            if not extract_results:
-                time.sleep(5)
-                continue
-
-            # 检查第一个文件的状态
-            file_result = extract_results[0]
-            state = file_result.get("state")
-
-            if state == "done":
-                return file_result
-            elif state == "failed":
-                err_msg = file_result.get("err_msg", "未知错误")
-                raise DocumentParserException(f"文档解析失败: {err_msg}", self.get_service_name(), "parsing_failed")
+                if state == "done":
+                    return file_result
+                elif state == "failed":
+                    err_msg = file_result.get("err_msg", "未知错误")
+                    raise DocumentParserException(f"文档解析失败: {err_msg}", self.get_service_name(), "parsing_failed")
 
             # 继续等待
-            time.sleep(5)
+            time.sleep(delay)
+            delay = min(delay * 1.5, 15.0)
 
         raise DocumentParserException("任务处理超时", self.get_service_name(), "timeout")
 
-    def _download_and_extract(self, zip_url: str) -> str:
-        """下载并解压结果文件"""
-        if not zip_url:
-            raise DocumentParserException("未获取到结果下载链接", self.get_service_name(), "no_download_url")
+    def _download_zip(self, zip_url: str | None) -> bytes:
+        """下载结果ZIP"""
+        self._check_download_response(zip_url)
+        response = get_http_client(self.get_service_name()).get(zip_url, timeout=60)
+        self._check_download_response(zip_url, response)
+        return response.content
 
-        # 下载文件
-        response = requests.get(zip_url, timeout=60)
-        if response.status_code != 200:
-            raise DocumentParserException(
-                f"下载结果失败: HTTP {response.status_code}", self.get_service_name(), "download_failed"
+    # =========================================================================
+    # 异步路径
+    # =========================================================================
+
+    async def _arun_batch(
+        self, items: list[_PendingFile], options: dict[str, Any]
+    ) -> dict[str, dict[str, Any] | Exception]:
+        """
+        提交一个多文件批次并等待所有文件完成
+
+        Returns:
+            dict: data_id -> 文件结果（成功）或异常（失败）
+        """
+        service_name = self.get_service_name()
+        client = get_async_http_client(service_name)
+        limiter = get_service_limiter(service_name)
+
+        upload_data = {**options, "files": [item.entry for item in items]}
+        async with limiter:
+            response = await client.post(
+                f"{self.api_base}/file-urls/batch", headers=self.headers, json=upload_data, timeout=30
             )
+        data = self._check_api_response(response, "申请上传链接", "upload_url_failed")
+        batch_id, upload_urls = self._parse_upload_urls(data, len(items))
+        logger.info(f"MinerU Official 批次已创建: batch_id={batch_id}, files={len(items)}")
 
-        # 解压到临时目录
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp_file:
-            tmp_file.write(response.content)
-            tmp_file.flush()
+        results: dict[str, dict[str, Any] | Exception] = {}
 
+        async def _upload(item: _PendingFile, upload_url: str) -> None:
             try:
-                with tempfile.TemporaryDirectory() as tmp_dir:
-                    with zipfile.ZipFile(tmp_file.name, "r") as zip_ref:
-                        zip_ref.extractall(tmp_dir)
-
-                    # 查找 markdown 文件
-                    md_files = list(Path(tmp_dir).glob("*.md"))
-                    if md_files:
-                        with open(md_files[0], encoding="utf-8") as f:
-                            return f.read()
-
-                    # 如果没有 markdown 文件，查找 json 文件
-                    json_files = list(Path(tmp_dir).glob("*.json"))
-                    if json_files:
-                        import json
-
-                        with open(json_files[0], encoding="utf-8") as f:
-                            data = json.load(f)
-                            # 尝试提取文本内容
-                            if isinstance(data, dict) and "content" in data:
-                                return str(data["content"])
-                            return str(data)
-
-                    # 如果都没有，返回第一个文本文件的内容
-                    text_files = list(Path(tmp_dir).glob("*"))
-                    if text_files:
-                        with open(text_files[0], encoding="utf-8") as f:
-                            return f.read()
-
-                    raise DocumentParserException(
-                        "无法从结果中提取文本内容", self.get_service_name(), "extract_content_failed"
-                    )
-
-            finally:
-                os.unlink(tmp_file.name)
-
-    def _download_zip(self, zip_url: str) -> str:
-        """下载结果ZIP到临时文件并返回路径"""
-        if not zip_url:
-            raise DocumentParserException("未获取到结果下载链接", self.get_service_name(), "no_download_url")
-        response = requests.get(zip_url, timeout=60)
-        if response.status_code != 200:
-            raise DocumentParserException(
-                f"下载结果失败: HTTP {response.status_code}", self.get_service_name(), "download_failed"
-            )
-        import tempfile
+                async with aiofiles.open(item.file_path, "rb") as f:
+                    content = await f.read()
+                async with limiter:
+                    upload_response = await client.put(upload_url, content=content, timeout=60)
+                self._check_upload_response(upload_response)
+            except Exception as e:
+                results[item.entry["data_id"]] = e
+
+        await asyncio.gather(*(_upload(item, url) for item, url in zip(items, upload_urls)))
+
+        waiting = {item.entry["data_id"] for item in items} - set(results)
+        if not waiting:
+            return results
+
+        async def _fetch() -> list[dict[str, Any]]:
+            async with limiter:
+                poll_response = await client.get(
+                    f"{self.api_base}/extract-results/batch/{batch_id}", headers=self.headers, timeout=30
+                )
+            poll_data = self._check_api_response(poll_response, "查询任务状态", "status_query_failed")
+            return poll_data.get("extract_result", [])
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp_file:
-            tmp_file.write(response.content)
-            tmp_file.flush()
-            return tmp_file.name
+        def _all_finished(extract_results: list[dict[str, Any]]) -> bool:
+            finished = {r.get("data_id") for r in extract_results if r.get("state") in ("done", "failed")}
+            return waiting <= finished
+
+        max_wait_time = 600 + 30 * (len(waiting) - 1)
+        try:
+            extract_results = await poll_with_backoff(_fetch, _all_finished, timeout=max_wait_time)
+        except TimeoutError:
+            timeout_error = DocumentParserException("任务处理超时", service_name, "timeout")
+            return {**{data_id: timeout_error for data_id in waiting}, **results}
+
+        for file_result in extract_results:
+            data_id = file_result.get("data_id")
+            if data_id not in waiting:
+                continue
+            if file_result.get("state") == "done":
+                results[data_id] = file_result
+            else:
+                err_msg = file_result.get("err_msg", "未知错误")
+                results[data_id] = DocumentParserException(f"文档解析失败: {err_msg}", service_name, "parsing_failed")
+
+        logger.info(f"MinerU Official 批次完成: batch_id={batch_id}")
+        return results
+
+    async def _adownload_zip(self, zip_url: str | None) -> bytes:
+        """异步下载结果ZIP"""
+        self._check_download_response(zip_url)
+        async with get_service_limiter(self.get_service_name()):
+            response = await get_async_http_client(self.get_service_name()).get(zip_url, timeout=60)
+        self._check_download_response(zip_url, response)
+        return response.content
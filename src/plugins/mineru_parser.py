@@ -4,15 +4,23 @@ MinerU 文档解析器
 使用 MinerU 服务进行文档版面分析和内容提取
 """
 
+import asyncio
 import os
 import tempfile
 import time
 from pathlib import Path
 
-import requests
+import aiofiles
+import httpx
 
 from src.knowledge.indexing import _process_zip_file
 from src.plugins.document_processor_base import BaseDocumentProcessor, DocumentParserException
+from src.plugins.http_client import (
+    get_async_http_client,
+    get_http_client,
+    get_service_limiter,
+    response_error_detail,
+)
 from src.utils import logger
 
 
@@ -22,6 +30,7 @@ class MinerUParser(BaseDocumentProcessor):
     def __init__(self, server_url: str | None = None):
         self.server_url = server_url or os.getenv("MINERU_API_URI") or "http://localhost:30001"
         self.parse_endpoint = f"{self.server_url}/file_parse"
+        self.timeout = float(os.environ.get("MINERU_TIMEOUT", 1800))  # 30分钟超时
 
     def get_service_name(self) -> str:
         return "mineru_ocr"
@@ -35,7 +44,7 @@ class MinerUParser(BaseDocumentProcessor):
         try:
             # 尝试访问 OpenAPI JSON 端点来检查服务是否可用
             health_url = f"{self.server_url}/openapi.json"
-            response = requests.get(health_url, timeout=5)
+            response = get_http_client(self.get_service_name()).get(health_url, timeout=5)
 
             if response.status_code == 200:
                 try:
@@ -71,13 +80,13 @@ class MinerUParser(BaseDocumentProcessor):
                     "details": {"server_url": self.server_url},
                 }
 
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             return {
                 "status": "unavailable",
                 "message": "MinerU 服务无法连接,请检查服务是否启动",
                 "details": {"server_url": self.server_url},
             }
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             return {
                 "status": "timeout",
                 "message": "MinerU 服务连接超时",
@@ -90,25 +99,7 @@ class MinerUParser(BaseDocumentProcessor):
                 "details": {"server_url": self.server_url, "error": str(e)},
             }
 
-    def process_file(self, file_path: str, params: dict | None = None) -> str:
-        """
-        使用 MinerU 处理文档
-
-        Args:
-            file_path: 文件路径
-            params: 处理参数
-                - lang_list: 语言列表 (默认: ["ch"])
-                - backend: 后端类型 (默认: "pipeline", 支持 "vlm-*" 系列)
-                - parse_method: 解析方法 (默认: "auto")
-                - start_page_id: 起始页码 (默认: 0)
-                - end_page_id: 结束页码 (默认: 99999)
-                - formula_enable: 启用公式解析 (默认: True)
-                - table_enable: 启用表格解析 (默认: True)
-                - server_url: VLM 服务器地址 (vlm-http-client 时需要)
-
-        Returns:
-            str: 提取的 Markdown 文本
-        """
+    def _validate_file(self, file_path: str) -> None:
         if not os.path.exists(file_path):
             raise DocumentParserException(f"文件不存在: {file_path}", self.get_service_name(), "file_not_found")
 
@@ -118,10 +109,8 @@ class MinerUParser(BaseDocumentProcessor):
                 f"不支持的文件类型: {file_ext}", self.get_service_name(), "unsupported_file_type"
             )
 
-        # 解析参数
-        params = params or {}
-
-        # 构建请求数据 - 只保留核心参数
+    def _build_form_data(self, params: dict) -> dict:
+        """构建请求数据 - 只保留核心参数"""
         data = {
             "lang_list": params.get("lang_list", ["ch"]),
             "backend": params.get("backend", "vlm-http-client"),
@@ -139,96 +128,136 @@ class MinerUParser(BaseDocumentProcessor):
             assert mineru_vl_server, "MINERU_VL_SERVER 环境变量未配置"
             data["server_url"] = mineru_vl_server
 
+        return data
+
+    def _check_response(self, response: httpx.Response) -> bytes:
+        """检查响应状态，返回结果 ZIP 数据"""
+        logger.debug(f"MinerU 响应状态: {response.status_code}, Content-Type: {response.headers.get('content-type')}")
+
+        if response.status_code != 200:
+            error_detail = response_error_detail(response)
+            logger.error(f"MinerU HTTP错误 {response.status_code}: {error_detail}")
+            raise DocumentParserException(
+                f"MinerU 处理失败: {error_detail}",
+                self.get_service_name(),
+                f"http_{response.status_code}",
+            )
+        return response.content
+
+    async def _extract_markdown(self, zip_data: bytes, params: dict) -> str:
+        """解析结果 ZIP：上传图片并返回 Markdown"""
         try:
-            start_time = time.time()
+            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp_zip:
+                tmp_zip.write(zip_data)
+
+            try:
+                processed = await _process_zip_file(tmp_zip.name, params.get("db_id"))
+                text = processed["markdown_content"]
+            finally:
+                os.unlink(tmp_zip.name)
+        except Exception as e:
+            raise DocumentParserException(
+                f"MinerU 响应解析失败: {str(e)}",
+                self.get_service_name(),
+                "response_parse_error",
+            )
+
+        if not text:
+            logger.error("MinerU 未返回任何文本内容")
+            raise DocumentParserException(
+                "MinerU 未返回任何文本内容",
+                self.get_service_name(),
+                "no_content",
+            )
+        return text
+
+    def _wrap_error(self, e: Exception, start_time: float) -> DocumentParserException:
+        if isinstance(e, DocumentParserException):
+            return e
+        if isinstance(e, httpx.TimeoutException):
+            error_msg = f"MinerU 处理超时 ({time.time() - start_time:.2f}s), 可以配置 MINERU_TIMEOUT 环境变量。"
+            logger.error(error_msg)
+            return DocumentParserException(error_msg, self.get_service_name(), "timeout")
+        if isinstance(e, httpx.ConnectError):
+            error_msg = "MinerU 连接失败,请检查服务是否运行"
+            logger.error(error_msg)
+            return DocumentParserException(error_msg, self.get_service_name(), "connection_error")
+        error_msg = f"MinerU 处理失败: {str(e)}"
+        logger.error(f"{error_msg} ({time.time() - start_time:.2f}s)")
+        return DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
 
+    def process_file(self, file_path: str, params: dict | None = None) -> str:
+        """
+        使用 MinerU 处理文档
+
+        Args:
+            file_path: 文件路径
+            params: 处理参数
+                - lang_list: 语言列表 (默认: ["ch"])
+                - backend: 后端类型 (默认: "pipeline", 支持 "vlm-*" 系列)
+                - parse_method: 解析方法 (默认: "auto")
+                - start_page_id: 起始页码 (默认: 0)
+                - end_page_id: 结束页码 (默认: 99999)
+                - formula_enable: 启用公式解析 (默认: True)
+                - table_enable: 启用表格解析 (默认: True)
+                - server_url: VLM 服务器地址 (vlm-http-client 时需要)
+
+        Returns:
+            str: 提取的 Markdown 文本
+        """
+        self._validate_file(file_path)
+        params = params or {}
+        data = self._build_form_data(params)
+
+        start_time = time.time()
+        try:
             logger.info(
                 f"MinerU 开始处理: {os.path.basename(file_path)} (backend={data['backend']}, lang={data['lang_list']})"
             )
 
-            # 打开文件并发送请求
             with open(file_path, "rb") as f:
                 files = {"files": (os.path.basename(file_path), f, "application/octet-stream")}
-
-                # 发送 POST 请求
-                response = requests.post(
-                    self.parse_endpoint,
-                    files=files,
-                    data=data,
-                    timeout=os.environ.get("MINERU_TIMEOUT", 1800),  # 30分钟超时
+                response = get_http_client(self.get_service_name()).post(
+                    self.parse_endpoint, files=files, data=data, timeout=self.timeout
                 )
 
-            # 检查响应状态
-            logger.debug(
-                f"MinerU 响应状态: {response.status_code}, Content-Type: {response.headers.get('content-type')}"
-            )
+            zip_data = self._check_response(response)
+            text = asyncio.run(self._extract_markdown(zip_data, params))
 
-            if response.status_code != 200:
-                error_detail = "未知错误"
-                try:
-                    error_data = response.json()
-                    error_detail = error_data.get("detail", str(error_data))
-                except Exception:
-                    error_detail = response.text or f"HTTP {response.status_code}"
-
-                logger.error(f"MinerU HTTP错误 {response.status_code}: {error_detail}")
-                raise DocumentParserException(
-                    f"MinerU 处理失败: {error_detail}",
-                    self.get_service_name(),
-                    f"http_{response.status_code}",
-                )
+            processing_time = time.time() - start_time
+            logger.info(f"MinerU 处理成功: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)")
+            return text
 
-            # 解析响应
-            try:
-                # 直接从响应内容获取 ZIP 数据
-                zip_data = response.content
-
-                # 保存到临时文件并处理
-                with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp_zip:
-                    tmp_zip.write(zip_data)
-                    tmp_zip.flush()
-
-                    try:
-                        import asyncio
-
-                        processed = asyncio.run(_process_zip_file(tmp_zip.name, params.get("db_id")))
-                        text = processed["markdown_content"]
-                    finally:
-                        os.unlink(tmp_zip.name)
-
-                if not text:
-                    logger.error("MinerU 未返回任何文本内容")
-                    raise DocumentParserException(
-                        "MinerU 未返回任何文本内容",
-                        self.get_service_name(),
-                        "no_content",
-                    )
-
-                processing_time = time.time() - start_time
+        except Exception as e:
+            raise self._wrap_error(e, start_time)
+
+    async def aprocess_file(self, file_path: str, params: dict | None = None) -> str:
+        """使用 MinerU 异步处理文档（共享连接池 + 服务级并发限制），参数同 process_file"""
+        self._validate_file(file_path)
+        params = params or {}
+        data = self._build_form_data(params)
+
+        start_time = time.time()
+        try:
+            async with aiofiles.open(file_path, "rb") as f:
+                file_content = await f.read()
+
+            async with get_service_limiter(self.get_service_name()):
                 logger.info(
-                    f"MinerU 处理成功: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)"
+                    f"MinerU 开始处理: {os.path.basename(file_path)} "
+                    f"(backend={data['backend']}, lang={data['lang_list']})"
+                )
+                files = {"files": (os.path.basename(file_path), file_content, "application/octet-stream")}
+                response = await get_async_http_client(self.get_service_name()).post(
+                    self.parse_endpoint, files=files, data=data, timeout=self.timeout
                 )
 
-                return text
+            zip_data = self._check_response(response)
+            text = await self._extract_markdown(zip_data, params)
 
-            except Exception as e:
-                raise DocumentParserException(
-                    f"MinerU 响应解析失败: {str(e)}",
-                    self.get_service_name(),
-                    "response_parse_error",
-                )
+            processing_time = time.time() - start_time
+            logger.info(f"MinerU 处理成功: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)")
+            return text
 
-        except DocumentParserException:
-            raise
-        except requests.exceptions.Timeout:
-            error_msg = f"MinerU 处理超时 ({time.time() - start_time:.2f}s), 可以配置 MINERU_TIMEOUT 环境变量。"
-            logger.error(error_msg)
-            raise DocumentParserException(error_msg, self.get_service_name(), "timeout")
-        except requests.exceptions.ConnectionError:
-            error_msg = "MinerU 连接失败,请检查服务是否运行"
-            logger.error(error_msg)
-            raise DocumentParserException(error_msg, self.get_service_name(), "connection_error")
         except Exception as e:
-            error_msg = f"MinerU 处理失败: {str(e)}"
-            logger.error(f"{error_msg} ({time.time() - start_time:.2f}s)")
-            raise DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
+            raise self._wrap_error(e, start_time)
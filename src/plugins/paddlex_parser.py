@@ -4,15 +4,17 @@ PP-StructureV3 文档解析器
 使用 PP-StructureV3 进行文档版面解析和内容提取
 """
 
+import asyncio
 import base64
 import os
 import time
 from pathlib import Path
 from typing import Any
 
-import requests
+import httpx
 
 from src.plugins.document_processor_base import BaseDocumentProcessor, DocumentParserException
+from src.plugins.http_client import get_async_http_client, get_http_client, get_service_limiter
 from src.utils import logger
 
 
@@ -55,18 +57,16 @@ class PaddleXDocumentParser(BaseDocumentProcessor):
             logger.info(f"📝 假设为Base64编码内容，长度: {len(file_input)} 字符")
             return file_input
 
-    def _call_layout_api(
+    def _build_layout_payload(
         self,
-        file_input: str,
+        processed_file_input: str,
         file_type: int | None = None,
         use_table_recognition: bool = True,
         use_formula_recognition: bool = True,
         use_seal_recognition: bool = False,
         **kwargs,
     ) -> dict[str, Any]:
-        """调用PP-StructureV3版面解析API"""
-        # 处理文件输入
-        processed_file_input = self._process_file_input(file_input)
+        """构建版面解析请求体"""
         payload = {"file": processed_file_input}
 
         # 添加核心参数
@@ -87,17 +87,37 @@ class PaddleXDocumentParser(BaseDocumentProcessor):
             if value is not None:
                 payload[key] = value
 
-        response = requests.post(self.endpoint, json=payload, headers={"Content-Type": "application/json"}, timeout=300)
+        return payload
 
+    def _check_layout_response(self, response: httpx.Response) -> dict[str, Any]:
         if response.status_code == 200:
             return response.json()
-        else:
-            error_msg = f"PP-StructureV3 API请求失败: {response.status_code}"
-            try:
-                error_result = response.json()
-                raise DocumentParserException(f"{error_msg}: {error_result}", self.get_service_name(), "api_error")
-            except Exception:
-                raise DocumentParserException(f"{error_msg}: {response.text}", self.get_service_name(), "api_error")
+
+        error_msg = f"PP-StructureV3 API请求失败: {response.status_code}"
+        try:
+            error_result = response.json()
+        except Exception:
+            raise DocumentParserException(f"{error_msg}: {response.text}", self.get_service_name(), "api_error")
+        raise DocumentParserException(f"{error_msg}: {error_result}", self.get_service_name(), "api_error")
+
+    def _call_layout_api(self, file_input: str, **options) -> dict[str, Any]:
+        """调用PP-StructureV3版面解析API"""
+        payload = self._build_layout_payload(self._process_file_input(file_input), **options)
+        response = get_http_client(self.get_service_name()).post(
+            self.endpoint, json=payload, headers={"Content-Type": "application/json"}, timeout=300
+        )
+        return self._check_layout_response(response)
+
+    async def _acall_layout_api(self, file_input: str, **options) -> dict[str, Any]:
+        """异步调用PP-StructureV3版面解析API（共享连接池 + 服务级并发限制）"""
+        # Base64 编码大文件较耗 CPU，放到线程中执行
+        processed_file_input = await asyncio.to_thread(self._process_file_input, file_input)
+        payload = self._build_layout_payload(processed_file_input, **options)
+        async with get_service_limiter(self.get_service_name()):
+            response = await get_async_http_client(self.get_service_name()).post(
+                self.endpoint, json=payload, headers={"Content-Type": "application/json"}, timeout=300
+            )
+        return self._check_layout_response(response)
 
     def _parse_api_result(self, api_result: dict[str, Any], file_path: str) -> dict[str, Any]:
         """解析API返回结果"""
@@ -156,57 +176,56 @@ class PaddleXDocumentParser(BaseDocumentProcessor):
 
         return parsed_result
 
-    def check_health(self) -> dict:
-        """检查 PP-StructureV3 服务健康状态"""
-        try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
-
-            if response.status_code == 200:
-                return {
-                    "status": "healthy",
-                    "message": "PP-StructureV3 服务运行正常",
-                    "details": {"server_url": self.server_url},
-                }
-            else:
-                return {
-                    "status": "unhealthy",
-                    "message": f"PP-StructureV3 服务响应异常: {response.status_code}",
-                    "details": {"server_url": self.server_url},
-                }
-
-        except requests.exceptions.ConnectionError:
+    def _health_from_response(self, response: httpx.Response) -> dict:
+        if response.status_code == 200:
+            return {
+                "status": "healthy",
+                "message": "PP-StructureV3 服务运行正常",
+                "details": {"server_url": self.server_url},
+            }
+        return {
+            "status": "unhealthy",
+            "message": f"PP-StructureV3 服务响应异常: {response.status_code}",
+            "details": {"server_url": self.server_url},
+        }
+
+    def _health_from_error(self, e: Exception) -> dict:
+        if isinstance(e, httpx.ConnectError):
             return {
                 "status": "unavailable",
                 "message": "PP-StructureV3 服务无法连接,请检查服务是否启动",
                 "details": {"server_url": self.server_url},
             }
-        except requests.exceptions.Timeout:
+        if isinstance(e, httpx.TimeoutException):
             return {
                 "status": "timeout",
                 "message": "PP-StructureV3 服务连接超时",
                 "details": {"server_url": self.server_url},
             }
-        except Exception as e:
-            return {
-                "status": "error",
-                "message": f"PP-StructureV3 健康检查失败: {str(e)}",
-                "details": {"server_url": self.server_url, "error": str(e)},
-            }
+        return {
+            "status": "error",
+            "message": f"PP-StructureV3 健康检查失败: {str(e)}",
+            "details": {"server_url": self.server_url, "error": str(e)},
+        }
 
-    def process_file(self, file_path: str, params: dict | None = None) -> str:
-        """
-        使用 PP-StructureV3 处理文档
+    def check_health(self) -> dict:
+        """检查 PP-StructureV3 服务健康状态"""
+        try:
+            response = get_http_client(self.get_service_name()).get(f"{self.base_url}/health", timeout=5)
+            return self._health_from_response(response)
+        except Exception as e:
+            return self._health_from_error(e)
 
-        Args:
-            file_path: 文件路径
-            params: 处理参数
-                - use_table_recognition: 启用表格识别 (默认: True)
-                - use_formula_recognition: 启用公式识别 (默认: True)
-                - use_seal_recognition: 启用印章识别 (默认: False)
+    async def acheck_health(self) -> dict:
+        """异步检查 PP-StructureV3 服务健康状态"""
+        try:
+            client = get_async_http_client(self.get_service_name())
+            response = await client.get(f"{self.base_url}/health", timeout=5)
+            return self._health_from_response(response)
+        except Exception as e:
+            return self._health_from_error(e)
 
-        Returns:
-            str: 提取的 Markdown 文本
-        """
+    def _validate_file(self, file_path: str) -> str:
         if not os.path.exists(file_path):
             raise DocumentParserException(f"文件不存在: {file_path}", self.get_service_name(), "file_not_found")
 
@@ -215,60 +234,95 @@ class PaddleXDocumentParser(BaseDocumentProcessor):
             raise DocumentParserException(
                 f"不支持的文件类型: {file_ext}", self.get_service_name(), "unsupported_file_type"
             )
+        return file_ext
 
-        # 先检查服务健康状态
-        health = self.check_health()
+    def _ensure_healthy(self, health: dict) -> None:
         if health["status"] != "healthy":
             raise DocumentParserException(
                 f"PP-StructureV3 服务不可用: {health['message']}", self.get_service_name(), health["status"]
             )
 
-        try:
-            start_time = time.time()
-            params = params or {}
-
+    @staticmethod
+    def _layout_options(file_ext: str, params: dict) -> dict[str, Any]:
+        return {
             # 判断文件类型
-            file_type = 0 if file_ext == ".pdf" else 1
-
-            logger.info(f"PP-StructureV3 开始处理: {os.path.basename(file_path)}")
+            "file_type": 0 if file_ext == ".pdf" else 1,
+            "use_table_recognition": params.get("use_table_recognition", True),
+            "use_formula_recognition": params.get("use_formula_recognition", True),
+            "use_seal_recognition": params.get("use_seal_recognition", False),
+        }
 
-            # 调用API
-            api_result = self._call_layout_api(
-                file_input=file_path,
-                file_type=file_type,
-                use_table_recognition=params.get("use_table_recognition", True),
-                use_formula_recognition=params.get("use_formula_recognition", True),
-                use_seal_recognition=params.get("use_seal_recognition", False),
+    def _extract_text(self, api_result: dict[str, Any], file_path: str, start_time: float) -> str:
+        # 检查API调用是否成功
+        if api_result.get("errorCode") != 0:
+            raise DocumentParserException(
+                f"PP-StructureV3 API错误: {api_result.get('errorMsg', '未知错误')}",
+                self.get_service_name(),
+                "api_error",
             )
 
-            # 检查API调用是否成功
-            if api_result.get("errorCode") != 0:
-                raise DocumentParserException(
-                    f"PP-StructureV3 API错误: {api_result.get('errorMsg', '未知错误')}",
-                    self.get_service_name(),
-                    "api_error",
-                )
-
-            # 解析结果
-            result = self._parse_api_result(api_result, file_path)
-            text = result.get("full_text", "")
-
-            processing_time = time.time() - start_time
-            logger.info(
-                f"PP-StructureV3 处理成功: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)"
-            )
+        # 解析结果
+        result = self._parse_api_result(api_result, file_path)
+        text = result.get("full_text", "")
+
+        processing_time = time.time() - start_time
+        logger.info(
+            f"PP-StructureV3 处理成功: {os.path.basename(file_path)} - {len(text)} 字符 ({processing_time:.2f}s)"
+        )
 
-            # 记录统计信息
-            summary = result.get("summary", {})
-            if summary:
-                logger.info(f"  统计: {summary.get('total_tables', 0)} 表格, {summary.get('total_formulas', 0)} 公式")
+        # 记录统计信息
+        summary = result.get("summary", {})
+        if summary:
+            logger.info(f"  统计: {summary.get('total_tables', 0)} 表格, {summary.get('total_formulas', 0)} 公式")
 
-            return text
+        return text
 
-        except DocumentParserException:
-            raise
+    def _wrap_error(self, e: Exception, start_time: float) -> DocumentParserException:
+        if isinstance(e, DocumentParserException):
+            return e
+        processing_time = time.time() - start_time
+        error_msg = f"PP-StructureV3 处理失败: {str(e)}"
+        logger.error(f"{error_msg} ({processing_time:.2f}s)")
+        return DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
+
+    def process_file(self, file_path: str, params: dict | None = None) -> str:
+        """
+        使用 PP-StructureV3 处理文档
+
+        Args:
+            file_path: 文件路径
+            params: 处理参数
+                - use_table_recognition: 启用表格识别 (默认: True)
+                - use_formula_recognition: 启用公式识别 (默认: True)
+                - use_seal_recognition: 启用印章识别 (默认: False)
+
+        Returns:
+            str: 提取的 Markdown 文本
+        """
+        file_ext = self._validate_file(file_path)
+
+        # 先检查服务健康状态
+        self._ensure_healthy(self.check_health())
+
+        start_time = time.time()
+        try:
+            logger.info(f"PP-StructureV3 开始处理: {os.path.basename(file_path)}")
+            api_result = self._call_layout_api(file_path, **self._layout_options(file_ext, params or {}))
+            return self._extract_text(api_result, file_path, start_time)
+        except Exception as e:
+            raise self._wrap_error(e, start_time)
+
+    async def aprocess_file(self, file_path: str, params: dict | None = None) -> str:
+        """使用 PP-StructureV3 异步处理文档，参数同 process_file"""
+        file_ext = self._validate_file(file_path)
+
+        # 先检查服务健康状态
+        self._ensure_healthy(await self.acheck_health())
+
+        start_time = time.time()
+        try:
+            logger.info(f"PP-StructureV3 开始处理: {os.path.basename(file_path)}")
+            api_result = await self._acall_layout_api(file_path, **self._layout_options(file_ext, params or {}))
+            return self._extract_text(api_result, file_path, start_time)
         except Exception as e:
-            processing_time = time.time() - start_time
-            error_msg = f"PP-StructureV3 处理失败: {str(e)}"
-            logger.error(f"{error_msg} ({processing_time:.2f}s)")
-            raise DocumentParserException(error_msg, self.get_service_name(), "processing_failed")
+            raise self._wrap_error(e, start_time)
@@ -3,12 +3,19 @@
 """
 
 import uuid as uuid_lib
+from datetime import datetime, timedelta
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from src.storage.postgres.models_business import Conversation, ConversationStats, Message, ToolCall
+from src.storage.postgres.models_business import (
+    Conversation,
+    ConversationStats,
+    Message,
+    MessageFeedback,
+    ToolCall,
+)
 from src.utils import logger
 from src.utils.datetime_utils import utc_now_naive
 
@@ -151,6 +158,135 @@ class ConversationRepository:
         logger.debug(f"Added tool call {tool_name} to message {message_id}")
         return tool_call
 
+    async def get_existing_message_ids(self, conversation_id: int, message_ids: list[str]) -> set[str]:
+        """只查询给定的 LangGraph 消息 id 中已保存的部分，不加载消息内容"""
+        if not message_ids:
+            return set()
+        lc_id = Message.extra_metadata["id"].as_string()
+        result = await self.db.execute(
+            select(lc_id).where(Message.conversation_id == conversation_id, lc_id.in_(message_ids))
+        )
+        return {row[0] for row in result.all()}
+
+    async def save_turn_messages(
+        self,
+        thread_id: str,
+        messages: list[dict],
+        tool_results: dict[str, dict] | None = None,
+    ) -> int:
+        """
+        在一个事务内保存一轮对话新增的消息
+
+        Args:
+            thread_id: 会话 thread_id
+            messages: 待保存的消息，每项包含 role / content / message_type / extra_metadata，
+                extra_metadata["id"] 为 LangGraph 消息 id（已保存的会跳过），可选 tool_calls: [{name, args, id}]
+            tool_results: 工具执行结果 {langgraph_tool_call_id: {"tool_output": ..., "status": ...}}；
+                本轮新建的工具调用直接带结果写入，其余更新已有记录
+
+        Returns:
+            新写入的消息数
+        """
+        tool_results = dict(tool_results or {})
+        conversation_id = (
+            await self.db.execute(select(Conversation.id).where(Conversation.thread_id == thread_id))
+        ).scalar_one_or_none()
+        if conversation_id is None:
+            logger.warning(f"Conversation not found for thread_id: {thread_id}")
+            return 0
+
+        try:
+            candidate_ids = [
+                msg_id for msg in messages if isinstance(msg_id := (msg.get("extra_metadata") or {}).get("id"), str)
+            ]
+            existing_ids = await self.get_existing_message_ids(conversation_id, candidate_ids)
+            new_messages = [msg for msg in messages if (msg.get("extra_metadata") or {}).get("id") not in existing_ids]
+
+            now = utc_now_naive()
+            if new_messages:
+                # 同一批消息逐条递增创建时间，保证按 created_at 排序时顺序不变
+                message_rows = [
+                    {
+                        "conversation_id": conversation_id,
+                        "role": msg["role"],
+                        "content": msg.get("content") or "",
+                        "message_type": msg.get("message_type", "text"),
+                        "extra_metadata": msg.get("extra_metadata") or {},
+                        "image_content": msg.get("image_content"),
+                        "created_at": now + timedelta(microseconds=index),
+                    }
+                    for index, msg in enumerate(new_messages)
+                ]
+                result = await self.db.execute(
+                    insert(Message.__table__).returning(Message.__table__.c.id, sort_by_parameter_order=True),
+                    message_rows,
+                )
+                message_ids = [row[0] for row in result.all()]
+
+                tool_call_rows = []
+                for message_id, msg in zip(message_ids, new_messages):
+                    for tc in msg.get("tool_calls") or []:
+                        tool_result = tool_results.pop(tc.get("id"), None) or {}
+                        tool_call_rows.append(
+                            {
+                                "message_id": message_id,
+                                "tool_name": tc.get("name", "unknown"),
+                                "tool_input": tc.get("args", {}),
+                                "tool_output": tool_result.get("tool_output"),
+                                "status": tool_result.get("status", "pending"),
+                                "error_message": tool_result.get("error_message"),
+                                "langgraph_tool_call_id": tc.get("id"),
+                                "created_at": now,
+                            }
+                        )
+                if tool_call_rows:
+                    await self.db.execute(insert(ToolCall.__table__), tool_call_rows)
+
+            # 之前轮次创建的工具调用（如审批后恢复执行）只更新结果，限定在本会话的消息内
+            tool_results = {key: value for key, value in tool_results.items() if key}
+            if tool_results:
+                table = ToolCall.__table__
+                conversation_message_ids = select(Message.id).where(Message.conversation_id == conversation_id)
+                await self.db.execute(
+                    update(table)
+                    .where(
+                        table.c.langgraph_tool_call_id == bindparam("b_tool_call_id"),
+                        table.c.message_id.in_(conversation_message_ids),
+                    )
+                    .values(tool_output=bindparam("b_tool_output"), status=bindparam("b_status")),
+                    [
+                        {
+                            "b_tool_call_id": tool_call_id,
+                            "b_tool_output": tool_result.get("tool_output"),
+                            "b_status": tool_result.get("status", "success"),
+                        }
+                        for tool_call_id, tool_result in tool_results.items()
+                    ],
+                )
+
+            if new_messages:
+                await self.db.execute(
+                    update(Conversation).where(Conversation.id == conversation_id).values(updated_at=now)
+                )
+                await self.db.execute(
+                    update(ConversationStats)
+                    .where(ConversationStats.conversation_id == conversation_id)
+                    .values(
+                        message_count=func.coalesce(ConversationStats.message_count, 0) + len(new_messages),
+                        updated_at=now,
+                    )
+                )
+
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        logger.debug(
+            f"Saved {len(new_messages)} messages, {len(tool_results)} tool results for conversation {conversation_id}"
+        )
+        return len(new_messages)
+
     async def get_messages(self, conversation_id: int, limit: int | None = None, offset: int = 0) -> list[Message]:
         query = (
             select(Message)
@@ -168,6 +304,77 @@ class ConversationRepository:
         result = await self.db.execute(query)
         return list(result.scalars().unique().all())
 
+    async def get_messages_page(
+        self, conversation_id: int, limit: int, before: tuple[datetime, int] | None = None
+    ) -> tuple[list[Message], bool]:
+        """
+        按 (created_at, id) 键集分页，取 before 之前最近的 limit 条消息（不加载工具调用与反馈）
+
+        Returns:
+            (按时间正序排列的消息, 是否还有更早的消息)
+        """
+        query = select(Message).where(Message.conversation_id == conversation_id)
+        if before is not None:
+            query = query.where(tuple_(Message.created_at, Message.id) < tuple_(*before))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+
+        result = await self.db.execute(query)
+        messages = list(result.scalars().all())
+        has_more = len(messages) > limit
+        return list(reversed(messages[:limit])), has_more
+
+    async def get_tool_calls_for_messages(self, message_ids: list[int], output_limit: int | None = None) -> list:
+        """
+        批量查询消息的工具调用；output_limit 不为空时只取输出的前 output_limit 个字符，
+        同时返回输出的完整长度（output_length），供前端按需获取完整输出
+        """
+        if not message_ids:
+            return []
+        output = ToolCall.tool_output if output_limit is None else func.substr(ToolCall.tool_output, 1, output_limit)
+        result = await self.db.execute(
+            select(
+                ToolCall.id,
+                ToolCall.message_id,
+                ToolCall.tool_name,
+                ToolCall.tool_input,
+                ToolCall.status,
+                ToolCall.error_message,
+                output.label("tool_output"),
+                func.length(ToolCall.tool_output).label("output_length"),
+            )
+            .where(ToolCall.message_id.in_(message_ids))
+            .order_by(ToolCall.id.asc())
+        )
+        return list(result.all())
+
+    async def get_user_feedbacks(self, message_ids: list[int], user_id: str) -> dict[int, MessageFeedback]:
+        """返回 {message_id: 该用户的反馈}"""
+        if not message_ids:
+            return {}
+        result = await self.db.execute(
+            select(MessageFeedback).where(
+                MessageFeedback.message_id.in_(message_ids), MessageFeedback.user_id == str(user_id)
+            )
+        )
+        feedbacks: dict[int, MessageFeedback] = {}
+        for feedback in result.scalars().all():
+            feedbacks.setdefault(feedback.message_id, feedback)
+        return feedbacks
+
+    async def get_user_tool_call(self, tool_call_id: int, user_id: str) -> ToolCall | None:
+        """查询属于该用户未删除对话的工具调用"""
+        result = await self.db.execute(
+            select(ToolCall)
+            .join(Message, ToolCall.message_id == Message.id)
+            .join(Conversation, Message.conversation_id == Conversation.id)
+            .where(
+                ToolCall.id == tool_call_id,
+                Conversation.user_id == str(user_id),
+                Conversation.status != "deleted",
+            )
+        )
+        return result.scalar_one_or_none()
+
     async def get_messages_by_thread_id(
         self, thread_id: str, limit: int | None = None, offset: int = 0
     ) -> list[Message]:
@@ -238,8 +445,8 @@ class ConversationRepository:
 
     async def delete_all_conversations(
         self, user_id: str, agent_id: str | None = None, soft_delete: bool = True
-    ) -> int:
-        """批量删除用户的对话线程"""
+    ) -> list[str]:
+        """批量删除用户的对话线程，返回被删除的 thread_id 列表"""
         query = select(Conversation).where(Conversation.user_id == str(user_id))
         if agent_id:
             query = query.where(Conversation.agent_id == agent_id)
@@ -249,17 +456,17 @@ class ConversationRepository:
         result = await self.db.execute(query)
         conversations = result.scalars().all()
 
-        count = 0
+        thread_ids = []
         for conv in conversations:
+            thread_ids.append(conv.thread_id)
             if soft_delete:
                 conv.status = "deleted"
             else:
                 await self.db.delete(conv)
-            count += 1
 
-        if count > 0:
+        if thread_ids:
             await self.db.commit()
-        return count
+        return thread_ids
 
     async def get_stats(self, conversation_id: int) -> ConversationStats | None:
         result = await self.db.execute(
@@ -321,8 +528,6 @@ class ConversationRepository:
         return tool_call
 
     async def _update_message_count(self, conversation_id: int) -> None:
-        from sqlalchemy import func
-
         stats = await self.get_stats(conversation_id)
         if stats:
             result = await self.db.execute(select(func.count()).where(Message.conversation_id == conversation_id))
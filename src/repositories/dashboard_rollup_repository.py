@@ -0,0 +1,275 @@
+"""
+仪表板汇总表
+
+按小时把消息、工具调用统计写入 dashboard_rollups，把有对话活动的用户写入 dashboard_active_users，
+仪表板接口只读取汇总表，每个接口一次查询。
+
+增量刷新只重算回看窗口内的小时，窗口之前的记录被修改或删除（如工具调用状态更新、清理历史对话）
+不会反映到汇总表，因此每隔一段时间做一次全量重算修正这类偏差。
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import BigInteger, Integer, String, case, cast, delete, distinct, extract, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.storage.postgres.models_business import (
+    Conversation,
+    DashboardActiveUser,
+    DashboardRollup,
+    DashboardRollupState,
+    Message,
+    ToolCall,
+    User,
+)
+
+ROLLUP_NAME = "dashboard"
+# 最近一次全量重算的时间
+RECONCILE_NAME = "dashboard_full"
+# 事务级 advisory lock 的键：多个 worker 同时刷新时只有一个执行
+ROLLUP_LOCK_KEY = 7_204_301
+
+TOOL_METRICS = ("tool_calls", "tool_success", "tool_errors")
+TOKEN_METRICS = ("input_tokens", "output_tokens")
+ROLLUP_COLUMNS = ["metric", "dimension", "bucket_start", "value"]
+
+
+def rollup_start(watermark: datetime | None, lookback_hours: int) -> datetime | None:
+    """
+    本次需要重新汇总的起始小时
+
+    从上次刷新时间往前回看 lookback_hours 小时（覆盖刷新后才写入或更新状态的记录），并对齐到整点；
+    从未汇总过时返回 None，表示全量汇总。
+    """
+    if watermark is None:
+        return None
+    start = watermark - timedelta(hours=max(0, lookback_hours))
+    return start.replace(minute=0, second=0, microsecond=0)
+
+
+def _since(column, start: datetime | None):
+    return column >= start if start is not None else column.isnot(None)
+
+
+def _rollup_selects(start: datetime | None) -> list:
+    """各指标的汇总查询，列依次为 metric, dimension, bucket_start, value"""
+    msg_hour = func.date_trunc("hour", Message.created_at)
+    tool_hour = func.date_trunc("hour", ToolCall.created_at)
+    model_name = func.coalesce(Message.extra_metadata["response_metadata"]["model_name"].as_string(), "unknown")
+
+    selects = [
+        select(literal("model_calls", String), model_name, msg_hour, func.count(Message.id))
+        .where(Message.role == "assistant", _since(Message.created_at, start))
+        .group_by(model_name, msg_hour),
+        # 每条用户消息视为一次智能体调用
+        select(literal("agent_calls", String), Conversation.agent_id, msg_hour, func.count(Message.id))
+        .select_from(Message)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .where(Message.role == "user", _since(Message.created_at, start))
+        .group_by(Conversation.agent_id, msg_hour),
+    ]
+
+    for metric, status in (("tool_calls", None), ("tool_success", "success"), ("tool_errors", "error")):
+        query = select(literal(metric, String), ToolCall.tool_name, tool_hour, func.count(ToolCall.id)).where(
+            _since(ToolCall.created_at, start)
+        )
+        if status is not None:
+            query = query.where(ToolCall.status == status)
+        selects.append(query.group_by(ToolCall.tool_name, tool_hour))
+
+    for metric in TOKEN_METRICS:
+        tokens = Message.extra_metadata["usage_metadata"][metric].as_string()
+        selects.append(
+            select(literal(metric, String), literal("", String), msg_hour, func.sum(cast(tokens, Integer)))
+            .where(_since(Message.created_at, start), tokens.isnot(None))
+            .group_by(msg_hour)
+        )
+    return selects
+
+
+def _active_user_select(start: datetime | None):
+    """每小时发送过消息的用户；对话中的 user_id 可能是登录名，也可能是用户主键"""
+    by_login = aliased(User)
+    by_pk = aliased(User)
+    user_pk = func.coalesce(by_login.id, by_pk.id)
+    return (
+        select(func.date_trunc("hour", Message.created_at), user_pk)
+        .select_from(Message)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .outerjoin(by_login, by_login.user_id == Conversation.user_id)
+        .outerjoin(by_pk, cast(by_pk.id, String) == Conversation.user_id)
+        .where(Message.role == "user", _since(Message.created_at, start), user_pk.isnot(None))
+        .distinct()
+    )
+
+
+def _day_offset(now: datetime, column):
+    """距 now 的整天数（0 表示最近 24 小时内）"""
+    return cast(func.floor(extract("epoch", literal(now) - column) / 86400), Integer)
+
+
+class DashboardRollupRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def refresh(self, now: datetime, lookback_hours: int = 2, reconcile_hours: int = 24) -> bool:
+        """
+        重新汇总上次刷新以来的数据（先删除对应小时的旧结果再写入），在一个事务内完成
+
+        Args:
+            reconcile_hours: 距上次全量重算超过该小时数时本次做全量重算，0 表示只在首次刷新时全量汇总
+
+        Returns:
+            是否执行了刷新；其他 worker 正在刷新时返回 False
+        """
+        locked = await self.db.scalar(select(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_KEY)))
+        if not locked:
+            return False
+
+        try:
+            state = await self.db.get(DashboardRollupState, ROLLUP_NAME)
+            reconciled = await self.db.get(DashboardRollupState, RECONCILE_NAME)
+            start = rollup_start(state.watermark if state else None, lookback_hours)
+            if reconcile_hours > 0 and (
+                reconciled is None or now - reconciled.watermark >= timedelta(hours=reconcile_hours)
+            ):
+                start = None
+
+            for table in (DashboardRollup, DashboardActiveUser):
+                stmt = delete(table)
+                if start is not None:
+                    stmt = stmt.where(table.bucket_start >= start)
+                await self.db.execute(stmt)
+
+            for query in _rollup_selects(start):
+                await self.db.execute(insert(DashboardRollup).from_select(ROLLUP_COLUMNS, query))
+            await self.db.execute(
+                insert(DashboardActiveUser).from_select(["bucket_start", "user_pk"], _active_user_select(start))
+            )
+
+            self._set_watermark(state, ROLLUP_NAME, now)
+            if start is None:
+                self._set_watermark(reconciled, RECONCILE_NAME, now)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        return True
+
+    def _set_watermark(self, state: DashboardRollupState | None, name: str, now: datetime) -> None:
+        if state is None:
+            self.db.add(DashboardRollupState(name=name, watermark=now))
+        else:
+            state.watermark = now
+
+    async def has_rollups(self) -> bool:
+        return await self.db.get(DashboardRollupState, ROLLUP_NAME) is not None
+
+    async def get_user_activity(self, now: datetime, days: int = 30) -> tuple[int, dict[int, int], int]:
+        """
+        Returns:
+            (未删除用户总数, {距今天数: 当天活跃用户数}, 最近 days 天活跃用户数)
+        """
+        active = (
+            select(
+                DashboardActiveUser.user_pk,
+                _day_offset(now, DashboardActiveUser.bucket_start).label("day_offset"),
+            )
+            .join(User, User.id == DashboardActiveUser.user_pk)
+            .where(User.is_deleted == 0, DashboardActiveUser.bucket_start > now - timedelta(days=days))
+            .subquery()
+        )
+        total_users = select(func.count(User.id)).where(User.is_deleted == 0).scalar_subquery()
+        # ROLLUP 同时返回按天分组的结果与总计行（day_offset 为 NULL）
+        result = await self.db.execute(
+            select(
+                active.c.day_offset, func.count(distinct(active.c.user_pk)), total_users.label("total_users")
+            ).group_by(func.rollup(active.c.day_offset))
+        )
+
+        users_total, period_active, daily = 0, 0, {}
+        for day_offset, count, total in result.all():
+            users_total = total or 0
+            if day_offset is None:
+                period_active = count
+            else:
+                daily[day_offset] = count
+        return users_total, daily, period_active
+
+    async def get_tool_stats(self, now: datetime, days: int = 7) -> list:
+        """按 (指标, 工具, 距今天数) 汇总工具调用，距今天数超过 days 的记为 None"""
+        rows = (
+            select(
+                DashboardRollup.metric,
+                DashboardRollup.dimension,
+                case(
+                    (
+                        DashboardRollup.bucket_start > now - timedelta(days=days),
+                        _day_offset(now, DashboardRollup.bucket_start),
+                    ),
+                    else_=None,
+                ).label("day_offset"),
+                DashboardRollup.value,
+            )
+            .where(DashboardRollup.metric.in_(TOOL_METRICS))
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(
+                rows.c.metric,
+                rows.c.dimension,
+                rows.c.day_offset,
+                cast(func.sum(rows.c.value), BigInteger).label("value"),
+            ).group_by(rows.c.metric, rows.c.dimension, rows.c.day_offset)
+        )
+        return list(result.all())
+
+    async def get_timeseries(
+        self,
+        metrics: tuple[str, ...],
+        start: datetime,
+        group_format,
+        by_metric: bool = False,
+        total_metric: str | None = None,
+    ) -> tuple[list, int | None]:
+        """
+        按时间段汇总指标
+
+        Args:
+            group_format: 以 DashboardRollup.bucket_start 构造的时间分组表达式
+            by_metric: 按指标名分类（如 input_tokens / output_tokens），否则按维度分类
+            total_metric: 同时返回该指标全部时间的总和
+
+        Returns:
+            (按时间排序的 (date, category, count) 行, total_metric 的总和)
+        """
+        buckets = (
+            select(DashboardRollup.metric, DashboardRollup.dimension, group_format.label("date"), DashboardRollup.value)
+            .where(DashboardRollup.metric.in_(metrics), DashboardRollup.bucket_start >= start)
+            .subquery()
+        )
+        category = buckets.c.metric if by_metric else buckets.c.dimension
+        columns = [
+            buckets.c.date.label("date"),
+            category.label("category"),
+            cast(func.sum(buckets.c.value), BigInteger).label("count"),
+        ]
+        if total_metric:
+            columns.append(
+                select(func.sum(DashboardRollup.value))
+                .where(DashboardRollup.metric == total_metric)
+                .scalar_subquery()
+                .label("total")
+            )
+
+        result = await self.db.execute(select(*columns).group_by(buckets.c.date, category).order_by(buckets.c.date))
+        rows = list(result.all())
+        if not total_metric:
+            return rows, None
+        if rows:
+            return rows, int(rows[0].total or 0)
+        total = await self.db.scalar(
+            select(func.sum(DashboardRollup.value)).where(DashboardRollup.metric == total_metric)
+        )
+        return rows, int(total or 0)
@@ -0,0 +1,205 @@
+"""
+对话运行事件日志
+
+原先智能体的输出直接写入一次 HTTP 响应，客户端断开（刷新页面、代理断开连接）就会取消生成，
+刷新后也无法重新接上。这里把生成与投递解耦：
+- 每次对话请求作为一次运行（ChatRun）在后台任务中执行，产生的事件按顺序编号写入该运行的环形缓冲区；
+- 任意数量的订阅者（同一对话的多个标签页、断线重连的客户端）从指定序号之后读取事件，
+  客户端断开不影响生成，停止生成需显式调用 cancel；
+- 运行结束后缓冲区再保留 YUXI_CHAT_RUN_RETENTION 秒，供断线的客户端补齐剩余事件。
+
+运行记录保存在当前进程内，多 worker 部署时重连请求需要落到同一 worker（按 thread_id 保持会话粘性），
+否则找不到运行，客户端回退为重新加载历史记录。
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+
+from src.utils import logger
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# 每次运行缓冲的事件数，超出后丢弃最早的事件
+CHAT_RUN_BUFFER_SIZE = _env_int("YUXI_CHAT_RUN_BUFFER_SIZE", 5000)
+# 运行结束后保留缓冲区的秒数
+CHAT_RUN_RETENTION = _env_int("YUXI_CHAT_RUN_RETENTION", 300, minimum=0)
+# SSE 心跳间隔（秒）
+CHAT_RUN_HEARTBEAT = 15
+
+
+class ChatRunConflictError(Exception):
+    """同一对话已有正在进行的运行"""
+
+
+class ChatRun:
+    """一次对话运行：按序号保存事件，并唤醒等待中的订阅者"""
+
+    def __init__(self, run_id: str, thread_id: str, user_id: str, buffer_size: int = CHAT_RUN_BUFFER_SIZE):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.user_id = user_id
+        self.finished_at: float | None = None
+        self.last_seq = 0
+        self.task: asyncio.Task | None = None
+        self._events: deque[tuple[int, bytes]] = deque(maxlen=buffer_size)
+        # 每次发布事件后替换为新的 Event，订阅者等待发布前取到的那一个
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def first_seq(self) -> int:
+        """缓冲区中最早事件的序号，缓冲区为空时为 last_seq + 1"""
+        return self._events[0][0] if self._events else self.last_seq + 1
+
+    def publish(self, payload: bytes) -> int:
+        self.last_seq += 1
+        self._events.append((self.last_seq, payload))
+        self._notify()
+        return self.last_seq
+
+    def finish(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.time()
+            self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def iter_events(
+        self, after_seq: int = 0, heartbeat: float | None = None
+    ) -> AsyncIterator[tuple[int, bytes] | None]:
+        """
+        依次返回序号大于 after_seq 的事件，运行结束且事件读完后停止
+
+        Args:
+            after_seq: 客户端已收到的最后一个事件序号（Last-Event-ID），0 表示从头读取
+            heartbeat: 等待新事件超过该秒数时返回 None，供调用方发送心跳
+        """
+        cursor = after_seq
+        while True:
+            changed = self._changed
+            first_seq = self.first_seq
+            if cursor + 1 < first_seq and self._events:
+                # 需要的事件已被环形缓冲区丢弃，告知客户端后从最早的事件继续
+                yield first_seq - 1, self._truncated_payload(first_seq - 1 - cursor)
+                cursor = first_seq - 1
+
+            start = max(0, cursor + 1 - first_seq)
+            for seq, payload in list(itertools.islice(self._events, start, None)):
+                yield seq, payload
+                cursor = seq
+
+            if self.done and cursor >= self.last_seq:
+                return
+            if cursor < self.last_seq:
+                continue
+
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except TimeoutError:
+                yield None
+
+    def _truncated_payload(self, missed: int) -> bytes:
+        chunk = {"request_id": self.run_id, "response": None, "status": "truncated", "missed": missed}
+        return json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class ChatRunRegistry:
+    """当前进程内各对话（thread_id）最近一次的运行"""
+
+    def __init__(self, buffer_size: int = CHAT_RUN_BUFFER_SIZE, retention_seconds: int = CHAT_RUN_RETENTION):
+        self.buffer_size = buffer_size
+        self.retention_seconds = retention_seconds
+        self._runs: dict[str, ChatRun] = {}
+
+    def start(self, *, run_id: str, thread_id: str, user_id: str, source: AsyncIterator[bytes]) -> ChatRun:
+        """在后台任务中消费 source，把产生的每个事件写入新运行；同一对话同时只允许一个运行"""
+        active = self._runs.get(thread_id)
+        if active is not None and not active.done:
+            raise ChatRunConflictError(thread_id)
+
+        run = ChatRun(run_id, thread_id, user_id, self.buffer_size)
+        self._runs[thread_id] = run
+        run.task = asyncio.create_task(self._drive(run, source), name=f"chat-run-{run_id}")
+        # 任务在开始执行前就被取消时 _drive 不会运行，因此在回调中结束运行
+        run.task.add_done_callback(lambda _: self._finish(run))
+        return run
+
+    def get(self, thread_id: str) -> ChatRun | None:
+        """返回该对话最近一次运行（可能已结束但仍在保留期内）"""
+        return self._runs.get(thread_id)
+
+    def cancel(self, thread_id: str) -> bool:
+        """停止该对话正在进行的运行，生成器收到取消后会保存已生成的内容"""
+        run = self._runs.get(thread_id)
+        if run is None or run.done or run.task is None:
+            return False
+        run.task.cancel()
+        return True
+
+    async def shutdown(self) -> None:
+        tasks = [run.task for run in self._runs.values() if run.task is not None and not run.done]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _drive(self, run: ChatRun, source: AsyncIterator[bytes]) -> None:
+        try:
+            async for payload in source:
+                run.publish(payload)
+        except asyncio.CancelledError:
+            logger.info(f"Chat run {run.run_id} cancelled")
+        except Exception as e:
+            logger.error(f"Chat run {run.run_id} failed: {e}")
+
+    def _finish(self, run: ChatRun) -> None:
+        run.finish()
+        if self.retention_seconds > 0:
+            asyncio.get_running_loop().call_later(self.retention_seconds, self._forget, run)
+        else:
+            self._forget(run)
+
+    def _forget(self, run: ChatRun) -> None:
+        if self._runs.get(run.thread_id) is run:
+            del self._runs[run.thread_id]
+
+    def get_stats(self) -> dict:
+        running = sum(1 for run in self._runs.values() if not run.done)
+        return {"runs": len(self._runs), "running": running}
+
+
+async def encode_run_events(run: ChatRun, after_seq: int = 0, sse: bool = False) -> AsyncIterator[bytes]:
+    """
+    把运行事件编码为响应体
+
+    sse=True 时为 text/event-stream，每个事件带 id（即序号），空闲时发送心跳注释防止代理断开；
+    否则为与原接口一致的 NDJSON。
+    """
+    heartbeat = CHAT_RUN_HEARTBEAT if sse else None
+    async for event in run.iter_events(after_seq, heartbeat=heartbeat):
+        if event is None:
+            yield b": ping\n\n"
+            continue
+        seq, payload = event
+        if sse:
+            yield b"id: %d\ndata: " % seq + payload.rstrip(b"\n") + b"\n\n"
+        else:
+            yield payload
+
+
+chat_run_registry = ChatRunRegistry()
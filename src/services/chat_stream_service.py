@@ -1,8 +1,12 @@
 import asyncio
 import json
+import os
+import time
 import traceback
 import uuid
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing
+from typing import Any
 
 from langchain.messages import AIMessage, AIMessageChunk, HumanMessage
 from langgraph.types import Command
@@ -18,6 +22,19 @@ from src.storage.postgres.manager import pg_manager
 from src.utils.logging_config import logger
 
 
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# 流式输出的合并窗口（毫秒），0 表示不合并
+CHAT_STREAM_FLUSH_MS = _env_int("YUXI_CHAT_STREAM_FLUSH_MS", 40, minimum=0)
+# 待发送的内容达到该字符数时立即发送
+CHAT_STREAM_FLUSH_CHARS = _env_int("YUXI_CHAT_STREAM_FLUSH_CHARS", 1024)
+
+
 async def _get_langgraph_messages(agent_instance, config_dict):
     graph = await agent_instance.get_graph()
     state = await graph.aget_state(config_dict)
@@ -41,20 +58,83 @@ def extract_agent_state(values: dict) -> dict:
         return [v]
 
     result = {}
-    print(f"values.keys(): {values.keys()}")
     result["todos"] = _norm_list(values.get("todos"))[:20]
     result["files"] = _norm_list(values.get("files"))[:50]
 
     return result
 
 
-async def _get_existing_message_ids(conv_repo: ConversationRepository, thread_id: str) -> set[str]:
-    existing_messages = await conv_repo.get_messages_by_thread_id(thread_id)
-    return {
-        msg.extra_metadata["id"]
-        for msg in existing_messages
-        if msg.extra_metadata and "id" in msg.extra_metadata and isinstance(msg.extra_metadata["id"], str)
-    }
+def _merge_files(current, update):
+    """与 FilesystemMiddleware 的 files reducer 一致：按路径合并，值为 None 表示删除"""
+    if not isinstance(update, dict):
+        return update
+    merged = dict(current) if isinstance(current, dict) else {}
+    for path, file_data in update.items():
+        if file_data is None:
+            merged.pop(path, None)
+        else:
+            merged[path] = file_data
+    return merged
+
+
+class AgentStateTracker:
+    """
+    根据图的 updates 事件增量维护 todos / files，代替每条工具消息后读取一次完整状态
+
+    每次运行最多读取一次检查点作为基准（首次出现相关更新或运行结束时），之后只合并增量；
+    基准可能已包含刚合并的更新，todos 覆盖、files 按路径合并都是幂等的。
+    """
+
+    STATE_KEYS = ("todos", "files")
+
+    def __init__(self, graph, langgraph_config: dict):
+        self._graph = graph
+        self._config = langgraph_config
+        self._values: dict | None = None
+
+    async def _ensure_baseline(self) -> dict:
+        if self._values is None:
+            state = await self._graph.aget_state(self._config)
+            values = getattr(state, "values", None) if state else None
+            values = values if isinstance(values, dict) else {}
+            self._values = {key: values.get(key) for key in self.STATE_KEYS}
+        return self._values
+
+    async def apply(self, updates) -> dict | None:
+        """合并一次 updates 事件，todos / files 有变化时返回新的 agent_state"""
+        changes = []
+        for node_update in (updates or {}).values() if isinstance(updates, dict) else []:
+            items = node_update if isinstance(node_update, (list, tuple)) else [node_update]
+            changes.extend(item for item in items if isinstance(item, dict) and item.keys() & self.STATE_KEYS)
+        if not changes:
+            return None
+
+        values = await self._ensure_baseline()
+        for change in changes:
+            if "todos" in change:
+                values["todos"] = change["todos"]
+            if "files" in change:
+                values["files"] = _merge_files(values.get("files"), change["files"])
+        return extract_agent_state(values)
+
+    async def snapshot(self) -> dict:
+        return extract_agent_state(await self._ensure_baseline())
+
+
+def _find_reasoning_content(
+    get_field: Callable[[str], Any], additional_kwargs: dict, provider_specific_fields: dict
+) -> Any:
+    nested_fields = additional_kwargs.get("provider_specific_fields") or {}
+    return (
+        get_field("reasoning_content")
+        or get_field("reasoning")
+        or additional_kwargs.get("reasoning_content")
+        or additional_kwargs.get("reasoning")
+        or provider_specific_fields.get("reasoning_content")
+        or provider_specific_fields.get("reasoning")
+        or nested_fields.get("reasoning_content")
+        or nested_fields.get("reasoning")
+    )
 
 
 def _normalize_reasoning_fields(msg_dict: dict) -> dict:
@@ -72,16 +152,7 @@ def _normalize_reasoning_fields(msg_dict: dict) -> dict:
         provider_specific_fields = {}
         msg_dict["provider_specific_fields"] = provider_specific_fields
 
-    reasoning_content = (
-        msg_dict.get("reasoning_content")
-        or msg_dict.get("reasoning")
-        or additional_kwargs.get("reasoning_content")
-        or additional_kwargs.get("reasoning")
-        or provider_specific_fields.get("reasoning_content")
-        or provider_specific_fields.get("reasoning")
-        or (additional_kwargs.get("provider_specific_fields") or {}).get("reasoning_content")
-        or (additional_kwargs.get("provider_specific_fields") or {}).get("reasoning")
-    )
+    reasoning_content = _find_reasoning_content(msg_dict.get, additional_kwargs, provider_specific_fields)
 
     if reasoning_content:
         msg_dict["reasoning_content"] = reasoning_content
@@ -90,47 +161,181 @@ def _normalize_reasoning_fields(msg_dict: dict) -> dict:
     return msg_dict
 
 
-async def _save_ai_message(conv_repo: ConversationRepository, thread_id: str, msg_dict: dict) -> None:
-    msg_dict = _normalize_reasoning_fields(msg_dict)
-    content = msg_dict.get("content", "")
-    tool_calls_data = msg_dict.get("tool_calls", [])
+class ChatStreamCoalescer:
+    """
+    合并同一次回复中连续的 AIMessageChunk，避免逐 token 序列化完整消息、逐 token 写入响应
+
+    - 回复的第一个块按完整消息发送（前端以它为基础合并后续块），之后只发送增量：
+      id、type、content、reasoning_content 与 tool_call_chunks，多个块的增量拼接后一起发送；
+    - 距上次发送超过合并窗口或待发送内容超过 max_chars 时立即发送。生成较慢时每个块到达时
+      都已超出窗口，会直接发送，不增加延迟；
+    - 调用方在发送其他消息或状态之前、以及等待下一个块超过 time_until_flush() 时调用 flush()。
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = CHAT_STREAM_FLUSH_MS / 1000,
+        max_chars: int = CHAT_STREAM_FLUSH_CHARS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        self._clock = clock
+        # 同一次回复使用同一个 id，部分模型每个块的 id 不同，前端会渲染成多个气泡
+        self.message_id: str | None = None
+        self.chunks = 0
+        self.frames = 0
+        self._last_flush = float("-inf")
+        self._metadata: dict | None = None
+        self._content: list[str] = []
+        self._reasoning: list[str] = []
+        self._kwargs_reasoning: list[str] = []
+        self._tool_call_chunks: list = []
+        self._pending_chars = 0
+
+    @property
+    def pending(self) -> bool:
+        return self._metadata is not None
+
+    def time_until_flush(self) -> float | None:
+        """距离需要发送待合并内容的秒数，没有待发送内容时为 None"""
+        if not self.pending:
+            return None
+        return max(0.0, self._last_flush + self.flush_interval - self._clock())
+
+    def add(self, msg: AIMessageChunk, metadata: dict) -> list[tuple[dict, dict]]:
+        """加入一个块，返回需要立即发送的 (msg, metadata)"""
+        self.chunks += 1
+        content = msg.content
+        # 模型返回的非标准字段在 __pydantic_extra__ 中，逐个 getattr 缺失字段会抛出并捕获异常，开销较大
+        extra = msg.__pydantic_extra__ or {}
+        reasoning = _find_reasoning_content(
+            extra.get, msg.additional_kwargs, extra.get("provider_specific_fields") or {}
+        )
+        kwargs_reasoning = msg.additional_kwargs.get("reasoning_content") or reasoning
+        mergeable = (
+            isinstance(content, str) and isinstance(reasoning or "", str) and isinstance(kwargs_reasoning or "", str)
+        )
 
-    ai_msg = await conv_repo.add_message_by_thread_id(
-        thread_id=thread_id,
-        role="assistant",
-        content=content,
-        message_type="text",
-        extra_metadata=msg_dict,
-    )
+        if self.message_id is None or not mergeable:
+            # 第一个块，或者内容不是文本（无法拼接）时按完整消息发送
+            frames = self.flush()
+            msg_dict = _normalize_reasoning_fields(msg.model_dump())
+            if self.message_id is None:
+                self.message_id = msg_dict.get("id") or str(uuid.uuid4())
+            msg_dict["id"] = self.message_id
+            frames.append(self._sent(msg_dict, metadata))
+            return frames
+
+        frames = []
+        if self.pending and metadata.get("langgraph_checkpoint_ns") != self._metadata.get("langgraph_checkpoint_ns"):
+            # 来自不同节点（例如子智能体）的块不合并，保证每条增量的 metadata 准确
+            frames = self.flush()
+        self._metadata = metadata
+        if content:
+            self._content.append(content)
+            self._pending_chars += len(content)
+        if reasoning:
+            self._reasoning.append(reasoning)
+            self._kwargs_reasoning.append(kwargs_reasoning)
+            self._pending_chars += len(reasoning)
+        if msg.tool_call_chunks:
+            self._tool_call_chunks.extend(msg.tool_call_chunks)
+            self._pending_chars += sum(len(chunk.get("args") or "") for chunk in msg.tool_call_chunks)
+
+        if self._pending_chars >= self.max_chars or self._clock() - self._last_flush >= self.flush_interval:
+            frames.extend(self.flush())
+        return frames
+
+    def flush(self) -> list[tuple[dict, dict]]:
+        """发送待合并的增量"""
+        if not self.pending:
+            return []
+        delta = {"id": self.message_id, "type": "AIMessageChunk", "content": "".join(self._content)}
+        if self._reasoning:
+            delta["reasoning_content"] = "".join(self._reasoning)
+            delta["additional_kwargs"] = {"reasoning_content": "".join(self._kwargs_reasoning)}
+        if self._tool_call_chunks:
+            delta["tool_call_chunks"] = self._tool_call_chunks
+        frame = self._sent(delta, self._metadata)
+
+        self._metadata = None
+        self._content = []
+        self._reasoning = []
+        self._kwargs_reasoning = []
+        self._tool_call_chunks = []
+        self._pending_chars = 0
+        return [frame]
+
+    def _sent(self, msg_dict: dict, metadata: dict) -> tuple[dict, dict]:
+        self.frames += 1
+        self._last_flush = self._clock()
+        return msg_dict, metadata
+
+
+async def _iter_with_idle_ticks(source: AsyncIterator, idle_timeout: Callable[[], float | None]) -> AsyncIterator[Any]:
+    """
+    在独立任务中迭代 source，等待下一项超过 idle_timeout() 秒时产出 None
+
+    不能直接给 source 的 __anext__ 加超时：超时取消会中断 source 本身（LangGraph 的运行）。
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+    end = object()
+
+    async def produce():
+        try:
+            async for item in source:
+                await queue.put((item, None))
+            await queue.put((end, None))
+        except Exception as e:
+            await queue.put((end, e))
 
-    if ai_msg and tool_calls_data:
-        for tc in tool_calls_data:
-            await conv_repo.add_tool_call(
-                message_id=ai_msg.id,
-                tool_name=tc.get("name", "unknown"),
-                tool_input=tc.get("args", {}),
-                status="pending",
-                langgraph_tool_call_id=tc.get("id"),
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                item, error = await asyncio.wait_for(queue.get(), timeout=idle_timeout())
+            except TimeoutError:
+                yield None
+                continue
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def _build_turn_records(messages: list) -> tuple[list[dict], dict[str, dict]]:
+    """把 LangGraph 状态中的消息转换为待保存的 AI 消息与工具结果（人类消息在请求开始时已保存）"""
+    records = []
+    tool_results = {}
+    for msg in messages:
+        msg_dict = msg.model_dump() if hasattr(msg, "model_dump") else {}
+        msg_dict = _normalize_reasoning_fields(msg_dict)
+        msg_type = msg_dict.get("type", "unknown")
+
+        if msg_type == "ai":
+            records.append(
+                {
+                    "role": "assistant",
+                    "content": msg_dict.get("content", ""),
+                    "message_type": "text",
+                    "extra_metadata": msg_dict,
+                    "tool_calls": msg_dict.get("tool_calls", []),
+                }
             )
+        elif msg_type == "tool" and msg_dict.get("tool_call_id"):
+            content = msg_dict.get("content", "")
+            if isinstance(content, list):
+                tool_output = json.dumps(content) if content else ""
+            else:
+                tool_output = str(content)
+            tool_results[msg_dict["tool_call_id"]] = {"tool_output": tool_output, "status": "success"}
 
-
-async def _save_tool_message(conv_repo: ConversationRepository, msg_dict: dict) -> None:
-    tool_call_id = msg_dict.get("tool_call_id")
-    content = msg_dict.get("content", "")
-
-    if not tool_call_id:
-        return
-
-    if isinstance(content, list):
-        tool_output = json.dumps(content) if content else ""
-    else:
-        tool_output = str(content)
-
-    await conv_repo.update_tool_call_output(
-        langgraph_tool_call_id=tool_call_id,
-        tool_output=tool_output,
-        status="success",
-    )
+    return records, tool_results
 
 
 async def save_partial_message(
@@ -178,20 +383,11 @@ async def save_messages_from_langgraph_state(
         if messages is None:
             return
 
-        existing_ids = await _get_existing_message_ids(conv_repo, thread_id)
-
-        for msg in messages:
-            msg_dict = msg.model_dump() if hasattr(msg, "model_dump") else {}
-            msg_dict = _normalize_reasoning_fields(msg_dict)
-            msg_type = msg_dict.get("type", "unknown")
-
-            if msg_type == "human" or getattr(msg, "id", None) in existing_ids:
-                continue
-
-            if msg_type == "ai":
-                await _save_ai_message(conv_repo, thread_id, msg_dict)
-            elif msg_type == "tool":
-                await _save_tool_message(conv_repo, msg_dict)
+        # 只处理最后一条用户消息之后的本轮消息（审批恢复执行也属于同一轮）；
+        # 已保存的消息由仓储按 id 过滤，整轮消息与工具调用在一个事务内写入
+        last_human = max((i for i, msg in enumerate(messages) if getattr(msg, "type", None) == "human"), default=-1)
+        records, tool_results = _build_turn_records(messages[last_human + 1 :])
+        await conv_repo.save_turn_messages(thread_id, records, tool_results)
 
     except Exception as e:
         logger.error(f"Error saving messages from LangGraph state: {e}")
@@ -268,6 +464,12 @@ async def stream_agent_chat(
             + b"\n"
         )
 
+    def make_message_chunks(frames: list[tuple[dict, dict]]) -> list[bytes]:
+        return [
+            make_chunk(content=msg_dict["content"], msg=msg_dict, metadata=metadata, status="loading")
+            for msg_dict, metadata in frames
+        ]
+
     if image_content:
         human_message = HumanMessage(
             content=[
@@ -399,44 +601,56 @@ async def stream_agent_chat(
 
         full_msg = None
         accumulated_content = []
-        assistant_stream_message_id: str | None = None
+        coalescer = ChatStreamCoalescer()
         langgraph_config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
-        async for msg, metadata in agent.stream_messages(messages, input_context=input_context):
-            if isinstance(msg, AIMessageChunk):
-                accumulated_content.append(msg.content)
-
-                content_for_check = "".join(accumulated_content[-10:])
-                if conf.enable_content_guard and await content_guard.check_with_keywords(content_for_check):
-                    full_msg = AIMessage(content="".join(accumulated_content))
-                    await save_partial_message(conv_repo, thread_id, full_msg, "content_guard_blocked")
-                    meta["time_cost"] = asyncio.get_event_loop().time() - start_time
-                    yield make_chunk(status="interrupted", message="检测到敏感内容，已中断输出", meta=meta)
-                    return
-
-                msg_dict = msg.model_dump()
-                msg_dict = _normalize_reasoning_fields(msg_dict)
-                # Keep one stable id for the same assistant streaming reply.
-                # Some providers/chains emit per-chunk ids, which would be rendered as many
-                # separate bubbles on the frontend (fast "screen flooding").
-                if not assistant_stream_message_id:
-                    assistant_stream_message_id = msg_dict.get("id") or str(uuid.uuid4())
-                msg_dict["id"] = assistant_stream_message_id
-
-                yield make_chunk(content=msg.content, msg=msg_dict, metadata=metadata, status="loading")
-            else:
-                msg_dict = msg.model_dump()
-                msg_dict = _normalize_reasoning_fields(msg_dict)
-                yield make_chunk(msg=msg_dict, metadata=metadata, status="loading")
-
-                try:
-                    if msg_dict.get("type") == "tool":
-                        graph = await agent.get_graph()
-                        state = await graph.aget_state(langgraph_config)
-                        agent_state = extract_agent_state(getattr(state, "values", {})) if state else {}
+        state_tracker = AgentStateTracker(await agent.get_graph(), langgraph_config)
+        events = _iter_with_idle_ticks(
+            agent.stream_messages_and_updates(messages, input_context=input_context), coalescer.time_until_flush
+        )
+        async with aclosing(events):
+            async for event in events:
+                if event is None:
+                    # 合并窗口内没有新的块，发送已合并的内容
+                    for chunk in make_message_chunks(coalescer.flush()):
+                        yield chunk
+                    continue
+
+                mode, payload = event
+                if mode == "updates":
+                    try:
+                        agent_state = await state_tracker.apply(payload)
                         if agent_state:
+                            for chunk in make_message_chunks(coalescer.flush()):
+                                yield chunk
                             yield make_chunk(status="agent_state", agent_state=agent_state, meta=meta)
-                except Exception as e:
-                    logger.error(f"Error processing tool message: {e}")
+                    except Exception as e:
+                        logger.error(f"Error processing state update: {e}")
+                    continue
+
+                msg, metadata = payload
+                if isinstance(msg, AIMessageChunk):
+                    accumulated_content.append(msg.content)
+
+                    if conf.enable_content_guard and await content_guard.check_with_keywords(
+                        "".join(accumulated_content[-10:])
+                    ):
+                        full_msg = AIMessage(content="".join(accumulated_content))
+                        await save_partial_message(conv_repo, thread_id, full_msg, "content_guard_blocked")
+                        meta["time_cost"] = asyncio.get_event_loop().time() - start_time
+                        yield make_chunk(status="interrupted", message="检测到敏感内容，已中断输出", meta=meta)
+                        return
+
+                    for chunk in make_message_chunks(coalescer.add(msg, metadata)):
+                        yield chunk
+                else:
+                    for chunk in make_message_chunks(coalescer.flush()):
+                        yield chunk
+                    msg_dict = msg.model_dump()
+                    msg_dict = _normalize_reasoning_fields(msg_dict)
+                    yield make_chunk(msg=msg_dict, metadata=metadata, status="loading")
+
+        for chunk in make_message_chunks(coalescer.flush()):
+            yield chunk
 
         if not full_msg and accumulated_content:
             full_msg = AIMessage(content="".join(accumulated_content))
@@ -452,9 +666,7 @@ async def stream_agent_chat(
 
         meta["time_cost"] = asyncio.get_event_loop().time() - start_time
         try:
-            graph = await agent.get_graph()
-            state = await graph.aget_state(langgraph_config)
-            agent_state = extract_agent_state(getattr(state, "values", {})) if state else {}
+            agent_state = await state_tracker.snapshot()
         except Exception:
             agent_state = {}
 
@@ -525,6 +737,13 @@ async def stream_agent_chat(
         yield make_chunk(status="error", error_type=error_type, error_message=error_msg, meta=meta)
 
 
+async def stream_agent_chat_in_session(**kwargs) -> AsyncIterator[bytes]:
+    """在独立的数据库会话中执行 stream_agent_chat，供后台运行使用（请求的会话随响应结束而关闭）"""
+    async with pg_manager.get_async_session_context() as db:
+        async for chunk in stream_agent_chat(db=db, **kwargs):
+            yield chunk
+
+
 async def stream_agent_resume(
     *,
     agent_id: str,
@@ -3,6 +3,7 @@ import uuid
 from fastapi import HTTPException, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.agents.common.checkpointer import delete_thread_checkpoints
 from src.repositories.conversation_repository import ConversationRepository
 from src.services.doc_converter import (
     ATTACHMENT_ALLOWED_EXTENSIONS,
@@ -89,6 +90,14 @@ async def list_threads_view(
     ]
 
 
+async def _delete_checkpoints(thread_ids: list[str]) -> None:
+    """对话删除后不再恢复，清理其智能体检查点；失败不影响删除结果"""
+    try:
+        await delete_thread_checkpoints(thread_ids)
+    except Exception as e:
+        logger.warning(f"清理对话检查点失败 {thread_ids}: {e}")
+
+
 async def delete_thread_view(
     *,
     thread_id: str,
@@ -100,6 +109,7 @@ async def delete_thread_view(
     deleted = await conv_repo.delete_conversation(thread_id, soft_delete=True)
     if not deleted:
         raise HTTPException(status_code=404, detail="对话线程不存在")
+    await _delete_checkpoints([thread_id])
     return {"message": "删除成功"}
 
 
@@ -113,9 +123,11 @@ async def delete_all_threads_view(
         raise HTTPException(status_code=422, detail="agent_id 不能为空")
 
     conv_repo = ConversationRepository(db)
-    count = await conv_repo.delete_all_conversations(
+    thread_ids = await conv_repo.delete_all_conversations(
         user_id=str(current_user_id), agent_id=agent_id, soft_delete=True
     )
+    await _delete_checkpoints(thread_ids)
+    count = len(thread_ids)
     return {"message": f"成功清空 {count} 条对话历史", "count": count}
 
 
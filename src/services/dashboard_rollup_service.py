@@ -0,0 +1,92 @@
+"""
+仪表板统计汇总任务
+
+仪表板接口原先每次请求都在 messages / tool_calls / conversations 上做十余次聚合查询。
+这里由后台任务把统计结果按小时增量写入汇总表（见 DashboardRollupRepository），接口只读取汇总表：
+- 每隔 YUXI_DASHBOARD_ROLLUP_INTERVAL 秒刷新一次，
+  只重新汇总上次刷新前 YUXI_DASHBOARD_ROLLUP_LOOKBACK_HOURS 小时以来的数据；
+- 首次刷新做一次全量汇总，之后每隔 YUXI_DASHBOARD_ROLLUP_RECONCILE_HOURS 小时全量重算一次，
+  修正回看窗口之前被修改或删除的记录造成的偏差；
+- 多个 worker 同时刷新时由 PostgreSQL advisory lock 保证只有一个执行。
+"""
+
+import asyncio
+import os
+import time
+
+from src.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from src.storage.postgres.manager import pg_manager
+from src.utils import logger
+from src.utils.datetime_utils import utc_now_naive
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+DASHBOARD_ROLLUP_INTERVAL = _env_int("YUXI_DASHBOARD_ROLLUP_INTERVAL", 300)
+DASHBOARD_ROLLUP_LOOKBACK_HOURS = _env_int("YUXI_DASHBOARD_ROLLUP_LOOKBACK_HOURS", 2, minimum=0)
+DASHBOARD_ROLLUP_RECONCILE_HOURS = _env_int("YUXI_DASHBOARD_ROLLUP_RECONCILE_HOURS", 24, minimum=0)
+
+
+class DashboardRollupService:
+    def __init__(
+        self,
+        interval_seconds: int = DASHBOARD_ROLLUP_INTERVAL,
+        lookback_hours: int = DASHBOARD_ROLLUP_LOOKBACK_HOURS,
+        reconcile_hours: int = DASHBOARD_ROLLUP_RECONCILE_HOURS,
+    ):
+        self.interval_seconds = interval_seconds
+        self.lookback_hours = lookback_hours
+        self.reconcile_hours = reconcile_hours
+        self._task: asyncio.Task | None = None
+        self._refresh_lock = asyncio.Lock()
+        self._ready = False
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="dashboard-rollup")
+            logger.info(f"Dashboard rollup started, interval={self.interval_seconds}s")
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self) -> bool:
+        """执行一次增量汇总（到期时全量重算）；其他 worker 正在汇总时返回 False"""
+        async with self._refresh_lock:
+            start = time.monotonic()
+            async with pg_manager.get_async_session_context() as session:
+                repo = DashboardRollupRepository(session)
+                refreshed = await repo.refresh(utc_now_naive(), self.lookback_hours, self.reconcile_hours)
+                if not refreshed:
+                    self._ready = self._ready or await repo.has_rollups()
+                    return False
+            self._ready = True
+            logger.debug(f"Refreshed dashboard rollups in {time.monotonic() - start:.2f}s")
+            return True
+
+    async def ensure_ready(self) -> None:
+        """汇总表尚未生成时（如服务首次启动）先同步汇总一次，失败时沿用已有数据"""
+        if self._ready:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Failed to build dashboard rollups: {e}")
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to refresh dashboard rollups: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+dashboard_rollup = DashboardRollupService()
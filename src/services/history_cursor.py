@@ -0,0 +1,39 @@
+"""
+对话历史分页游标
+
+历史消息按 (created_at, id) 倒序分页（"加载更早的消息"），游标记录当前页最早一条消息的位置，
+下一页取严格早于该位置的消息。游标对客户端不透明，编码为 URL 安全的 base64 字符串。
+"""
+
+import base64
+import binascii
+from collections.abc import Sequence
+from datetime import datetime
+
+
+def encode_cursor(created_at: datetime, message_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{message_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """解析游标，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid history cursor: {cursor}") from e
+
+
+def turn_start_index(roles: Sequence[str]) -> int:
+    """
+    返回第一条用户消息的下标，用于让分页边界落在一轮对话的开头
+
+    前端按用户消息把历史分组为多轮对话，页首不完整的一轮（只有回复没有提问）无法展示，
+    这部分消息留给更早的一页。整页都没有用户消息时（单轮消息数超过页大小）返回 0，保证分页能够推进。
+    """
+    for index, role in enumerate(roles):
+        if role == "user":
+            return index
+    return 0
@@ -1,43 +1,109 @@
+import json
+import os
+from collections.abc import AsyncIterator
+
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.agents import agent_manager
 from src.repositories.conversation_repository import ConversationRepository
+from src.services.history_cursor import decode_cursor, encode_cursor, turn_start_index
 from src.utils.logging_config import logger
 
 
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# 每页默认消息数与上限
+HISTORY_PAGE_SIZE = _env_int("YUXI_HISTORY_PAGE_SIZE", 50)
+HISTORY_MAX_PAGE_SIZE = _env_int("YUXI_HISTORY_MAX_PAGE_SIZE", 500)
+# 历史中工具输出只返回前 N 个字符，完整输出通过工具调用详情接口按需获取；0 表示不截断
+HISTORY_TOOL_OUTPUT_PREVIEW = _env_int("YUXI_HISTORY_TOOL_OUTPUT_PREVIEW", 2000, minimum=0)
+
+ROLE_TYPE_MAP = {"user": "human", "assistant": "ai", "tool": "tool", "system": "system"}
+
+
+def _format_tool_call(tc) -> dict:
+    tool_call_result = None
+    if tc.status == "success":
+        output = tc.tool_output or ""
+        tool_call_result = {"content": output}
+        if tc.output_length and tc.output_length > len(output):
+            tool_call_result.update(truncated=True, output_length=tc.output_length)
+    return {
+        "id": str(tc.id),
+        "name": tc.tool_name,
+        "function": {"name": tc.tool_name},
+        "args": tc.tool_input or {},
+        "tool_call_result": tool_call_result,
+        "status": tc.status,
+        "error_message": tc.error_message,
+    }
+
+
 async def get_agent_history_view(
     *,
     agent_id: str,
     thread_id: str,
     current_user_id: str,
     db: AsyncSession,
+    limit: int | None = None,
+    before: str | None = None,
+    tool_output_limit: int | None = None,
 ) -> dict:
+    """
+    分页获取对话历史（从最新消息往前）
+
+    Args:
+        limit: 每页消息数，默认 HISTORY_PAGE_SIZE
+        before: 上一页返回的 next_cursor，为空时返回最新一页
+        tool_output_limit: 工具输出截断长度，默认 HISTORY_TOOL_OUTPUT_PREVIEW，0 表示不截断
+
+    Returns:
+        {"history": [...], "has_more": 是否还有更早的消息, "next_cursor": 加载更早消息时传入的游标}
+    """
     if not agent_manager.get_agent(agent_id):
         raise HTTPException(status_code=404, detail=f"智能体 {agent_id} 不存在")
 
+    try:
+        cursor = decode_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
     conv_repo = ConversationRepository(db)
     conversation = await conv_repo.get_conversation_by_thread_id(thread_id)
     if not conversation or conversation.user_id != str(current_user_id) or conversation.status == "deleted":
         raise HTTPException(status_code=404, detail="对话线程不存在")
 
-    messages = await conv_repo.get_messages_by_thread_id(thread_id)
+    page_size = min(limit or HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+    messages, has_more = await conv_repo.get_messages_page(conversation.id, page_size, cursor)
+    if has_more:
+        # 页首不完整的一轮对话留给更早的一页
+        messages = messages[turn_start_index([msg.role for msg in messages]) :]
+
+    message_ids = [msg.id for msg in messages]
+    output_limit = HISTORY_TOOL_OUTPUT_PREVIEW if tool_output_limit is None else tool_output_limit
+    tool_calls_by_message: dict[int, list[dict]] = {}
+    for tc in await conv_repo.get_tool_calls_for_messages(message_ids, output_limit or None):
+        tool_calls_by_message.setdefault(tc.message_id, []).append(_format_tool_call(tc))
+    feedbacks = await conv_repo.get_user_feedbacks(message_ids, current_user_id)
 
     history: list[dict] = []
-    role_type_map = {"user": "human", "assistant": "ai", "tool": "tool", "system": "system"}
 
     for msg in messages:
         user_feedback = None
-        if msg.feedbacks:
-            for feedback in msg.feedbacks:
-                if feedback.user_id == str(current_user_id):
-                    user_feedback = {
-                        "id": feedback.id,
-                        "rating": feedback.rating,
-                        "reason": feedback.reason,
-                        "created_at": feedback.created_at.isoformat() if feedback.created_at else None,
-                    }
-                    break
+        feedback = feedbacks.get(msg.id)
+        if feedback is not None:
+            user_feedback = {
+                "id": feedback.id,
+                "rating": feedback.rating,
+                "reason": feedback.reason,
+                "created_at": feedback.created_at.isoformat() if feedback.created_at else None,
+            }
 
         extra_metadata = msg.extra_metadata or {}
         additional_kwargs = extra_metadata.get("additional_kwargs")
@@ -61,7 +127,7 @@ async def get_agent_history_view(
 
         msg_dict = {
             "id": msg.id,
-            "type": role_type_map.get(msg.role, msg.role),
+            "type": ROLE_TYPE_MAP.get(msg.role, msg.role),
             "content": msg.content,
             "created_at": msg.created_at.isoformat() if msg.created_at else None,
             "error_type": extra_metadata.get("error_type"),
@@ -75,21 +141,44 @@ async def get_agent_history_view(
             "feedback": user_feedback,
         }
 
-        if msg.tool_calls:
-            msg_dict["tool_calls"] = [
-                {
-                    "id": str(tc.id),
-                    "name": tc.tool_name,
-                    "function": {"name": tc.tool_name},
-                    "args": tc.tool_input or {},
-                    "tool_call_result": {"content": (tc.tool_output or "")} if tc.status == "success" else None,
-                    "status": tc.status,
-                    "error_message": tc.error_message,
-                }
-                for tc in msg.tool_calls
-            ]
+        if msg.id in tool_calls_by_message:
+            msg_dict["tool_calls"] = tool_calls_by_message[msg.id]
 
         history.append(msg_dict)
 
-    logger.info(f"Loaded {len(history)} messages with feedback for thread {thread_id}")
-    return {"history": history}
+    next_cursor = encode_cursor(messages[0].created_at, messages[0].id) if has_more and messages else None
+    logger.info(f"Loaded {len(history)} messages with feedback for thread {thread_id} (has_more={has_more})")
+    return {"history": history, "has_more": has_more, "next_cursor": next_cursor}
+
+
+async def get_tool_call_output_view(*, tool_call_id: int, current_user_id: str, db: AsyncSession) -> dict:
+    """获取工具调用的完整输出（历史中的工具输出被截断时按需获取）"""
+    tool_call = await ConversationRepository(db).get_user_tool_call(tool_call_id, current_user_id)
+    if tool_call is None:
+        raise HTTPException(status_code=404, detail="工具调用不存在")
+    return {
+        "id": str(tool_call.id),
+        "name": tool_call.tool_name,
+        "status": tool_call.status,
+        "content": tool_call.tool_output or "",
+        "error_message": tool_call.error_message,
+    }
+
+
+async def iter_history_json(view: dict) -> AsyncIterator[bytes]:
+    """
+    逐条消息序列化历史响应
+
+    长对话的历史响应体较大，直接返回 dict 时 FastAPI 会先递归转换整个结构再一次性序列化；
+    这里按消息逐条编码输出，减少峰值内存并让客户端更早开始接收数据。
+    """
+    yield b'{"history":['
+    for index, item in enumerate(view["history"]):
+        prefix = b"," if index else b""
+        yield prefix + json.dumps(item, ensure_ascii=False, default=str).encode("utf-8")
+    tail = b"".join(
+        b"," + json.dumps({key: value}, ensure_ascii=False, default=str).encode("utf-8")[1:-1]
+        for key, value in view.items()
+        if key != "history"
+    )
+    yield b"]" + tail + b"}"
@@ -17,6 +17,7 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.services.mcp_session_pool import MCP_CONNECT_TIMEOUT, mcp_session_pool
 from src.storage.postgres.models_business import MCPServer
 from src.utils import logger
 
@@ -33,6 +34,10 @@ _mcp_tools_cache: dict[str, list[Callable[..., Any]]] = {}
 # MCP tools statistics (for reporting enabled/disabled counts)
 _mcp_tools_stats: dict[str, dict[str, int]] = {}
 
+# MCP servers/tools version, bumped whenever the server configs or the tools cache change.
+# Agents use it as part of the compiled graph cache fingerprint.
+_mcp_tools_version = 0
+
 # MCP Server configurations (Runtime cache, loaded from DB)
 MCP_SERVERS: dict[str, dict[str, Any]] = {}
 
@@ -76,6 +81,8 @@ async def load_mcp_servers_from_db() -> None:
                 MCP_SERVERS.clear()
                 for server in servers:
                     MCP_SERVERS[server.name] = server.to_mcp_config()
+                _bump_mcp_tools_version()
+                _sync_session_pool()
 
             logger.info(f"Loaded {len(MCP_SERVERS)} MCP servers from database: {list(MCP_SERVERS.keys())}")
     except Exception as e:
@@ -94,6 +101,7 @@ async def sync_mcp_server_to_cache(name: str, config: dict[str, Any] | None) ->
     async with _mcp_lock:
         if config is None:
             MCP_SERVERS.pop(name, None)
+            mcp_session_pool.discard(name)
             logger.info(f"Removed MCP server '{name}' from cache")
         else:
             MCP_SERVERS[name] = config
@@ -101,6 +109,18 @@ async def sync_mcp_server_to_cache(name: str, config: dict[str, Any] | None) ->
 
         # Clear tools cache for this server
         _mcp_tools_cache.pop(name, None)
+        _bump_mcp_tools_version()
+        if config is not None:
+            # (Re)connect in the background so that chats don't wait for discovery
+            mcp_session_pool.ensure(name, config, _on_session_tools_loaded)
+
+
+def _sync_session_pool() -> None:
+    """Keep one persistent session per configured server, started in the background."""
+    for name in set(mcp_session_pool.get_server_names()) - set(MCP_SERVERS):
+        mcp_session_pool.discard(name)
+    for name, config in MCP_SERVERS.items():
+        mcp_session_pool.ensure(name, config, _on_session_tools_loaded)
 
 
 async def init_mcp_servers() -> None:
@@ -173,6 +193,11 @@ async def init_mcp_servers() -> None:
         # Load configurations from database to cache
         await load_mcp_servers_from_db()
 
+        # Prefetch tools so that the first chat requests don't wait for discovery.
+        # Slow servers keep connecting in the background after the timeout.
+        await mcp_session_pool.prefetch()
+        logger.info(f"MCP sessions after startup prefetch: {mcp_session_pool.get_stats()}")
+
     except Exception as e:
         logger.error(f"Failed to initialize MCP servers: {e}, traceback: {traceback.format_exc()}")
 
@@ -201,6 +226,51 @@ def to_camel_case(s: str) -> str:
     return s
 
 
+def _process_mcp_tools(server_name: str, tools: list[Any]) -> list[Any]:
+    """Render unique IDs for tools: mcp__[camelCaseServer]__[camelCaseTool]."""
+    server_cc = to_camel_case(server_name)
+    for tool in tools:
+        unique_id = f"mcp__{server_cc}__{to_camel_case(tool.name)}"
+
+        # Use metadata to store
+        if tool.metadata is None:
+            tool.metadata = {}
+        tool.metadata["id"] = unique_id
+    return list(tools)
+
+
+def _on_session_tools_loaded(server_name: str, tools: list[Any]) -> None:
+    """Store the FULL, UNFILTERED tool list discovered by the server's persistent session."""
+    all_processed_tools = _process_mcp_tools(server_name, tools)
+    _mcp_tools_cache[server_name] = all_processed_tools
+
+    # Stats should reflect the GLOBAL configuration state
+    # (How many are disabled in the stored config, not the transient arg)
+    global_config_disabled = MCP_SERVERS.get(server_name, {}).get("disabled_tools") or []
+    enabled_count = len([t for t in all_processed_tools if t.name not in global_config_disabled])
+    _mcp_tools_stats[server_name] = {
+        "total": len(all_processed_tools),
+        "enabled": enabled_count,
+        "disabled": len(all_processed_tools) - enabled_count,
+    }
+    _bump_mcp_tools_version()
+
+    logger.info(f"Refreshed MCP tools cache for '{server_name}': {len(all_processed_tools)} tools loaded.")
+
+
+async def _discover_mcp_tools(server_name: str, server_config: dict[str, Any]) -> list[Any]:
+    """One-off discovery with a temporary client (tools open a new session per call)."""
+    client_config = {k: v for k, v in server_config.items() if k not in ("disabled_tools",)}
+    client = await get_mcp_client({server_name: client_config})
+    if client is None:
+        return []
+
+    timeout = server_config.get("timeout") or MCP_CONNECT_TIMEOUT
+    async with asyncio.timeout(timeout):
+        raw_tools = cast(list[Any], await client.get_tools())
+    return _process_mcp_tools(server_name, raw_tools)
+
+
 async def get_mcp_tools(
     server_name: str,
     additional_servers: dict[str, dict] = None,
@@ -211,86 +281,45 @@ async def get_mcp_tools(
     """Get MCP tools for a specific server.
 
     Architecture:
-    1. Fetching: Connects to MCP server to get ALL tools.
+    1. Fetching: Each server keeps a persistent session in `mcp_session_pool`, which lists ALL tools
+       on connect and refreshes them in the background (TTL / tools list_changed notification).
     2. Caching: Stores the FULL, UNFILTERED list of tools in `_mcp_tools_cache`.
     3. Filtering: Filters the return value based on `disabled_tools` argument.
 
+    Never blocks on discovery unless `force_refresh` is set: while a server is still connecting
+    or unavailable, returns the last discovered tools (empty before the first successful discovery).
+
     Args:
         server_name: Server name
         additional_servers: Additional server configurations
         disabled_tools: List of tool names to filter out from the RETURN value (does not affect cache)
-        cache: Whether to use/update the cache (default: True)
-        force_refresh: Whether to force a refresh from the server (default: False)
+        cache: Whether to use the persistent session and cache (default: True).
+            If False, discovers once with a temporary client.
+        force_refresh: Whether to re-list tools from the server now (default: False)
     """
-    global _mcp_tools_cache
-
     # 1. Prepare Server Config
     async with _mcp_lock:
         mcp_servers = MCP_SERVERS | (additional_servers or {})
 
-    all_processed_tools = []
+    if server_name not in mcp_servers:
+        logger.warning(f"Failed to load tools from MCP server '{server_name}': not found in ({list(mcp_servers)})")
+        return []
 
-    # 2. Check Cache / Fetch Strategy
-    # If we have it in cache and don't need to force refresh, use cache.
-    if not force_refresh and cache and server_name in _mcp_tools_cache:
-        all_processed_tools = _mcp_tools_cache[server_name]
-    else:
-        # Need to fetch from server
-        try:
-            assert server_name in mcp_servers, f"Server {server_name} not found in ({list(mcp_servers.keys())})"
-
-            # Extract connection config
-            server_config = mcp_servers[server_name]
-            client_config = {k: v for k, v in server_config.items() if k not in ("disabled_tools",)}
-
-            client = await get_mcp_client({server_name: client_config})
-            if client is None:
-                return []
-
-            # Get ALL tools (Raw)
-            raw_tools = cast(list[Any], await client.get_tools())
-
-            # Render IDs for ALL tools
-            server_cc = to_camel_case(server_name)
-            for tool in raw_tools:
-                # Render unique ID rule: mcp__[camelCaseServer]__[camelCaseTool]
-                original_name = tool.name
-                tool_cc = to_camel_case(original_name)
-                unique_id = f"mcp__{server_cc}__{tool_cc}"
-
-                # Use metadata to store
-                if tool.metadata is None:
-                    tool.metadata = {}
-                tool.metadata["id"] = unique_id
-
-                all_processed_tools.append(tool)
-
-            # Update Cache (Store the FULL list)
-            if cache:
-                _mcp_tools_cache[server_name] = all_processed_tools
-
-                # Update Stats
-                # Stats should reflect the GLOBAL configuration state
-                # (How many are disabled in the stored config, not the transient arg)
-                global_config_disabled = mcp_servers.get(server_name, {}).get("disabled_tools") or []
-                enabled_count = len([t for t in all_processed_tools if t.name not in global_config_disabled])
-
-                _mcp_tools_stats[server_name] = {
-                    "total": len(all_processed_tools),
-                    "enabled": enabled_count,
-                    "disabled": len(all_processed_tools) - enabled_count,
-                }
-
-                logger.info(f"Refreshed MCP tools cache for '{server_name}': {len(all_processed_tools)} tools loaded.")
-
-        except AssertionError as e:
-            logger.warning(f"[assert] Failed to load tools from MCP server '{server_name}': {e}")
-            return []
-        except Exception as e:
-            logger.error(
-                f"Failed to load tools from MCP server '{server_name}': {e}, traceback: {traceback.format_exc()}"
-            )
-            return []
+    # 2. Cache / Fetch Strategy
+    try:
+        if cache:
+            connection = mcp_session_pool.ensure(server_name, mcp_servers[server_name], _on_session_tools_loaded)
+            if force_refresh:
+                await connection.refresh()
+            if server_name not in _mcp_tools_cache and connection.tools is not None:
+                # Cache was cleared (e.g. tool toggled), re-populate from the session without I/O
+                _on_session_tools_loaded(server_name, connection.tools)
+            all_processed_tools = _mcp_tools_cache.get(server_name, [])
+        else:
+            all_processed_tools = await _discover_mcp_tools(server_name, mcp_servers[server_name])
+    except Exception as e:
+        logger.error(f"Failed to load tools from MCP server '{server_name}': {e}, traceback: {traceback.format_exc()}")
+        return _mcp_tools_cache.get(server_name, []) if cache else []
 
     # 3. Filtering (Apply to Return Value Only)
     if disabled_tools:
@@ -325,6 +354,7 @@ def clear_mcp_cache() -> None:
     global _mcp_tools_cache, _mcp_tools_stats
     _mcp_tools_cache = {}
     _mcp_tools_stats = {}
+    _bump_mcp_tools_version()
 
 
 def clear_mcp_server_tools_cache(server_name: str) -> None:
@@ -332,9 +362,30 @@ def clear_mcp_server_tools_cache(server_name: str) -> None:
     global _mcp_tools_cache, _mcp_tools_stats
     _mcp_tools_cache.pop(server_name, None)
     _mcp_tools_stats.pop(server_name, None)
+    _bump_mcp_tools_version()
     logger.info(f"Cleared tools cache for MCP server '{server_name}'")
 
 
+def _bump_mcp_tools_version() -> None:
+    global _mcp_tools_version
+    _mcp_tools_version += 1
+
+
+def get_mcp_tools_version() -> int:
+    """Get the current MCP servers/tools version (changes whenever configs or cached tools change)."""
+    return _mcp_tools_version
+
+
+async def shutdown_mcp_sessions() -> None:
+    """Close all persistent MCP sessions (stops stdio server processes)."""
+    await mcp_session_pool.shutdown()
+
+
+def get_mcp_session_stats() -> dict[str, dict[str, Any]]:
+    """Get persistent session status for each MCP server (status, tools, reconnects, last error)."""
+    return mcp_session_pool.get_stats()
+
+
 def get_mcp_tools_stats(server_name: str) -> dict[str, int] | None:
     """Get tools statistics for a MCP server.
 
@@ -598,7 +649,8 @@ async def get_all_mcp_tools(server_name: str) -> list:
     """Get all tools of an MCP server (no filtering).
 
     For management UI to display tool list, supports viewing all tools and their enabled status.
-    Does NOT update the global tools cache to avoid polluting agent's filtered view.
+    Re-lists tools through the server's persistent session, so the shared (unfiltered) cache
+    is refreshed as well.
 
     Args:
         server_name: Server name
@@ -611,5 +663,26 @@ async def get_all_mcp_tools(server_name: str) -> list:
         logger.warning(f"MCP server '{server_name}' not found in cache")
         return []
 
-    # Get all tools (no filtering, force refresh, no cache update)
-    return await get_mcp_tools(server_name, disabled_tools=[], cache=False, force_refresh=True)
+    # Get all tools (no filtering, force refresh)
+    return await get_mcp_tools(server_name, disabled_tools=[], force_refresh=True)
+
+
+async def check_mcp_server(server_name: str) -> list:
+    """Check that an MCP server is reachable by re-listing its tools now.
+
+    Unlike `get_all_mcp_tools`, never falls back to previously discovered tools: raises
+    if the server is unavailable or listing tools fails, so a dead server is not reported
+    as healthy because of its cached tools.
+
+    Args:
+        server_name: Server name
+
+    Returns:
+        List of all tools (unfiltered)
+    """
+    config = MCP_SERVERS.get(server_name)
+    if not config:
+        raise ValueError(f"MCP server '{server_name}' not found")
+
+    connection = mcp_session_pool.ensure(server_name, config, _on_session_tools_loaded)
+    return await connection.refresh(strict=True)
@@ -0,0 +1,284 @@
+"""
+MCP 服务器长连接池
+
+原先每次发现工具都会新建 MCP 客户端（stdio 服务器重新启动进程，SSE/HTTP 服务器重新建立连接），
+每次工具调用也会再建立一次会话，响应慢的服务器会让对话的首次模型调用多等待数秒。这里为每个服务器
+维持一个后台任务：
+- 持有一个长期会话，工具列表和工具调用都复用该会话；
+- 每隔 YUXI_MCP_HEALTH_CHECK_INTERVAL 秒 ping 一次，失败或连接断开时按指数退避重连；
+- 每隔 YUXI_MCP_TOOLS_REFRESH_INTERVAL 秒，或收到服务器的 tools/list_changed 通知时，在后台刷新工具列表；
+- 连接与每次请求受超时限制（服务器配置的 timeout，未配置时为 YUXI_MCP_CONNECT_TIMEOUT），
+  服务器不可用时对话直接使用上次成功获取的工具（首次连接失败则为空），不会阻塞请求。
+
+工具通过会话代理调用，重连后已构建的工具（包括已编译图中注册的工具）自动使用新会话。
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections.abc import Callable
+from contextlib import AsyncExitStack
+from typing import Any
+
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
+from mcp import types
+
+from src.utils import logger
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+# 连接、列出工具、ping 的默认超时（秒），服务器配置了 timeout 时以服务器配置为准
+MCP_CONNECT_TIMEOUT = _env_int("YUXI_MCP_CONNECT_TIMEOUT", 20)
+# 健康检查间隔（秒）
+MCP_HEALTH_CHECK_INTERVAL = _env_int("YUXI_MCP_HEALTH_CHECK_INTERVAL", 30)
+# 工具列表刷新间隔（秒）
+MCP_TOOLS_REFRESH_INTERVAL = _env_int("YUXI_MCP_TOOLS_REFRESH_INTERVAL", 600)
+# 重连退避的最大间隔（秒）
+MCP_RECONNECT_MAX_DELAY = 60
+
+
+class MCPServerUnavailableError(RuntimeError):
+    """MCP 服务器当前没有可用的会话"""
+
+
+class _SessionProxy:
+    """把调用转发到服务器当前的会话，工具对象不随重连失效"""
+
+    def __init__(self, connection: "MCPServerConnection"):
+        self._connection = connection
+
+    def __getattr__(self, name: str) -> Any:
+        session = self._connection.session
+        if session is None:
+            raise MCPServerUnavailableError(f"MCP 服务器 '{self._connection.name}' 暂不可用")
+        return getattr(session, name)
+
+
+def _tools_signature(tools: list) -> tuple:
+    """工具名称、描述和参数 schema，用于判断工具列表是否变化"""
+    return tuple(
+        (tool.name, tool.description, json.dumps(tool.args_schema, sort_keys=True, default=str)) for tool in tools
+    )
+
+
+class MCPServerConnection:
+    """一个 MCP 服务器的长连接"""
+
+    def __init__(self, name: str, config: dict[str, Any], on_tools_loaded: Callable[[str, list], None]):
+        self.name = name
+        self.config = config
+        self.session = None
+        # 最近一次成功获取的工具列表，None 表示还没有成功获取过
+        self.tools: list | None = None
+        self.last_error: str | None = None
+        self.connected_at: float | None = None
+        self.tools_loaded_at: float | None = None
+        self.reconnects = 0
+        self._on_tools_loaded = on_tools_loaded
+        self._tools_signature: tuple | None = None
+        self._backoff = 1.0
+        # 首次连接尝试结束（无论成功与否），用于启动预取时等待
+        self._attempted = asyncio.Event()
+        self._refresh_requested = asyncio.Event()
+        self._load_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def timeout(self) -> float:
+        return float(self.config.get("timeout") or MCP_CONNECT_TIMEOUT)
+
+    @property
+    def status(self) -> str:
+        if self._task is None or self._task.done():
+            return "closed"
+        if self.session is not None:
+            return "ready"
+        return "connecting" if not self._attempted.is_set() else "unavailable"
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=f"mcp-session-{self.name}")
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def wait_attempted(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._attempted.wait(), timeout=timeout)
+        except TimeoutError:
+            pass
+
+    async def refresh(self, strict: bool = False) -> list | None:
+        """
+        立即重新获取工具列表；服务器不可用时等待首次连接尝试后返回已有的工具
+
+        strict 为 True 时（如连接测试）不回退到已有的工具，服务器不可用时抛出 MCPServerUnavailableError
+        """
+        if self.session is None:
+            await self.wait_attempted(self.timeout)
+        if self.session is None:
+            if strict:
+                reason = self.last_error or "连接超时"
+                raise MCPServerUnavailableError(f"MCP 服务器 '{self.name}' 不可用: {reason}")
+            return self.tools
+        async with asyncio.timeout(self.timeout):
+            return await self._load_tools()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._serve()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning(
+                    f"MCP server '{self.name}' unavailable: {self.last_error}, reconnecting in {self._backoff:.0f}s"
+                )
+            finally:
+                self.session = None
+                self._attempted.set()
+
+            await asyncio.sleep(self._backoff)
+            self._backoff = min(self._backoff * 2, MCP_RECONNECT_MAX_DELAY)
+            self.reconnects += 1
+
+    async def _serve(self) -> None:
+        """建立会话并保持，直到健康检查失败或连接断开"""
+        connection = dict(self.config)
+        connection["session_kwargs"] = {
+            **(connection.get("session_kwargs") or {}),
+            "message_handler": self._handle_message,
+        }
+        client = MultiServerMCPClient({self.name: connection})
+
+        # 会话在当前任务中进入和退出（anyio 的 cancel scope 不能跨任务）
+        async with AsyncExitStack() as stack:
+            async with asyncio.timeout(self.timeout):
+                self.session = await stack.enter_async_context(client.session(self.name))
+                await self._load_tools()
+
+            self.connected_at = time.time()
+            self.last_error = None
+            self._backoff = 1.0
+            self._attempted.set()
+            logger.info(f"MCP server '{self.name}' connected, {len(self.tools or [])} tools")
+
+            while True:
+                try:
+                    await asyncio.wait_for(self._refresh_requested.wait(), timeout=MCP_HEALTH_CHECK_INTERVAL)
+                except TimeoutError:
+                    pass
+
+                async with asyncio.timeout(self.timeout):
+                    tools_expired = time.time() - (self.tools_loaded_at or 0) >= MCP_TOOLS_REFRESH_INTERVAL
+                    if self._refresh_requested.is_set() or tools_expired:
+                        # 列出工具本身也能确认连接可用
+                        await self._load_tools()
+                    else:
+                        await self.session.send_ping()
+
+    async def _load_tools(self) -> list:
+        async with self._load_lock:
+            self._refresh_requested.clear()
+            tools = await load_mcp_tools(_SessionProxy(self))
+            self.tools_loaded_at = time.time()
+
+            signature = _tools_signature(tools)
+            if signature != self._tools_signature:
+                # 工具未变化时保留原有对象，避免已编译的图重新构建
+                self._tools_signature = signature
+                self.tools = tools
+                self._on_tools_loaded(self.name, tools)
+            return self.tools
+
+    async def _handle_message(self, message: Any) -> None:
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            logger.info(f"MCP server '{self.name}' tools changed, refreshing")
+            self._refresh_requested.set()
+
+    def get_stats(self) -> dict:
+        return {
+            "status": self.status,
+            "tools": len(self.tools) if self.tools is not None else None,
+            "connected_at": self.connected_at,
+            "tools_loaded_at": self.tools_loaded_at,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+class MCPSessionPool:
+    """当前进程内各 MCP 服务器的长连接"""
+
+    def __init__(self):
+        self._connections: dict[str, MCPServerConnection] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    def get(self, name: str) -> MCPServerConnection | None:
+        return self._connections.get(name)
+
+    def get_server_names(self) -> list[str]:
+        return list(self._connections)
+
+    def ensure(
+        self, name: str, config: dict[str, Any], on_tools_loaded: Callable[[str, list], None]
+    ) -> MCPServerConnection:
+        """返回服务器的连接，不存在或连接配置变化时（重新）建立，不等待连接完成"""
+        # disabled_tools 只影响返回给智能体的工具，不需要重新连接
+        config = {k: v for k, v in config.items() if k != "disabled_tools"}
+        connection = self._connections.get(name)
+        if connection is not None and connection.config == config and connection.status != "closed":
+            return connection
+        if connection is not None:
+            self._close_in_background(connection)
+
+        def publish(server_name: str, tools: list) -> None:
+            # 已被替换或移除的连接不再更新工具缓存
+            if self._connections.get(server_name) is connection:
+                on_tools_loaded(server_name, tools)
+
+        connection = MCPServerConnection(name, config, publish)
+        self._connections[name] = connection
+        connection.start()
+        return connection
+
+    def discard(self, name: str) -> None:
+        connection = self._connections.pop(name, None)
+        if connection is not None:
+            self._close_in_background(connection)
+
+    async def prefetch(self, timeout: float | None = None) -> None:
+        """等待所有服务器完成首次连接尝试，最多等待 timeout 秒"""
+        connections = list(self._connections.values())
+        if not connections:
+            return
+        timeout = timeout if timeout is not None else max(c.timeout for c in connections)
+        await asyncio.gather(*(c.wait_attempted(timeout) for c in connections))
+
+    async def shutdown(self) -> None:
+        connections = list(self._connections.values())
+        self._connections.clear()
+        await asyncio.gather(*(c.close() for c in connections), *self._closing, return_exceptions=True)
+
+    def _close_in_background(self, connection: MCPServerConnection) -> None:
+        task = asyncio.create_task(connection.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def get_stats(self) -> dict:
+        return {name: connection.get_stats() for name, connection in self._connections.items()}
+
+
+mcp_session_pool = MCPSessionPool()
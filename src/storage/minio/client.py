@@ -49,6 +49,8 @@ class MinIOClient:
         self.access_key = os.getenv("MINIO_ACCESS_KEY") or "minioadmin"
         self.secret_key = os.getenv("MINIO_SECRET_KEY") or "minioadmin"
         self._client = None
+        # 已确认存在（且已配置访问策略）的存储桶，避免每次上传都重复检查
+        self._ready_buckets: set[str] = set()
 
         # 设置公开访问端点
         if os.getenv("RUNNING_IN_DOCKER"):
@@ -79,6 +81,9 @@ class MinIOClient:
 
     def ensure_bucket_exists(self, bucket_name: str) -> bool:
         """确保存储桶存在"""
+        if bucket_name in self._ready_buckets:
+            return True
+
         try:
             created = False
             if not self.client.bucket_exists(bucket_name=bucket_name):
@@ -91,12 +96,14 @@ class MinIOClient:
             if created and bucket_name in self.PUBLIC_READ_BUCKETS:
                 logger.info(f"存储桶 '{bucket_name}' 已配置为公开可读")
 
+            self._ready_buckets.add(bucket_name)
             return True
         except S3Error as e:
             error_code = getattr(e, "code", "")
             if error_code in {"BucketAlreadyOwnedByYou", "BucketAlreadyExists"}:
                 logger.info(f"存储桶 '{bucket_name}' 已存在（并发创建），继续使用")
                 self._ensure_public_read_access(bucket_name)
+                self._ready_buckets.add(bucket_name)
                 return True
             logger.error(f"存储桶 '{bucket_name}' 错误: {e}")
             raise StorageError(f"Error with bucket '{bucket_name}': {e}")
@@ -125,6 +132,8 @@ class MinIOClient:
             return UploadResult(url, bucket_name, object_name)
 
         except S3Error as e:
+            # 存储桶可能已被外部删除，下次上传时重新检查
+            self._ready_buckets.discard(bucket_name)
             error_msg = f"上传文件 '{object_name}' 失败: {e}"
             logger.error(error_msg)
             raise StorageError(error_msg)
@@ -184,13 +193,14 @@ class MinIOClient:
                 raise StorageError(f"对象 '{object_name}' 在存储桶 '{bucket_name}' 中不存在")
             raise StorageError(f"下载文件失败: {e}")
 
-    async def adownload_response(self, bucket_name: str, object_name: str) -> BaseHTTPResponse:
-        """异步下载文件"""
+    async def adownload_response(self, bucket_name: str, object_name: str, offset: int = 0) -> BaseHTTPResponse:
+        """异步下载文件，返回流式响应（调用方负责 close / release_conn），offset 为起始字节"""
         try:
             response = await asyncio.to_thread(
                 self.client.get_object,
                 bucket_name=bucket_name,
                 object_name=object_name,
+                offset=offset,
             )
             return response
 
@@ -242,6 +252,34 @@ class MinIOClient:
         )
         return result
 
+    def delete_prefix(self, bucket_name: str, prefix: str = "") -> int:
+        """删除存储桶中指定前缀下的所有对象，返回删除数量"""
+        from minio.deleteobjects import DeleteObject
+
+        try:
+            objects = [
+                DeleteObject(obj.object_name)
+                for obj in self.client.list_objects(bucket_name=bucket_name, prefix=prefix, recursive=True)
+            ]
+            if not objects:
+                return 0
+
+            errors = list(self.client.remove_objects(bucket_name=bucket_name, delete_object_list=objects))
+            for error in errors:
+                logger.warning(f"删除对象失败 '{error.name}': {error.message}")
+            deleted = len(objects) - len(errors)
+            logger.info(f"成功删除存储桶 '{bucket_name}' 中前缀 '{prefix}' 下的 {deleted} 个对象")
+            return deleted
+
+        except S3Error as e:
+            if "NoSuchBucket" in str(e):
+                return 0
+            raise StorageError(f"批量删除文件失败: {e}")
+
+    async def adelete_prefix(self, bucket_name: str, prefix: str = "") -> int:
+        """删除存储桶中指定前缀下的所有对象"""
+        return await asyncio.to_thread(self.delete_prefix, bucket_name=bucket_name, prefix=prefix)
+
     def file_exists(self, bucket_name: str, object_name: str) -> bool:
         """检查文件是否存在"""
         try:
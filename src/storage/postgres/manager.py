@@ -178,6 +178,13 @@ class PostgresManager(metaclass=SingletonMeta):
             "CREATE INDEX IF NOT EXISTS idx_er_status ON evaluation_results(status)",
             "CREATE INDEX IF NOT EXISTS idx_er_started ON evaluation_results(started_at DESC)",
             "CREATE INDEX IF NOT EXISTS idx_erd_task ON evaluation_result_details(task_id)",
+            # 按 LangGraph 消息 id 判断消息是否已保存（对话每轮结束时批量写入前检查）
+            "CREATE INDEX IF NOT EXISTS idx_messages_conv_lc_id ON messages(conversation_id, (extra_metadata->>'id'))",
+            # 历史消息按 (created_at, id) 键集分页（加载更早的消息）
+            "CREATE INDEX IF NOT EXISTS idx_messages_conv_created ON messages(conversation_id, created_at, id)",
+            # 仪表板汇总任务按创建时间增量扫描消息与工具调用
+            "CREATE INDEX IF NOT EXISTS idx_messages_created ON messages(created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_tool_calls_created_at ON tool_calls(created_at)",
             """
             CREATE TABLE IF NOT EXISTS kb_agent_bindings (
                 id SERIAL PRIMARY KEY,
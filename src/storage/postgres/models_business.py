@@ -4,6 +4,7 @@ from typing import Any
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -11,6 +12,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
@@ -267,6 +269,12 @@ class Message(Base):
     tool_calls = relationship("ToolCall", back_populates="message", cascade="all, delete-orphan")
     feedbacks = relationship("MessageFeedback", back_populates="message", cascade="all, delete-orphan")
 
+    # 历史消息按 (created_at, id) 键集分页；仪表板汇总任务按 created_at 增量扫描
+    __table_args__ = (
+        Index("idx_messages_conv_created", "conversation_id", "created_at", "id"),
+        Index("idx_messages_created", "created_at"),
+    )
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "id": self.id,
@@ -301,7 +309,7 @@ class ToolCall(Base):
     tool_output = Column(Text, nullable=True, comment="Tool execution result")
     status = Column(String(20), default="pending", comment="Status: pending/success/error")
     error_message = Column(Text, nullable=True, comment="Error message if failed")
-    created_at = Column(DateTime, default=utc_now_naive, comment="Creation time")
+    created_at = Column(DateTime, default=utc_now_naive, index=True, comment="Creation time")
 
     # Relationships
     message = relationship("Message", back_populates="tool_calls")
@@ -352,6 +360,73 @@ class ConversationStats(Base):
         }
 
 
+class DashboardRollup(Base):
+    """DashboardRollup table - 仪表板按小时汇总的调用统计（后台任务增量维护）"""
+
+    __tablename__ = "dashboard_rollups"
+
+    metric = Column(
+        String(32),
+        primary_key=True,
+        comment="Metric: model_calls/agent_calls/tool_calls/tool_success/tool_errors/input_tokens/output_tokens",
+    )
+    dimension = Column(String(255), primary_key=True, comment="Model name / agent ID / tool name, empty if none")
+    bucket_start = Column(DateTime, primary_key=True, comment="Hour bucket start (UTC)")
+    value = Column(BigInteger, nullable=False, default=0, comment="Aggregated value")
+
+    __table_args__ = (Index("idx_dashboard_rollups_bucket", "bucket_start"),)
+
+
+class DashboardActiveUser(Base):
+    """DashboardActiveUser table - 每小时有对话活动的用户（用于去重统计活跃用户）"""
+
+    __tablename__ = "dashboard_active_users"
+
+    bucket_start = Column(DateTime, primary_key=True, comment="Hour bucket start (UTC)")
+    user_pk = Column(Integer, primary_key=True, comment="users.id")
+
+
+class DashboardRollupState(Base):
+    """DashboardRollupState table - 汇总任务进度"""
+
+    __tablename__ = "dashboard_rollup_state"
+
+    name = Column(String(32), primary_key=True, comment="Rollup name")
+    watermark = Column(DateTime, nullable=False, comment="Source rows before this time have been aggregated")
+    updated_at = Column(DateTime, default=utc_now_naive, onupdate=utc_now_naive, comment="Update time")
+
+
+class AgentCheckpoint(Base):
+    """AgentCheckpoint table - LangGraph 智能体状态检查点（各 worker 共享）"""
+
+    __tablename__ = "agent_checkpoints"
+
+    thread_id = Column(String(128), primary_key=True, comment="Thread ID")
+    checkpoint_ns = Column(String(255), primary_key=True, default="", comment="Checkpoint namespace (subgraph)")
+    checkpoint_id = Column(String(64), primary_key=True, comment="Checkpoint ID (monotonically increasing)")
+    parent_checkpoint_id = Column(String(64), nullable=True, comment="Parent checkpoint ID")
+    type = Column(String(32), nullable=True, comment="Serializer type")
+    checkpoint = Column(LargeBinary, nullable=False, comment="Serialized checkpoint")
+    checkpoint_metadata = Column("metadata", JSON, nullable=True, comment="Checkpoint metadata")
+    created_at = Column(DateTime, default=utc_now_naive, comment="Creation time")
+
+
+class AgentCheckpointWrite(Base):
+    """AgentCheckpointWrite table - 检查点上尚未合并的中间写入（pending writes）"""
+
+    __tablename__ = "agent_checkpoint_writes"
+
+    thread_id = Column(String(128), primary_key=True, comment="Thread ID")
+    checkpoint_ns = Column(String(255), primary_key=True, default="", comment="Checkpoint namespace (subgraph)")
+    checkpoint_id = Column(String(64), primary_key=True, comment="Checkpoint ID")
+    task_id = Column(String(64), primary_key=True, comment="Task ID")
+    idx = Column(Integer, primary_key=True, comment="Write index within the task")
+    channel = Column(String(255), nullable=False, comment="Channel name")
+    type = Column(String(32), nullable=True, comment="Serializer type")
+    value = Column(LargeBinary, nullable=True, comment="Serialized value")
+    task_path = Column(String(255), nullable=False, default="", comment="Task path")
+
+
 class OperationLog(Base):
     """操作日志模型"""
 
@@ -0,0 +1,103 @@
+"""
+Docling 转换工作进程入口
+
+DoclingExecutionService 以 spawn 方式启动的工作进程只导入本模块：本模块不依赖 src.knowledge，
+配合 YUXI_SKIP_APP_INIT=1，工作进程不会创建知识库管理器、图数据库连接等应用级对象。
+"""
+
+import base64
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+# 每个工作进程（或线程模式下的当前进程）持有一个预热好的转换器
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def _build_converter():
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.DOCX: None,
+            InputFormat.XLSX: None,
+            InputFormat.PPTX: None,
+        }
+    )
+
+
+def get_converter():
+    """获取当前进程内的 Docling 转换器单例"""
+    global _converter
+    if _converter is None:
+        with _converter_lock:
+            if _converter is None:
+                _converter = _build_converter()
+    return _converter
+
+
+def init_worker() -> None:
+    """工作进程初始化：提前构建转换器，首个文档无需承担冷启动开销"""
+    get_converter()
+
+
+def warmup_worker() -> int:
+    get_converter()
+    return os.getpid()
+
+
+def _parse_data_uri(data_uri: str) -> tuple[bytes, str]:
+    """解析 data URI，返回 (image_data, mime_type)"""
+    header, base64_data = data_uri.split(",", 1)
+    mime_type = header.split(":")[1].split(";")[0]
+    image_data = base64.b64decode(base64_data)
+    return image_data, mime_type
+
+
+def convert_document(file_path: str) -> dict[str, Any]:
+    """
+    执行 Docling 转换（运行在工作进程或线程中）
+
+    Returns:
+        dict: {
+            "markdown": str,                          # 含 <!-- image --> 占位符的 Markdown
+            "images": list[tuple[str, bytes] | None], # 与文档图片一一对应，无内嵌数据时为 None
+            "convert_seconds": float,
+            "export_seconds": float,
+        }
+    """
+    converter = get_converter()
+
+    start = time.perf_counter()
+    result = converter.convert(Path(file_path))
+    convert_seconds = time.perf_counter() - start
+
+    if result.status.name != "SUCCESS":
+        raise RuntimeError(f"Docling 转换失败: {result.status}")
+
+    doc = result.document
+
+    images: list[tuple[str, bytes] | None] = []
+    for idx, pic in enumerate(getattr(doc, "pictures", None) or []):
+        uri = str(pic.image.uri) if getattr(pic, "image", None) is not None and hasattr(pic.image, "uri") else ""
+        if not uri.startswith("data:"):
+            images.append(None)
+            continue
+        image_data, mime_type = _parse_data_uri(uri)
+        timestamp = int(time.time() * 1000000)  # 微秒级时间戳
+        images.append((f"image_{timestamp}_{idx}.{mime_type.split('/')[-1]}", image_data))
+
+    start = time.perf_counter()
+    markdown = doc.export_to_markdown()
+    export_seconds = time.perf_counter() - start
+
+    return {
+        "markdown": markdown,
+        "images": images,
+        "convert_seconds": convert_seconds,
+        "export_seconds": export_seconds,
+    }
@@ -0,0 +1,27 @@
+"""
+Integration tests for the graph triple import endpoint.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.integration]
+
+
+async def test_resume_rejects_task_of_another_file(test_client, admin_headers):
+    """Resuming must not reuse the byte offset recorded for a different file or graph."""
+    response = await test_client.post(
+        "/api/graph/neo4j/add-entities",
+        json={"file_path": "http://127.0.0.1:1/missing/a.jsonl"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
+    task_id = response.json()["task_id"]
+
+    for body in (
+        {"file_path": "http://127.0.0.1:1/missing/b.jsonl", "resume_task_id": task_id},
+        {"file_path": "http://127.0.0.1:1/missing/a.jsonl", "kgdb_name": "other", "resume_task_id": task_id},
+    ):
+        response = await test_client.post("/api/graph/neo4j/add-entities", json=body, headers=admin_headers)
+        assert response.status_code == 400, response.text
@@ -0,0 +1,61 @@
+import time
+
+from server.utils.auth_cache import AuthPrincipalCache
+
+
+def test_cached_principal_returns_copy() -> None:
+    cache = AuthPrincipalCache(ttl_seconds=30)
+    assert cache.set("token-a", 1, {"id": 1, "role": "user"})
+
+    values = cache.get("token-a")
+    assert values == {"id": 1, "role": "user"}
+    # 返回副本，调用方修改不影响缓存
+    values["role"] = "admin"
+    assert cache.get("token-a") == {"id": 1, "role": "user"}
+    assert cache.get("token-b") is None
+
+
+def test_entry_never_outlives_token() -> None:
+    cache = AuthPrincipalCache(ttl_seconds=30)
+    cache.set("expired", 1, {"id": 1}, token_expires_at=time.time() - 1)
+    assert cache.get("expired") is None
+
+    # ttl 为 0 表示不缓存
+    disabled = AuthPrincipalCache(ttl_seconds=0)
+    assert not disabled.set("token", 1, {"id": 1})
+    assert disabled.get("token") is None
+
+
+def test_invalidate_user_drops_all_tokens() -> None:
+    cache = AuthPrincipalCache(ttl_seconds=30)
+    cache.set("web", 1, {"id": 1})
+    cache.set("mobile", 1, {"id": 1})
+    cache.set("other", 2, {"id": 2})
+
+    cache.invalidate_user(1)
+
+    assert cache.get("web") is None
+    assert cache.get("mobile") is None
+    assert cache.get("other") == {"id": 2}
+
+
+def test_stale_load_is_not_cached_after_invalidation() -> None:
+    cache = AuthPrincipalCache(ttl_seconds=30)
+    # 查询数据库前记录版本，查询期间用户被修改
+    version = cache.version
+    cache.invalidate_user(1)
+
+    assert not cache.set("token", 1, {"id": 1, "role": "admin"}, version=version)
+    assert cache.get("token") is None
+
+
+def test_lru_eviction_keeps_user_index_consistent() -> None:
+    cache = AuthPrincipalCache(ttl_seconds=30, max_size=2)
+    cache.set("a", 1, {"id": 1})
+    cache.set("b", 2, {"id": 2})
+    cache.get("a")
+    cache.set("c", 3, {"id": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": 1}
+    assert cache.get_stats()["users"] == 2
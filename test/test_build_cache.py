@@ -0,0 +1,51 @@
+import asyncio
+
+from src.agents.common.build_cache import BuildCache
+
+
+def test_fingerprint_change_rebuilds_and_hits_record_saved_time() -> None:
+    cache = BuildCache("test")
+    builds = []
+
+    def build():
+        builds.append(1)
+        return ["tool"]
+
+    assert cache.get_or_build("kb", ("a",), build) == ["tool"]
+    assert cache.get_or_build("kb", ("a",), build) == ["tool"]
+    assert len(builds) == 1
+
+    # 知识库集合变化后重新构建，同一 key 只保留一份
+    cache.get_or_build("kb", ("a", "b"), build)
+    assert len(builds) == 2
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 1 and stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["saved_seconds"] >= 0
+
+    cache.invalidate("kb")
+    assert cache.get("kb", ("a", "b")) is None
+
+
+async def test_concurrent_async_builds_once_and_uses_post_build_fingerprint() -> None:
+    cache = BuildCache("test")
+    version = {"mcp": 0}
+    builds = []
+
+    async def build():
+        builds.append(1)
+        await asyncio.sleep(0.01)
+        # 构建过程中首次加载 MCP 工具，版本号随之变化
+        version["mcp"] += 1
+        return object()
+
+    def fingerprint():
+        return version["mcp"]
+
+    graphs = await asyncio.gather(*(cache.aget_or_build("agent", fingerprint, build) for _ in range(5)))
+    assert len(builds) == 1
+    assert all(graph is graphs[0] for graph in graphs)
+
+    # 按构建后的指纹保存，下一次请求直接命中
+    assert await cache.aget_or_build("agent", fingerprint, build) is graphs[0]
+    assert len(builds) == 1
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from src.services.chat_run_service import ChatRun, ChatRunConflictError, ChatRunRegistry, encode_run_events
+from src.services.chat_stream_service import AgentStateTracker
+
+
+async def _source(events: list[bytes], gate: asyncio.Event | None = None):
+    for i, event in enumerate(events):
+        if gate is not None and i == 1:
+            await gate.wait()
+        yield event
+
+
+async def _collect(run: ChatRun, after_seq: int = 0) -> list[tuple[int, bytes]]:
+    return [event async for event in run.iter_events(after_seq) if event is not None]
+
+
+async def test_subscribers_share_run_and_resume_after_last_event() -> None:
+    registry = ChatRunRegistry(retention_seconds=0)
+    gate = asyncio.Event()
+    run = registry.start(run_id="r1", thread_id="t1", user_id="1", source=_source([b"a\n", b"b\n", b"c\n"], gate))
+
+    # 两个标签页同时订阅，其中一个已经收到第 1 个事件后断线重连
+    first = asyncio.create_task(_collect(run))
+    resumed = asyncio.create_task(_collect(run, after_seq=1))
+    await asyncio.sleep(0)
+    gate.set()
+
+    assert await first == [(1, b"a\n"), (2, b"b\n"), (3, b"c\n")]
+    assert await resumed == [(2, b"b\n"), (3, b"c\n")]
+    assert run.done
+    assert registry.get("t1") is None
+
+
+async def test_one_active_run_per_thread_and_cancel() -> None:
+    registry = ChatRunRegistry()
+    gate = asyncio.Event()
+    run = registry.start(run_id="r1", thread_id="t1", user_id="1", source=_source([b"a\n", b"b\n"], gate))
+
+    with pytest.raises(ChatRunConflictError):
+        registry.start(run_id="r2", thread_id="t1", user_id="1", source=_source([]))
+
+    assert registry.cancel("t1")
+    await asyncio.gather(run.task, return_exceptions=True)
+    assert run.done and run.last_seq <= 1
+    # 保留期内仍可读取已有事件，新的运行可以开始
+    assert registry.get("t1") is run
+    registry.start(run_id="r2", thread_id="t1", user_id="1", source=_source([]))
+
+
+async def test_truncated_buffer_and_sse_encoding() -> None:
+    run = ChatRun("r1", "t1", "1", buffer_size=2)
+    for payload in (b'{"n": 1}\n', b'{"n": 2}\n', b'{"n": 3}\n'):
+        run.publish(payload)
+    run.finish()
+
+    events = await _collect(run)
+    # 第 1 个事件已被丢弃，先收到 truncated 提示
+    assert b'"truncated"' in events[0][1] and events[0][0] == 1
+    assert [seq for seq, _ in events[1:]] == [2, 3]
+
+    body = b"".join([chunk async for chunk in encode_run_events(run, after_seq=2, sse=True)])
+    assert body == b'id: 3\ndata: {"n": 3}\n\n'
+
+
+class _Graph:
+    def __init__(self, values: dict):
+        self.values = values
+        self.reads = 0
+
+    async def aget_state(self, config):
+        self.reads += 1
+        return self
+
+
+async def test_agent_state_tracker_merges_updates() -> None:
+    graph = _Graph({"todos": [], "files": {"/a.md": {"content": ["a"]}}})
+    tracker = AgentStateTracker(graph, {})
+
+    # 与 todos / files 无关的更新不读取状态
+    assert await tracker.apply({"model": {"messages": []}}) is None
+    assert graph.reads == 0
+
+    state = await tracker.apply({"tools": [{"todos": [{"content": "x"}]}, {"files": {"/b.md": {"content": ["b"]}}}]})
+    assert state["todos"] == [{"content": "x"}]
+    assert state["files"] == [{"/a.md": {"content": ["a"]}, "/b.md": {"content": ["b"]}}]
+
+    state = await tracker.apply({"tools": {"files": {"/a.md": None}}})
+    assert state["files"] == [{"/b.md": {"content": ["b"]}}]
+    assert graph.reads == 1
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from langchain.messages import AIMessageChunk
+
+from src.services.chat_stream_service import ChatStreamCoalescer, _iter_with_idle_ticks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _merge(frames: list[tuple[dict, dict]]) -> dict:
+    """与前端 mergeMessageChunk 一致：以第一条为基础，拼接后续增量"""
+    result = dict(frames[0][0])
+    result["tool_args"] = ""
+    for msg, _ in frames[1:]:
+        result["content"] += msg["content"]
+        result["reasoning_content"] = result.get("reasoning_content", "") + msg.get("reasoning_content", "")
+        result["tool_args"] += "".join(chunk["args"] for chunk in msg.get("tool_call_chunks", []))
+    return result
+
+
+def test_fast_chunks_are_coalesced_into_slim_deltas() -> None:
+    clock = FakeClock()
+    coalescer = ChatStreamCoalescer(flush_interval=0.04, max_chars=1000, clock=clock)
+    metadata = {"langgraph_checkpoint_ns": "model:1"}
+    frames = []
+
+    # 第一个块立即以完整消息发送，之后的 id 统一为第一个块的 id
+    frames += coalescer.add(
+        AIMessageChunk(content="", id="run-1", additional_kwargs={"reasoning_content": "想"}), metadata
+    )
+    assert len(frames) == 1 and frames[0][0]["id"] == "run-1" and "response_metadata" in frames[0][0]
+
+    # 合并窗口内的块只累积，不发送
+    for i in range(20):
+        clock.now += 0.001
+        frames += coalescer.add(AIMessageChunk(content=f"t{i}", id=f"other-{i}"), metadata)
+    assert len(frames) == 1 and coalescer.time_until_flush() == pytest.approx(0.02)
+
+    clock.now += 0.001
+    frames += coalescer.add(
+        AIMessageChunk(content="", tool_call_chunks=[{"name": "s", "args": '{"q"', "index": 0}]), metadata
+    )
+    clock.now += 0.1
+    # 距上次发送已超过窗口，连同当前块一起发送
+    frames += coalescer.add(AIMessageChunk(content="", tool_call_chunks=[{"args": ": 1}", "index": 0}]), metadata)
+    assert len(frames) == 2 and not coalescer.pending
+
+    delta = frames[1][0]
+    assert set(delta) == {"id", "type", "content", "tool_call_chunks"}
+    assert delta["id"] == "run-1" and delta["type"] == "AIMessageChunk"
+
+    # 不同节点的块不合并；flush 发送剩余内容
+    clock.now += 0.001
+    frames += coalescer.add(AIMessageChunk(content="!", additional_kwargs={"reasoning_content": "了"}), metadata)
+    frames += coalescer.add(AIMessageChunk(content="?"), {"langgraph_checkpoint_ns": "model:2"})
+    frames += coalescer.flush()
+    assert [meta["langgraph_checkpoint_ns"] for _, meta in frames[2:]] == ["model:1", "model:2"]
+
+    merged = _merge(frames)
+    assert merged["content"] == "".join(f"t{i}" for i in range(20)) + "!?"
+    assert merged["reasoning_content"] == "想了"
+    assert merged["tool_args"] == '{"q": 1}'
+    assert coalescer.chunks == 25 and coalescer.frames == len(frames) == 4
+
+
+async def test_idle_ticks_do_not_interrupt_source() -> None:
+    async def source():
+        yield "a"
+        await asyncio.sleep(0.05)
+        yield "b"
+        raise ValueError("boom")
+
+    events = []
+    with pytest.raises(ValueError):
+        async for event in _iter_with_idle_ticks(source(), lambda: 0.01):
+            events.append(event)
+
+    # 等待 b 期间产出空闲信号，source 本身不受超时影响
+    assert events[0] == "a" and events[-1] == "b"
+    assert None in events
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.agents.common.checkpointer import PostgresCheckpointSaver
+from src.storage.postgres.manager import pg_manager
+from src.storage.postgres.models_business import AgentCheckpoint, AgentCheckpointWrite, Base
+
+
+@pytest.fixture(scope="module")
+def postgres_url(tmp_path_factory):
+    # 优先使用外部测试库，否则尝试用 pgserver 启动一个临时实例
+    if url := os.getenv("TEST_POSTGRES_URL"):
+        yield url
+        return
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server.get_uri().replace("postgresql://", "postgresql+asyncpg://", 1)
+    server.cleanup()
+
+
+@pytest.fixture
+async def saver(postgres_url, monkeypatch):
+    engine = create_async_engine(postgres_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=[AgentCheckpoint.__table__, AgentCheckpointWrite.__table__])
+        await conn.run_sync(
+            Base.metadata.create_all, tables=[AgentCheckpoint.__table__, AgentCheckpointWrite.__table__]
+        )
+    monkeypatch.setattr(pg_manager, "async_engine", engine)
+    monkeypatch.setattr(
+        pg_manager, "AsyncSession", async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    monkeypatch.setattr(pg_manager, "_initialized", True)
+    yield PostgresCheckpointSaver(keep_last=2)
+    await engine.dispose()
+
+
+def _config(thread_id: str, checkpoint_ns: str = "", checkpoint_id: str | None = None) -> dict:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+async def _put(saver: PostgresCheckpointSaver, config: dict, step: int) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"step": step}
+    return await saver.aput(config, checkpoint, {"source": "loop", "step": step}, {})
+
+
+async def _checkpoint_ids(thread_id: str) -> list[tuple[str, str]]:
+    async with pg_manager.get_async_session_context() as session:
+        rows = await session.execute(
+            select(AgentCheckpoint.checkpoint_ns, AgentCheckpoint.checkpoint_id)
+            .where(AgentCheckpoint.thread_id == thread_id)
+            .order_by(AgentCheckpoint.checkpoint_id)
+        )
+        return [tuple(row) for row in rows]
+
+
+async def test_put_get_list_and_writes(saver) -> None:
+    first = await _put(saver, _config("t1"), 0)
+    second = await _put(saver, first, 1)
+    await saver.aput_writes(second, [("messages", "hello")], task_id="task-1")
+
+    latest = await saver.aget_tuple(_config("t1"))
+    assert latest.config == second
+    assert latest.checkpoint["channel_values"] == {"step": 1}
+    assert latest.parent_config == first
+    assert latest.pending_writes == [("task-1", "messages", "hello")]
+
+    by_id = await saver.aget_tuple(first)
+    assert by_id.checkpoint["channel_values"] == {"step": 0}
+    assert by_id.pending_writes == []
+
+    listed = [item async for item in saver.alist(_config("t1"))]
+    assert [item.config for item in listed] == [second, first]
+    filtered = [item async for item in saver.alist(_config("t1"), filter={"step": 0})]
+    assert [item.config for item in filtered] == [first]
+
+
+async def test_prune_keeps_last_checkpoints_and_stale_subgraph_namespaces(saver) -> None:
+    config = _config("t1")
+    subgraph_ids = []
+    for step in range(4):
+        # 每个根步骤运行一次子图，子图命名空间各不相同
+        sub = await _put(saver, _config("t1", f"node:task-{step}"), step)
+        await saver.aput_writes(sub, [("messages", step)], task_id=f"sub-{step}")
+        subgraph_ids.append(("node:task-" + str(step), sub["configurable"]["checkpoint_id"]))
+        config = await _put(saver, config, step)
+
+    root_ids = [cid for ns, cid in await _checkpoint_ids("t1") if ns == ""]
+    assert len(root_ids) == 2
+    # 只保留晚于根命名空间保留窗口中最旧检查点的子图检查点及其写入
+    assert [row for row in await _checkpoint_ids("t1") if row[0] != ""] == subgraph_ids[3:]
+    async with pg_manager.get_async_session_context() as session:
+        write_ns = (await session.execute(select(AgentCheckpointWrite.checkpoint_ns))).scalars().all()
+    assert write_ns == ["node:task-3"]
+
+
+async def test_delete_threads(saver) -> None:
+    for thread_id in ("t1", "t2", "t3"):
+        config = await _put(saver, _config(thread_id), 0)
+        await _put(saver, _config(thread_id, "node:task"), 0)
+        await saver.aput_writes(config, [("messages", "hi")], task_id="task-1")
+
+    await saver.adelete_threads(["t1", "t2"])
+
+    assert await _checkpoint_ids("t1") == []
+    assert await _checkpoint_ids("t2") == []
+    assert len(await _checkpoint_ids("t3")) == 2
+    assert (await saver.aget_tuple(_config("t3"))).pending_writes == [("task-1", "messages", "hi")]
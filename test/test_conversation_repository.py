@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.repositories.conversation_repository import ConversationRepository
+from src.storage.postgres.models_business import Base, Conversation, ConversationStats, Message, ToolCall
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        yield db
+    await engine.dispose()
+
+
+async def _conversation_with_tool_call(db: AsyncSession, thread_id: str, tool_call_id: str) -> None:
+    conversation = Conversation(thread_id=thread_id, user_id="u1", agent_id="a1")
+    db.add(conversation)
+    await db.flush()
+    db.add(ConversationStats(conversation_id=conversation.id))
+    message = Message(conversation_id=conversation.id, role="assistant", content="")
+    db.add(message)
+    await db.flush()
+    db.add(ToolCall(message_id=message.id, tool_name="search", langgraph_tool_call_id=tool_call_id))
+    await db.commit()
+
+
+async def test_save_turn_messages_updates_tool_results_within_conversation(session) -> None:
+    # 两个会话的工具调用使用相同的 LangGraph tool_call_id
+    await _conversation_with_tool_call(session, "thread-a", "call_1")
+    await _conversation_with_tool_call(session, "thread-b", "call_1")
+
+    repo = ConversationRepository(session)
+    saved = await repo.save_turn_messages(
+        "thread-a", [], tool_results={"call_1": {"tool_output": "done", "status": "success"}}
+    )
+
+    assert saved == 0
+    rows = (
+        await session.execute(
+            select(Conversation.thread_id, ToolCall.status, ToolCall.tool_output)
+            .join(Message, Message.id == ToolCall.message_id)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .order_by(Conversation.thread_id)
+        )
+    ).all()
+    assert [tuple(row) for row in rows] == [("thread-a", "success", "done"), ("thread-b", "pending", None)]
@@ -0,0 +1,219 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Integer, String, cast, delete, func, insert, literal_column, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.repositories.dashboard_rollup_repository import DashboardRollupRepository
+from src.storage.postgres.models_business import Base, Conversation, DashboardRollup, Message, ToolCall, User
+
+NOW = datetime(2026, 10, 19, 12, 30)
+SERIES_START = NOW - timedelta(days=13)
+
+
+@pytest.fixture(scope="module")
+def postgres_url(tmp_path_factory):
+    # 优先使用外部测试库，否则尝试用 pgserver 启动一个临时实例
+    if url := os.getenv("TEST_POSTGRES_URL"):
+        yield url
+        return
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server.get_uri().replace("postgresql://", "postgresql+asyncpg://", 1)
+    server.cleanup()
+
+
+@pytest.fixture
+async def db(postgres_url):
+    engine = create_async_engine(postgres_url)
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await _seed(session)
+        yield session
+    await engine.dispose()
+
+
+def _time_group(column):
+    # 与仪表板接口的 14days 分组一致；格式用字面量，GROUP BY 与 SELECT 中的表达式才能匹配
+    return func.to_char(column + text("INTERVAL '8 hours'"), literal_column("'YYYY-MM-DD'"))
+
+
+async def _seed(db: AsyncSession) -> None:
+    await db.execute(
+        insert(User),
+        [
+            {"id": 1, "username": "alice", "user_id": "alice", "password_hash": "-"},
+            {"id": 2, "username": "bob", "user_id": "bob", "password_hash": "-"},
+            {"id": 3, "username": "carol", "user_id": "carol", "password_hash": "-", "is_deleted": 1},
+        ],
+    )
+    # 对话中的 user_id 既有登录名也有用户主键
+    await db.execute(
+        insert(Conversation),
+        [
+            {"id": 1, "thread_id": "t1", "user_id": "alice", "agent_id": "ChatbotAgent"},
+            {"id": 2, "thread_id": "t2", "user_id": "2", "agent_id": "ReActAgent"},
+            {"id": 3, "thread_id": "t3", "user_id": "carol", "agent_id": "ChatbotAgent"},
+        ],
+    )
+    turns = [
+        (1, NOW.replace(hour=11, minute=10), "qwen3", ("web_search", "success")),
+        (2, NOW.replace(hour=11, minute=20), "qwen3", ("web_search", "error")),
+        (1, NOW.replace(hour=9, minute=10), "deepseek", ("calculator", "success")),
+        (3, NOW.replace(hour=8, minute=10), "qwen3", None),
+        (2, NOW - timedelta(days=1, hours=2, minutes=20), "deepseek", ("web_search", "success")),
+        (1, NOW - timedelta(days=3, hours=5), None, ("calculator", "success")),
+        (2, NOW - timedelta(days=20), "qwen3", ("web_search", "success")),
+        (1, NOW - timedelta(days=40), "qwen3", ("calculator", "error")),
+    ]
+    for idx, (conversation_id, at, model, tool) in enumerate(turns):
+        await _add_turn(db, idx, conversation_id, at, model, tool)
+    await db.commit()
+
+
+async def _add_turn(db: AsyncSession, idx: int, conversation_id: int, at: datetime, model, tool) -> None:
+    metadata = {"usage_metadata": {"input_tokens": 100 + idx, "output_tokens": 10 + idx}}
+    if model:
+        metadata["response_metadata"] = {"model_name": model}
+    await db.execute(
+        insert(Message),
+        [
+            {"id": idx * 2 + 1, "conversation_id": conversation_id, "role": "user", "content": "q", "created_at": at},
+            {
+                "id": idx * 2 + 2,
+                "conversation_id": conversation_id,
+                "role": "assistant",
+                "content": "a",
+                "created_at": at + timedelta(seconds=2),
+                "extra_metadata": metadata,
+            },
+        ],
+    )
+    if tool:
+        await db.execute(
+            insert(ToolCall).values(
+                id=idx + 1, message_id=idx * 2 + 2, tool_name=tool[0], status=tool[1], created_at=at
+            )
+        )
+
+
+async def _rollup_rows(db: AsyncSession) -> list[tuple]:
+    result = await db.execute(
+        select(
+            DashboardRollup.metric, DashboardRollup.dimension, DashboardRollup.bucket_start, DashboardRollup.value
+        ).order_by(DashboardRollup.metric, DashboardRollup.dimension, DashboardRollup.bucket_start)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def test_refresh_builds_hourly_buckets(db) -> None:
+    repo = DashboardRollupRepository(db)
+    assert await repo.refresh(NOW)
+
+    rows = await _rollup_rows(db)
+    eleven = NOW.replace(hour=11, minute=0)
+    assert ("tool_calls", "web_search", eleven, 2) in rows
+    assert ("tool_success", "web_search", eleven, 1) in rows
+    assert ("tool_errors", "web_search", eleven, 1) in rows
+    assert ("model_calls", "qwen3", eleven, 2) in rows
+    assert ("model_calls", "unknown", (NOW - timedelta(days=3, hours=5)).replace(minute=0), 1) in rows
+    assert ("agent_calls", "ReActAgent", eleven, 1) in rows
+    assert ("input_tokens", "", eleven, 100 + 101) in rows
+    assert all(bucket.minute == 0 and bucket.second == 0 for _, _, bucket, _ in rows)
+
+
+async def test_rollups_match_raw_table_queries(db) -> None:
+    repo = DashboardRollupRepository(db)
+    await repo.refresh(NOW)
+
+    # 工具调用统计：总数、成功数、最近 7 天每天的调用数
+    tool_rows = await repo.get_tool_stats(NOW, days=7)
+    assert sum(v for m, _, _, v in tool_rows if m == "tool_calls") == await db.scalar(select(func.count(ToolCall.id)))
+    assert sum(v for m, _, _, v in tool_rows if m == "tool_success") == await db.scalar(
+        select(func.count(ToolCall.id)).where(ToolCall.status == "success")
+    )
+    for i in range(7):
+        raw = await db.scalar(
+            select(func.count(ToolCall.id)).where(
+                ToolCall.created_at >= NOW - timedelta(days=i + 1), ToolCall.created_at < NOW - timedelta(days=i)
+            )
+        )
+        assert sum(v for m, _, offset, v in tool_rows if m == "tool_calls" and offset == i) == raw
+
+    # 调用趋势：按天、按模型 / 工具 / Token 类型分组
+    model_name = func.coalesce(Message.extra_metadata["response_metadata"]["model_name"].as_string(), "unknown")
+    raw_series = {
+        ("model_calls",): select(_time_group(Message.created_at), model_name, func.count(Message.id))
+        .where(Message.role == "assistant", Message.created_at >= SERIES_START)
+        .group_by(_time_group(Message.created_at), model_name),
+        ("tool_calls",): select(_time_group(ToolCall.created_at), ToolCall.tool_name, func.count(ToolCall.id))
+        .where(ToolCall.created_at >= SERIES_START)
+        .group_by(_time_group(ToolCall.created_at), ToolCall.tool_name),
+    }
+    for metrics, raw_query in raw_series.items():
+        rows, _ = await repo.get_timeseries(metrics, SERIES_START, _time_group(DashboardRollup.bucket_start))
+        raw_rows = (await db.execute(raw_query)).all()
+        assert {(r.date, r.category, r.count) for r in rows} == {tuple(r) for r in raw_rows}
+
+    rows, _ = await repo.get_timeseries(
+        ("input_tokens", "output_tokens"), SERIES_START, _time_group(DashboardRollup.bucket_start), by_metric=True
+    )
+    for metric in ("input_tokens", "output_tokens"):
+        tokens = Message.extra_metadata["usage_metadata"][metric].as_string()
+        raw_total = await db.scalar(
+            select(func.sum(cast(tokens, Integer))).where(Message.created_at >= SERIES_START, tokens.isnot(None))
+        )
+        assert sum(r.count for r in rows if r.category == metric) == raw_total
+
+    # 活跃用户：排除已删除用户，对话中的登录名与用户主键都能对应到用户
+    total_users, daily, active_30d = await repo.get_user_activity(NOW, days=30)
+    join_condition = or_(Conversation.user_id == User.user_id, Conversation.user_id == cast(User.id, String))
+    raw_active_30d = await db.scalar(
+        select(func.count(func.distinct(User.id)))
+        .select_from(Message)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .join(User, join_condition)
+        .where(Message.role == "user", Message.created_at >= NOW - timedelta(days=30), User.is_deleted == 0)
+    )
+    assert (total_users, active_30d) == (2, raw_active_30d)
+    assert daily == {0: 2, 1: 1, 3: 1, 20: 1}
+
+
+async def test_refresh_is_idempotent(db) -> None:
+    repo = DashboardRollupRepository(db)
+    await repo.refresh(NOW)
+    full = await _rollup_rows(db)
+
+    # 重复刷新（增量窗口内的小时先删除再写入）结果不变
+    assert await repo.refresh(NOW + timedelta(minutes=5))
+    assert await repo.refresh(NOW + timedelta(minutes=10))
+    assert await _rollup_rows(db) == full
+
+    # 回看窗口内新增的记录只计入一次
+    await _add_turn(db, 100, 1, NOW + timedelta(minutes=12), "qwen3", ("web_search", "success"))
+    await db.commit()
+    await repo.refresh(NOW + timedelta(minutes=15))
+    await repo.refresh(NOW + timedelta(minutes=20))
+    rows = await _rollup_rows(db)
+    assert ("tool_calls", "web_search", NOW.replace(minute=0), 1) in rows
+    assert len(rows) == len(full) + 6
+
+
+async def test_periodic_full_reconcile_fixes_old_changes(db) -> None:
+    repo = DashboardRollupRepository(db)
+    await repo.refresh(NOW, lookback_hours=2, reconcile_hours=24)
+
+    # 回看窗口之前的记录被删除：增量刷新不会修正，到达全量重算间隔后修正
+    await db.execute(delete(ToolCall).where(ToolCall.created_at < NOW - timedelta(days=30)))
+    await db.commit()
+    old_bucket = (NOW - timedelta(days=40)).replace(minute=0)
+
+    await repo.refresh(NOW + timedelta(hours=1), lookback_hours=2, reconcile_hours=24)
+    assert ("tool_calls", "calculator", old_bucket, 1) in await _rollup_rows(db)
+
+    await repo.refresh(NOW + timedelta(hours=24), lookback_hours=2, reconcile_hours=24)
+    assert not [row for row in await _rollup_rows(db) if row[2] == old_bucket and row[0].startswith("tool_")]
@@ -0,0 +1,18 @@
+from src.knowledge.services.docling_service import replace_image_placeholders
+
+
+def test_replace_image_placeholders_in_document_order() -> None:
+    markdown = "封面\n<!-- image -->\n正文\n<!--image-->\n结尾 <!--  image  -->"
+    result = replace_image_placeholders(markdown, ["![a](u1)", "![b](u2)", "![c](u3)"])
+    assert result == "封面\n![a](u1)\n正文\n![b](u2)\n结尾 ![c](u3)"
+
+
+def test_replace_image_placeholders_keeps_unmatched_placeholders() -> None:
+    markdown = "<!-- image -->|<!-- image -->|<!-- image -->"
+    # 第二张图片无内嵌数据（None），第三张超出列表长度，均保留原占位符
+    result = replace_image_placeholders(markdown, ["![a](u1)", None])
+    assert result == "![a](u1)|<!-- image -->|<!-- image -->"
+
+
+def test_replace_image_placeholders_without_images() -> None:
+    assert replace_image_placeholders("无图片 <!-- image -->", []) == "无图片 <!-- image -->"
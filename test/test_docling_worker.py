@@ -0,0 +1,34 @@
+import sys
+
+# 本模块会在 spawn 出的工作进程中被导入（探针函数按模块路径反序列化），顶层不能导入 src.knowledge
+
+
+def _noop() -> None:
+    pass
+
+
+def _loaded_app_objects() -> dict:
+    # 与工作进程执行 convert_document 时一样导入工作进程入口
+    import src
+    import src.utils.docling_worker  # noqa: F401
+
+    return {
+        "knowledge": "src.knowledge" in sys.modules,
+        "knowledge_base": hasattr(src, "knowledge_base"),
+        "graph_base": hasattr(src, "graph_base"),
+    }
+
+
+def test_spawned_worker_skips_app_init(monkeypatch) -> None:
+    from src.knowledge.services import docling_service
+
+    monkeypatch.setattr(docling_service, "init_worker", _noop)
+    monkeypatch.setattr(docling_service, "warmup_worker", _noop)
+    service = docling_service.DoclingExecutionService(max_workers=1)
+    try:
+        loaded = service._get_executor().submit(_loaded_app_objects).result(timeout=120)
+    finally:
+        service.shutdown()
+
+    # 工作进程不创建知识库管理器与图数据库连接
+    assert loaded == {"knowledge": False, "knowledge_base": False, "graph_base": False}
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+from src.knowledge.services.upload_graph_service import (
+    BATCH_EXPAND_QUERY,
+    BATCH_FULLTEXT_QUERY,
+    BATCH_FUZZY_QUERY,
+    BATCH_VECTOR_QUERY,
+    UploadGraphService,
+)
+
+
+class FakeAsyncDriver:
+    """按查询语句返回预设结果，并记录每次查询的参数"""
+
+    def __init__(self, responses: dict):
+        self.responses = responses
+        self.calls: list[tuple[str, dict]] = []
+
+    def session(self):
+        driver = self
+
+        class Session:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute_read(self, work):
+                return await work(self)
+
+            async def run(self, query, **params):
+                driver.calls.append((query, params))
+                rows = driver.responses.get(query, [])
+                if callable(rows):
+                    rows = rows(params)
+
+                async def data():
+                    return rows
+
+                return SimpleNamespace(data=data)
+
+        return Session()
+
+    def queries(self, query: str) -> list[dict]:
+        return [params for q, params in self.calls if q == query]
+
+
+def triple(head: str, rel: str, tail: str) -> dict:
+    return {
+        "h": {"id": head, "name": head, "properties": {"embedding": [0.1]}},
+        "r": {"id": f"{head}-{tail}", "type": rel, "source_id": head, "target_id": tail, "properties": {}},
+        "t": {"id": tail, "name": tail, "properties": {}},
+    }
+
+
+def make_service(driver: FakeAsyncDriver, embed_calls: list) -> UploadGraphService:
+    async def abatch_encode(texts, batch_size=40):
+        embed_calls.append(list(texts))
+        return [[float(i)] for i in range(len(texts))]
+
+    service = UploadGraphService.__new__(UploadGraphService)
+    service.connection = SimpleNamespace(async_driver=driver, driver=None, status="open", is_running=lambda: True)
+    service.kgdb_name = "neo4j"
+    service.embed_model = SimpleNamespace(abatch_encode=abatch_encode)
+    service._vector_index_exists = True
+    service._fulltext_index_ready = True
+    return service
+
+
+async def test_aquery_node_batches_tokens_and_keeps_entity_order() -> None:
+    expand = {"变压器": triple("变压器", "包含", "绕组"), "断路器": triple("断路器", "包含", "触头")}
+    driver = FakeAsyncDriver(
+        {
+            BATCH_VECTOR_QUERY: [{"name": "断路器", "score": 0.92}, {"name": "变压器", "score": 0.95}],
+            BATCH_FULLTEXT_QUERY: [{"name": "断路器检修", "score": 2.0, "queries": ['"断路器"']}],
+            BATCH_EXPAND_QUERY: lambda params: [expand[name] for name in params["entity_names"] if name in expand],
+        }
+    )
+    embed_calls = []
+    service = make_service(driver, embed_calls)
+
+    result = await service.aquery_node("变压器 断路器", max_entities=2, return_format="triples")
+
+    # 所有分词一次向量化、一次向量查询，向量顺序与分词顺序一致
+    assert embed_calls == [["变压器", "断路器"]]
+    assert driver.queries(BATCH_VECTOR_QUERY) == [{"embeddings": [[0.0], [1.0]], "threshold": 0.9}]
+    assert driver.queries(BATCH_FULLTEXT_QUERY)[0]["queries"] == ['"变压器"', '"断路器"']
+    # 实体按分数排序后截断，一次查询展开，三元组对应各自的实体
+    assert driver.queries(BATCH_EXPAND_QUERY) == [{"entity_names": ["变压器", "断路器"], "limit": 100}]
+    assert result["triples"] == [("变压器", "包含", "绕组"), ("断路器", "包含", "触头")]
+
+
+async def test_aquery_node_graph_format_merges_fuzzy_hits() -> None:
+    driver = FakeAsyncDriver(
+        {
+            BATCH_VECTOR_QUERY: [{"name": "变压器", "score": 0.95}],
+            BATCH_FULLTEXT_QUERY: [
+                {"name": "变压器", "score": 3.0, "queries": ['"变压器"']},
+                {"name": "变压器油", "score": 1.5, "queries": ['"变压器"']},
+            ],
+            BATCH_EXPAND_QUERY: [triple("变压器", "包含", "绕组"), triple("变压器", "包含", "绕组")],
+        }
+    )
+    service = make_service(driver, [])
+
+    result = await service.aquery_node("变压器", return_format="graph")
+
+    # 模糊命中只作轻权重补充，排在向量命中之后
+    assert driver.queries(BATCH_EXPAND_QUERY)[0]["entity_names"] == ["变压器", "变压器油"]
+    assert [node["name"] for node in result["nodes"]] == ["变压器", "绕组"]
+    assert "embedding" not in result["nodes"][0]
+    assert len(result["edges"]) == 1
+
+
+async def test_aquery_node_falls_back_to_contains_when_fulltext_misses() -> None:
+    names = ["Baoyu", "Jia_Baoyu", "Daiyu"]
+    driver = FakeAsyncDriver(
+        {
+            BATCH_FULLTEXT_QUERY: [],
+            BATCH_FUZZY_QUERY: lambda params: [
+                {"name": name, "score": None}
+                for name in names
+                if any(keyword.lower() in name.lower() for keyword in params["keywords"])
+            ],
+        }
+    )
+    service = make_service(driver, [])
+
+    await service.aquery_node("Bao", return_format="triples")
+
+    # 全文短语查询无法命中单词的一部分，改用 CONTAINS 找到实体
+    assert driver.queries(BATCH_FUZZY_QUERY) == [{"keywords": ["Bao"]}]
+    assert driver.queries(BATCH_EXPAND_QUERY)[0]["entity_names"] == ["Baoyu", "Jia_Baoyu"]
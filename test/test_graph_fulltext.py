@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+from src.knowledge.adapters.base import build_fulltext_query, fulltext_index_ddl
+from src.knowledge.adapters.lightrag import LightRAGGraphAdapter
+
+
+def test_build_fulltext_query() -> None:
+    # 短语查询保证双字连续命中；引号与反斜杠需要转义
+    assert build_fulltext_query(" 贾宝玉 ") == '"贾宝玉"'
+    assert build_fulltext_query('a"b\\c') == '"a\\"b\\\\c"'
+    # 单字无法用 cjk 双字索引表达，回退到 CONTAINS
+    assert build_fulltext_query("玉") is None
+    assert build_fulltext_query("") is None
+
+
+def test_fulltext_index_ddl() -> None:
+    ddl = fulltext_index_ddl("kb_1_entity_fulltext", "kb_1", ["entity_id", "name"])
+    assert ddl.startswith("CREATE FULLTEXT INDEX `kb_1_entity_fulltext` IF NOT EXISTS FOR (n:`kb_1`)")
+    assert "ON EACH [n.`entity_id`, n.`name`]" in ddl
+    assert "`fulltext.analyzer`" in ddl
+
+
+def test_lightrag_query_uses_fulltext_index() -> None:
+    # 只构建查询语句，不连接数据库
+    adapter = LightRAGGraphAdapter.__new__(LightRAGGraphAdapter)
+
+    query = adapter._build_cypher_query("宝玉", "kb_1", limit=10, max_depth=1, use_fulltext=True)
+    assert "db.index.fulltext.queryNodes($index_name, $fulltext_query" in query
+    assert "CONTAINS" not in query
+
+    fallback = adapter._build_cypher_query("玉", "kb_1", limit=10, max_depth=1)
+    assert "MATCH (n:`kb_1`)" in fallback
+    assert "CONTAINS" in fallback
+
+
+class _Result(list):
+    def consume(self) -> None:
+        pass
+
+
+def _node(entity_id: str) -> SimpleNamespace:
+    return SimpleNamespace(element_id=entity_id, labels=["kb_1"], items=lambda: {"entity_id": entity_id}.items())
+
+
+async def test_lightrag_query_falls_back_to_contains_when_fulltext_misses() -> None:
+    queries = []
+
+    class Session:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def run(self, query, **params):
+            queries.append(query)
+            if "CONTAINS" in query:
+                return _Result([{"n": _node("Baoyu"), "r": None, "m": None}])
+            return _Result()
+
+    adapter = LightRAGGraphAdapter.__new__(LightRAGGraphAdapter)
+    adapter.kb_id = "kb_1"
+    adapter._db = SimpleNamespace(driver=SimpleNamespace(session=Session))
+
+    result = await adapter.query_nodes("Bao")
+
+    # 全文短语查询无法命中单词的一部分，回退到 CONTAINS 仍能找到实体
+    assert any("db.index.fulltext.queryNodes" in query for query in queries)
+    assert [node["name"] for node in result["nodes"]] == ["Baoyu"]
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from src.knowledge.utils.graph_overview import GraphOverviewStore, etag_matches, slice_subgraph
+
+
+def _graph(num_nodes: int) -> dict:
+    nodes = [{"id": f"n{i}"} for i in range(num_nodes)]
+    edges = [{"id": f"e{i}", "source_id": f"n{i}", "target_id": f"n{i + 1}"} for i in range(num_nodes - 1)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def test_slice_subgraph_keeps_inner_edges() -> None:
+    sliced = slice_subgraph(_graph(5), 3)
+
+    # 只保留两端都在前 3 个节点中的边
+    assert [node["id"] for node in sliced["nodes"]] == ["n0", "n1", "n2"]
+    assert [edge["id"] for edge in sliced["edges"]] == ["e0", "e1"]
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('"abc-100"', '"abc-100"')
+    assert etag_matches('W/"abc-100", "other"', '"abc-100"')
+    assert etag_matches("*", '"abc-100"')
+    assert not etag_matches('"abc-50"', '"abc-100"')
+    assert not etag_matches(None, '"abc-100"')
+
+
+async def test_store_serves_snapshot_until_invalidated(tmp_path) -> None:
+    store = GraphOverviewStore(str(tmp_path), max_nodes=4)
+    calls = []
+
+    async def loader(max_nodes: int) -> dict:
+        calls.append(max_nodes)
+        return _graph(4 + len(calls))
+
+    body, etag = await store.get("kb_a", loader, max_nodes=2)
+    again, same_etag = await store.get("kb_a", loader, max_nodes=2)
+
+    # 同一快照只计算一次，且落盘保存
+    assert calls == [4]
+    assert (body, etag) == (again, same_etag)
+    assert os.listdir(tmp_path) == ["kb_a.json.gz"]
+
+    # 重启后从磁盘读取，不重新计算
+    restarted = GraphOverviewStore(str(tmp_path), max_nodes=4)
+    assert (await restarted.get("kb_a", loader, max_nodes=2))[1] == etag
+    assert calls == [4]
+
+    # 失效后先返回旧快照，后台重新计算
+    store.invalidate("kb_a")
+    assert (await store.get("kb_a", loader, max_nodes=2))[1] == etag
+    await asyncio.sleep(0)
+    assert calls == [4, 4]
+    assert (await store.get("kb_a", loader, max_nodes=2))[1] != etag
+
+
+async def test_store_follows_other_process_and_max_age(tmp_path) -> None:
+    calls = []
+
+    async def loader(max_nodes: int) -> dict:
+        calls.append(max_nodes)
+        return _graph(2 + len(calls))
+
+    worker_a = GraphOverviewStore(str(tmp_path), max_nodes=4)
+    worker_b = GraphOverviewStore(str(tmp_path), max_nodes=4)
+    _, etag = await worker_a.get("kb_a", loader)
+    assert (await worker_b.get("kb_a", loader))[1] == etag
+
+    # 另一进程写入后失效：本进程发现磁盘快照被删除，后台重新计算
+    worker_a.invalidate("kb_a")
+    assert (await worker_b.get("kb_a", loader))[1] == etag
+    await asyncio.sleep(0)
+    assert len(calls) == 2
+    _, new_etag = await worker_b.get("kb_a", loader)
+    assert new_etag != etag
+
+    # 超过最长有效时间的快照同样过期
+    worker_b.max_age = 1
+    worker_b._snapshots["kb_a"].computed_at -= 10
+    await worker_b.get("kb_a", loader)
+    await asyncio.sleep(0)
+    assert len(calls) == 3
+
+
+async def test_store_does_not_cache_failed_loads(tmp_path) -> None:
+    store = GraphOverviewStore(str(tmp_path), max_nodes=4)
+
+    async def failing_loader(max_nodes: int) -> dict:
+        raise RuntimeError("neo4j unavailable")
+
+    async def loader(max_nodes: int) -> dict:
+        return _graph(3)
+
+    with pytest.raises(RuntimeError):
+        await store.get("kb_a", failing_loader)
+    assert os.listdir(tmp_path) == []
+    body, _ = await store.get("kb_a", loader)
+    assert b'"n2"' in body
+
+
+async def test_upload_overview_runs_sample_query_off_event_loop() -> None:
+    from src.knowledge.adapters.upload import UploadGraphAdapter
+
+    loop_thread = threading.get_ident()
+    calls = []
+
+    class FakeDb:
+        def _get_sample_nodes_with_connections(self, num, label_filter):
+            calls.append((num, label_filter, threading.get_ident()))
+            return {"nodes": [], "edges": []}
+
+    adapter = UploadGraphAdapter.__new__(UploadGraphAdapter)
+    adapter.config = {}
+    adapter._db = FakeDb()
+    adapter._format_results = lambda raw: raw
+
+    assert await adapter.get_overview(max_nodes=5) == {"nodes": [], "edges": []}
+    # 同步的 Neo4j 查询不能在事件循环线程中执行
+    assert calls and calls[0][:2] == (5, "Upload") and calls[0][2] != loop_thread
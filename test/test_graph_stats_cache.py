@@ -0,0 +1,56 @@
+import asyncio
+
+from src.knowledge.utils.graph_stats_cache import GraphStatsCache
+
+
+class CountingLoader:
+    """记录调用次数的统计计算函数"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"entity_count": self.calls}
+
+
+async def test_concurrent_gets_compute_once() -> None:
+    cache = GraphStatsCache(refresh_seconds=60)
+    loader = CountingLoader(delay=0.05)
+
+    results = await asyncio.gather(*(cache.get("neo4j", loader) for _ in range(5)))
+
+    assert loader.calls == 1
+    assert all(result == {"entity_count": 1} for result in results)
+    # 返回副本，调用方修改不影响缓存
+    results[0]["entity_count"] = 100
+    assert cache.peek("neo4j") == {"entity_count": 1}
+
+
+async def test_stale_entry_served_while_refreshing() -> None:
+    cache = GraphStatsCache(refresh_seconds=60, max_stale_seconds=600)
+    loader = CountingLoader()
+    await cache.get("neo4j", loader)
+
+    # 超过刷新间隔但未超过陈旧上限：先返回旧值，后台刷新
+    cache.mark_stale("neo4j")
+    assert await cache.get("neo4j", loader) == {"entity_count": 1}
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert loader.calls == 2
+    assert await cache.get("neo4j", loader) == {"entity_count": 2}
+
+
+async def test_update_applies_delta_and_invalidate_reloads() -> None:
+    cache = GraphStatsCache()
+    loader = CountingLoader()
+
+    assert not cache.update("neo4j", lambda info: None)
+    await cache.get("neo4j", loader)
+    assert cache.update("neo4j", lambda info: info.update(entity_count=info["entity_count"] + 10))
+    assert await cache.get("neo4j", loader) == {"entity_count": 11}
+
+    cache.invalidate()
+    assert await cache.get("neo4j", loader) == {"entity_count": 2}
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+from src.services.history_cursor import decode_cursor, encode_cursor, turn_start_index
+
+
+def test_cursor_round_trip() -> None:
+    created_at = datetime(2025, 3, 1, 12, 30, 45, 123456)
+
+    cursor = encode_cursor(created_at, 42)
+
+    # 游标不含填充符，可直接放在查询参数中
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+def test_invalid_cursor_raises_value_error() -> None:
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_turn_start_index() -> None:
+    # 页首的回复与工具消息属于更早的一轮对话，分页从第一条用户消息开始
+    assert turn_start_index(["assistant", "tool", "user", "assistant"]) == 2
+    # 整页都没有用户消息时不裁剪
+    assert turn_start_index(["assistant", "tool", "assistant"]) == 0
@@ -0,0 +1,86 @@
+import asyncio
+
+from src.knowledge.utils.instance_pool import InstancePool
+
+
+async def test_concurrent_get_creates_once() -> None:
+    calls = []
+
+    async def factory() -> object:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return object()
+
+    pool = InstancePool()
+    instances = await asyncio.gather(*(pool.get("kb_a", factory) for _ in range(5)))
+
+    # 并发请求合并为一次创建
+    assert len(calls) == 1
+    assert all(instance is instances[0] for instance in instances)
+    assert pool.get_stats()["coalesced"] == 4
+
+
+async def test_evicts_least_recently_used_unpinned_instance() -> None:
+    released = []
+
+    async def finalizer(instance: str) -> None:
+        released.append(instance)
+
+    def factory(value: str):
+        async def create() -> str:
+            return value
+
+        return create
+
+    pool = InstancePool(max_instances=2, finalizer=finalizer)
+    await pool.get("kb_a", factory("a"))
+    await pool.get("kb_b", factory("b"))
+    pool.pin("kb_a")
+    await pool.get("kb_c", factory("c"))
+    await asyncio.sleep(0.01)
+
+    # kb_a 虽然最久未访问，但使用中不会被释放
+    assert released == ["b"]
+    assert "kb_a" in pool and "kb_b" not in pool and "kb_c" in pool
+
+
+async def test_get_with_pin_is_not_evicted_from_full_pool() -> None:
+    released = []
+
+    async def finalizer(instance: str) -> None:
+        released.append(instance)
+
+    async def create_a() -> str:
+        return "a"
+
+    async def create_b() -> str:
+        await asyncio.sleep(0.01)
+        return "b"
+
+    pool = InstancePool(max_instances=1, finalizer=finalizer)
+    await pool.get("kb_a", create_a, pin=True)
+
+    # 池已满且 kb_a 占用中：新建的 kb_b 在返回前已被占用，不会被淘汰
+    assert await pool.get("kb_b", create_b, pin=True) == "b"
+    await asyncio.sleep(0.01)
+    assert released == []
+    assert pool.get_stats()["active"][0] == {"key": "kb_b", "idle_seconds": 0.0, "pins": 1}
+
+    pool.unpin("kb_b")
+    await pool.get("kb_a", create_a)
+    await asyncio.sleep(0.01)
+    assert released == ["b"]
+
+
+async def test_cancelled_waiter_releases_pin() -> None:
+    async def create() -> str:
+        await asyncio.sleep(0.05)
+        return "a"
+
+    pool = InstancePool()
+    waiter = asyncio.create_task(pool.get("kb_a", create, pin=True))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+
+    assert await pool.get("kb_a", create) == "a"
+    assert pool.get_stats()["active"][0]["pins"] == 0
@@ -0,0 +1,46 @@
+from src.knowledge.utils.jsonl_stream import JsonlBatchReader
+
+LINES = [
+    '{"h": "北京", "t": "中国", "r": "首都"}',
+    '{"h": "上海", "t": "中国", "r": "直辖市"}',
+    "",
+    '{"h": "广州", "t": "广东", "r": "省会"}',
+]
+DATA = "\n".join(LINES).encode()
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def test_lines_split_across_chunks() -> None:
+    # 块边界落在行中间（包括多字节字符中间）时仍能完整解析
+    reader = JsonlBatchReader(_chunks(DATA, 7))
+
+    first = reader.read_batch(2)
+    rest = reader.read_batch(10)
+
+    assert [item["h"] for item in first] == ["北京", "上海"]
+    assert [item["h"] for item in rest] == ["广州"]
+    assert reader.read_batch(10) == []
+    assert reader.offset == len(DATA)
+
+
+def test_resume_from_offset() -> None:
+    reader = JsonlBatchReader(_chunks(DATA, 16))
+    reader.read_batch(1)
+    offset = reader.offset
+
+    # 从记录的 offset 重新读取，得到剩余的记录
+    resumed = JsonlBatchReader(_chunks(DATA[offset:], 16), start_offset=offset)
+    assert [item["h"] for item in resumed.read_batch(10)] == ["上海", "广州"]
+    assert resumed.offset == len(DATA)
+
+
+def test_invalid_lines_are_skipped() -> None:
+    data = b'{"h": "a", "t": "b", "r": "c"}\n{broken\n{"h": "d", "t": "e", "r": "f"}\n'
+    reader = JsonlBatchReader([data])
+
+    assert [item["h"] for item in reader.read_batch(10)] == ["a", "d"]
+    assert reader.invalid_lines == 1
+    assert reader.lines_read == 3
@@ -0,0 +1,152 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.knowledge.utils.lightrag_ingest import InsertBatcher, describe_stage, split_unique_batches
+from src.knowledge.utils.llm_limiter import LLMRateLimiter
+
+
+def test_describe_stage() -> None:
+    path = "minio://kb/a.md"
+
+    assert describe_stage({"status": "pending"}, "", path)[0] == "queued"
+    assert describe_stage({"status": "processing"}, "", path)[0] == "chunking"
+    assert describe_stage({"status": "processing", "chunks_count": 3}, "", path) == (
+        "extracting",
+        "实体与关系抽取中（3 个分块）",
+    )
+    # 流水线消息属于该文档时以消息中的阶段为准
+    assert describe_stage({"status": "processing", "chunks_count": 3}, f"Merging stage 1/2: {path}", path)[0] == (
+        "merging"
+    )
+    assert describe_stage({"status": "DocStatus.PROCESSED"}, "", path)[0] == "done"
+    assert describe_stage({"status": "failed", "error_msg": "timeout"}, "", path) == ("failed", "入库失败: timeout")
+
+
+async def test_batcher_merges_concurrent_submissions() -> None:
+    batches = []
+
+    async def flush(items: list[str]) -> None:
+        batches.append(items)
+
+    batcher = InsertBatcher(flush, max_batch_size=3, window_seconds=0.05)
+    await asyncio.gather(*(batcher.submit(f"doc{i}") for i in range(4)))
+
+    # 达到批次上限立即写入，剩余文档在窗口期结束后写入
+    assert batches == [["doc0", "doc1", "doc2"], ["doc3"]]
+
+
+async def test_limiter_caps_concurrency() -> None:
+    limiter = LLMRateLimiter(max_concurrency=2)
+    active, peak = 0, 0
+
+    async def call() -> None:
+        nonlocal active, peak
+        async with limiter.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert limiter.get_stats()["calls"] == 6
+
+
+async def test_wait_for_document_times_out(monkeypatch) -> None:
+    from src.knowledge.implementations import lightrag
+
+    workspaces, retriggers, upserts = [], [], []
+
+    async def get_namespace_data(namespace, workspace=None):
+        workspaces.append(workspace)
+        return {"busy": False, "latest_message": ""}
+
+    async def get_by_id(doc_id):
+        return {"status": "pending", "file_path": "a.md"}
+
+    async def upsert(data):
+        upserts.append(data)
+
+    async def retrigger():
+        retriggers.append(True)
+
+    monkeypatch.setattr(lightrag, "get_namespace_data", get_namespace_data)
+    monkeypatch.setattr(lightrag, "DOC_TIMEOUT_SECONDS", 0)
+    monkeypatch.setattr(lightrag, "STATUS_POLL_SECONDS", 0)
+    rag = SimpleNamespace(
+        workspace="kb_a",
+        doc_status=SimpleNamespace(get_by_id=get_by_id, upsert=upsert),
+        apipeline_process_enqueue_documents=retrigger,
+    )
+
+    with pytest.raises(TimeoutError):
+        await lightrag.LightRagKB._wait_for_document(rag, "doc-1", "a.md", None)
+
+    # 流水线空闲时先重新触发一次，再次超时则标记为失败
+    assert set(workspaces) == {"kb_a"}
+    assert retriggers == [True]
+    assert upserts[0]["doc-1"]["status"] == "failed"
+
+
+class FakeRag:
+    """模拟 LightRAG.ainsert：同一次写入中重复 id 报错、重复内容只保留第一个"""
+
+    workspace = "kb_a"
+
+    def __init__(self):
+        self.calls = []
+        self.accepted = []
+
+    async def ainsert(self, input, ids, file_paths):
+        self.calls.append(list(ids))
+        if len(set(ids)) != len(ids):
+            raise ValueError("IDs must be unique")
+        seen = set()
+        for doc_id, content in zip(ids, input):
+            if content.strip() not in seen:
+                seen.add(content.strip())
+                self.accepted.append(doc_id)
+
+
+def test_split_unique_batches() -> None:
+    items = [{"id": "a", "content": "x"}, {"id": "b", "content": "x "}, {"id": "a", "content": "y"}]
+    assert [[item["id"] for item in batch] for batch in split_unique_batches(items)] == [["a"], ["b", "a"]]
+
+
+async def test_same_content_files_in_one_window_are_all_inserted() -> None:
+    from src.knowledge.implementations.lightrag import LightRagKB
+
+    rag = FakeRag()
+    batcher = InsertBatcher(LightRagKB._flush_documents, max_batch_size=8, window_seconds=0.01)
+    docs = [("f1", "same"), ("f2", "same"), ("f3", "other")]
+    await asyncio.gather(
+        *(
+            batcher.submit({"rag": rag, "id": doc_id, "content": content, "file_path": doc_id})
+            for doc_id, content in docs
+        )
+    )
+
+    # 内容相同的文档拆到不同批次写入，均被 LightRAG 接收
+    assert rag.calls == [["f1", "f3"], ["f2"]]
+    assert sorted(rag.accepted) == ["f1", "f2", "f3"]
+
+
+async def test_batch_value_error_retries_documents_one_by_one() -> None:
+    from src.knowledge.implementations.lightrag import LightRagKB
+
+    class RejectingRag(FakeRag):
+        async def ainsert(self, input, ids, file_paths):
+            if len(ids) > 1 or ids == ["bad"]:
+                self.calls.append(list(ids))
+                raise ValueError("invalid document")
+            await super().ainsert(input, ids, file_paths)
+
+    rag = RejectingRag()
+    await LightRagKB._flush_documents(
+        [{"rag": rag, "id": doc_id, "content": doc_id, "file_path": doc_id} for doc_id in ("ok1", "bad", "ok2")]
+    )
+
+    assert rag.accepted == ["ok1", "ok2"]
@@ -0,0 +1,70 @@
+import re
+import sys
+
+import pytest
+
+from src.services.mcp_session_pool import MCPServerUnavailableError, MCPSessionPool, _SessionProxy
+
+SERVER_SCRIPT = """
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("demo")
+
+
+@mcp.tool()
+def add(a: int, b: int) -> int:
+    \"\"\"Add two numbers\"\"\"
+    return a + b
+
+
+mcp.run()
+"""
+
+
+async def test_tools_reuse_persistent_session(tmp_path) -> None:
+    script = tmp_path / "server.py"
+    script.write_text(SERVER_SCRIPT, encoding="utf-8")
+    pool = MCPSessionPool()
+    loaded = []
+
+    config = {"transport": "stdio", "command": sys.executable, "args": [str(script)], "disabled_tools": ["x"]}
+    connection = pool.ensure("demo", config, lambda name, tools: loaded.append(tools))
+    try:
+        await pool.prefetch()
+        assert connection.status == "ready"
+        assert [tool.name for tool in connection.tools] == ["add"]
+
+        # 多次调用复用同一个会话，不会重新启动服务器进程
+        session = connection.session
+        for i in range(3):
+            result = await connection.tools[0].ainvoke({"a": i, "b": 1})
+        assert "3" in str(result)
+        assert connection.session is session
+
+        # 工具未变化时刷新不会替换工具对象；只修改 disabled_tools 不会重新连接
+        await connection.refresh()
+        assert len(loaded) == 1
+        assert pool.ensure("demo", config | {"disabled_tools": []}, lambda *_: None) is connection
+    finally:
+        await pool.shutdown()
+    assert connection.status == "closed"
+
+
+async def test_unavailable_server_does_not_block() -> None:
+    pool = MCPSessionPool()
+    connection = pool.ensure("bad", {"transport": "stdio", "command": "/nonexistent-mcp", "args": []}, lambda *_: None)
+    try:
+        await pool.prefetch(timeout=5)
+        assert connection.status == "unavailable" and connection.tools is None
+        assert connection.last_error
+
+        with pytest.raises(MCPServerUnavailableError):
+            await _SessionProxy(connection).call_tool("add", {})
+
+        # 之前获取过的工具只作为普通刷新的回退，连接测试必须报告失败原因
+        connection.tools = ["cached"]
+        assert await connection.refresh() == ["cached"]
+        with pytest.raises(MCPServerUnavailableError, match=re.escape(connection.last_error)):
+            await connection.refresh(strict=True)
+    finally:
+        await pool.shutdown()
@@ -0,0 +1,188 @@
+from types import SimpleNamespace
+
+import pytest
+from pymilvus import FunctionType
+
+from src.knowledge.implementations import milvus
+from src.knowledge.implementations.milvus import RRF_K, SPARSE_FIELD, MilvusKB, similarity_radius
+
+
+class FakeCollection:
+    """记录建索引、写入与检索调用的假集合"""
+
+    def __init__(self, name: str, schema=None, using: str = "default", fields: list[str] | None = None, **kwargs):
+        self.name = name
+        self.schema = schema or SimpleNamespace(fields=[SimpleNamespace(name=f) for f in fields or []])
+        self.indexes = []
+        self.index_calls = []
+        self.inserted = []
+        self.rows = []
+        self.hybrid_calls = []
+        self.hybrid_hits = []
+
+    def create_index(self, field_name: str, index_params: dict, **kwargs) -> None:
+        self.index_calls.append((field_name, index_params))
+
+    def insert(self, rows: list[dict]) -> None:
+        self.inserted.extend(rows)
+
+    def flush(self) -> None:
+        pass
+
+    def query_iterator(self, batch_size: int, **kwargs):
+        batches = [self.rows[i : i + batch_size] for i in range(0, len(self.rows), batch_size)]
+        return SimpleNamespace(next=lambda: batches.pop(0) if batches else [], close=lambda: None)
+
+    def hybrid_search(self, reqs, rerank, limit, output_fields):
+        self.hybrid_calls.append(reqs)
+        return [self.hybrid_hits]
+
+
+class FakeUtility:
+    """以集合名集合模拟 Milvus utility，可指定某次重命名失败"""
+
+    def __init__(self, names: set[str], fail_rename_to: str | None = None):
+        self.names = set(names)
+        self.fail_rename_to = fail_rename_to
+        self.ops = []
+
+    def has_collection(self, name: str, using: str = "default") -> bool:
+        return name in self.names
+
+    def drop_collection(self, name: str, using: str = "default") -> None:
+        self.ops.append(("drop", name))
+        self.names.discard(name)
+
+    def rename_collection(self, old: str, new: str, using: str = "default") -> None:
+        if new == self.fail_rename_to and old != f"{new}_bm25_backup":
+            raise RuntimeError("rename failed")
+        self.ops.append(("rename", old, new))
+        self.names.remove(old)
+        self.names.add(new)
+
+
+def make_kb(collection: FakeCollection | None = None) -> MilvusKB:
+    kb = MilvusKB.__new__(MilvusKB)
+    kb.connection_alias = "default"
+    kb.databases_meta = {"kb": {"metadata": {}, "embed_info": {"name": "bge", "dimension": 4}}}
+    kb.collections = {}
+    kb._index_types = {}
+    kb._residency = SimpleNamespace(discard=lambda db_id: None)
+
+    async def get_collection(db_id):
+        return collection
+
+    async def maybe_reindex(db_id, collection, force=False):
+        return None
+
+    kb._get_milvus_collection = get_collection
+    kb._maybe_reindex = maybe_reindex
+    return kb
+
+
+def hit(chunk_id: str, distance: float):
+    entity = {"content": chunk_id, "source": "a.md", "chunk_id": chunk_id, "file_id": "f", "chunk_index": 0}
+    return SimpleNamespace(id=chunk_id, distance=distance, entity=entity)
+
+
+def test_new_collection_has_bm25_field_and_index(monkeypatch) -> None:
+    monkeypatch.setattr(milvus, "Collection", FakeCollection)
+    kb = make_kb()
+
+    collection = kb._create_new_collection("kb", {"name": "bge", "dimension": 4}, "kb")
+
+    fields = {field.name: field for field in collection.schema.fields}
+    assert fields["content"].params.get("enable_analyzer") is True
+    function = collection.schema.functions[0]
+    assert function.type == FunctionType.BM25
+    assert function.input_field_names == ["content"] and function.output_field_names == [SPARSE_FIELD]
+    assert (SPARSE_FIELD, "BM25") in [(name, params.get("metric_type")) for name, params in collection.index_calls]
+    assert MilvusKB._supports_bm25(collection)
+
+
+def test_hybrid_search_pushes_threshold_and_normalizes_score() -> None:
+    collection = FakeCollection("kb")
+    collection.hybrid_hits = [hit("c1", 2 / (RRF_K + 1)), hit("c2", 1 / (RRF_K + 1))]
+    kb = make_kb(collection)
+    search_params = {"metric_type": "COSINE", "params": {"ef": 64}}
+
+    chunks = kb._hybrid_search(collection, "变压器", [[0.1] * 4], search_params, 10, 10, None, 0.3)
+
+    dense, sparse = collection.hybrid_calls[0]
+    assert dense.param["params"] == {"ef": 64, "radius": 0.3}
+    assert sparse.anns_field == SPARSE_FIELD
+    # 两路均排第一为 1.0，原始 RRF 分数保留
+    assert [c["score"] for c in chunks] == pytest.approx([1.0, 0.5])
+    assert chunks[1]["rrf_score"] == pytest.approx(1 / (RRF_K + 1))
+
+    kb._hybrid_search(collection, "变压器", [[0.1] * 4], search_params, 10, 10, None, 0.0)
+    assert "radius" not in collection.hybrid_calls[1][0].param["params"]
+
+
+def test_similarity_radius_matches_vector_similarity() -> None:
+    assert similarity_radius("COSINE", 0.2) == 0.2
+    assert similarity_radius("L2", 0.5) == pytest.approx(1.0)  # 1 / (1 + 1.0) == 0.5
+    assert similarity_radius("COSINE", 0) is None
+
+
+def setup_migration(monkeypatch, utility: FakeUtility) -> tuple[MilvusKB, FakeCollection]:
+    old = FakeCollection("kb", fields=["id", "content", "embedding"])
+    old.rows = [
+        {
+            "id": f"r{i}",
+            "content": "c",
+            "source": "s",
+            "chunk_id": "k",
+            "file_id": "f",
+            "chunk_index": i,
+            "embedding": [0.0],
+        }
+        for i in range(5)
+    ]
+    new = FakeCollection("kb_bm25_migrating")
+    kb = make_kb(old)
+
+    def create_new_collection(name, embed_info, db_id):
+        utility.names.add(name)
+        return new
+
+    kb._create_new_collection = create_new_collection
+    monkeypatch.setattr(milvus, "utility", utility)
+    monkeypatch.setattr(milvus, "Collection", lambda name, using: SimpleNamespace(name=name))
+    return kb, new
+
+
+async def test_migration_keeps_backup_until_switch_succeeds(monkeypatch) -> None:
+    utility = FakeUtility({"kb"})
+    kb, new = setup_migration(monkeypatch, utility)
+
+    result = await kb.migrate_collection_to_bm25("kb", batch_size=2)
+
+    assert result == {"db_id": "kb", "status": "migrated", "rows": 5}
+    assert len(new.inserted) == 5
+    assert utility.ops == [
+        ("rename", "kb", "kb_bm25_backup"),
+        ("rename", "kb_bm25_migrating", "kb"),
+        ("drop", "kb_bm25_backup"),
+    ]
+
+
+async def test_migration_restores_original_when_switch_fails(monkeypatch) -> None:
+    utility = FakeUtility({"kb"}, fail_rename_to="kb")
+    kb, _ = setup_migration(monkeypatch, utility)
+
+    with pytest.raises(RuntimeError):
+        await kb.migrate_collection_to_bm25("kb")
+
+    assert "kb" in utility.names and "kb_bm25_backup" not in utility.names
+
+
+async def test_migration_recovers_interrupted_backup(monkeypatch) -> None:
+    # 上次迁移在两次重命名之间中断：只剩备份与临时集合
+    utility = FakeUtility({"kb_bm25_backup", "kb_bm25_migrating"})
+    kb, _ = setup_migration(monkeypatch, utility)
+
+    await kb.migrate_collection_to_bm25("kb")
+
+    assert utility.ops[0] == ("rename", "kb_bm25_backup", "kb")
+    assert utility.names == {"kb"}
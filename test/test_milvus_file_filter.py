@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from src.knowledge.implementations import milvus
+from src.knowledge.implementations.milvus import NO_MATCH_EXPR, MilvusKB, resolve_filter_file_ids
+
+FILES_META = {
+    "folder-1": {"database_id": "kb", "filename": "制度", "is_folder": True, "parent_id": None},
+    "folder-2": {"database_id": "kb", "filename": "安全", "is_folder": True, "parent_id": "folder-1"},
+    "file_a": {"database_id": "kb", "filename": "安全生产法.pdf", "parent_id": "folder-2"},
+    "file_b": {"database_id": "kb", "filename": "安全生产法实施细则.pdf", "parent_id": None},
+    "file_c": {"database_id": "kb", "filename": "消防条例.docx", "parent_id": "folder-1"},
+    "file_d": {"database_id": "other", "filename": "安全生产法.pdf", "parent_id": None},
+    "folder-3": {"database_id": "kb", "filename": "空目录", "is_folder": True, "parent_id": None},
+}
+
+
+def test_exact_file_name_wins_over_contains() -> None:
+    # 完全匹配时只返回该文件，且不跨知识库
+    assert resolve_filter_file_ids(FILES_META, "kb", file_name="安全生产法.pdf") == ["file_a"]
+    assert resolve_filter_file_ids(FILES_META, "kb", file_name="安全生产法") == ["file_a", "file_b"]
+
+
+def test_unresolvable_file_name_falls_back() -> None:
+    assert resolve_filter_file_ids(FILES_META, "kb", file_name="不存在") is None
+    assert resolve_filter_file_ids(FILES_META, "kb", file_name="安全%") is None
+
+
+def make_kb(files_meta: dict) -> MilvusKB:
+    kb = MilvusKB.__new__(MilvusKB)
+    kb.files_meta = files_meta
+    return kb
+
+
+def test_folder_includes_descendants() -> None:
+    assert resolve_filter_file_ids(FILES_META, "kb", folder_id="folder-1") == ["file_a", "file_c"]
+    assert resolve_filter_file_ids(FILES_META, "kb", file_name="消防", folder_id="folder-2") is None
+
+
+def test_unresolved_file_name_stays_within_folder() -> None:
+    kb = make_kb(FILES_META)
+
+    # 文件夹内没有匹配的文件名：source like 与文件夹范围同时生效，而不是检索整个知识库
+    expr = kb._build_file_expr("kb", {"file_name": "消防", "folder_id": "folder-2"})
+    assert expr == 'file_id in ["file_a"] and source like "%消防%"'
+    assert kb._build_file_expr("kb", {"file_name": "消防", "folder_id": "folder-3"}) == NO_MATCH_EXPR
+    # 未指定文件夹时仍按文件名模糊匹配
+    assert kb._build_file_expr("kb", {"file_name": "不存在"}) == 'source like "%不存在%"'
+
+
+def test_large_folder_is_split_into_in_clauses(monkeypatch) -> None:
+    monkeypatch.setattr(milvus, "FILE_FILTER_MAX_IDS", 2)
+    files_meta = {"folder": {"database_id": "kb", "filename": "大目录", "is_folder": True, "parent_id": None}}
+    files_meta.update({f"f{i}": {"database_id": "kb", "filename": f"{i}.md", "parent_id": "folder"} for i in range(5)})
+
+    # 文件数超过单个子句上限时拆分，过滤范围不变
+    assert make_kb(files_meta)._build_file_expr("kb", {"folder_id": "folder"}) == (
+        '(file_id in ["f0", "f1"] or file_id in ["f2", "f3"] or file_id in ["f4"])'
+    )
+
+
+async def test_empty_folder_matches_nothing() -> None:
+    assert resolve_filter_file_ids(FILES_META, "kb", folder_id="folder-3") == []
+
+    searches = []
+    kb = make_kb(FILES_META)
+
+    async def get_collection(db_id):
+        return SimpleNamespace(search=lambda **kwargs: searches.append(kwargs))
+
+    kb._get_milvus_collection = get_collection
+    kb._get_query_params = lambda db_id: {}
+
+    # 空文件夹不能退化为"不过滤"而检索整个知识库
+    assert kb._build_file_expr("kb", {"folder_id": "folder-3"}) == NO_MATCH_EXPR
+    assert await kb.aquery("安全", "kb", folder_id="folder-3") == []
+    assert searches == []
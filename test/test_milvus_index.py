@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+from src.knowledge.implementations.milvus import MilvusKB
+from src.knowledge.utils.milvus_index import (
+    FLAT_MAX_ROWS,
+    HNSW_MAX_ROWS,
+    build_index_params,
+    build_search_params,
+    normalize_index_profile,
+    resolve_index_type,
+)
+from src.knowledge.utils.milvus_residency import CollectionResidencyManager
+
+
+def test_resolve_index_type_auto_tiers() -> None:
+    # auto 档位按数据量切换：小库 FLAT，中等 HNSW，超大 IVF_SQ8
+    assert resolve_index_type("auto", 0) == "FLAT"
+    assert resolve_index_type(None, FLAT_MAX_ROWS) == "FLAT"
+    assert resolve_index_type("auto", FLAT_MAX_ROWS + 1) == "HNSW"
+    assert resolve_index_type("auto", HNSW_MAX_ROWS + 1) == "IVF_SQ8"
+
+
+def test_explicit_profile_ignores_row_count() -> None:
+    assert normalize_index_profile("hnsw") == "HNSW"
+    assert normalize_index_profile("unknown") == "auto"
+    assert resolve_index_type("diskann", 10) == "DISKANN"
+
+
+def test_build_index_params() -> None:
+    assert build_index_params("FLAT", 100, 1024)["params"] == {}
+    assert build_index_params("HNSW", 100, 1024)["params"] == {"M": 16, "efConstruction": 200}
+    # nlist 随数据量增长，且不低于 128
+    assert build_index_params("IVF_SQ8", 100, 1024)["params"]["nlist"] == 128
+    assert build_index_params("IVF_SQ8", 1_000_000, 1024)["params"]["nlist"] == 4000
+    # PQ 子空间数需整除维度
+    pq = build_index_params("IVF_PQ", 1_000_000, 768)["params"]
+    assert 768 % pq["m"] == 0
+
+
+def test_build_search_params_respects_limit() -> None:
+    # ef / search_list 不小于返回数量
+    assert build_search_params("HNSW", "COSINE", 100, {"hnsw_ef": 32})["params"] == {"ef": 100}
+    assert build_search_params("HNSW", "COSINE", 10, {"hnsw_ef": 128})["params"] == {"ef": 128}
+    assert build_search_params("IVF_SQ8", "COSINE", 10, {"ivf_nprobe": 64})["params"] == {"nprobe": 64}
+    assert build_search_params("DISKANN", "COSINE", 200)["params"] == {"search_list": 200}
+    assert build_search_params("FLAT", "IP", 10) == {"metric_type": "IP", "params": {}}
+
+
+class FakeIndexedCollection:
+    def __init__(self, fail_create: bool = False):
+        self.schema = SimpleNamespace(fields=[SimpleNamespace(name="embedding", params={"dim": 4})])
+        self.indexes = [
+            SimpleNamespace(field_name="embedding", index_name="embedding_idx", params={"index_type": "FLAT"})
+        ]
+        self.num_entities = HNSW_MAX_ROWS
+        self.fail_create = fail_create
+        self.ops = []
+
+    def release(self) -> None:
+        self.ops.append("release")
+
+    def load(self) -> None:
+        self.ops.append("load")
+
+    def drop_index(self, index_name: str) -> None:
+        self.ops.append("drop")
+
+    def create_index(self, field_name: str, params: dict) -> None:
+        if self.fail_create:
+            raise RuntimeError("create index failed")
+        self.ops.append(("create", params["index_type"]))
+
+
+def make_kb() -> MilvusKB:
+    kb = MilvusKB.__new__(MilvusKB)
+    kb.databases_meta = {"kb": {"metadata": {}}}
+    kb._index_types = {}
+    kb._reindex_locks = {}
+    kb._reindex_tasks = set()
+    kb._residency = CollectionResidencyManager(0, 0)
+    kb._residency._resident["kb"] = object()
+    return kb
+
+
+async def test_reindex_runs_in_background_and_reloads_collection() -> None:
+    kb, collection = make_kb(), FakeIndexedCollection()
+
+    await kb._schedule_reindex("kb", collection)
+
+    assert collection.ops == ["release", "drop", ("create", "HNSW"), "load"]
+    assert kb._index_types["kb"] == "HNSW"
+    # 驻留登记已移除，下次访问时重新登记
+    assert not kb._residency.is_resident("kb")
+    assert not kb._reindex_tasks
+
+
+async def test_failed_reindex_reloads_collection() -> None:
+    kb, collection = make_kb(), FakeIndexedCollection(fail_create=True)
+
+    assert await kb._maybe_reindex("kb", collection) is None
+
+    # 重建失败也重新加载集合，且不再被视为驻留
+    assert collection.ops == ["release", "drop", "load"]
+    assert "kb" not in kb._index_types
+    assert not kb._residency.is_resident("kb")
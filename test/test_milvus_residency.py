@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from src.knowledge.utils.milvus_residency import CollectionResidencyManager
+
+MB = 1024**2
+
+
+class FakeCollection:
+    """记录 load / release 调用次数的假集合"""
+
+    def __init__(self, load_delay: float = 0.0):
+        self.load_delay = load_delay
+        self.load_calls = 0
+        self.release_calls = 0
+
+    def load(self) -> None:
+        self.load_calls += 1
+        time.sleep(self.load_delay)
+
+    def release(self) -> None:
+        self.release_calls += 1
+
+
+async def test_concurrent_acquire_loads_once() -> None:
+    manager = CollectionResidencyManager()
+    collection = FakeCollection(load_delay=0.05)
+
+    await asyncio.gather(*(manager.acquire("kb_a", collection, lambda: MB) for _ in range(5)))
+    await manager.acquire("kb_a", collection, lambda: MB)
+
+    # 并发请求合并为一次 load，之后的访问直接命中
+    stats = manager.get_stats()
+    assert collection.load_calls == 1
+    assert stats["loads"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["hits"] == 1
+
+
+async def test_evicts_least_recently_used_over_budget() -> None:
+    manager = CollectionResidencyManager(budget_bytes=2 * MB, min_idle_seconds=0)
+    collections = {key: FakeCollection() for key in ("kb_a", "kb_b", "kb_c")}
+
+    await manager.acquire("kb_a", collections["kb_a"], lambda: MB)
+    await manager.acquire("kb_b", collections["kb_b"], lambda: MB)
+    await manager.acquire("kb_a", collections["kb_a"], lambda: MB)
+    await manager.acquire("kb_c", collections["kb_c"], lambda: MB)
+
+    # kb_b 最久未访问，超出预算后被释放
+    assert collections["kb_b"].release_calls == 1
+    assert collections["kb_a"].release_calls == 0
+    assert not manager.is_resident("kb_b")
+    assert manager.get_stats()["evictions"] == 1
+    assert manager.resident_bytes == 2 * MB
+
+
+async def test_recently_used_collections_are_kept() -> None:
+    manager = CollectionResidencyManager(budget_bytes=MB, min_idle_seconds=60)
+    first, second = FakeCollection(), FakeCollection()
+
+    await manager.acquire("kb_a", first, lambda: MB)
+    await manager.acquire("kb_b", second, lambda: MB)
+
+    # 刚访问过的集合可能仍在检索中，即使超出预算也不释放
+    assert first.release_calls == 0
+    assert manager.is_resident("kb_a") and manager.is_resident("kb_b")
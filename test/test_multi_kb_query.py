@@ -0,0 +1,53 @@
+from src.knowledge.manager import KnowledgeBaseManager
+
+
+class FakeMilvusKB:
+    """按 db_id 返回固定结果的假知识库，记录向量化与检索调用"""
+
+    def __init__(self, results: dict[str, list[dict]]):
+        self.results = results
+        self.databases_meta = {db_id: {"name": f"KB-{db_id}"} for db_id in results}
+        self.embed_calls = 0
+        self.query_kwargs = {}
+
+    def get_embedding_key(self, db_id: str) -> str:
+        return "bge-m3"
+
+    async def aembed_query(self, db_id: str, query_text: str) -> list[list[float]]:
+        self.embed_calls += 1
+        return [[0.1, 0.2]]
+
+    async def aquery(self, query_text: str, db_id: str, agent_call: bool = False, **kwargs) -> list[dict]:
+        self.query_kwargs[db_id] = kwargs
+        return self.results[db_id]
+
+    def _get_query_params(self, db_id: str) -> dict:
+        return {}
+
+
+async def test_aquery_multi_embeds_once_and_merges(tmp_path) -> None:
+    fake_kb = FakeMilvusKB(
+        {
+            "kb_a": [{"content": "安全生产法第一条", "score": 0.9}, {"content": "共同条款", "score": 0.5}],
+            "kb_b": [{"content": "共同条款", "score": 0.8}, {"content": "消防条例第三条", "score": 0.7}],
+        }
+    )
+    manager = KnowledgeBaseManager(str(tmp_path))
+
+    async def fake_get_kb(db_id: str):
+        return fake_kb
+
+    manager._get_kb_for_database = fake_get_kb
+
+    results = await manager.aquery_multi("安全", ["kb_a", "kb_b"], final_top_k=10)
+
+    # 同一 embedding 模型只向量化一次，且各库检索复用该向量、不单独重排序
+    assert fake_kb.embed_calls == 1
+    assert all(kwargs["query_embedding"] == [[0.1, 0.2]] for kwargs in fake_kb.query_kwargs.values())
+    assert all(kwargs["use_reranker"] is False for kwargs in fake_kb.query_kwargs.values())
+
+    # 跨库重复内容只保留一次，按各库排名融合
+    contents = [item["content"] for item in results]
+    assert contents.count("共同条款") == 1
+    assert len(results) == 3
+    assert {item["metadata"]["kb_name"] for item in results[:2]} == {"KB-kb_a", "KB-kb_b"}
@@ -0,0 +1,27 @@
+from src.knowledge.services.parse_cache import build_cache_key, resolve_parser_type
+
+
+def test_resolve_parser_type_by_extension() -> None:
+    assert resolve_parser_type("规章.pdf", {"enable_ocr": "mineru_ocr"}) == "pdf-mineru_ocr"
+    assert resolve_parser_type("scan.PNG") == "image-disable"
+    assert resolve_parser_type("report.docx") == "docling"
+    # 纯文本与压缩包不缓存
+    assert resolve_parser_type("notes.md") is None
+    assert resolve_parser_type("bundle.zip") is None
+
+
+def test_build_cache_key_ignores_chunking_params() -> None:
+    base = {"enable_ocr": "paddlex_ocr", "zoom_x": 2.0}
+    key = build_cache_key("abc123", "pdf-paddlex_ocr", base)
+
+    assert key.startswith("abc123/pdf-paddlex_ocr/")
+    assert build_cache_key("abc123", "pdf-paddlex_ocr", {**base, "chunk_size": 500, "db_id": "kb_1"}) == key
+    assert build_cache_key("abc123", "pdf-paddlex_ocr", {**base, "zoom_x": 3.0}) != key
+
+
+def test_build_cache_key_scoped_to_kb_for_image_uploading_parsers() -> None:
+    # Docling / MinerU 的结果引用 kb-images/{db_id}/ 下的图片，不能跨知识库复用
+    for parser_type in ("docling", "pdf-mineru_ocr", "image-mineru_official"):
+        key = build_cache_key("abc123", parser_type, {"db_id": "kb_1", "chunk_size": 500})
+        assert build_cache_key("abc123", parser_type, {"db_id": "kb_1", "chunk_size": 800}) == key
+        assert build_cache_key("abc123", parser_type, {"db_id": "kb_2"}) != key
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from src.plugins.http_client import poll_with_backoff
+from src.plugins.mineru_official_parser import MinerUOfficialParser, _MinerUBatchSubmitter
+
+
+async def test_poll_with_backoff_returns_when_done() -> None:
+    calls = []
+
+    async def fetch() -> int:
+        calls.append(1)
+        return len(calls)
+
+    result = await poll_with_backoff(fetch, lambda n: n >= 3, timeout=5, initial_delay=0.01, max_delay=0.02)
+    assert result == 3
+
+
+async def test_poll_with_backoff_raises_timeout() -> None:
+    async def fetch() -> str:
+        return "running"
+
+    with pytest.raises(TimeoutError):
+        await poll_with_backoff(fetch, lambda state: state == "done", timeout=0.05, initial_delay=0.01)
+
+
+async def test_mineru_batch_submitter_merges_concurrent_files(tmp_path) -> None:
+    parser = MinerUOfficialParser(api_key="test-key")
+    batches = []
+
+    async def fake_run_batch(items, options):
+        batches.append([item.entry["data_id"] for item in items])
+        return {item.entry["data_id"]: {"state": "done", "data_id": item.entry["data_id"]} for item in items}
+
+    parser._arun_batch = fake_run_batch
+    submitter = _MinerUBatchSubmitter(parser, batch_size=10, window=0.05)
+
+    paths = []
+    for name in ("a.pdf", "b.pdf", "a.pdf"):
+        path = tmp_path / f"{len(paths)}" / name
+        path.parent.mkdir()
+        path.write_bytes(b"%PDF")
+        paths.append(str(path))
+
+    results = await asyncio.gather(*(submitter.submit(p, {}) for p in paths))
+
+    # 三个文件合并为一个批次，同名文件的 data_id 被区分
+    assert len(batches) == 1
+    assert len(set(batches[0])) == 3
+    assert [r["data_id"] for r in results] == batches[0]
+
+
+async def test_mineru_batch_submitter_splits_by_batch_options(tmp_path) -> None:
+    parser = MinerUOfficialParser(api_key="test-key")
+    batches = []
+
+    async def fake_run_batch(items, options):
+        batches.append(options["language"])
+        return {item.entry["data_id"]: {"state": "done"} for item in items}
+
+    parser._arun_batch = fake_run_batch
+    submitter = _MinerUBatchSubmitter(parser, batch_size=10, window=0.05)
+
+    file_path = tmp_path / "doc.pdf"
+    file_path.write_bytes(b"%PDF")
+    await asyncio.gather(
+        submitter.submit(str(file_path), {"language": "ch"}),
+        submitter.submit(str(file_path), {"language": "en"}),
+    )
+
+    assert sorted(batches) == ["ch", "en"]
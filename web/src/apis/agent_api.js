@@ -39,6 +39,8 @@ export const agentApi = {
       body: JSON.stringify(data),
       signal,
       headers: {
+        // 以 SSE 返回，事件带 id，断线后可从最后收到的事件续传
+        Accept: 'text/event-stream',
         ...baseHeaders,
         ...(extraHeaders || {})
       },
@@ -76,15 +78,24 @@ export const agentApi = {
    * 获取智能体历史消息
    * @param {string} agentId - 智能体ID
    * @param {string} threadId - 会话ID
-   * @param {Object} options - 可选参数，如 { agent_config_id }
-   * @returns {Promise} - 历史消息
+   * @param {Object} options - 可选参数，如 { agent_config_id, limit, before }；before 为上一页返回的 next_cursor
+   * @returns {Promise} - 历史消息 { history, has_more, next_cursor }
    */
   getAgentHistory: (agentId, threadId, options = {}) => {
     const params = new URLSearchParams({ thread_id: threadId })
     if (options.agent_config_id != null) params.set('agent_config_id', String(options.agent_config_id))
+    if (options.limit != null) params.set('limit', String(options.limit))
+    if (options.before) params.set('before', options.before)
     return apiGet(`/api/chat/agent/${agentId}/history?${params}`)
   },
 
+  /**
+   * 获取工具调用的完整输出（历史消息中的工具输出被截断时使用）
+   * @param {string|number} toolCallId - 工具调用ID
+   * @returns {Promise} - { id, name, status, content, error_message }
+   */
+  getToolCallOutput: (toolCallId) => apiGet(`/api/chat/tool-calls/${toolCallId}`),
+
   /**
    * 获取指定会话的 AgentState
    * @param {string} agentId - 智能体ID
@@ -199,7 +210,38 @@ export const agentApi = {
       },
       ...restOptions
     })
-  }
+  },
+
+  /**
+   * 接入对话正在进行的生成（刷新页面、多标签页、断线重连）
+   * @param {string} agentId - 智能体ID
+   * @param {string} threadId - 对话线程ID
+   * @param {Object} options - { lastEventId, signal }，带 lastEventId 时从该事件之后续传
+   * @returns {Promise} - SSE 响应流；没有可接入的生成时状态码为 204
+   */
+  attachAgentRun: (agentId, threadId, { lastEventId = null, signal } = {}) => {
+    const params = new URLSearchParams({ thread_id: threadId })
+    if (lastEventId !== null && lastEventId !== undefined) {
+      params.append('last_event_id', String(lastEventId))
+    }
+    return fetch(`/api/chat/agent/${agentId}/runs/stream?${params}`, {
+      method: 'GET',
+      signal,
+      headers: {
+        Accept: 'text/event-stream',
+        ...useUserStore().getAuthHeaders()
+      }
+    })
+  },
+
+  /**
+   * 停止对话正在进行的生成（断开连接不会停止生成）
+   * @param {string} agentId - 智能体ID
+   * @param {string} threadId - 对话线程ID
+   * @returns {Promise} - { stopped }
+   */
+  stopAgentRun: (agentId, threadId) =>
+    apiPost(`/api/chat/agent/${agentId}/runs/stop`, { thread_id: threadId })
 }
 
 // =============================================================================
@@ -30,10 +30,15 @@ export const dashboardApi = {
   /**
    * 获取对话详情
    * @param {string} threadId - 对话线程ID
+   * @param {Object} params - 分页参数 { limit, before }，before 为上一页返回的 next_cursor
    * @returns {Promise<Object>} - 对话详情
    */
-  getConversationDetail: (threadId) => {
-    return apiAdminGet(`/api/dashboard/conversations/${threadId}`)
+  getConversationDetail: (threadId, params = {}) => {
+    const queryParams = new URLSearchParams()
+    if (params.limit) queryParams.append('limit', params.limit)
+    if (params.before) queryParams.append('before', params.before)
+    const query = queryParams.toString()
+    return apiAdminGet(`/api/dashboard/conversations/${threadId}${query ? `?${query}` : ''}`)
   },
 
   /**
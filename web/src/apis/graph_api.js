@@ -45,6 +45,52 @@ export const unifiedApi = {
     return await apiGet(`/api/graph/subgraph?${queryParams.toString()}`, {}, true)
   },
 
+  /**
+   * 获取图谱概览子图（高度数节点及其连接，服务端预计算，支持 ETag 协商缓存）
+   * @param {Object} params - 查询参数
+   * @param {string} params.db_id - 图谱ID
+   * @param {number} params.max_nodes - 最大节点数
+   * @returns {Promise} - 子图数据
+   */
+  getOverview: async (params) => {
+    const { db_id, max_nodes = 100 } = params
+
+    if (!db_id) {
+      throw new Error('db_id is required')
+    }
+
+    const queryParams = new URLSearchParams({
+      db_id: db_id,
+      max_nodes: max_nodes.toString()
+    })
+
+    return await apiGet(`/api/graph/overview?${queryParams.toString()}`, {}, true)
+  },
+
+  /**
+   * 展开节点的一跳邻居
+   * @param {Object} params - 查询参数
+   * @param {string} params.db_id - 图谱ID
+   * @param {string} params.node_id - 节点ID
+   * @param {number} params.limit - 最多返回的邻居关系数
+   * @returns {Promise} - 子图数据
+   */
+  expandNode: async (params) => {
+    const { db_id, node_id, limit = 50 } = params
+
+    if (!db_id || !node_id) {
+      throw new Error('db_id and node_id are required')
+    }
+
+    const queryParams = new URLSearchParams({
+      db_id: db_id,
+      node_id: String(node_id),
+      limit: limit.toString()
+    })
+
+    return await apiGet(`/api/graph/expand?${queryParams.toString()}`, {}, true)
+  },
+
   /**
    * 获取图谱统计信息 (统一接口)
    * @param {string} db_id - 图谱ID
@@ -1,25 +1,62 @@
 import { message } from 'ant-design-vue'
 import { handleChatError } from '@/utils/errorHandler'
 import { unref } from 'vue'
+import { agentApi } from '@/apis'
+
+// 连接在生成结束前断开时，最多重新接入的次数
+const MAX_REATTACH_ATTEMPTS = 3
+
+/**
+ * Parse one line of the response body.
+ * Supports NDJSON (one JSON object per line) and SSE (`id:` / `data:` fields, `:` comments).
+ * @returns {{ chunk?: Object, eventId?: number }}
+ */
+const parseStreamLine = (line) => {
+  if (!line || line.startsWith(':') || line.startsWith('event:') || line.startsWith('retry:')) {
+    return {}
+  }
+  if (line.startsWith('id:')) {
+    const eventId = Number(line.slice(3).trim())
+    return Number.isFinite(eventId) ? { eventId } : {}
+  }
+  const payload = line.startsWith('data:') ? line.slice(5).trim() : line
+  try {
+    return { chunk: JSON.parse(payload) }
+  } catch (e) {
+    console.warn('Failed to parse stream chunk JSON:', e, 'Line:', line)
+    return {}
+  }
+}
 
 /**
  * Process a streaming response from the server
  * @param {Response} response - The fetch response object
  * @param {Function} onChunk - Callback function for each parsed JSON chunk. Return true to stop processing.
+ * @returns {Promise<{ lastEventId: number|null, stopped: boolean }>} - Last SSE event id received
  */
 const processStreamResponse = async (response, onChunk) => {
+  const result = { lastEventId: null, stopped: false }
   if (!response || !response.body) {
     console.warn('Invalid response or missing body for stream processing')
-    return
+    return result
   }
 
   const reader = response.body.getReader()
   const decoder = new TextDecoder()
   let buffer = ''
-  let stopProcessing = false
+
+  const handleLine = (line) => {
+    const { chunk, eventId } = parseStreamLine(line.trim())
+    if (eventId !== undefined) {
+      result.lastEventId = eventId
+    }
+    if (chunk && onChunk && onChunk(chunk)) {
+      result.stopped = true
+    }
+  }
 
   try {
-    while (!stopProcessing) {
+    while (!result.stopped) {
       const { done, value } = await reader.read()
       if (done) break
 
@@ -28,30 +65,13 @@ const processStreamResponse = async (response, onChunk) => {
       buffer = lines.pop() || ''
 
       for (const line of lines) {
-        const trimmedLine = line.trim()
-        if (trimmedLine) {
-          try {
-            const chunk = JSON.parse(trimmedLine)
-            if (onChunk && onChunk(chunk)) {
-              stopProcessing = true
-              break
-            }
-          } catch (e) {
-            console.warn('Failed to parse stream chunk JSON:', e, 'Line:', trimmedLine)
-          }
-        }
+        handleLine(line)
+        if (result.stopped) break
       }
     }
 
-    if (!stopProcessing && buffer.trim()) {
-      try {
-        const chunk = JSON.parse(buffer.trim())
-        if (onChunk) {
-          onChunk(chunk)
-        }
-      } catch (e) {
-        console.warn('Failed to parse final stream chunk JSON:', e)
-      }
+    if (!result.stopped && buffer.trim()) {
+      handleLine(buffer)
     }
   } finally {
     try {
@@ -60,6 +80,7 @@ const processStreamResponse = async (response, onChunk) => {
       // Ignore errors on releasing lock
     }
   }
+  return result
 }
 
 export function useAgentStreamHandler({
@@ -85,7 +106,9 @@ export function useAgentStreamHandler({
       case 'init':
         threadState.onGoingConv.currentRequestKey = request_id || null
         threadState.onGoingConv.currentAssistantKey = null
-        threadState.onGoingConv.msgChunks[request_id] = [msg]
+        if (msg) {
+          threadState.onGoingConv.msgChunks[request_id] = [msg]
+        }
         return false
 
       case 'loading':
@@ -181,19 +204,73 @@ export function useAgentStreamHandler({
 
   /**
    * Process the full agent stream response
+   * When an SSE stream drops before the run ends, reattach and continue after the last event id.
    * @param {Response} response - The fetch response
    * @param {String} threadId - The thread ID
    * @param {Function} [onChunk] - Optional callback for each chunk (e.g. for logging)
+   * @param {Object} [options] - { attached }: the user message is already in the loaded history
    */
-  const handleAgentResponse = async (response, threadId, onChunk = null) => {
-    await processStreamResponse(response, (chunk) => {
+  const handleAgentResponse = async (response, threadId, onChunk = null, { attached = false } = {}) => {
+    let ended = false
+    const handleChunk = (chunk) => {
       if (onChunk) onChunk(chunk)
+      if (['finished', 'error', 'interrupted'].includes(chunk.status)) {
+        ended = true
+      }
+      if (attached && chunk.status === 'init') {
+        chunk = { ...chunk, msg: null }
+      }
       return handleStreamChunk(chunk, threadId)
-    })
+    }
+
+    let current = response
+    let lastEventId = null
+    for (let attempt = 0; ; attempt++) {
+      let connectionError = null
+      try {
+        const result = await processStreamResponse(current, handleChunk)
+        lastEventId = result.lastEventId ?? lastEventId
+        if (result.stopped) return
+      } catch (error) {
+        if (error.name === 'AbortError') throw error
+        connectionError = error
+      }
+
+      // 生成已结束，或不是可续传的 SSE 响应
+      if (ended || lastEventId === null || attempt >= MAX_REATTACH_ATTEMPTS) {
+        if (connectionError && !ended) throw connectionError
+        return
+      }
+
+      const signal = getThreadState(threadId)?.streamAbortController?.signal
+      if (signal?.aborted) return
+      console.warn(`[Stream] Connection lost, resuming after event ${lastEventId}`)
+      current = await agentApi.attachAgentRun(unref(currentAgentId), threadId, { lastEventId, signal })
+      if (current.status !== 200) return
+    }
+  }
+
+  /**
+   * Attach to a run that is still generating for this thread (page refresh, another tab).
+   * @param {String} threadId - The thread ID
+   * @param {AbortSignal} [signal] - Abort signal for the stream
+   * @returns {Promise<Boolean>} - false when there is no active run
+   */
+  const attachActiveRun = async (threadId, signal) => {
+    const response = await agentApi.attachAgentRun(unref(currentAgentId), threadId, { signal })
+    if (response.status !== 200) return false
+
+    const threadState = getThreadState(threadId)
+    if (threadState) {
+      threadState.isStreaming = true
+    }
+    await handleAgentResponse(response, threadId, null, { attached: true })
+    return true
   }
 
   return {
     handleStreamChunk,
-    handleAgentResponse
+    handleAgentResponse,
+    attachActiveRun
   }
 }
@@ -48,6 +48,21 @@ export function useGraph(graphRef) {
     refreshGraph()
   }
 
+  // 合并展开得到的子图，按 id 去重
+  const mergeGraphData = (nodes, edges) => {
+    const nodeIds = new Set(graphData.nodes.map((n) => String(n.id)))
+    const edgeIds = new Set(graphData.edges.map((e) => String(e.id)))
+    const newNodes = (nodes || []).filter((n) => !nodeIds.has(String(n.id)))
+    const newEdges = (edges || []).filter((e) => !edgeIds.has(String(e.id)))
+    if (newNodes.length === 0 && newEdges.length === 0) {
+      return 0
+    }
+    graphData.nodes = [...graphData.nodes, ...newNodes]
+    graphData.edges = [...graphData.edges, ...newEdges]
+    refreshGraph()
+    return newNodes.length
+  }
+
   const refreshGraph = () => {
     nextTick(() => {
       if (graphRef && graphRef.value && graphRef.value.refreshGraph) {
@@ -67,6 +82,7 @@ export function useGraph(graphRef) {
     handleCanvasClick,
     clearGraph,
     updateGraphData,
+    mergeGraphData,
     refreshGraph
   }
 }